@@ -3,9 +3,62 @@ Script para aplicar componentes navbar e footer em múltiplas páginas HTML
 Automatiza a componentização seguindo padrão Phase 3
 """
 
+import json
+import os
 import re
+import sys
+from functools import partial
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).parent / 'scripts' / 'automation'))
+
+from site_pipeline import (
+    CACHED,
+    ENGINE_SOURCE,
+    FAILED,
+    NOT_FOUND,
+    UNCHANGED,
+    UPDATED,
+    PageResult,
+    Rule,
+    SinglePassEngine,
+    make_parser,
+    manifest_for,
+    merge_results,
+    resolve_pages,
+    rules_digest,
+    run_incremental,
+)
+from site_pipeline.components import (
+    COMPONENTS_SOURCE,
+    FOOTER_COMPONENT,
+    FOOTER_PATTERN,
+    I18N_SCRIPT_PATTERN,
+    LOADER_SCRIPT,
+    NAVBAR_COMPONENT,
+    NAVBAR_PATTERN,
+    PLACEHOLDERS,
+    PRERENDERED_PATTERN,
+    component_sources,
+    load_components,
+    placeholder_for_block,
+    prerender_rules,
+    prerendered_block,
+)
+from site_pipeline.fingerprint import (
+    ASSET_REF_PATTERN,
+    FINGERPRINT_SOURCE,
+    AssetManifest,
+    fingerprint_content,
+    fingerprint_ref,
+)
+from site_pipeline.profiling import (
+    PageProfile,
+    add_profiling_arguments,
+    finish_profiling,
+    profiled_worker,
+)
+
 # Páginas para processar
 PAGES = [
     'blog.html',
@@ -15,31 +68,13 @@ PAGES = [
     'testimonials.html'
 ]
 
-# Padrões regex para encontrar navbar e footer
-NAVBAR_PATTERN = re.compile(
-    r'<nav class="gb-navbar".*?</nav>\s*(?:<script>.*?</script>\s*)?',
-    re.DOTALL
-)
-
-FOOTER_PATTERN = re.compile(
-    r'<footer class="gb-footer".*?</footer>',
-    re.DOTALL
-)
-
-# Componentes de substituição
-NAVBAR_COMPONENT = '<!-- Navbar Component (loaded dynamically) -->\n<div data-component="navbar"></div>\n\n'
-FOOTER_COMPONENT = '<!-- Footer Component (loaded dynamically) -->\n<div data-component="footer"></div>\n\n'
-
-# Adicionar component-loader.js
-LOADER_SCRIPT = '<script defer src="js/utils/component-loader.js?v=20251025"></script>'
-
 def add_component_loader(content):
     """Adiciona component-loader.js se não existir"""
     if 'component-loader.js' in content:
         return content
     
-    # Procura por i18n.js e adiciona logo após
-    pattern = r'(<script defer src="assets/i18n\.js.*?</script>)'
+    # Procura por i18n.js (e o runtime logo depois dele) e adiciona logo após
+    pattern = f'({I18N_SCRIPT_PATTERN})'
     replacement = r'\1\n' + LOADER_SCRIPT
     
     return re.sub(pattern, replacement, content, count=1)
@@ -52,64 +87,160 @@ def replace_footer(content):
     """Substitui footer por componente"""
     return FOOTER_PATTERN.sub(FOOTER_COMPONENT, content, count=1)
 
-def update_cache_busting(content):
-    """Atualiza versões de cache para 20251025"""
-    content = re.sub(
-        r'(\?v=)[\d-]+',
-        r'\g<1>20251025',
-        content
-    )
-    return content
-
-def process_file(filepath):
-    """Processa um arquivo HTML"""
-    print(f"\n📄 Processando {filepath.name}...")
-    
+def update_cache_busting(content, assets, page_rel='index.html'):
+    """Atualiza as versões de cache com o hash do conteúdo de cada arquivo
+
+    `assets` é o AssetManifest da execução; referências a arquivos locais
+    recebem `?v=<hash>` e o resto fica como está.
+    """
+    return fingerprint_content(content, assets, page_rel)
+
+def component_rules(navbar, footer, assets, page_rel):
+    """Regras de add_component_loader → replace_navbar → replace_footer → update_cache_busting"""
+    def insert_loader(match_text):
+        # Mantém o script do i18n e adiciona o loader, ambos com hash
+        return update_cache_busting(match_text + '\n' + LOADER_SCRIPT, assets, page_rel)
+
+    return [
+        Rule('component_loader', I18N_SCRIPT_PATTERN, insert_loader, once=True,
+             when=lambda content: 'component-loader.js' not in content),
+        Rule('navbar', NAVBAR_PATTERN, lambda _: navbar, once=True),
+        Rule('footer', FOOTER_PATTERN.pattern, lambda _: footer,
+             flags=re.DOTALL, once=True),
+        Rule('cache_busting', ASSET_REF_PATTERN,
+             lambda ref: fingerprint_ref(ref, assets, page_rel)),
+    ]
+
+def build_engine(assets, page_rel, components=None):
+    """Todas as transformações numa única passada pelo documento
+
+    Com `components` (modo --inline) o HTML de components/ é inserido na
+    página em vez do placeholder carregado em runtime.
+    """
+    if components is None:
+        return SinglePassEngine([
+            Rule('prerendered_component', PRERENDERED_PATTERN, placeholder_for_block, flags=re.DOTALL),
+            *component_rules(NAVBAR_COMPONENT, FOOTER_COMPONENT, assets, page_rel),
+        ])
+
+    navbar = NAVBAR_COMPONENT
+    footer = FOOTER_COMPONENT
+    if 'navbar' in components:
+        navbar = prerendered_block('navbar', components['navbar'], page_rel) + '\n\n'
+    if 'footer' in components:
+        footer = prerendered_block('footer', components['footer'], page_rel) + '\n\n'
+    return SinglePassEngine([
+        *prerender_rules(components, page_rel),
+        *component_rules(navbar, footer, assets, page_rel),
+    ])
+
+def transform(content, assets, page_rel, components=None):
+    """Aplica todas as transformações em uma única passada"""
+    return build_engine(assets, page_rel, components).apply(content)
+
+def process_file(filepath, assets, root, inline=False):
+    """Processa um arquivo HTML e devolve um PageResult"""
+    if not filepath.exists():
+        return PageResult(str(filepath), NOT_FOUND, f"⚠️  {filepath.name} não encontrado, pulando...")
+
     try:
         content = filepath.read_text(encoding='utf-8')
-        original_length = len(content.split('\n'))
+        original_length = content.count('\n') + 1
         
-        # Aplicar transformações
-        content = add_component_loader(content)
-        content = replace_navbar(content)
-        content = replace_footer(content)
-        content = update_cache_busting(content)
+        # Aplicar transformações (passada única, com tempo/bytes/matches por regra)
+        page_rel = Path(os.path.relpath(filepath, root)).as_posix()
+        components = load_components(root) if inline else None
+        rule_profile = {}
+        new_content, counts = build_engine(assets, page_rel, components).scan(content, profile=rule_profile)
+        profile = PageProfile()
+        profile.add_engine(counts, rule_profile)
+        stats = {'profile': profile.as_list()}
+        if new_content == content:
+            return PageResult(str(filepath), UNCHANGED, f"   ✓ {filepath.name}: sem alterações", stats=stats)
+        content = new_content
         
         # Salvar
         filepath.write_text(content, encoding='utf-8')
         
-        new_length = len(content.split('\n'))
+        new_length = content.count('\n') + 1
         diff = original_length - new_length
         
-        print(f"   ✅ {filepath.name}: {original_length} → {new_length} linhas ({diff:+d})")
-        
-        return diff
+        message = f"   ✅ {filepath.name}: {original_length} → {new_length} linhas ({diff:+d})"
+        return PageResult(str(filepath), UPDATED, message, diff, stats)
         
     except Exception as e:
-        print(f"   ❌ Erro em {filepath.name}: {e}")
-        return 0
+        return PageResult(str(filepath), FAILED, f"   ❌ Erro em {filepath.name}: {e}")
+
+def stream_file(filepath, assets, root, inline=False):
+    """Como process_file, mas sem carregar a página na memória (--stream)
+
+    O arquivo é mapeado com mmap, só os trechos reescritos são decodificados
+    e a saída vai para um arquivo temporário renomeado no lugar no final.
+    """
+    if not filepath.exists():
+        return PageResult(str(filepath), NOT_FOUND, f"⚠️  {filepath.name} não encontrado, pulando...")
+
+    try:
+        page_rel = Path(os.path.relpath(filepath, root)).as_posix()
+        components = load_components(root) if inline else None
+        rule_profile = {}
+        result = build_engine(assets, page_rel, components).stream(filepath, profile=rule_profile)
+        profile = PageProfile()
+        profile.add_engine(result.counts, rule_profile)
+        stats = {'profile': profile.as_list()}
+        if not result.changed:
+            return PageResult(str(filepath), UNCHANGED, f"   ✓ {filepath.name}: sem alterações", stats=stats)
+
+        original_length = result.lines_before + 1
+        new_length = result.lines_after + 1
+        diff = original_length - new_length
+        message = f"   ✅ {filepath.name}: {original_length} → {new_length} linhas ({diff:+d})"
+        return PageResult(str(filepath), UPDATED, message, diff, stats)
+
+    except Exception as e:
+        return PageResult(str(filepath), FAILED, f"   ❌ Erro em {filepath.name}: {e}")
 
 def main():
     """Função principal"""
-    base_path = Path(__file__).parent
-    total_lines_removed = 0
+    parser = make_parser('Aplica componentes navbar/footer nas páginas HTML')
+    parser.add_argument('--inline', action='store_true',
+                        help='pré-renderiza navbar/footer de components/ na página (sem fetch em runtime)')
+    parser.add_argument('--stream', action='store_true',
+                        help='processa cada página via mmap e arquivo temporário, com memória limitada '
+                             'qualquer que seja o tamanho da página')
+    add_profiling_arguments(parser)
+    args = parser.parse_args()
+    pages = resolve_pages(args, PAGES)
     
     print("🚀 Iniciando componentização em batch...")
-    print(f"📁 Diretório: {base_path}")
-    print(f"📋 Páginas: {', '.join(PAGES)}\n")
+    print(f"📁 Diretório: {args.root}")
+    if args.all:
+        print(f"📋 Páginas: {len(pages)} encontradas\n")
+    else:
+        print(f"📋 Páginas: {', '.join(PAGES)}\n")
     
-    for page in PAGES:
-        filepath = base_path / page
-        
-        if not filepath.exists():
-            print(f"⚠️  {page} não encontrado, pulando...")
-            continue
-            
-        lines_removed = process_file(filepath)
-        total_lines_removed += lines_removed
+    # Hashes dos assets calculados uma vez e compartilhados com os workers
+    assets = AssetManifest.build(args.root)
+    worker = partial(stream_file if args.stream else process_file,
+                     assets=assets, root=args.root, inline=args.inline)
+    rules = rules_digest(Path(__file__), ENGINE_SOURCE, FINGERPRINT_SOURCE, COMPONENTS_SOURCE,
+                         json.dumps(assets.versions, sort_keys=True))
+    manifest_name = 'apply-components'
+    if args.inline:
+        # Editar um componente invalida todas as páginas pré-renderizadas
+        rules = rules_digest(rules, *component_sources(args.root))
+        manifest_name = 'apply-components-inline'
+    manifest = manifest_for(args, manifest_name, rules)
+    results = run_incremental(profiled_worker(worker, args), pages, args.workers, manifest)
+    for result in results:
+        print(result.message)
     
+    summary = merge_results(results)
     print(f"\n✨ Concluído!")
-    print(f"📊 Total removido: {total_lines_removed} linhas")
+    print(f"📊 Total removido: {summary['lines_removed']} linhas")
+    print(f"📄 Páginas: {summary[UPDATED]} atualizadas, {summary[UNCHANGED]} sem alterações, "
+          f"{summary[CACHED]} em cache, {summary[NOT_FOUND]} não encontradas, {summary[FAILED]} com erro")
+    finish_profiling(args, results)
     print(f"🎯 Componentes aplicados com sucesso!")
 
 if __name__ == '__main__':
@@ -0,0 +1,52 @@
+/*! Garcia Builder – i18n dictionaries of one page, fetched per language */
+/*
+ * The per-page counterpart of assets/i18n.js: instead of every dictionary it
+ * fetches only the strings the page uses, one language at a time, for
+ * assets/i18n-runtime.js, which loads next. The build
+ * (scripts/automation/site_pipeline/i18n_bundles.py) writes those
+ * dictionaries and swaps this script in for assets/i18n.js, naming them in
+ * data-i18n-en / data-i18n-pt / data-i18n-es.
+ */
+(function () {
+  'use strict';
+
+  const script = document.currentScript;
+
+  // lang → { keys: { "dotted.key": text }, text: { "English text": translation } }
+  const BUNDLES = {};
+  const pending = {};
+  const empty = { keys: {}, text: {} };
+
+  function load(lang) {
+    if (BUNDLES[lang]) return Promise.resolve(BUNDLES[lang]);
+    if (pending[lang]) return pending[lang];
+    const url = script && script.getAttribute('data-i18n-' + lang);
+    if (!url) return Promise.resolve(empty);
+    pending[lang] = fetch(url, { credentials: 'same-origin' })
+      .then(response => {
+        if (!response.ok) throw new Error(`HTTP ${response.status}`);
+        return response.json();
+      })
+      .then(bundle => {
+        BUNDLES[lang] = { keys: bundle.keys || {}, text: bundle.text || {} };
+        return BUNDLES[lang];
+      })
+      .catch(error => {
+        console.warn(`[i18n] Could not load the ${lang} strings:`, error);
+        return empty;
+      })
+      .finally(() => { delete pending[lang]; });
+    return pending[lang];
+  }
+
+  // The build already resolved each key in the page's language, English included
+  window.GB_I18N_SOURCE = {
+    has: (lang) => Boolean(BUNDLES[lang]),
+    load,
+    t: (lang, key) => {
+      const keys = (BUNDLES[lang] || empty).keys;
+      return Object.prototype.hasOwnProperty.call(keys, key) ? keys[key] : undefined;
+    },
+    text: (lang) => (BUNDLES[lang] || empty).text
+  };
+})();
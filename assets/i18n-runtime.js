@@ -0,0 +1,221 @@
+/*! Garcia Builder – Safe i18n (no DOM wipe, no page freeze) */
+/*
+ * The runtime every translated page loads (window.GB_I18N, the gb_lang
+ * preference, data-i18n / data-i18n-ph, untagged text). It reads its strings
+ * from the dictionary script loaded just before it, which sets
+ * window.GB_I18N_SOURCE:
+ *
+ * - assets/i18n.js: every dictionary, in the script itself,
+ * - assets/i18n-lite.js: the strings of one page, fetched per language
+ *   (written by scripts/automation/site_pipeline/i18n_bundles.py).
+ *
+ * A source has has(lang), load(lang) → Promise, t(lang, key) (undefined when
+ * missing, English already used as the fallback) and text(lang), the untagged
+ * English text → translation map.
+ */
+(function () {
+  'use strict';
+
+  const source = window.GB_I18N_SOURCE || {
+    has: () => true,
+    load: () => Promise.resolve(),
+    t: () => undefined,
+    text: () => ({})
+  };
+  if (!window.GB_I18N_SOURCE) console.warn('[i18n] No dictionary script loaded before assets/i18n-runtime.js');
+
+  const KEY = "gb_lang";
+  const clamp = (l) => (l==="en"||l==="pt"||l==="es") ? l : "en";
+  const LANGUAGE_SELECT_IDS = ['lang-select', 'lang-select-navbar', 'lang-select-footer'];
+
+  function getLang() {
+    try { return clamp(localStorage.getItem(KEY) || "en"); } catch { return "en"; }
+  }
+  function setLang(l) {
+    const lang = clamp(l);
+    try { localStorage.setItem(KEY, lang); } catch {}
+    const changed = () => {
+      translatePage(lang);
+      // Notify listeners (e.g., FAQ page) that language changed
+      try { document.dispatchEvent(new Event('languageChanged')); } catch {}
+    };
+    if (source.has(lang)) {
+      changed();
+      return Promise.resolve();
+    }
+    return source.load(lang).then(changed);
+  }
+
+  function syncLanguageSelectors(lang) {
+    LANGUAGE_SELECT_IDS.forEach(id => {
+      const el = document.getElementById(id);
+      if (!el) return;
+
+      if (lang && el.value !== lang) {
+        el.value = lang;
+      }
+
+      if (el.dataset.gbLangBound === '1') {
+        return;
+      }
+
+      el.addEventListener('change', () => {
+        const newLang = clamp(el.value || '');
+        if (newLang && newLang !== getLang()) {
+          setLang(newLang);
+        }
+      });
+
+      el.dataset.gbLangBound = '1';
+    });
+  }
+
+  const t = (lang, key, fallback) => {
+    const value = source.t(lang, key);
+    return value !== undefined ? value : fallback;
+  };
+
+  const normalizeStaticText = (value) => String(value || '').replace(/\s+/g, ' ').trim();
+  const getStaticTextMap = (lang) => lang === 'en' ? {} : source.text(lang) || {};
+  // A language whose strings could not be loaded shows the page's English
+  const english = (lang) => lang === 'en' || !source.has(lang);
+
+  const hasI18nAncestor = (node) => {
+    let el = node && node.parentElement;
+    while (el) {
+      if (
+        el.hasAttribute('data-i18n') ||
+        el.hasAttribute('data-i18n-ph') ||
+        el.hasAttribute('data-i18n-placeholder') ||
+        el.hasAttribute('data-no-auto-i18n')
+      ) return true;
+      el = el.parentElement;
+    }
+    return false;
+  };
+
+  const translateStaticTextNodes = (lang) => {
+    if (!document.body) return;
+    const map = getStaticTextMap(lang);
+    const skipTags = new Set(['SCRIPT', 'STYLE', 'NOSCRIPT', 'IFRAME', 'SVG']);
+    const walker = document.createTreeWalker(document.body, NodeFilter.SHOW_TEXT);
+
+    while (walker.nextNode()) {
+      const node = walker.currentNode;
+      const parent = node.parentElement;
+      if (!parent || skipTags.has(parent.tagName) || hasI18nAncestor(node)) continue;
+
+      const original = node.__gbI18nSourceText || normalizeStaticText(node.nodeValue);
+      if (!original) continue;
+      if (!node.__gbI18nSourceText) node.__gbI18nSourceText = original;
+
+      const next = english(lang) ? original : map[original];
+      if (!next) continue;
+
+      const leading = (node.nodeValue.match(/^\s*/) || [''])[0];
+      const trailing = (node.nodeValue.match(/\s*$/) || [''])[0];
+      node.nodeValue = `${leading}${next}${trailing}`;
+    }
+  };
+
+  const translateStaticAttributes = (lang) => {
+    const map = getStaticTextMap(lang);
+    document.querySelectorAll('[placeholder], [title], [aria-label]').forEach(el => {
+      ['placeholder', 'title', 'aria-label'].forEach(attr => {
+        if (!el.hasAttribute(attr)) return;
+        if (el.hasAttribute('data-i18n-ph') && attr === 'placeholder') return;
+
+        const sourceAttr = `data-gb-i18n-source-${attr}`;
+        const original = el.getAttribute(sourceAttr) || normalizeStaticText(el.getAttribute(attr));
+        if (!original) return;
+        if (!el.hasAttribute(sourceAttr)) el.setAttribute(sourceAttr, original);
+
+        const next = english(lang) ? original : map[original];
+        if (next && el.getAttribute(attr) !== next) el.setAttribute(attr, next);
+      });
+    });
+  };
+
+  const withStaticFallback = (lang, value, source) => {
+    if (lang === 'en') return value;
+    const map = getStaticTextMap(lang);
+    const fromValue = map[normalizeStaticText(value)];
+    if (fromValue) return fromValue;
+    const fromSource = map[normalizeStaticText(source)];
+    return fromSource || value;
+  };
+
+  let staticObserver = null;
+  let staticObserverPending = false;
+  const scheduleStaticTranslations = () => {
+    if (staticObserverPending) return;
+    staticObserverPending = true;
+    setTimeout(() => {
+      staticObserverPending = false;
+      translateStaticTextNodes(getLang());
+      translateStaticAttributes(getLang());
+    }, 0);
+  };
+
+  const observeStaticTranslations = () => {
+    if (!document.body || staticObserver || typeof MutationObserver === 'undefined') return;
+    staticObserver = new MutationObserver(scheduleStaticTranslations);
+    staticObserver.observe(document.body, {
+      childList: true,
+      subtree: true,
+      attributes: true,
+      attributeFilter: ['placeholder', 'title', 'aria-label']
+    });
+  };
+
+  function translatePage(lang) {
+    // Apply text content translations
+    document.querySelectorAll('[data-i18n]').forEach(el => {
+      const key = el.getAttribute('data-i18n'); if (!key) return;
+      const current = (el.textContent || '').trim();
+      const sourceAttr = 'data-gb-i18n-source-text';
+      const original = el.getAttribute(sourceAttr) || current;
+      if (!el.hasAttribute(sourceAttr) && current) el.setAttribute(sourceAttr, current);
+      const val = withStaticFallback(lang, t(lang, key, source.has(lang) ? current : original), original);
+      if (val !== undefined && val !== null) el.textContent = val;
+    });
+
+    // Apply placeholder translations
+    document.querySelectorAll('[data-i18n-ph]').forEach(el => {
+      const key = el.getAttribute('data-i18n-ph'); if (!key) return;
+      const current = el.getAttribute('placeholder') || '';
+      const sourceAttr = 'data-gb-i18n-source-placeholder';
+      const original = el.getAttribute(sourceAttr) || current;
+      if (!el.hasAttribute(sourceAttr) && current) el.setAttribute(sourceAttr, current);
+      const val = withStaticFallback(lang, t(lang, key, source.has(lang) ? current : original), original);
+      if (val !== undefined && val !== null) el.setAttribute('placeholder', val);
+    });
+
+    syncLanguageSelectors(lang);
+    translateStaticTextNodes(lang);
+    translateStaticAttributes(lang);
+  }
+
+  function apply(lang) {
+    // Not loaded yet: translate once the load settles (a failed one leaves the English)
+    if (!source.has(lang)) source.load(lang).then(() => translatePage(lang));
+    else translatePage(lang);
+  }
+
+  // Start loading the visitor's language before the document is parsed
+  source.load(getLang());
+
+  document.addEventListener('DOMContentLoaded', function () {
+    const lang = getLang(); // EN by default
+    apply(lang);
+    syncLanguageSelectors(lang);
+    observeStaticTranslations();
+  });
+
+  document.addEventListener('componentLoaded', () => {
+    apply(getLang());
+    observeStaticTranslations();
+  });
+
+  window.GB_I18N = { setLang, getLang, applyTranslations: apply };
+})();
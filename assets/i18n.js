@@ -1,4 +1,4 @@
-/*! Garcia Builder – Safe i18n (no DOM wipe, no page freeze) */
+/*! Garcia Builder – i18n dictionaries (every page, every language) for assets/i18n-runtime.js */
 (function () {
   'use strict';
 
@@ -2918,9 +2918,6 @@
     disclaimer: "*AVISO: Los resultados pueden variar. Los resultados dependen de circunstancias individuales. Los plazos no estan garantizados. La fuerza de voluntad siempre es necesaria!"
   });
 
-  const KEY = "gb_lang";
-  const clamp = (l) => (l==="en"||l==="pt"||l==="es") ? l : "en";
-  const LANGUAGE_SELECT_IDS = ['lang-select', 'lang-select-navbar', 'lang-select-footer'];
   const STATIC_TEXT_TRANSLATIONS = {
     pt: {
       "I didn't grow up with perfect conditions. The Air Force was my first coach: 05:00 alarms, inspections, and standards that didn't care about excuses. There I learned that discipline beats mood and that progress is a decision repeated daily. When I moved to London, I carried that mindset into a city where I knew no one. I worked long hours, learned a new rhythm, and rebuilt my life one training session at a time. The gym became my compass; iron gave me structure when everything else was uncertain, and reps became a language I could trust.": "Nao cresci com condicoes perfeitas. A Forca Aerea foi meu primeiro treinador: alarmes as 05:00, inspecoes e padroes que nao aceitavam desculpas. La aprendi que disciplina vence humor e que progresso e uma decisao repetida todos os dias. Quando me mudei para Londres, levei essa mentalidade para uma cidade onde nao conhecia ninguem. Trabalhei longas horas, aprendi um novo ritmo e reconstruí minha vida uma sessao de treino por vez. A academia virou minha bussola; o ferro me deu estrutura quando todo o resto era incerto, e as repeticoes viraram uma linguagem em que eu podia confiar.",
@@ -3742,41 +3739,6 @@
     "FALAR COM O COACH": "HABLAR CON EL ENTRENADOR"
   });
 
-  function getLang() {
-    try { return clamp(localStorage.getItem(KEY) || "en"); } catch { return "en"; }
-  }
-  function setLang(l) {
-    const lang = clamp(l);
-    try { localStorage.setItem(KEY, lang); } catch {}
-    apply(lang);
-    // Notify listeners (e.g., FAQ page) that language changed
-    try { document.dispatchEvent(new Event('languageChanged')); } catch {}
-  }
-
-  function syncLanguageSelectors(lang) {
-    LANGUAGE_SELECT_IDS.forEach(id => {
-      const el = document.getElementById(id);
-      if (!el) return;
-
-      if (lang && el.value !== lang) {
-        el.value = lang;
-      }
-
-      if (el.dataset.gbLangBound === '1') {
-        return;
-      }
-
-      el.addEventListener('change', () => {
-        const newLang = clamp(el.value || '');
-        if (newLang && newLang !== getLang()) {
-          setLang(newLang);
-        }
-      });
-
-      el.dataset.gbLangBound = '1';
-    });
-  }
-
   const getByPath = readPath;
   const t = (lang, key, fallback) => {
     const v1 = getByPath(DICTS[lang]||{}, key);
@@ -3815,135 +3777,15 @@
     return map;
   };
 
-  const hasI18nAncestor = (node) => {
-    let el = node && node.parentElement;
-    while (el) {
-      if (
-        el.hasAttribute('data-i18n') ||
-        el.hasAttribute('data-i18n-ph') ||
-        el.hasAttribute('data-i18n-placeholder') ||
-        el.hasAttribute('data-no-auto-i18n')
-      ) return true;
-      el = el.parentElement;
-    }
-    return false;
-  };
-
-  const translateStaticTextNodes = (lang) => {
-    if (!document.body) return;
-    const map = getStaticTextMap(lang);
-    const skipTags = new Set(['SCRIPT', 'STYLE', 'NOSCRIPT', 'IFRAME', 'SVG']);
-    const walker = document.createTreeWalker(document.body, NodeFilter.SHOW_TEXT);
-
-    while (walker.nextNode()) {
-      const node = walker.currentNode;
-      const parent = node.parentElement;
-      if (!parent || skipTags.has(parent.tagName) || hasI18nAncestor(node)) continue;
-
-      const original = node.__gbI18nSourceText || normalizeStaticText(node.nodeValue);
-      if (!original) continue;
-      if (!node.__gbI18nSourceText) node.__gbI18nSourceText = original;
-
-      const next = lang === 'en' ? original : map[original];
-      if (!next) continue;
-
-      const leading = (node.nodeValue.match(/^\s*/) || [''])[0];
-      const trailing = (node.nodeValue.match(/\s*$/) || [''])[0];
-      node.nodeValue = `${leading}${next}${trailing}`;
-    }
+  // The dictionaries for assets/i18n-runtime.js, which loads next
+  window.GB_I18N_SOURCE = {
+    has: () => true,
+    load: () => Promise.resolve(),
+    t: (lang, key) => t(lang, key),
+    text: getStaticTextMap
   };
 
-  const translateStaticAttributes = (lang) => {
-    const map = getStaticTextMap(lang);
-    document.querySelectorAll('[placeholder], [title], [aria-label]').forEach(el => {
-      ['placeholder', 'title', 'aria-label'].forEach(attr => {
-        if (!el.hasAttribute(attr)) return;
-        if (el.hasAttribute('data-i18n-ph') && attr === 'placeholder') return;
-
-        const sourceAttr = `data-gb-i18n-source-${attr}`;
-        const original = el.getAttribute(sourceAttr) || normalizeStaticText(el.getAttribute(attr));
-        if (!original) return;
-        if (!el.hasAttribute(sourceAttr)) el.setAttribute(sourceAttr, original);
-
-        const next = lang === 'en' ? original : map[original];
-        if (next && el.getAttribute(attr) !== next) el.setAttribute(attr, next);
-      });
-    });
-  };
-
-  const withStaticFallback = (lang, value, source) => {
-    if (lang === 'en') return value;
-    const map = getStaticTextMap(lang);
-    const fromValue = map[normalizeStaticText(value)];
-    if (fromValue) return fromValue;
-    const fromSource = map[normalizeStaticText(source)];
-    return fromSource || value;
-  };
-
-  let staticObserver = null;
-  let staticObserverPending = false;
-  const scheduleStaticTranslations = () => {
-    if (staticObserverPending) return;
-    staticObserverPending = true;
-    setTimeout(() => {
-      staticObserverPending = false;
-      translateStaticTextNodes(getLang());
-      translateStaticAttributes(getLang());
-    }, 0);
-  };
-
-  const observeStaticTranslations = () => {
-    if (!document.body || staticObserver || typeof MutationObserver === 'undefined') return;
-    staticObserver = new MutationObserver(scheduleStaticTranslations);
-    staticObserver.observe(document.body, {
-      childList: true,
-      subtree: true,
-      attributes: true,
-      attributeFilter: ['placeholder', 'title', 'aria-label']
-    });
-  };
-
-  function apply(lang) {
-    // Apply text content translations
-    document.querySelectorAll('[data-i18n]').forEach(el => {
-      const key = el.getAttribute('data-i18n'); if (!key) return;
-      const current = (el.textContent || '').trim();
-      const sourceAttr = 'data-gb-i18n-source-text';
-      const source = el.getAttribute(sourceAttr) || current;
-      if (!el.hasAttribute(sourceAttr) && current) el.setAttribute(sourceAttr, current);
-      const val = withStaticFallback(lang, t(lang, key, current), source);
-      if (val !== undefined && val !== null) el.textContent = val;
-    });
-
-    // Apply placeholder translations
-    document.querySelectorAll('[data-i18n-ph]').forEach(el => {
-      const key = el.getAttribute('data-i18n-ph'); if (!key) return;
-      const current = el.getAttribute('placeholder') || '';
-      const sourceAttr = 'data-gb-i18n-source-placeholder';
-      const source = el.getAttribute(sourceAttr) || current;
-      if (!el.hasAttribute(sourceAttr) && current) el.setAttribute(sourceAttr, current);
-      const val = withStaticFallback(lang, t(lang, key, current), source);
-      if (val !== undefined && val !== null) el.setAttribute('placeholder', val);
-    });
-
-    syncLanguageSelectors(lang);
-    translateStaticTextNodes(lang);
-    translateStaticAttributes(lang);
-  }
-
-  document.addEventListener('DOMContentLoaded', function () {
-    const lang = getLang(); // EN by default
-    apply(lang);
-    syncLanguageSelectors(lang);
-    observeStaticTranslations();
-  });
-
-  document.addEventListener('componentLoaded', () => {
-    apply(getLang());
-    observeStaticTranslations();
-  });
-
-  // Expose APIs and raw dictionaries for legacy consumers
-  window.GB_I18N = { setLang, getLang, applyTranslations: apply };
+  // Raw dictionaries for legacy consumers
   window.DICTS = DICTS;
+  window.GB_I18N_STATIC_TEXT = STATIC_TEXT_TRANSLATIONS;
 })();
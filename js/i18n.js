@@ -1,4 +1,4 @@
-/*! Legacy i18n bridge: older pages load this path, newer pages use assets/i18n.js */
+/*! Legacy i18n bridge: older pages load this path, newer pages use assets/i18n.js + assets/i18n-runtime.js */
 (function () {
   'use strict';
 
@@ -24,9 +24,12 @@
     return;
   }
 
-  const script = document.createElement('script');
-  script.src = 'assets/i18n.js';
-  script.defer = true;
-  script.onload = applyNow;
-  document.head.appendChild(script);
+  // Dictionaries first, then the runtime that reads them (inserted scripts keep this order with async off)
+  ['assets/i18n.js', 'assets/i18n-runtime.js'].forEach((src, index, all) => {
+    const script = document.createElement('script');
+    script.src = src;
+    script.async = false;
+    if (index === all.length - 1) script.onload = applyNow;
+    document.head.appendChild(script);
+  });
 })();
@@ -1218,6 +1218,24 @@ async function injectComponent(element) {
     console.log(`[Component Loader] ✓ Injected ${componentName}`);
 }
 
+/**
+ * Wire up components that were inlined at build time
+ */
+function initPrerenderedComponents(elements) {
+    for (const el of elements) {
+        const componentName = el.getAttribute('data-prerendered-component');
+        if (el.dataset.gbPrerenderedReady === '1') continue;
+        el.dataset.gbPrerenderedReady = '1';
+        if (componentName === 'navbar') {
+            initializeNavbar();
+        }
+        document.dispatchEvent(new CustomEvent('componentLoaded', {
+            detail: { componentName, prerendered: true, timestamp: Date.now() }
+        }));
+    }
+    console.log(`[Component Loader] ✓ ${elements.length} prerendered components initialized`);
+}
+
 /**
  * Initialize all components
  */
@@ -1232,6 +1250,13 @@ async function initComponents() {
     normalizeGlobalAssets();
 
     if (elements.length === 0) {
+        // Components inlined at build time (apply-components.py --inline)
+        // only need their behaviour wired up, nothing is fetched.
+        const prerendered = document.querySelectorAll('[data-prerendered-component]');
+        if (prerendered.length > 0) {
+            initPrerenderedComponents(prerendered);
+            return;
+        }
         console.warn('[Component Loader] No components found on page');
         normalizeGlobalAssets();
         return;
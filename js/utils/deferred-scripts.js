@@ -0,0 +1,35 @@
+// Load tracking and third-party scripts once the visitor interacts or the page is idle.
+(function loadDeferredScripts() {
+  const EVENTS = ['pointerdown', 'keydown', 'touchstart', 'scroll', 'wheel'];
+  const IDLE_TIMEOUT = 4000;
+  const listener = { passive: true, capture: true };
+  let started = false;
+
+  function start() {
+    if (started) return;
+    started = true;
+    EVENTS.forEach((name) => window.removeEventListener(name, start, listener));
+    document.querySelectorAll('script[data-deferred-script]').forEach((placeholder) => {
+      const script = document.createElement('script');
+      Array.from(placeholder.attributes).forEach(({ name, value }) => {
+        if (name === 'type' || name === 'data-deferred-script' || name === 'data-third-party') return;
+        if (name === 'data-src') script.setAttribute('src', value);
+        else if (name === 'data-type') script.setAttribute('type', value);
+        else script.setAttribute(name, value);
+      });
+      // Inserted scripts run as soon as they arrive; keep the page's order
+      // for those that were not async to begin with.
+      script.async = placeholder.hasAttribute('async');
+      placeholder.replaceWith(script);
+    });
+  }
+
+  function whenIdle() {
+    if ('requestIdleCallback' in window) window.requestIdleCallback(start, { timeout: IDLE_TIMEOUT });
+    else setTimeout(start, IDLE_TIMEOUT / 2);
+  }
+
+  EVENTS.forEach((name) => window.addEventListener(name, start, listener));
+  if (document.readyState === 'complete') whenIdle();
+  else window.addEventListener('load', whenIdle, { once: true });
+})();
@@ -1,4 +1,5 @@
 const assert = require('node:assert/strict');
+const crypto = require('node:crypto');
 const fs = require('node:fs');
 const path = require('node:path');
 
@@ -14,12 +15,19 @@ function read(relativePath) {
   return fs.readFileSync(path.join(root, relativePath), 'utf8');
 }
 
+// The site pipeline's cache busting replaces hand-set tokens with the file's content hash
+function contentVersion(relativePath) {
+  return crypto.createHash('sha256').update(fs.readFileSync(path.join(root, relativePath))).digest('hex').slice(0, 10);
+}
+
+const bootstrapTokens = [assessmentToken, contentVersion('js/starter-tracking-bootstrap.js')];
+
 for (const entry of assessmentEntries) {
   const html = read(entry);
   assert(!html.includes('connect.facebook.net/en_US/fbevents.js'), `${entry} must not bootstrap Meta directly`);
   assert(!html.includes('facebook.com/tr?id='), `${entry} must not contain a consent-bypassing Meta image tag`);
   assert(!html.includes('googletagmanager.com/gtag/js?id=AW-'), `${entry} must not load a direct Google Ads tag outside the assessment consent gate`);
-  assert(html.includes(`/js/starter-tracking-bootstrap.js?v=${assessmentToken}`), `${entry} must use the current assessment-only tracking bootstrap`);
+  assert(bootstrapTokens.some((token) => html.includes(`/js/starter-tracking-bootstrap.js?v=${token}`)), `${entry} must use the current assessment-only tracking bootstrap`);
 }
 
 const cardRedirect = read('go/card/index.html');
@@ -0,0 +1,62 @@
+"""
+Move inline blocks repeated across pages into shared, fingerprinted files.
+
+Example: the ~7 KB navbar <style> that update-navbar.py pastes into every
+page becomes one css/shared/inline-<hash>.css linked from each page, and
+its menu <script> (--kind script) one js/shared/inline-<hash>.js.
+"""
+
+import os
+from collections import Counter
+
+from site_pipeline import UPDATED, make_parser, resolve_pages
+from site_pipeline.shared_blocks import BLOCK_KINDS, extract_shared_blocks
+
+# Pages to scan when --all is not given
+PAGES = [
+    'index.html',
+    'about.html',
+    'pricing.html',
+    'contact.html',
+    'faq.html',
+    'testimonials.html',
+    'transformations.html',
+    'blog.html'
+]
+
+def main():
+    parser = make_parser('Extract inline blocks repeated across pages into shared files')
+    parser.add_argument('--kind', choices=sorted(BLOCK_KINDS), default='style',
+                        help='inline element to extract (default: style)')
+    parser.add_argument('--min-pages', type=int, default=2,
+                        help='only extract blocks found on at least this many pages')
+    args = parser.parse_args()
+
+    kind = BLOCK_KINDS[args.kind]
+    pages = resolve_pages(args, PAGES)
+    print(f"🔎 Scanning {len(pages)} pages for repeated inline <{kind.name}> blocks...\n")
+
+    results, shared_paths = extract_shared_blocks(pages, args.root, kind, args.min_pages, args.workers)
+    for result in results:
+        if result.status != UPDATED:
+            continue
+        print(result.message)
+
+    saved = sum(result.stats.get('bytes_saved', 0) for result in results)
+    shared_bytes = sum(os.path.getsize(args.root / rel) for rel, _ in shared_paths.values())
+    copies = Counter(rel for result in results for rel in result.stats.get('files', ()))
+    print(f"\n📦 Shared files: {len(shared_paths)}")
+    for rel, _ in sorted(shared_paths.values()):
+        size = os.path.getsize(args.root / rel)
+        print(f"   - {rel} ({size / 1024:.1f} KB): {copies[rel]} duplicate(s) removed")
+    if kind.deferred_reference:
+        references = sum(copies.values())
+        deferred = sum(result.stats.get('deferred', 0) for result in results)
+        print(f"⏳ References loaded with defer: {deferred}/{references} "
+              f"(the rest stay synchronous to keep execution order)")
+    print(f"📉 Inline bytes removed site-wide: {saved / 1024:.1f} KB "
+          f"(shared files: {shared_bytes / 1024:.1f} KB, downloaded once and cached)")
+    print(f"📄 Pages updated: {sum(result.status == UPDATED for result in results)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Run selected page transforms with one read and one write per page.
+
+Replaces running update-navbar.py, update-navbar-additional.py,
+standardize-navbar.py and apply-components.py one after the other:
+
+    python run-pipeline.py -t navbar_upgrade,navbar_insert,components,loader,cache_busting --all
+    python run-pipeline.py -t cache_busting --pages 'blog/*.html' --pages index.html
+    python run-pipeline.py --list
+    python run-pipeline.py -t prerender_components,loader,cache_busting --all --watch
+
+Every transform rewrites pages, so the pages are always chosen explicitly:
+`--pages` globs, or `--all` for every page of the tree.
+"""
+
+import sys
+from collections import Counter
+
+from site_pipeline import (
+    CACHED,
+    FAILED,
+    NOT_FOUND,
+    UNCHANGED,
+    UPDATED,
+    discover_pages,
+    glob_pages,
+    make_parser,
+    manifest_for,
+    merge_results,
+)
+from site_pipeline.pipeline import (
+    TRANSFORMS,
+    load_shared_data,
+    pipeline_digest,
+    run_pipeline,
+    select_transforms,
+)
+from site_pipeline.profiling import add_profiling_arguments, finish_profiling
+from site_pipeline.watch import DEBOUNCE, POLL_INTERVAL, Watcher
+
+def main():
+    parser = make_parser('Run selected page transforms with one read and one write per page')
+    parser.add_argument('-t', '--transform', action='append', dest='transforms', default=[],
+                        metavar='NAME[,NAME...]', help='transform(s) to run (repeatable); see --list')
+    parser.add_argument('--pages', action='append', default=[], metavar='GLOB',
+                        help="root-relative page glob, e.g. 'blog/*.html' (repeatable; --all: every page)")
+    parser.add_argument('--list', action='store_true', help='list the registered transforms and exit')
+    parser.add_argument('--watch', action='store_true',
+                        help='keep running and re-apply the transforms to what each edit affects')
+    parser.add_argument('--poll', action='store_true', help='with --watch, poll instead of using inotify')
+    parser.add_argument('--interval', type=float, default=POLL_INTERVAL,
+                        help='with --poll, seconds between scans (default: %(default)s)')
+    parser.add_argument('--debounce', type=float, default=DEBOUNCE,
+                        help='with --watch, seconds of quiet that close a burst of edits (default: %(default)s)')
+    add_profiling_arguments(parser)
+    args = parser.parse_args()
+
+    if args.list:
+        for transform in TRANSFORMS.values():
+            print(f"{transform.name:<22} {transform.description}")
+        return
+
+    names = [name for value in args.transforms for name in value.split(',') if name]
+    if not names:
+        parser.error('select at least one transform with -t (see --list)')
+    try:
+        transforms = select_transforms(names)
+    except ValueError as e:
+        parser.error(str(e))
+
+    if not args.pages and not args.all:
+        parser.error("select the pages with --pages GLOB or --all")
+    pages = glob_pages(args.root, args.pages) if args.pages else discover_pages(args.root)
+    if not pages:
+        print("⚠️  No pages matched")
+        sys.exit(1)
+
+    print(f"🚀 {' → '.join(t.name for t in transforms)}")
+    print(f"📋 {len(pages)} pages\n")
+
+    assets, components = load_shared_data(transforms, args.root)
+    manifest_name = 'pipeline-' + '+'.join(t.name for t in transforms)
+    manifest = manifest_for(args, manifest_name, pipeline_digest(transforms, args.root, assets))
+    if args.watch:
+        watcher = Watcher(args.root, transforms, manifest, assets, components, args.pages, args.workers,
+                          args.poll, args.interval, args.debounce)
+        results = watcher.start()
+    else:
+        results = run_pipeline(pages, transforms, args.root, args.workers, manifest, assets, components,
+                               cprofile_dir=args.cprofile)
+    for result in results:
+        if result.status != UNCHANGED and result.status != CACHED:
+            print(result.message)
+
+    summary = merge_results(results)
+    per_transform = Counter(name for result in results for name in result.stats.get('transforms', ()))
+    print(f"\n📊 Pages changed per transform:")
+    for transform in transforms:
+        print(f"   {transform.name:<22} {per_transform[transform.name]}")
+    read = summary['total'] - summary[CACHED] - summary[NOT_FOUND]
+    print(f"📄 {read} pages read once, {summary[UPDATED]} written once "
+          f"({summary[UNCHANGED]} unchanged, {summary[CACHED]} cached, "
+          f"{summary[NOT_FOUND]} not found, {summary[FAILED]} failed)")
+    finish_profiling(args, results)
+    if args.watch:
+        print(f"\n👀 Watching pages, components/ and referenced assets (Ctrl+C to stop)")
+        watcher.loop()
+        return
+    if summary[FAILED]:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Shared helpers for the Python site automation scripts.
+
+The standalone scripts (`apply-components.py`, `standardize-navbar.py`,
+`update-navbar.py`, `update-navbar-additional.py`) import from here so the
+heavy lifting lives in one place.
+"""
+
+from .batch import (
+    CACHED,
+    FAILED,
+    NOT_FOUND,
+    REPO_ROOT,
+    SITE_SECTIONS,
+    UNCHANGED,
+    UPDATED,
+    PageResult,
+    discover_pages,
+    glob_pages,
+    make_parser,
+    merge_results,
+    resolve_pages,
+    run_batch,
+)
+from .elements import ElementPattern
+from .engine import ENGINE_SOURCE, Rule, SinglePassEngine
+from .manifest import (
+    BuildManifest,
+    content_digest,
+    manifest_for,
+    rules_digest,
+    run_incremental,
+)
+
+__all__ = [
+    'CACHED',
+    'FAILED',
+    'NOT_FOUND',
+    'REPO_ROOT',
+    'SITE_SECTIONS',
+    'UNCHANGED',
+    'UPDATED',
+    'PageResult',
+    'discover_pages',
+    'glob_pages',
+    'make_parser',
+    'merge_results',
+    'resolve_pages',
+    'run_batch',
+    'ElementPattern',
+    'ENGINE_SOURCE',
+    'Rule',
+    'SinglePassEngine',
+    'BuildManifest',
+    'content_digest',
+    'manifest_for',
+    'rules_digest',
+    'run_incremental',
+]
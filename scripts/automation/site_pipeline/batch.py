@@ -0,0 +1,122 @@
+"""
+Page discovery and parallel batch execution.
+
+`discover_pages` finds every HTML page under a site root and `run_batch`
+fans a per-page worker out over a process pool, returning the per-page
+results in input order so each script can print one merged summary.
+"""
+
+import argparse
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+
+# Repo root (scripts/automation/site_pipeline/batch.py → ../../..)
+REPO_ROOT = Path(__file__).resolve().parents[3]
+
+# Directories (relative to the root) that hold site pages
+SITE_SECTIONS = ('.', 'blog', 'pages/public', 'pages/auth', 'pages/admin')
+
+# The build output also holds the per-language copies i18n.py writes
+LANGUAGE_DIRS = ('pt', 'es')
+OUTPUT_SECTIONS = SITE_SECTIONS + tuple(
+    language if section == '.' else f'{language}/{section}'
+    for language in LANGUAGE_DIRS for section in SITE_SECTIONS
+)
+
+UPDATED = 'updated'
+UNCHANGED = 'unchanged'
+NOT_FOUND = 'not_found'
+FAILED = 'failed'
+CACHED = 'cached'
+
+
+@dataclass
+class PageResult:
+    """Outcome of processing one page in a worker.
+
+    `stats` carries stage-specific numbers (bytes saved, matches, ...).
+    """
+
+    page: str
+    status: str
+    message: str = ''
+    lines_removed: int = 0
+    stats: dict = field(default_factory=dict)
+
+
+def discover_pages(root, sections=SITE_SECTIONS):
+    """Return every `*.html` page in the site sections under `root`, sorted."""
+    root = Path(root)
+    pages = []
+    for section in sections:
+        directory = root / section
+        if directory.is_dir():
+            pages.extend(p for p in directory.glob('*.html') if p.is_file())
+    return sorted(pages)
+
+
+def glob_pages(root, patterns):
+    """Every `*.html` page under `root` matching one of the glob `patterns`, sorted."""
+    root = Path(root)
+    pages = set()
+    for pattern in patterns:
+        pages.update(p for p in root.glob(pattern) if p.is_file() and p.suffix == '.html')
+    return sorted(pages)
+
+
+def run_batch(worker, paths, workers=None):
+    """Run `worker(path)` for every path, across `workers` processes.
+
+    `workers=None` uses every CPU core; `workers=1` runs in-process. The
+    worker must be a module-level function so it can be pickled.
+    """
+    paths = list(paths)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(paths) <= 1:
+        return [worker(path) for path in paths]
+
+    chunksize = max(1, len(paths) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=min(workers, len(paths))) as pool:
+        return list(pool.map(worker, paths, chunksize=chunksize))
+
+
+def merge_results(results):
+    """Merge per-page results into one summary dict."""
+    statuses = Counter(result.status for result in results)
+    return {
+        'total': len(results),
+        UPDATED: statuses[UPDATED],
+        UNCHANGED: statuses[UNCHANGED],
+        NOT_FOUND: statuses[NOT_FOUND],
+        FAILED: statuses[FAILED],
+        CACHED: statuses[CACHED],
+        'lines_removed': sum(result.lines_removed for result in results),
+    }
+
+
+def add_batch_arguments(parser):
+    """Add the shared `--root/--all/--workers/--force` options to a script's CLI."""
+    parser.add_argument('--root', type=Path, default=REPO_ROOT,
+                        help='site root (default: repository root)')
+    parser.add_argument('--all', action='store_true',
+                        help='process every page found under --root instead of the fixed list')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='worker processes (default: all CPU cores, 1 = serial)')
+    parser.add_argument('--force', action='store_true',
+                        help='ignore the incremental manifest and reprocess every page')
+    return parser
+
+
+def resolve_pages(args, default_pages):
+    """Pages selected by the CLI: the discovered tree or the script's list."""
+    if args.all:
+        return discover_pages(args.root)
+    return [args.root / page for page in default_pages]
+
+
+def make_parser(description):
+    """ArgumentParser preloaded with the shared batch options."""
+    return add_batch_arguments(argparse.ArgumentParser(description=description))
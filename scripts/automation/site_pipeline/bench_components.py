@@ -0,0 +1,88 @@
+"""
+Benchmark: runtime component fetches before and after pre-rendering.
+
+Every `data-component` placeholder is one `fetch()` of
+`components/<name>.html` by `js/utils/component-loader.js` (with
+`cache: 'no-store'`, so on every view). This renders each page in memory
+the way `apply-components.py --inline` does and counts what is left.
+
+    cd scripts/automation
+    python -m site_pipeline.bench_components [--root ../..] [--json out.json]
+"""
+
+import argparse
+import json
+import re
+import time
+from pathlib import Path
+
+from .batch import REPO_ROOT, discover_pages
+from .components import PLACEHOLDER_PATTERN, load_components, placeholder_name, prerender_rules
+from .engine import SinglePassEngine
+
+_PLACEHOLDER = re.compile(PLACEHOLDER_PATTERN)
+
+
+def measure_page(path, root, components):
+    """Fetch counts, bytes and render time for one page."""
+    content = path.read_text(encoding='utf-8')
+    page_rel = path.relative_to(root).as_posix()
+    before = [placeholder_name(m.group(0)) for m in _PLACEHOLDER.finditer(content)]
+
+    start = time.perf_counter()
+    rendered = SinglePassEngine(prerender_rules(components, page_rel)).apply(content)
+    elapsed = time.perf_counter() - start
+
+    after = [placeholder_name(m.group(0)) for m in _PLACEHOLDER.finditer(rendered)]
+    return {
+        'page': page_rel,
+        'fetches_before': len(before),
+        'fetches_after': len(after),
+        'fetched_bytes_before': sum(len(components.get(n, '').encode('utf-8')) for n in before),
+        'fetched_bytes_after': sum(len(components.get(n, '').encode('utf-8')) for n in after),
+        'html_bytes_before': len(content.encode('utf-8')),
+        'html_bytes_after': len(rendered.encode('utf-8')),
+        'render_ms': round(elapsed * 1000, 3),
+    }
+
+
+def run(root):
+    root = Path(root)
+    components = load_components(root)
+    rows = [measure_page(path, root, components) for path in discover_pages(root)]
+    totals = {
+        key: sum(row[key] for row in rows)
+        for key in rows[0] if key != 'page'
+    } if rows else {}
+    return {'pages': len(rows), 'totals': totals, 'rows': rows}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--root', type=Path, default=REPO_ROOT)
+    parser.add_argument('--json', type=Path, help='write the full result as JSON')
+    args = parser.parse_args()
+
+    result = run(args.root)
+    totals = result['totals']
+    print(f"{'page':<48} {'fetches':>9} {'fetched KB':>12} {'render ms':>10}")
+    for row in result['rows']:
+        if row['fetches_before']:
+            print(f"{row['page']:<48} {row['fetches_before']:>4} → {row['fetches_after']:<2}"
+                  f" {row['fetched_bytes_before'] / 1024:>7.1f} → {row['fetched_bytes_after'] / 1024:<3.0f}"
+                  f" {row['render_ms']:>10.2f}")
+    if totals:
+        print(f"\n📄 {result['pages']} pages")
+        print(f"🌐 component fetches per full-site view: {totals['fetches_before']} → {totals['fetches_after']}")
+        print(f"📦 component bytes fetched: {totals['fetched_bytes_before'] / 1024:.1f} KB → "
+              f"{totals['fetched_bytes_after'] / 1024:.1f} KB")
+        print(f"📈 HTML grew by {(totals['html_bytes_after'] - totals['html_bytes_before']) / 1024:.1f} KB "
+              f"(compressible, served with the first response)")
+        print(f"⏱️  pre-render time: {totals['render_ms']:.1f} ms")
+
+    if args.json:
+        args.json.write_text(json.dumps(result, indent=2), encoding='utf-8')
+
+
+if __name__ == '__main__':
+    main()
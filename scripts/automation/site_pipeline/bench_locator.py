@@ -0,0 +1,112 @@
+"""
+Benchmark: lazy `.*?</nav>` regexes against the balanced `ElementPattern`.
+
+Our two largest pages do not carry a navbar themselves (it comes from the
+component loader), so each page is measured as it is and with
+`components/navbar.html` inserted after `<body>` the way the update-navbar
+scripts do: once as-is (`gb-navbar`) and once with the outer class renamed
+to the old `navbar`. Throughput is the best of `--repeat` full scans.
+
+    cd scripts/automation
+    python -m site_pipeline.bench_locator [--root ../..] [--page my-profile-production.html] [--json out.json]
+"""
+
+import argparse
+import json
+import re
+import time
+from pathlib import Path
+
+from .batch import REPO_ROOT
+from .components import load_components
+from .elements import ElementPattern
+
+DEFAULT_PAGES = ('my-profile-production.html', 'workouts.html')
+
+# (name, regex currently in the scripts, equivalent locator)
+PATTERNS = (
+    ('gb-navbar',
+     re.compile(r'<nav class="gb-navbar".*?</nav>', re.DOTALL),
+     ElementPattern('nav', start=r'<nav class="gb-navbar"[^>]*>')),
+    ('navbar',
+     re.compile(r'<nav class="navbar">.*?</nav>', re.DOTALL),
+     ElementPattern('nav', start=r'<nav class="navbar">')),
+)
+
+
+def page_variants(content, navbar):
+    """The page as-is plus versions carrying the new and the old navbar."""
+    variants = {'as-is': content}
+    if navbar:
+        old_navbar = re.sub(r'^<nav class="gb-navbar"[^>]*>', '<nav class="navbar">', navbar, count=1)
+        for name, markup in (('with gb-navbar', navbar), ('with old navbar', old_navbar)):
+            variants[name] = re.sub(r'(<body[^>]*>)', lambda m: f'{m.group(1)}\n{markup}', content, count=1)
+    return variants
+
+
+def time_scan(pattern, text, repeat):
+    """Best wall time of `repeat` full `finditer` scans, and the spans found."""
+    best = float('inf')
+    spans = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        spans = [match.span() for match in pattern.finditer(text)]
+        best = min(best, time.perf_counter() - start)
+    return best, spans
+
+
+def measure(page, text, variant, repeat):
+    rows = []
+    size = len(text.encode('utf-8'))
+    for name, regex, locator in PATTERNS:
+        regex_time, regex_spans = time_scan(regex, text, repeat)
+        locator_time, locator_spans = time_scan(locator, text, repeat)
+        rows.append({
+            'page': page,
+            'variant': variant,
+            'pattern': name,
+            'bytes': size,
+            'matches': len(locator_spans),
+            'regex_ms': round(regex_time * 1000, 4),
+            'locator_ms': round(locator_time * 1000, 4),
+            'regex_mb_s': round(size / regex_time / 1e6, 1) if regex_time else None,
+            'locator_mb_s': round(size / locator_time / 1e6, 1) if locator_time else None,
+            # Where the regex stops short, it left a broken fragment behind
+            'regex_truncated': sum(r != l for r, l in zip(regex_spans, locator_spans)),
+        })
+    return rows
+
+
+def run(root, pages=DEFAULT_PAGES, repeat=50):
+    root = Path(root)
+    navbar = load_components(root).get('navbar')
+    rows = []
+    for page in pages:
+        content = (root / page).read_text(encoding='utf-8')
+        for variant, text in page_variants(content, navbar).items():
+            rows.extend(measure(page, text, variant, repeat))
+    return {'repeat': repeat, 'rows': rows}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--root', type=Path, default=REPO_ROOT)
+    parser.add_argument('--page', action='append', dest='pages',
+                        help=f'page to measure (repeatable, default: {", ".join(DEFAULT_PAGES)})')
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--json', type=Path, help='write the full result as JSON')
+    args = parser.parse_args()
+
+    result = run(args.root, args.pages or DEFAULT_PAGES, args.repeat)
+    print(f"{'page':<28} {'variant':<16} {'pattern':<10} {'KB':>6} "
+          f"{'regex MB/s':>11} {'locator MB/s':>13} {'truncated':>10}")
+    for row in result['rows']:
+        print(f"{row['page']:<28} {row['variant']:<16} {row['pattern']:<10} {row['bytes'] / 1024:>6.1f} "
+              f"{row['regex_mb_s']:>11} {row['locator_mb_s']:>13} {row['regex_truncated']:>10}")
+
+    if args.json:
+        args.json.write_text(json.dumps(result, indent=2), encoding='utf-8')
+
+
+if __name__ == '__main__':
+    main()
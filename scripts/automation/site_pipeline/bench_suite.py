@@ -0,0 +1,253 @@
+"""
+Benchmark suite: every script and every transform on synthetic sites.
+
+For each size in `--sizes`, a synthetic site (see `synthetic.py`) is
+generated and
+
+- each script runs on its own fresh copy (`--all --force`), timed from
+  the outside as a subprocess; peak RSS is the script process's own
+  (`--workers 1` by default, so all of the work happens in it),
+- each registered pipeline transform runs in memory over every page in a
+  fresh process; only the transform call is timed, and peak RSS is that
+  process's.
+
+With `--repeat N` the best of N runs is kept (small sites are noisy).
+Wall time, pages/sec, MB/sec and peak RSS go to a JSON file (default
+`.site-pipeline/bench/bench-<timestamp>.json`). `--baseline` compares
+pages/sec with an earlier result and exits non-zero on a regression.
+
+    cd scripts/automation
+    python -m site_pipeline.bench_suite [--sizes 10,100,1000] [--baseline old.json]
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+from .batch import REPO_ROOT, discover_pages
+from .manifest import MANIFEST_DIR
+from .pipeline import TRANSFORMS, Page, load_shared_data, select_transforms
+from .synthetic import generate_site
+
+AUTOMATION_DIR = Path(__file__).resolve().parents[1]
+
+# name → (script, extra arguments)
+SCRIPTS = {
+    'apply-components': (REPO_ROOT / 'apply-components.py', []),
+    'apply-components-inline': (REPO_ROOT / 'apply-components.py', ['--inline']),
+    'update-navbar': (AUTOMATION_DIR / 'update-navbar.py', []),
+    'update-navbar-additional': (AUTOMATION_DIR / 'update-navbar-additional.py', []),
+    'standardize-navbar': (AUTOMATION_DIR / 'standardize-navbar.py', []),
+    'extract-shared-blocks': (AUTOMATION_DIR / 'extract-shared-blocks.py', []),
+    'run-pipeline': (AUTOMATION_DIR / 'run-pipeline.py',
+                     ['-t', 'navbar_upgrade,navbar_insert,components,loader,cache_busting']),
+}
+
+DEFAULT_SIZES = (10, 100, 1000)
+
+
+def _rates(pages, size, seconds):
+    return {
+        'pages_per_s': round(pages / seconds, 1) if seconds else None,
+        'mb_per_s': round(size / seconds / 1e6, 2) if seconds else None,
+    }
+
+
+def _max_rss_mb(usage):
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    scale = 1 if sys.platform == 'darwin' else 1024
+    return round(usage.ru_maxrss * scale / 1e6, 1)
+
+
+def run_script(name, site, info, workers):
+    """Run one script on `site` and measure it."""
+    script, extra = SCRIPTS[name]
+    command = [sys.executable, str(script), '--root', str(site), '--all', '--force',
+               '--workers', str(workers), *extra]
+    start = time.perf_counter()
+    process = subprocess.Popen(command, cwd=script.parent,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    _, status, usage = os.wait4(process.pid, 0)
+    elapsed = time.perf_counter() - start
+    process.returncode = os.waitstatus_to_exitcode(status)
+    return {
+        'kind': 'script',
+        'name': name,
+        'pages': info['pages'],
+        'wall_s': round(elapsed, 4),
+        **_rates(info['pages'], info['html_bytes'], elapsed),
+        'peak_rss_mb': _max_rss_mb(usage),
+        'returncode': process.returncode,
+    }
+
+
+def measure_transform(name, site):
+    """Run one transform over every page in memory (in a fresh process)."""
+    transforms = select_transforms([name])
+    transform = transforms[0]
+    assets, components = load_shared_data(transforms, site)
+    pages = discover_pages(site)
+
+    elapsed = 0.0
+    size = 0
+    changed = 0
+    for path in pages:
+        content = path.read_text(encoding='utf-8')
+        page = Page(path.relative_to(site).as_posix(), path.name, assets, components)
+        start = time.perf_counter()
+        result = transform.func(content, page)
+        elapsed += time.perf_counter() - start
+        size += len(content.encode('utf-8'))
+        changed += result != content
+    return {
+        'kind': 'transform',
+        'name': name,
+        'pages': len(pages),
+        'wall_s': round(elapsed, 4),
+        **_rates(len(pages), size, elapsed),
+        'peak_rss_mb': _max_rss_mb(resource.getrusage(resource.RUSAGE_SELF)),
+        'changed_pages': changed,
+    }
+
+
+def run_transform(name, site):
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+        return pool.submit(measure_transform, name, site).result()
+
+
+def _best(measure, repeat):
+    return min((measure() for _ in range(max(1, repeat))), key=lambda row: row['wall_s'])
+
+
+def run_size(pages, scripts, transforms, workers, seed, workdir, repeat=1):
+    """Generate one site and benchmark everything on it."""
+    template = Path(workdir) / f'site-{pages}'
+    start = time.perf_counter()
+    info = generate_site(template, pages, seed)
+    generate_s = time.perf_counter() - start
+
+    rows = []
+    for name in transforms:
+        rows.append(_best(lambda: run_transform(name, template), repeat))
+        print(_format_row(rows[-1]))
+
+    def fresh_run(name):
+        site = Path(workdir) / f'site-{pages}-{name}'
+        shutil.copytree(template, site)
+        try:
+            return run_script(name, site, info, workers)
+        finally:
+            shutil.rmtree(site, ignore_errors=True)
+
+    for name in scripts:
+        rows.append(_best(lambda: fresh_run(name), repeat))
+        print(_format_row(rows[-1]))
+    shutil.rmtree(template, ignore_errors=True)
+    return {
+        'pages': pages,
+        'html_bytes': info['html_bytes'],
+        'layouts': info['layouts'],
+        'generate_s': round(generate_s, 3),
+        'results': rows,
+    }
+
+
+def _format_row(row):
+    status = '' if row.get('returncode', 0) == 0 else f"  (exit {row['returncode']})"
+    return (f"   {row['kind']:<9} {row['name']:<26} {row['wall_s']:>9.3f} s {row['pages_per_s'] or 0:>10.1f} p/s "
+            f"{row['mb_per_s'] or 0:>8.2f} MB/s {row['peak_rss_mb']:>7.1f} MB{status}")
+
+
+def compare(result, baseline, tolerance):
+    """Rows whose pages/sec dropped by more than `tolerance` against `baseline`."""
+    previous = {
+        (run['pages'], row['kind'], row['name']): row
+        for run in baseline.get('runs', []) for row in run['results']
+    }
+    regressions = []
+    for run in result['runs']:
+        for row in run['results']:
+            old = previous.get((run['pages'], row['kind'], row['name']))
+            if not old or not old.get('pages_per_s') or not row.get('pages_per_s'):
+                continue
+            ratio = row['pages_per_s'] / old['pages_per_s']
+            if ratio < 1 - tolerance:
+                regressions.append({'pages': run['pages'], 'kind': row['kind'], 'name': row['name'],
+                                    'before': old['pages_per_s'], 'after': row['pages_per_s'],
+                                    'ratio': round(ratio, 3)})
+    return regressions
+
+
+def _names(value, available):
+    names = [name for name in value.split(',') if name] if value else list(available)
+    unknown = [name for name in names if name not in available]
+    if unknown:
+        raise SystemExit(f"unknown: {', '.join(unknown)} (available: {', '.join(available)})")
+    return names
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)),
+                        help='comma-separated site sizes in pages (default: %(default)s)')
+    parser.add_argument('--scripts', help='comma-separated scripts (default: all)')
+    parser.add_argument('--transforms', help='comma-separated transforms (default: all)')
+    parser.add_argument('--workers', type=int, default=1, help='--workers passed to the scripts')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=1, help='keep the best of this many runs')
+    parser.add_argument('--json', type=Path, help='where to write the result')
+    parser.add_argument('--baseline', type=Path, help='earlier result to compare pages/sec with')
+    parser.add_argument('--tolerance', type=float, default=0.15,
+                        help='allowed pages/sec drop against the baseline (default: %(default)s)')
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(',') if size]
+    scripts = _names(args.scripts, SCRIPTS)
+    transforms = _names(args.transforms, TRANSFORMS)
+
+    result = {
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'workers': args.workers,
+        'seed': args.seed,
+        'repeat': args.repeat,
+        'runs': [],
+    }
+    with tempfile.TemporaryDirectory(prefix='site-bench-') as workdir:
+        for pages in sizes:
+            print(f"🏗️  {pages} pages")
+            result['runs'].append(run_size(pages, scripts, transforms, args.workers, args.seed, workdir, args.repeat))
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding='utf-8'))
+        result['baseline'] = str(args.baseline)
+        result['regressions'] = compare(result, baseline, args.tolerance)
+
+    output = args.json or REPO_ROOT / MANIFEST_DIR / 'bench' / f"bench-{datetime.now():%Y%m%d-%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(result, indent=2), encoding='utf-8')
+    print(f"\n📝 {output}")
+
+    for regression in result.get('regressions', []):
+        print(f"🐢 {regression['kind']} {regression['name']} @ {regression['pages']} pages: "
+              f"{regression['before']} → {regression['after']} pages/s")
+    if result.get('regressions'):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,182 @@
+"""
+Build-time pre-rendering of the shared navbar/footer components.
+
+`components/*.html` stays the single source of truth. Instead of leaving a
+`<div data-component="...">` placeholder for `js/utils/component-loader.js`
+to fetch on first view, the component HTML is inlined into the page with
+its `data-gb-nav` links resolved and the current page's links marked
+active, the same way the runtime loader (and `standardize_navbar`) would.
+"""
+
+import re
+from pathlib import Path
+
+from .elements import ElementPattern
+from .engine import Rule
+
+COMPONENT_NAMES = ('navbar', 'footer')
+
+# Hashed into rule digests so pattern/rendering changes invalidate manifests
+COMPONENTS_SOURCE = Path(__file__)
+
+# The hand-written navbar/footer that components/ replaces. The navbar's
+# menu <script> may follow it inline or already moved to js/shared/ by
+# extract-shared-blocks.py; the nested <nav>s need a balanced locator.
+NAVBAR_PATTERN = ElementPattern(
+    'nav', start=r'<nav class="gb-navbar"[^>]*>',
+    tail=r'\s*(?:<script>.*?</script>\s*|<script (?:defer )?src="[^"]*js/shared/inline-[0-9a-f]+\.js[^"]*"></script>\s*)?',
+)
+
+FOOTER_PATTERN = re.compile(
+    r'<footer class="gb-footer".*?</footer>',
+    re.DOTALL
+)
+
+# Runtime placeholders filled by js/utils/component-loader.js
+NAVBAR_COMPONENT = '<!-- Navbar Component (loaded dynamically) -->\n<div data-component="navbar"></div>\n\n'
+FOOTER_COMPONENT = '<!-- Footer Component (loaded dynamically) -->\n<div data-component="footer"></div>\n\n'
+PLACEHOLDERS = {'navbar': NAVBAR_COMPONENT, 'footer': FOOTER_COMPONENT}
+
+# The loader goes right after the i18n scripts (its ?v= comes from the file hash)
+LOADER_SCRIPT = '<script defer src="js/utils/component-loader.js"></script>'
+I18N_SCRIPT_PATTERN = (r'<script defer src="assets/i18n\.js.*?</script>'
+                       r'(?:\s*<script defer src="assets/i18n-runtime\.js.*?</script>)?')
+
+# <div data-component="navbar"></div>, with the comment apply-components adds
+PLACEHOLDER_PATTERN = (
+    r'(?:<!-- (?:Navbar|Footer) Component \(loaded dynamically[^>]*-->\s*)?'
+    r'<div\b[^>]*\bdata-component="(?:navbar|footer)"[^>]*>\s*</div>'
+)
+
+# A block previously inlined by this module (re-rendered on every run)
+PRERENDERED_PATTERN = (
+    r'<!-- (Navbar|Footer) Component \(prerendered[^>]*-->.*?<!-- /\1 Component -->'
+)
+
+_PLACEHOLDER_NAME = re.compile(r'data-component="([a-z]+)"')
+_BLOCK_NAME = re.compile(r'<!-- (Navbar|Footer) Component')
+_NAV_ANCHOR = re.compile(r'<a\b[^>]*\bdata-gb-nav="([^"]*)"[^>]*>')
+_FIRST_ELEMENT = re.compile(r'<(?!!)([a-zA-Z][\w-]*)')
+_HREF_ATTR = re.compile(r'\bhref="[^"]*"')
+_CLASS_ATTR = re.compile(r'\bclass="([^"]*)"')
+
+# Links the runtime loader highlights (initializeNavbar)
+ACTIVE_LINK_CLASSES = ('gb-navbar-link', 'gb-menu-link')
+
+
+def load_components(root):
+    """Read `components/{navbar,footer}.html` under `root`."""
+    components = {}
+    for name in COMPONENT_NAMES:
+        path = Path(root) / 'components' / f'{name}.html'
+        if path.exists():
+            components[name] = path.read_text(encoding='utf-8').strip()
+    return components
+
+
+def component_sources(root):
+    """Paths whose content defines the rendered components (for rule digests)."""
+    paths = [Path(root) / 'components' / f'{name}.html' for name in COMPONENT_NAMES]
+    return [COMPONENTS_SOURCE] + [path for path in paths if path.exists()]
+
+
+def page_route_candidates(page_rel):
+    """Every `data-gb-nav` target that points at the page `page_rel`."""
+    page_rel = page_rel.replace('\\', '/').lstrip('/')
+    candidates = {page_rel}
+    if page_rel.endswith('.html'):
+        candidates.add(page_rel[:-len('.html')])
+    if page_rel == 'index.html':
+        candidates.add('')
+    elif page_rel.endswith('/index.html'):
+        candidates.add(page_rel[:-len('/index.html')])
+    return candidates
+
+
+def resolve_nav_href(target):
+    """Root-absolute href for a `data-gb-nav` target (mirrors resolveNavHref)."""
+    target = target.strip()
+    if not target:
+        return '#'
+    if re.match(r'^[a-z]+:', target, re.IGNORECASE) or target.startswith('#'):
+        return target
+    return '/' + target.lstrip('/')
+
+
+def render_component(html, page_rel):
+    """Resolve nav links in component `html` and mark `page_rel`'s links active."""
+    routes = page_route_candidates(page_rel)
+
+    def rewrite_anchor(match):
+        tag = match.group(0)
+        target = match.group(1)
+        href = resolve_nav_href(target)
+        if _HREF_ATTR.search(tag):
+            tag = _HREF_ATTR.sub(lambda _: f'href="{href}"', tag, count=1)
+        else:
+            tag = tag.replace('<a', f'<a href="{href}"', 1)
+
+        route = target.strip().lstrip('/').split('?')[0]
+        class_match = _CLASS_ATTR.search(tag)
+        classes = class_match.group(1).split() if class_match else []
+        if route in routes and any(c in classes for c in ACTIVE_LINK_CLASSES):
+            tag = _CLASS_ATTR.sub(lambda _: f'class="{" ".join(classes + ["active"])}"', tag, count=1)
+            tag = tag[:-1] + ' aria-current="page">'
+        return tag
+
+    return _NAV_ANCHOR.sub(rewrite_anchor, html)
+
+
+def mark_prerendered(html, name):
+    """Tag the component's root element so the runtime loader can find it."""
+    return _FIRST_ELEMENT.sub(
+        lambda m: f'{m.group(0)} data-prerendered-component="{name}"', html, count=1
+    )
+
+
+def prerendered_block(name, html, page_rel):
+    """Inlined component wrapped in the markers `PRERENDERED_PATTERN` finds."""
+    label = name.capitalize()
+    return (
+        f'<!-- {label} Component (prerendered from components/{name}.html) -->\n'
+        f'{mark_prerendered(render_component(html, page_rel), name)}\n'
+        f'<!-- /{label} Component -->'
+    )
+
+
+def placeholder_name(text):
+    """Component name of a placeholder matched by `PLACEHOLDER_PATTERN`."""
+    return _PLACEHOLDER_NAME.search(text).group(1)
+
+
+def prerendered_name(text):
+    """Component name of a block matched by `PRERENDERED_PATTERN`."""
+    return _BLOCK_NAME.match(text).group(1).lower()
+
+
+def placeholder_for_block(text):
+    """Runtime placeholder for a block matched by `PRERENDERED_PATTERN`.
+
+    The blank lines the placeholder ended with are still after the block,
+    so switching modes back and forth leaves the page as it was.
+    """
+    return PLACEHOLDERS[prerendered_name(text)].rstrip('\n')
+
+
+def prerender_rules(components, page_rel):
+    """Rules that inline every placeholder or stale pre-rendered block.
+
+    Components missing from `components` are left untouched.
+    """
+    def inline(name_of):
+        def replace(text):
+            name = name_of(text)
+            if name not in components:
+                return text
+            return prerendered_block(name, components[name], page_rel)
+        return replace
+
+    return [
+        Rule('prerendered_component', PRERENDERED_PATTERN, inline(prerendered_name), flags=re.DOTALL),
+        Rule('component_placeholder', PLACEHOLDER_PATTERN, inline(placeholder_name)),
+    ]
@@ -0,0 +1,284 @@
+"""
+Precompressed variants of the build output.
+
+For servers that serve static `.gz`/`.br` files next to the originals
+(nginx `gzip_static`/`brotli_static`, the offline preview) instead of
+compressing on the fly like Vercel, every HTML/CSS/JS/JSON/SVG file of
+`public/` gets a gzip variant at level 9 and, when the `brotli` module is
+installed, a Brotli variant at quality 11. A variant that would not be
+smaller than the original is not written (and removed if an older run
+left one), and variants whose original is gone are deleted.
+
+Compression runs in a process pool. `CompressionManifest` remembers the
+content hash of every original together with the size of each variant
+written for it, so a file is only recompressed when its content changed
+or one of its variants was removed or altered.
+
+The summary lists each page's transfer size, uncompressed and per
+encoding: the page itself plus the local scripts, stylesheets, SVG images
+and components it loads (`--json` prints it as JSON; `--report` has the
+per-file numbers).
+
+    cd scripts/automation
+    python -m site_pipeline.compress [--out ../../public] [--report compress.csv]
+"""
+
+import argparse
+import gzip
+import json
+import os
+import sys
+import time
+from functools import partial
+from pathlib import Path
+
+from .batch import CACHED, FAILED, OUTPUT_SECTIONS, REPO_ROOT, UPDATED, PageResult, discover_pages, run_batch
+from .fingerprint import AssetManifest
+from .manifest import MANIFEST_DIR, BuildManifest, rules_digest
+from .profiling import TransformStat, add_profiling_arguments, finish_profiling, profiled_worker
+from .references import component_path, page_references
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+# Hashed into the manifest rules so compressor changes recompress everything
+COMPRESS_SOURCE = Path(__file__)
+
+COMPRESSIBLE = frozenset({'.html', '.css', '.js', '.json', '.svg'})
+
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+
+# Encoding name → variant suffix
+ENCODINGS = {'gzip': '.gz', 'br': '.br'}
+
+
+def gzip_compress(data):
+    # mtime=0 keeps the output a pure function of the input
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def brotli_compress(data):
+    return brotli.compress(data, quality=BROTLI_QUALITY)
+
+
+ENCODERS = {'gzip': gzip_compress, 'br': brotli_compress}
+
+
+def available_encodings():
+    """The encodings this interpreter can produce, in `ENCODINGS` order."""
+    return ('gzip', 'br') if brotli is not None else ('gzip',)
+
+
+def variant_path(path, encoding):
+    path = Path(path)
+    return path.with_name(path.name + ENCODINGS[encoding])
+
+
+def _size(path):
+    try:
+        return os.stat(path).st_size
+    except OSError:
+        return None
+
+
+def compressible_files(out):
+    """Every file under `out` that gets compressed variants, sorted."""
+    files = []
+    for directory, _, names in os.walk(out):
+        files.extend(Path(directory) / name for name in names if Path(name).suffix.lower() in COMPRESSIBLE)
+    return sorted(files)
+
+
+def orphaned_variants(out):
+    """`.gz`/`.br` files under `out` whose original no longer exists."""
+    orphans = []
+    for directory, _, names in os.walk(out):
+        for name in names:
+            stem, suffix = os.path.splitext(name)
+            if (suffix in ENCODINGS.values() and Path(stem).suffix.lower() in COMPRESSIBLE
+                    and stem not in names):
+                orphans.append(Path(directory) / name)
+    return sorted(orphans)
+
+
+class CompressionManifest(BuildManifest):
+    """`BuildManifest` whose entries also hold the variants written per file.
+
+    A file is fresh when its content is what was compressed and every
+    variant is still on disk at the recorded size.
+    """
+
+    def is_fresh(self, path):
+        if not super().is_fresh(path):
+            return False
+        variants = self.pages[self._key(path)].get('variants', {})
+        return all(
+            _size(variant_path(path, encoding)) == size
+            for encoding, size in variants.items()
+        )
+
+    def record(self, path, variants):
+        super().record(path)
+        self.pages[self._key(path)]['variants'] = variants
+
+    def sizes(self, path):
+        """`{'identity': bytes, encoding: bytes}` of a recorded file."""
+        entry = self.pages.get(self._key(path), {})
+        return {'identity': entry.get('size', 0), **entry.get('variants', {})}
+
+
+def _write(path, data):
+    tmp = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def compress_file(path, root, encodings):
+    """Worker: write the `encodings` variants of one file.
+
+    `stats['sizes']` maps `identity` and every variant written to its size.
+    """
+    path = Path(path)
+    rel = Path(os.path.relpath(path, root)).as_posix()
+    try:
+        data = path.read_bytes()
+        sizes = {'identity': len(data)}
+        profile = []
+        for encoding in encodings:
+            start = time.perf_counter()
+            compressed = ENCODERS[encoding](data)
+            elapsed = time.perf_counter() - start
+            target = variant_path(path, encoding)
+            written = len(compressed) < len(data)
+            if written:
+                _write(target, compressed)
+                sizes[encoding] = len(compressed)
+            elif target.exists():
+                target.unlink()
+            profile.append(TransformStat(encoding, elapsed, len(data), len(compressed), int(written),
+                                         written).as_dict())
+        ratios = ', '.join(f"{encoding} {sizes[encoding] / 1024:.1f} KB" for encoding in encodings
+                           if encoding in sizes) or 'not compressible'
+        message = f"✅ {rel}: {len(data) / 1024:.1f} KB → {ratios}"
+        return PageResult(str(path), UPDATED, message, stats={'profile': profile, 'sizes': sizes})
+    except Exception as e:
+        return PageResult(str(path), FAILED, f"❌ Error in {rel}: {e}")
+
+
+def compress_output(out, manifest, encodings, workers=None, worker=None):
+    """Compress every stale file of `out`; returns one PageResult per file.
+
+    Fresh files get a `CACHED` result whose `stats['sizes']` comes from the
+    manifest, so callers see the sizes of every file either way.
+    """
+    files = compressible_files(out)
+    stale = [path for path in files if not manifest.is_fresh(path)]
+    worker = worker or partial(compress_file, root=out, encodings=encodings)
+    processed = dict(zip(map(str, stale), run_batch(worker, stale, workers)))
+
+    results = []
+    for path in files:
+        result = processed.get(str(path))
+        if result is None:
+            result = PageResult(str(path), CACHED, stats={'sizes': manifest.sizes(path)})
+        elif result.status == FAILED:
+            manifest.forget(path)
+        else:
+            manifest.record(path, {k: v for k, v in result.stats['sizes'].items() if k != 'identity'})
+        results.append(result)
+    manifest.pages = {key: entry for key, entry in manifest.pages.items() if (Path(out) / key).exists()}
+    manifest.save()
+    return results
+
+
+def page_transfer(out, sizes, pages=None):
+    """`{page rel: {encoding: bytes}}`: each page plus the files it loads.
+
+    Counts the page, its local scripts and stylesheets, its SVG images and
+    the components it uses; a file without a variant for an encoding
+    counts at its identity size.
+    """
+    out = Path(out)
+    resolver = AssetManifest(out)
+    encodings = ['identity', *ENCODINGS]
+    transfer = {}
+    for page in discover_pages(out, OUTPUT_SECTIONS) if pages is None else pages:
+        rel = Path(os.path.relpath(page, out)).as_posix()
+        refs = page_references(page.read_text(encoding='utf-8', errors='replace'), rel, resolver)
+        files = {rel, *refs['scripts'], *refs['stylesheets']}
+        files.update(target for target in refs['images'] if target.lower().endswith('.svg'))
+        files.update(component_path(name) for name in refs['components'])
+        files = [sizes[target] for target in sorted(files) if target in sizes]
+        transfer[rel] = {
+            encoding: sum(entry.get(encoding, entry['identity']) for entry in files)
+            for encoding in encodings
+            if encoding == 'identity' or any(encoding in entry for entry in files)
+        }
+        transfer[rel]['files'] = len(files)
+    return transfer
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Write gzip/Brotli variants of the build output')
+    parser.add_argument('--root', type=Path, default=REPO_ROOT, help='site root (holds .site-pipeline/)')
+    parser.add_argument('--out', type=Path, help='build output to compress (default: ROOT/public)')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--force', action='store_true', help='recompress files the last run already handled')
+    parser.add_argument('--json', action='store_true', help='print the per-page transfer sizes as JSON')
+    add_profiling_arguments(parser)
+    args = parser.parse_args()
+    out = args.out or args.root / 'public'
+    if not out.is_dir():
+        parser.error(f'{out} does not exist; run `npm run build:public` first')
+
+    encodings = available_encodings()
+    rules = rules_digest(COMPRESS_SOURCE, *encodings, str(GZIP_LEVEL), str(BROTLI_QUALITY))
+    manifest = CompressionManifest(args.root / MANIFEST_DIR / 'compress-output.json', out, rules)
+    if args.force:
+        manifest.pages = {}
+    for orphan in orphaned_variants(out):
+        orphan.unlink()
+
+    worker = profiled_worker(partial(compress_file, root=out, encodings=encodings), args, out)
+    results = compress_output(out, manifest, encodings, args.workers, worker)
+    sizes = {
+        Path(os.path.relpath(result.page, out)).as_posix(): result.stats['sizes']
+        for result in results if 'sizes' in result.stats
+    }
+    transfer = page_transfer(out, sizes)
+    failed = sum(result.status == FAILED for result in results)
+    if args.json:
+        print(json.dumps(transfer, indent=2))
+        if failed:
+            sys.exit(1)
+        return
+
+    for result in results:
+        if result.status == FAILED:
+            print(result.message)
+    if brotli is None:
+        print("ℹ️  brotli module not installed: writing gzip variants only (pip install brotli)")
+    print("🗜️  Per-page transfer (page + local scripts, stylesheets, SVGs, components):")
+    for page, entry in transfer.items():
+        variants = ', '.join(f"{encoding} {entry[encoding] / 1024:.1f} KB" for encoding in ENCODINGS
+                             if encoding in entry)
+        print(f"   {page}: {entry['identity'] / 1024:.1f} KB → {variants} ({entry['files']} files)")
+
+    written = sum(result.status == UPDATED for result in results)
+    cached = sum(result.status == CACHED for result in results)
+    identity = sum(entry['identity'] for entry in sizes.values())
+    print(f"\n📦 {written} files compressed, {cached} already current, {failed} failed")
+    for encoding in encodings if identity else ():
+        total = sum(entry.get(encoding, entry['identity']) for entry in sizes.values())
+        print(f"📉 {encoding}: {identity / 1024:.1f} KB → {total / 1024:.1f} KB ({(total - identity) / identity:+.1%})")
+    finish_profiling(args, [result for result in results if result.status != CACHED], out)
+    # A partial set of variants must not ship
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,286 @@
+"""
+Critical CSS: the first screen's rules inlined, the stylesheets deferred.
+
+Runs on the build output (`public/`, after `css_purge`, before
+minify/compress). For each page, the render-blocking stylesheets of its
+`<head>` (local `rel="stylesheet"` links for every media) are split:
+
+- the rules that can match the first screen are inlined, minified, in one
+  `<style>` where the first of those links was, with their relative
+  `url()`s rebased onto the page. The first screen is the navbar component
+  (when the page loads components) plus the first `FOLD_BYTES` of the
+  body's markup; a rule is kept when its classes, ids and element names
+  all appear there or in `css_purge.ALLOWLIST`,
+- each link becomes the `<link data-deferred-stylesheet data-href>`
+  placeholder `js/utils/deferred-styles.js` activates in place (so the
+  cascade order is unchanged) once the page has loaded; the script is
+  added if the page lacks it, and a `<noscript>` keeps the stylesheets for
+  visitors without JavaScript.
+
+Pages whose critical CSS would exceed `MAX_INLINE` once gzipped (what
+the first round trip has to carry) keep their links.
+External stylesheets are not fetched and stay as they are; the report
+counts them. The critical subset of each stylesheet is cached per page
+first screen and stylesheet content (`ResultCache`), so unchanged pages
+and stylesheets are not parsed again. Everything this stage writes carries
+`data-critical-css` and is undone before each run.
+
+    cd scripts/automation
+    python -m site_pipeline.critical_css [--out ../../public] [--json]
+"""
+
+import argparse
+import html
+import json
+import os
+import posixpath
+import re
+import sys
+import time
+from functools import partial
+from pathlib import Path
+
+from .batch import (
+    FAILED,
+    OUTPUT_SECTIONS,
+    REPO_ROOT,
+    UNCHANGED,
+    UPDATED,
+    PageResult,
+    discover_pages,
+    merge_results,
+    run_batch,
+)
+from .compress import gzip_compress
+from .css_purge import ALLOWLIST, CSS_PURGE_SOURCE, markup_usage, purge_css, usage_predicate
+from .fingerprint import AssetManifest, file_version
+from .i18n import set_attribute
+from .manifest import ResultCache, rules_digest
+from .minify import MINIFY_SOURCE, minify_css
+from .profiling import TransformStat, add_profiling_arguments, finish_profiling, profiled_worker
+from .references import parse_attributes
+from .script_loading import scan_scripts
+
+# Hashed into the cache key so changes here recompute every page
+CRITICAL_CSS_SOURCE = Path(__file__)
+
+DEFERRED_STYLES = 'js/utils/deferred-styles.js'
+
+# Body markup (scripts, styles and comments left out) taken as the first screen
+FOLD_BYTES = 12 * 1024
+
+# Gzipped inline budget per page, about the first TCP round trip (10 packets);
+# beyond it the page keeps its blocking links
+MAX_INLINE = 14 * 1024
+
+# Marks the tags this stage owns
+OWNED = 'data-critical-css'
+
+BLOCKING_MEDIA = frozenset({'', 'all', 'screen'})
+
+_LINK = re.compile(r'<link\b((?:"[^"]*"|\'[^\']*\'|[^\'">])*)>', re.IGNORECASE)
+_BODY = re.compile(r'<body\b[^>]*>', re.IGNORECASE)
+_NOSCRIPT = re.compile(r'<noscript\b[^>]*>.*?</noscript\s*>', re.DOTALL | re.IGNORECASE)
+_NOT_MARKUP = re.compile(r'<!--.*?-->|<(script|style|template)\b[^>]*>.*?</\1\s*>', re.DOTALL | re.IGNORECASE)
+_OWNED_BLOCK = re.compile(rf'[ \t]*<(style|noscript|script)\b[^>]*\b{OWNED}\b[^>]*>.*?</\1\s*>\n?',
+                          re.DOTALL | re.IGNORECASE)
+_CSS_STATEMENT = re.compile(r'@(?:import|charset)\b[^;{]*;\s*', re.IGNORECASE)
+_CSS_URL = re.compile(r'''url\(\s*(["']?)([^"')\s]+)\1\s*\)''', re.IGNORECASE)
+_NOT_RELATIVE = re.compile(r'^(?:#|[a-z][a-z0-9+.-]*:|/)', re.IGNORECASE)
+
+
+def restore_links(content):
+    """`content` with this stage's edits undone (deferred links back to stylesheets)."""
+    content = _OWNED_BLOCK.sub('', content)
+
+    def restore(match):
+        attributes = parse_attributes(match.group(1))
+        if OWNED not in attributes:
+            return match.group(0)
+        tag = re.sub(rf'\s+(?:{OWNED}|data-deferred-stylesheet)\b(?!-)', '', match.group(0))
+        tag = re.sub(r'(\s)data-href(\s*=)', r'\1href\2', tag, count=1)
+        return set_attribute(tag, 'rel', 'stylesheet')
+    return _LINK.sub(restore, content)
+
+
+def blocking_links(content, page_rel, resolver):
+    """`(match, href, rel)` of the head's local render-blocking stylesheet links."""
+    body = _BODY.search(content)
+    head_end = body.start() if body else len(content)
+    hidden = [match.span() for match in _NOSCRIPT.finditer(content, 0, head_end)]
+    links = []
+    for match in _LINK.finditer(content, 0, head_end):
+        if any(start <= match.start() < end for start, end in hidden):
+            continue
+        attributes = parse_attributes(match.group(1))
+        if attributes.get('rel', '').lower().split() != ['stylesheet'] or 'disabled' in attributes:
+            continue
+        if attributes.get('media', '').strip().lower() not in BLOCKING_MEDIA or 'onload' in attributes:
+            continue
+        href = attributes.get('href', '').strip()
+        rel = resolver.resolve(re.split(r'[?#]', href, maxsplit=1)[0], page_rel) if href else None
+        links.append((match, href, rel))
+    return links
+
+
+def first_screen(content, out):
+    """Markup that renders in the first screen (see the module docstring)."""
+    body = _BODY.search(content)
+    markup = _NOT_MARKUP.sub('', content[body.start() if body else 0:])[:FOLD_BYTES]
+    if 'data-component="navbar"' in content or 'component-loader' in content:
+        navbar = Path(out) / 'components' / 'navbar.html'
+        if navbar.is_file():
+            markup = navbar.read_text(encoding='utf-8', errors='replace') + markup
+    return markup
+
+
+def rebase_urls(css, sheet_rel, page_rel):
+    """`css` from `sheet_rel` with its relative `url()`s made relative to `page_rel`."""
+    sheet_dir = posixpath.dirname(sheet_rel)
+    page_dir = posixpath.dirname(page_rel) or '.'
+
+    def rebase(match):
+        url = match.group(2)
+        if _NOT_RELATIVE.match(url):
+            return match.group(0)
+        path, suffix = re.match(r'([^?#]*)(.*)', url).groups()
+        target = posixpath.normpath(posixpath.join(sheet_dir, path))
+        return f'url({match.group(1)}{posixpath.relpath(target, page_dir)}{suffix}{match.group(1)})'
+    return _CSS_URL.sub(rebase, css)
+
+
+def critical_subset(css, usage, sheet_rel, page_rel):
+    """The minified rules of `css` that can match `usage`, `url()`s rebased."""
+    subset = purge_css(css, usage_predicate(usage, ALLOWLIST))
+    return minify_css(rebase_urls(_CSS_STATEMENT.sub('', subset), sheet_rel, page_rel))
+
+
+def critical_page(path, out, cache, deferred_version):
+    """Worker: inline one page's critical CSS and defer its blocking stylesheets."""
+    path = Path(path)
+    rel = Path(os.path.relpath(path, out)).as_posix()
+    try:
+        start = time.perf_counter()
+        original = path.read_text(encoding='utf-8')
+        content = restore_links(original)
+        resolver = AssetManifest(out)
+        links = blocking_links(content, rel, resolver)
+        local = [(match, href, sheet) for match, href, sheet in links
+                 if sheet and not sheet.startswith(('http:', 'https:')) and (Path(out) / sheet).is_file()]
+        stats = {'external': len(links) - len(local), 'deferred': 0, 'inline_bytes': 0, 'cache_hits': 0,
+                 'cache_keys': []}
+        if local:
+            screen = first_screen(content, out)
+            usage = markup_usage(screen)
+            parts = []
+            for _, _, sheet in local:
+                data = (Path(out) / sheet).read_bytes()
+                key = cache.key(screen, posixpath.dirname(rel), sheet, data)
+                stats['cache_keys'].append(key)
+                cached = cache.get(key)
+                if cached is None:
+                    critical = critical_subset(data.decode('utf-8'), usage, sheet, rel)
+                    cache.put(key, critical.encode('utf-8'))
+                else:
+                    critical = cached.decode('utf-8')
+                    stats['cache_hits'] += 1
+                parts.append(critical)
+            inline = '\n'.join(part for part in parts if part)
+            stats['inline_bytes'] = len(inline.encode('utf-8'))
+            stats['inline_gzip_bytes'] = len(gzip_compress(inline.encode('utf-8')))
+            if stats['inline_gzip_bytes'] <= MAX_INLINE:
+                content = _defer(content, rel, resolver, local, inline, deferred_version)
+                stats['deferred'] = len(local)
+            else:
+                stats['over_budget'] = True
+        stats['profile'] = [TransformStat('critical_css', time.perf_counter() - start, len(original), len(content),
+                                          stats['deferred'], content != original).as_dict()]
+        if content == original:
+            return PageResult(str(path), UNCHANGED, f"✓ {rel}: critical CSS current", stats=stats)
+        path.write_text(content, encoding='utf-8')
+        if stats.get('over_budget'):
+            return PageResult(str(path), UPDATED, f"⚠️  {rel}: {stats['inline_gzip_bytes'] / 1024:.1f} KB gzipped critical CSS "
+                              f"over budget, stylesheets kept blocking", stats=stats)
+        return PageResult(str(path), UPDATED, f"✅ {rel}: {stats['deferred']} stylesheets deferred, "
+                          f"{stats['inline_bytes'] / 1024:.1f} KB inlined ({stats['inline_gzip_bytes'] / 1024:.1f} KB gzipped)", stats=stats)
+    except Exception as e:
+        return PageResult(str(path), FAILED, f"❌ Error in {rel}: {e}")
+
+
+def _defer(content, page_rel, resolver, links, inline, deferred_version):
+    """Replace `links` by deferred placeholders, with `inline` and the fallbacks at the first."""
+    first = links[0][0]
+    line_start = content.rfind('\n', 0, first.start()) + 1
+    indent = re.match(r'[ \t]*', content[line_start:first.start()]).group(0)
+    noscript = ''.join(f'<link rel="stylesheet" href="{html.escape(href)}">' for _, href, _ in links)
+    block = [f'<style {OWNED}>{inline}</style>', f'<noscript {OWNED}>{noscript}</noscript>']
+    if DEFERRED_STYLES not in {script.rel for script in scan_scripts(content, page_rel, resolver)}:
+        src = posixpath.relpath(DEFERRED_STYLES, posixpath.dirname(page_rel) or '.')
+        block.append(f'<script defer src="{src}?v={deferred_version}" {OWNED}></script>')
+
+    out = []
+    pos = 0
+    for index, (match, href, _) in enumerate(links):
+        tag = re.sub(r'''\s+rel\s*=\s*(?:"[^"]*"|'[^']*'|[^\s>]+)''', '', match.group(0), count=1)
+        tag = re.sub(r'(\s)href(\s*=)', r'\1data-href\2', tag, count=1)
+        tag = tag[:5] + f' data-deferred-stylesheet {OWNED}' + tag[5:]
+        out.append(content[pos:match.start()])
+        if index == 0:
+            out.append(''.join(f'{part}\n{indent}' for part in block))
+        out.append(tag)
+        pos = match.end()
+    out.append(content[pos:])
+    return ''.join(out)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Inline critical CSS and defer the blocking stylesheets')
+    parser.add_argument('--root', type=Path, default=REPO_ROOT, help='site root (holds .site-pipeline/)')
+    parser.add_argument('--out', type=Path, help='build output to rewrite (default: ROOT/public)')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--json', action='store_true', help='print the per-page numbers as JSON')
+    add_profiling_arguments(parser)
+    args = parser.parse_args()
+    out = args.out or args.root / 'public'
+    if not (out / DEFERRED_STYLES).is_file():
+        parser.error(f'{out / DEFERRED_STYLES} does not exist; run `npm run build:public` first')
+
+    rules = rules_digest(CRITICAL_CSS_SOURCE, CSS_PURGE_SOURCE, MINIFY_SOURCE)
+    cache = ResultCache(args.root, 'critical-css', rules, suffix='.css')
+    deferred_version = file_version((out / DEFERRED_STYLES).read_bytes())
+    pages = discover_pages(out, OUTPUT_SECTIONS)
+    worker = partial(critical_page, out=out, cache=cache, deferred_version=deferred_version)
+    results = run_batch(profiled_worker(worker, args, out), pages, args.workers)
+    summary = merge_results(results)
+    if not summary[FAILED]:
+        cache.prune({key for result in results for key in result.stats.get('cache_keys', ())})
+
+    if args.json:
+        print(json.dumps({Path(os.path.relpath(result.page, out)).as_posix(): {
+            name: value for name, value in result.stats.items() if name not in ('profile', 'cache_keys')}
+            for result in results if result.stats}, indent=2))
+        return
+
+    for result in results:
+        if result.status in (UPDATED, FAILED):
+            print(result.message)
+    deferred = [result.stats for result in results if result.stats.get('deferred')]
+    hits = sum(result.stats.get('cache_hits', 0) for result in results)
+    lookups = sum(len(result.stats.get('cache_keys', ())) for result in results)
+    print(f"\n🎨 {len(deferred)} pages render from inline critical CSS, "
+          f"{sum(stats['deferred'] for stats in deferred)} blocking stylesheets deferred "
+          f"({hits}/{lookups} from cache), "
+          f"{sum(bool(result.stats.get('over_budget')) for result in results)} over budget, "
+          f"{summary[FAILED]} failed")
+    if deferred:
+        average = sum(stats['inline_bytes'] for stats in deferred) / len(deferred)
+        gzipped = sum(stats['inline_gzip_bytes'] for stats in deferred) / len(deferred)
+        print(f"   {average / 1024:.1f} KB inlined per page on average ({gzipped / 1024:.1f} KB gzipped); "
+              f"{sum(result.stats.get('external', 0) for result in results)} external stylesheet links still block")
+    finish_profiling(args, results, out)
+    if summary[FAILED]:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
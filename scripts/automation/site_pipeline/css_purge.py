@@ -0,0 +1,515 @@
+"""
+Unused CSS removal for the build output.
+
+Runs on `public/` (after the i18n stages, before minify/compress). Every
+local stylesheet a page links (`rel="stylesheet"`, deferred `data-href`
+links and `as="style"` preloads) is trimmed to what the pages linking it
+can use:
+
+- the classes, ids and element names of their markup, of the components
+  they load and of `<template>`/script markup,
+- every word of the scripts they load, inline or local (including those
+  `third_party` loads after interaction), so classes and elements scripts
+  add (`classList.add('open')`, `createElement('dialog')`) count as used,
+- `ALLOWLIST` (plus `--allow`), for classes built at runtime that no source
+  spells out, such as the Bootstrap states its CDN script toggles.
+
+A selector is dropped when one of its classes, ids or element names is
+unused; attribute selectors and the arguments of `:is()`, `:not()` and the
+other functional pseudo-classes always count as matching. A rule goes when
+all its selectors do, an `@media`/`@supports`/`@layer`/`@container` block
+when all its rules do; `@font-face`, `@keyframes` and the other at-rules
+are kept. Imported stylesheets and external ones are left alone.
+
+The trimmed stylesheet is written next to the original (relative `url()`s
+keep working) as `<name>.<hash>.css`, the pages' links point at it and the
+original stays for whatever else loads it; trimmed files no page links any
+more are removed. The report lists each stylesheet's bytes before and
+after and the selectors removed (`--json` prints them all).
+
+    cd scripts/automation
+    python -m site_pipeline.css_purge [--out ../../public] [--allow 'swiper-*'] [--json]
+"""
+
+import argparse
+import fnmatch
+import functools
+import json
+import os
+import posixpath
+import re
+import sys
+import time
+from dataclasses import dataclass, field
+from functools import partial
+from pathlib import Path
+
+from .batch import (
+    FAILED,
+    OUTPUT_SECTIONS,
+    REPO_ROOT,
+    UNCHANGED,
+    UPDATED,
+    PageResult,
+    discover_pages,
+    merge_results,
+    run_batch,
+)
+from .fingerprint import AssetManifest, file_version
+from .i18n import set_attribute
+from .profiling import TransformStat, add_profiling_arguments, finish_profiling, profiled_worker
+from .references import parse_attributes
+from .script_loading import INLINE, scan_scripts
+from .third_party import deferred_scripts
+
+# Hashed into rule digests so changes here re-purge everything
+CSS_PURGE_SOURCE = Path(__file__)
+
+# Classes (glob patterns) no page or script spells out: Bootstrap's CDN
+# script states, and class names scripts build from pieces
+ALLOWLIST = (
+    'active', 'show', 'showing', 'hiding', 'collapsing', 'collapsed', 'fade', 'open', 'disabled',
+    'modal-open', 'modal-backdrop', 'offcanvas-backdrop', 'was-validated', 'is-valid', 'is-invalid',
+    'is-*', 'has-*',
+)
+
+# Elements always in the document
+ROOT_ELEMENTS = frozenset({'html', 'head', 'body'})
+
+# At-rules whose bodies hold style rules
+GROUPING_AT_RULES = frozenset({'media', 'supports', 'layer', 'container', 'document', '-moz-document'})
+
+_PURGED_NAME = re.compile(r'^(?P<stem>.+)\.(?P<hash>[0-9a-f]{10})\.css$')
+_WORD = re.compile(r'[A-Za-z_][\w-]*')
+_START_TAG = re.compile(r'<([a-zA-Z][\w:-]*)((?:"[^"]*"|\'[^\']*\'|[^\'">])*)>')
+_LINK = re.compile(r'<link\b((?:"[^"]*"|\'[^\']*\'|[^\'">])*)>', re.IGNORECASE)
+_COMMENT = re.compile(r'<!--.*?-->', re.DOTALL)
+
+_CSS_SKIP = re.compile(r'/\*.*?\*/|"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'', re.DOTALL)
+_CSS_SPACE = re.compile(r'(?:\s+|/\*.*?\*/)*', re.DOTALL)
+_FUNCTIONAL_PSEUDO = re.compile(r'::?[a-zA-Z-]+\(')
+_ATTRIBUTE_SELECTOR = re.compile(r'\[[^\]]*\]')
+_ESCAPE = re.compile(r'\\([0-9a-fA-F]{1,6}\s?|.)')
+_CLASS_OR_ID = re.compile(r'([.#])((?:\\.|[\w-])+)')
+_TYPE = re.compile(r'(?:^|[\s>+~(,])([a-zA-Z][\w-]*)')
+
+
+# --- usage -----------------------------------------------------------------
+
+@dataclass
+class Usage:
+    """Classes, ids, element names and script words some pages can use."""
+
+    classes: set = field(default_factory=set)
+    ids: set = field(default_factory=set)
+    elements: set = field(default_factory=set)
+    words: set = field(default_factory=set)
+
+    def update(self, other):
+        self.classes |= other.classes
+        self.ids |= other.ids
+        self.elements |= other.elements
+        self.words |= other.words
+        return self
+
+
+def markup_usage(text):
+    """`Usage` of some markup (start tags only; script bodies count as markup too)."""
+    usage = Usage()
+    for match in _START_TAG.finditer(_COMMENT.sub('', text)):
+        usage.elements.add(match.group(1).lower())
+        attributes = parse_attributes(match.group(2))
+        usage.classes.update(attributes.get('class', '').split())
+        if attributes.get('id'):
+            usage.ids.add(attributes['id'])
+    return usage
+
+
+@functools.lru_cache(maxsize=512)
+def _file_usage(path, mtime_ns, script):
+    text = Path(path).read_text(encoding='utf-8', errors='replace')
+    usage = markup_usage(text)
+    if script:
+        usage.words.update(_WORD.findall(text))
+    return usage
+
+
+def file_usage(out, rel, script=False):
+    path = Path(out) / rel
+    try:
+        return _file_usage(str(path), path.stat().st_mtime_ns, script)
+    except OSError:
+        return Usage()
+
+
+def stylesheet_links(content, page_rel, resolver):
+    """`(match, attribute, rel)` of every link to a local stylesheet."""
+    links = []
+    for match in _LINK.finditer(content):
+        attributes = parse_attributes(match.group(1))
+        kinds = attributes.get('rel', '').lower().split()
+        if 'stylesheet' in kinds:
+            attribute = 'href'
+        elif 'data-deferred-stylesheet' in attributes:
+            attribute = 'data-href'
+        elif 'preload' in kinds and attributes.get('as', '').lower() == 'style':
+            attribute = 'href'
+        else:
+            continue
+        url = re.split(r'[?#]', attributes.get(attribute, '').strip(), maxsplit=1)[0]
+        rel = resolver.resolve(url, page_rel) if url else None
+        if rel and rel.endswith('.css'):
+            links.append((match, attribute, original_stylesheet(rel)))
+    return links
+
+
+def original_stylesheet(rel):
+    """The stylesheet a trimmed `<name>.<hash>.css` was made from (else `rel`)."""
+    directory, name = posixpath.split(rel)
+    purged = _PURGED_NAME.match(name)
+    return posixpath.join(directory, purged.group('stem') + '.css') if purged else rel
+
+
+def scan_page(path, out):
+    """Worker: `(page rel, linked stylesheets, Usage)` of one output page."""
+    path = Path(path)
+    rel = Path(os.path.relpath(path, out)).as_posix()
+    content = path.read_text(encoding='utf-8', errors='replace')
+    resolver = AssetManifest(out)
+    stylesheets = sorted({sheet for _, _, sheet in stylesheet_links(content, rel, resolver)})
+    if not stylesheets:
+        return rel, stylesheets, None
+    usage = markup_usage(content)
+    if 'data-component' in content or 'component-loader' in content:
+        for component in sorted((Path(out) / 'components').glob('*.html')):
+            usage.update(file_usage(out, component.relative_to(out).as_posix()))
+    for script in scan_scripts(content, rel, resolver):
+        if script.kind == INLINE:
+            usage.words.update(_WORD.findall(content[script.start:script.end]))
+        elif script.rel:
+            usage.update(file_usage(out, script.rel, script=True))
+    for script_rel in deferred_scripts(content, rel, resolver):
+        usage.update(file_usage(out, script_rel, script=True))
+    return rel, stylesheets, usage
+
+
+# --- CSS -------------------------------------------------------------------
+
+def _skip_to(css, pos, stops, length=None):
+    """Position of the first of `stops` at nesting depth 0 (strings and comments skipped)."""
+    depth = 0
+    length = len(css) if length is None else length
+    while pos < length:
+        char = css[pos]
+        if char in '"\'' or css.startswith('/*', pos):
+            literal = _CSS_SKIP.match(css, pos)
+            pos = literal.end() if literal else length
+            continue
+        if char in stops and depth == 0:
+            return pos
+        if char in '([':
+            depth += 1
+        elif char in ')]':
+            depth = max(0, depth - 1)
+        elif char == '{':
+            end = _block_end(css, pos)
+            pos = end
+            continue
+        pos += 1
+    return length
+
+
+def _block_end(css, brace):
+    """Position after the `}` closing the block opened at `brace`."""
+    depth = 0
+    pos = brace
+    length = len(css)
+    while pos < length:
+        char = css[pos]
+        if char in '"\'' or css.startswith('/*', pos):
+            literal = _CSS_SKIP.match(css, pos)
+            pos = literal.end() if literal else length
+            continue
+        if char == '{':
+            depth += 1
+        elif char == '}':
+            depth -= 1
+            if depth == 0:
+                return pos + 1
+        pos += 1
+    return length
+
+
+def split_selectors(prelude):
+    """Top-level comma-separated selectors of a rule prelude."""
+    selectors = []
+    start = 0
+    while start <= len(prelude):
+        end = _skip_to(prelude, start, ',')
+        selectors.append(prelude[start:end])
+        start = end + 1
+    return selectors
+
+
+def _strip_functional(selector):
+    """`selector` without the arguments of functional pseudo-classes (`:not(.x)` → `:not`)."""
+    out = []
+    pos = 0
+    for match in _FUNCTIONAL_PSEUDO.finditer(selector):
+        if match.start() < pos:
+            continue
+        out.append(selector[pos:match.end() - 1])
+        depth = 0
+        index = match.end() - 1
+        while index < len(selector):
+            if selector[index] == '(':
+                depth += 1
+            elif selector[index] == ')':
+                depth -= 1
+                if depth == 0:
+                    break
+            index += 1
+        pos = index + 1
+    out.append(selector[pos:])
+    return ''.join(out)
+
+
+def _unescape(name):
+    def replace(match):
+        escaped = match.group(1)
+        if re.fullmatch(r'[0-9a-fA-F]{1,6}\s?', escaped):
+            return chr(int(escaped.strip(), 16))
+        return escaped
+    return _ESCAPE.sub(replace, name)
+
+
+def selector_used(selector, is_used):
+    """Whether `selector` may match, given `is_used(kind, name)`."""
+    simple = _ATTRIBUTE_SELECTOR.sub('[]', _strip_functional(selector))
+    for sigil, name in _CLASS_OR_ID.findall(simple):
+        if not is_used('class' if sigil == '.' else 'id', _unescape(name)):
+            return False
+    without_names = _CLASS_OR_ID.sub('', simple)
+    without_names = re.sub(r'::?[a-zA-Z-]+', '', without_names)
+    for name in _TYPE.findall(without_names):
+        if not is_used('element', name.lower()):
+            return False
+    return True
+
+
+def purge_css(css, is_used, removed=None):
+    """`css` without the rules whose selectors cannot match (see the module docstring).
+
+    `removed` collects the dropped selectors.
+    """
+    removed = [] if removed is None else removed
+    edits = []
+    _purge_block(css, 0, len(css), is_used, removed, edits)
+    out = []
+    pos = 0
+    for start, end, text in sorted(edits):
+        out.append(css[pos:start])
+        out.append(text)
+        pos = end
+    out.append(css[pos:])
+    return ''.join(out)
+
+
+def _removal(css, start, end):
+    """Span to cut for a statement at `start:end`, with its line when it is alone on it."""
+    line_start = css.rfind('\n', 0, start) + 1
+    if css[line_start:start].strip() == '':
+        start = line_start
+        trailing = re.match(r'[ \t]*\n?', css[end:])
+        end += trailing.end()
+    return start, end
+
+
+def _purge_block(css, start, end, is_used, removed, edits):
+    """Record the edits for the statements in `css[start:end]`; returns how many are kept."""
+    kept = 0
+    pos = start
+    while pos < end:
+        pos = _CSS_SPACE.match(css, pos, end).end()
+        if pos >= end:
+            break
+        stop = _skip_to(css, pos, '{;}', end)
+        if stop >= end or css[stop] != '{':
+            # `@import`, `@charset`, a stray `}` or a declaration: kept
+            pos = stop + 1
+            kept += 1
+            continue
+        block_end = min(_block_end(css, stop), end)
+        prelude = css[pos:stop]
+        if prelude.startswith('@'):
+            name = re.match(r'@([\w-]+)', prelude)
+            if name and name.group(1).lower() in GROUPING_AT_RULES:
+                group_edits = []
+                if _purge_block(css, stop + 1, block_end - 1, is_used, removed, group_edits):
+                    edits.extend(group_edits)
+                    kept += 1
+                else:
+                    edits.append((*_removal(css, pos, block_end), ''))
+            else:
+                kept += 1
+        else:
+            selectors = split_selectors(prelude)
+            used = [selector for selector in selectors if selector_used(selector, is_used)]
+            if not used:
+                removed.extend(selector.strip() for selector in selectors)
+                edits.append((*_removal(css, pos, block_end), ''))
+            else:
+                kept += 1
+                if len(used) < len(selectors):
+                    removed.extend(selector.strip() for selector in selectors if selector not in used)
+                    separator = ',\n' if '\n' in prelude.strip() else ', '
+                    rewritten = separator.join(selector.strip() for selector in used)
+                    trailing = prelude[len(prelude.rstrip()):]
+                    edits.append((pos, stop, rewritten + trailing))
+        pos = block_end
+    return kept
+
+
+def usage_predicate(usage, allow):
+    """`is_used(kind, name)` over `usage` and the allowlist patterns `allow`."""
+    exact = {pattern for pattern in allow if not any(char in pattern for char in '*?[')}
+    patterns = [pattern for pattern in allow if pattern not in exact]
+
+    def is_used(kind, name):
+        if kind == 'element':
+            return name in ROOT_ELEMENTS or name in usage.elements or name in usage.words
+        if kind == 'id':
+            return name in usage.ids or name in usage.words
+        return (name in usage.classes or name in usage.words or name in exact
+                or any(fnmatch.fnmatchcase(name, pattern) for pattern in patterns))
+    return is_used
+
+
+def purge_stylesheet(rel, out, usages, allow):
+    """Worker: write the trimmed copy of stylesheet `rel` for `usages[rel]`; the stats hold its rel."""
+    path = Path(out) / rel
+    try:
+        start = time.perf_counter()
+        css = path.read_text(encoding='utf-8')
+        removed = []
+        trimmed = purge_css(css, usage_predicate(usages[rel], allow), removed)
+        data = trimmed.encode('utf-8')
+        stats = {'bytes_before': len(css.encode('utf-8')), 'bytes_after': len(data), 'removed': removed}
+        if not removed:
+            stats['trimmed'] = rel
+        else:
+            stem = posixpath.splitext(rel)[0]
+            stats['trimmed'] = f'{stem}.{file_version(data)}.css'
+            target = Path(out) / stats['trimmed']
+            if not target.is_file():
+                tmp = target.with_name(f'{target.name}.{os.getpid()}.tmp')
+                tmp.write_bytes(data)
+                os.replace(tmp, target)
+        stats['profile'] = [TransformStat('css_purge', time.perf_counter() - start, stats['bytes_before'],
+                                          stats['bytes_after'], len(removed), bool(removed)).as_dict()]
+        saved = stats['bytes_before'] - stats['bytes_after']
+        return PageResult(str(path), UPDATED if removed else UNCHANGED,
+                          f"✂️  {rel}: {len(removed)} selectors, -{saved / 1024:.1f} KB", stats=stats)
+    except Exception as e:
+        return PageResult(str(path), FAILED, f"❌ Error in {rel}: {e}")
+
+
+def link_page(path, out, trimmed):
+    """Worker: point a page's stylesheet links at the trimmed copies (`{original: trimmed}`)."""
+    path = Path(path)
+    rel = Path(os.path.relpath(path, out)).as_posix()
+    try:
+        content = path.read_text(encoding='utf-8')
+        edits = []
+        for match, attribute, sheet in stylesheet_links(content, rel, AssetManifest(out)):
+            target = trimmed.get(sheet, sheet)
+            url = parse_attributes(match.group(1))[attribute].strip()
+            path_part = re.split(r'[?#]', url, maxsplit=1)[0]
+            linked = original_stylesheet(path_part)
+            if not linked.endswith(sheet):
+                continue
+            # The trimmed copies are fingerprinted by name, so they need no `?v=`
+            new_url = linked[:len(linked) - len(sheet)] + target
+            if target == sheet:
+                new_url += url[len(path_part):]
+            if new_url != url:
+                edits.append((match.start(), match.end(), set_attribute(match.group(0), attribute, new_url)))
+        if not edits:
+            return PageResult(str(path), UNCHANGED, f"✓ {rel}: links current")
+        parts = []
+        pos = 0
+        for start, end, text in edits:
+            parts.append(content[pos:start])
+            parts.append(text)
+            pos = end
+        parts.append(content[pos:])
+        path.write_text(''.join(parts), encoding='utf-8')
+        return PageResult(str(path), UPDATED, f"🔗 {rel}: {len(edits)} links")
+    except Exception as e:
+        return PageResult(str(path), FAILED, f"❌ Error in {rel}: {e}")
+
+
+def prune_trimmed(out, keep):
+    """Delete the trimmed stylesheets not in `keep`; returns how many."""
+    removed = 0
+    for path in (Path(out) / 'css').rglob('*.css') if (Path(out) / 'css').is_dir() else ():
+        purged = _PURGED_NAME.match(path.name)
+        rel = path.relative_to(out).as_posix()
+        if purged and path.with_name(purged.group('stem') + '.css').is_file() and rel not in keep:
+            path.unlink()
+            removed += 1
+    return removed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Remove the CSS rules no page can use')
+    parser.add_argument('--root', type=Path, default=REPO_ROOT, help='site root')
+    parser.add_argument('--out', type=Path, help='build output to purge (default: ROOT/public)')
+    parser.add_argument('--allow', action='append', default=[], metavar='PATTERN',
+                        help='class (glob pattern) to keep even if unused; repeatable')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--json', action='store_true', help='print the removed selectors per stylesheet as JSON')
+    add_profiling_arguments(parser)
+    args = parser.parse_args()
+    out = args.out or args.root / 'public'
+    if not out.is_dir():
+        parser.error(f'{out} does not exist; run `npm run build:public` first')
+
+    pages = discover_pages(out, OUTPUT_SECTIONS)
+    usage = {}
+    for _, stylesheets, page_usage in run_batch(partial(scan_page, out=out), pages, args.workers):
+        for sheet in stylesheets:
+            usage.setdefault(sheet, Usage()).update(page_usage)
+    sheets = sorted(sheet for sheet in usage if (out / sheet).is_file())
+    allow = (*ALLOWLIST, *args.allow)
+    worker = partial(purge_stylesheet, out=out, usages=usage, allow=allow)
+    results = run_batch(profiled_worker(worker, args, out), sheets, args.workers)
+    trimmed = {sheet: result.stats['trimmed'] for sheet, result in zip(sheets, results) if result.status != FAILED}
+    links = run_batch(partial(link_page, out=out, trimmed=trimmed), pages, args.workers)
+    removed_files = prune_trimmed(out, set(trimmed.values()))
+
+    if args.json:
+        print(json.dumps({sheet: {name: result.stats[name] for name in ('bytes_before', 'bytes_after', 'removed')}
+                          for sheet, result in zip(sheets, results) if result.status != FAILED}, indent=2))
+        return
+
+    for result in results:
+        if result.status in (UPDATED, FAILED):
+            print(result.message)
+            for selector in result.stats.get('removed', [])[:5]:
+                print(f"   {selector}")
+    before = sum(result.stats.get('bytes_before', 0) for result in results)
+    after = sum(result.stats.get('bytes_after', 0) for result in results)
+    summary = merge_results(results + links)
+    print(f"\n✂️  {len(sheets)} stylesheets, {sum(result.status == UPDATED for result in results)} trimmed, "
+          f"{sum(result.status == UPDATED for result in links)} pages relinked, {removed_files} stale copies removed, "
+          f"{summary[FAILED]} failed")
+    if before:
+        print(f"📉 {before / 1024:.1f} KB → {after / 1024:.1f} KB (-{(before - after) / before:.1%})")
+    finish_profiling(args, results, out)
+    if summary[FAILED]:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
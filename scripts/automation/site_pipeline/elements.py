@@ -0,0 +1,144 @@
+"""
+Balanced element locator.
+
+`<nav class="gb-navbar".*?</nav>` stops at the first `</nav>`, which in our
+navbar is the nested `<nav class="gb-menu-links">`, leaving half a navbar
+behind. `ElementPattern` finds an opening tag (by tag and class, or by an
+explicit start-tag regex) and then walks forward over that tag's opening
+and closing tags only, counting depth, until the element is closed: one
+linear scan, no backtracking. Comments and `<script>`/`<style>` bodies are
+skipped so a `</nav>` inside them does not count.
+
+It quacks like a compiled pattern (`search`, `finditer`, `sub`), so it can
+be used as a `Rule` pattern in `SinglePassEngine` or in place of
+`re.compile(...)` at existing call sites.
+"""
+
+import copy
+import re
+from functools import lru_cache
+
+
+class ElementMatch:
+    """Span of one located element (the subset of `re.Match` the scripts use)."""
+
+    __slots__ = ('string', '_start', '_end')
+
+    def __init__(self, string, start, end):
+        self.string = string
+        self._start = start
+        self._end = end
+
+    def start(self):
+        return self._start
+
+    def end(self):
+        return self._end
+
+    def span(self):
+        return self._start, self._end
+
+    def group(self, index=0):
+        if index != 0:
+            raise IndexError('no such group')
+        return self.string[self._start:self._end]
+
+    def __repr__(self):
+        return f'<ElementMatch span={self.span()!r}>'
+
+
+def class_start_pattern(tag, class_name=None):
+    """Regex for a `<tag>` start tag whose class list contains `class_name`."""
+    pattern = rf'<{re.escape(tag)}\b'
+    if class_name:
+        pattern += rf'[^>]*\bclass="(?:[^"]*\s)?{re.escape(class_name)}(?:\s[^"]*)?"'
+    return pattern + r'[^>]*>'
+
+
+@lru_cache(maxsize=None)
+def _tag_tokens(tag, binary=False):
+    """Opening/closing `tag` tags, plus the regions where they do not count."""
+    tag = re.escape(tag)
+    pattern = (
+        r'<!--.*?-->'
+        r'|<(script|style)\b[^>]*>.*?</\1\s*>'
+        rf'|<(/?){tag}\b[^>]*>'
+    )
+    return re.compile(pattern.encode('utf-8') if binary else pattern, re.DOTALL | re.IGNORECASE)
+
+
+def _to_bytes(pattern):
+    return re.compile(pattern.pattern.encode('utf-8'), pattern.flags & ~re.UNICODE)
+
+
+class ElementPattern:
+    """Locates whole `tag` elements, nested ones included.
+
+    `class_name` selects start tags by class list membership; `start` is an
+    explicit start-tag regex instead (to keep an old pattern's exact
+    selection). `tail`, if given, is matched right after the closing tag and
+    included in the span (e.g. trailing whitespace and a companion script).
+    """
+
+    def __init__(self, tag, class_name=None, *, start=None, tail=None, flags=0):
+        self.tag = tag
+        self.pattern = start or class_start_pattern(tag, class_name)
+        self._start = re.compile(self.pattern, flags)
+        self._tail = re.compile(tail, re.DOTALL) if tail else None
+        self._tokens = _tag_tokens(tag)
+
+    def binary(self):
+        """The same locator for UTF-8 `bytes`/`mmap` text (see `SinglePassEngine.stream`)."""
+        pattern = copy.copy(self)
+        pattern._start = _to_bytes(self._start)
+        pattern._tail = _to_bytes(self._tail) if self._tail is not None else None
+        pattern._tokens = _tag_tokens(self.tag, binary=True)
+        return pattern
+
+    def close(self, text, pos):
+        """End of the element whose start tag ends at `pos`, or None if unclosed."""
+        depth = 1
+        for token in self._tokens.finditer(text, pos):
+            slash = token.group(2)
+            if slash is None:
+                continue
+            if slash:
+                depth -= 1
+                if depth == 0:
+                    return token.end()
+            elif token.group(0)[-2:] not in ('/>', b'/>'):
+                depth += 1
+        return None
+
+    def search(self, text, pos=0):
+        opening = self._start.search(text, pos)
+        if opening is None:
+            return None
+        end = self.close(text, opening.end())
+        if end is None:
+            # Anything after an unclosed element is inside it too
+            return None
+        if self._tail is not None:
+            end = self._tail.match(text, end).end()
+        return ElementMatch(text, opening.start(), end)
+
+    def finditer(self, text, pos=0):
+        while True:
+            match = self.search(text, pos)
+            if match is None:
+                return
+            yield match
+            pos = match.end()
+
+    def sub(self, repl, text, count=0):
+        """Replace located elements with `repl` (a literal string or a callable)."""
+        parts = []
+        pos = 0
+        for index, match in enumerate(self.finditer(text)):
+            if count and index >= count:
+                break
+            parts.append(text[pos:match.start()])
+            parts.append(repl(match) if callable(repl) else repl)
+            pos = match.end()
+        parts.append(text[pos:])
+        return ''.join(parts)
@@ -0,0 +1,264 @@
+"""
+Single-pass rewrite engine.
+
+The page is walked once, left to right, and every rule is applied during
+that walk. Unmatched text and replacements are written to a single output
+buffer, so a page costs one pass and one result string no matter how many
+rules run, instead of one full copy of the page per rule.
+
+`stream` runs the same pass over a memory-mapped file and writes the
+result to a temporary file renamed into place, for pages too large to
+hold (several times over) in each worker's memory.
+"""
+
+import io
+import mmap
+import os
+import re
+import shutil
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Optional, Union
+
+# Hashed into rule digests so engine changes invalidate incremental manifests
+ENGINE_SOURCE = Path(__file__)
+
+# Bytes copied per write when `stream` passes unchanged text through
+STREAM_CHUNK = 1 << 20
+
+
+@dataclass(frozen=True)
+class Rule:
+    """A rewrite rule applied by `SinglePassEngine`.
+
+    `replace` receives the matched text and returns its replacement.
+    `once` rules stop matching after their first hit (like `count=1`).
+    `when`, if given, is checked against the whole page before scanning;
+    the rule is skipped for that page when it returns False.
+    `pattern` is a regex string, or any object with a compiled pattern's
+    `search(text, pos)` (such as `ElementPattern`), used as is.
+    """
+
+    name: str
+    pattern: Union[str, Any]
+    replace: Callable[[str], str]
+    flags: int = 0
+    once: bool = False
+    when: Optional[Callable[[str], bool]] = None
+
+
+@dataclass(frozen=True)
+class StreamResult:
+    """What `SinglePassEngine.stream` did to a file."""
+
+    changed: bool
+    counts: dict
+    bytes_before: int
+    bytes_after: int
+    lines_before: int
+    lines_after: int
+
+
+class _MappedPage:
+    """`'needle' in page` for `Rule.when` predicates, on a memory-mapped page."""
+
+    def __init__(self, data):
+        self.data = data
+
+    def __contains__(self, needle):
+        return self.data.find(needle.encode('utf-8')) != -1
+
+
+def _binary_pattern(rule):
+    if isinstance(rule.pattern, str):
+        return re.compile(rule.pattern.encode('utf-8'), rule.flags)
+    if hasattr(rule.pattern, 'binary'):
+        return rule.pattern.binary()
+    raise TypeError(f'rule {rule.name!r} cannot be streamed: its pattern has no binary() form')
+
+
+def _copy(data, start, end, out, chunk_size):
+    for offset in range(start, end, chunk_size):
+        out.write(data[offset:min(offset + chunk_size, end)])
+    return end - start
+
+
+def _count(data, needle, start, end, chunk_size):
+    return sum(data[offset:min(offset + chunk_size, end)].count(needle)
+               for offset in range(start, end, chunk_size))
+
+
+class SinglePassEngine:
+    """Applies a list of `Rule`s to a page in one left-to-right pass.
+
+    Each rule keeps a cursor on its next match (found with the rule's own
+    compiled pattern, so CPython's literal-prefix search still applies).
+    The engine always takes the leftmost pending match, ties going to the
+    earlier rule, exactly like a regex alternation would, and cursors only
+    ever move forward.
+    """
+
+    def __init__(self, rules):
+        self.rules = tuple(rules)
+        self._patterns = tuple(
+            re.compile(rule.pattern, rule.flags) if isinstance(rule.pattern, str) else rule.pattern
+            for rule in self.rules
+        )
+        self._bytes_patterns = None
+
+    def _walk(self, text, patterns, page, profile):
+        """Yield `(rule, match)` left to right: the pass `scan` and `stream` share.
+
+        `page` is what `Rule.when` predicates are checked against.
+        """
+        def search(index, pos=0):
+            if profile is None:
+                return patterns[index].search(text, pos)
+            start = time.perf_counter()
+            match = patterns[index].search(text, pos)
+            profile[self.rules[index].name]['seconds'] += time.perf_counter() - start
+            return match
+
+        active = [
+            index for index, rule in enumerate(self.rules)
+            if rule.when is None or rule.when(page)
+        ]
+        pending = {}
+        for index in active:
+            match = search(index)
+            if match is not None:
+                pending[index] = match
+
+        while pending:
+            index = min(pending, key=lambda i: (pending[i].start(), i))
+            match = pending[index]
+            rule = self.rules[index]
+            if match.end() == match.start():
+                raise ValueError(f'rule {rule.name!r} matched an empty string')
+            yield rule, match
+            pos = match.end()
+
+            if rule.once:
+                del pending[index]
+            # Refresh cursors whose match was consumed by this replacement.
+            for other in list(pending):
+                if pending[other].start() < pos:
+                    following = search(other, pos)
+                    if following is None:
+                        del pending[other]
+                    else:
+                        pending[other] = following
+
+    def _start_profile(self, profile):
+        if profile is not None:
+            for rule in self.rules:
+                profile.setdefault(rule.name, {'seconds': 0.0, 'bytes_in': 0, 'bytes_out': 0, 'changed': 0})
+
+    @staticmethod
+    def _replace(rule, matched, profile):
+        if profile is None:
+            return rule.replace(matched)
+        start = time.perf_counter()
+        replacement = rule.replace(matched)
+        entry = profile[rule.name]
+        entry['seconds'] += time.perf_counter() - start
+        entry['bytes_in'] += len(matched.encode('utf-8'))
+        entry['bytes_out'] += len(replacement.encode('utf-8'))
+        entry['changed'] += replacement != matched
+        return replacement
+
+    def scan(self, text, profile=None):
+        """Rewrite `text`, returning `(new_text, {rule_name: match_count})`.
+
+        If `profile` is a dict it is filled with, per rule name, the
+        `seconds` spent searching and replacing, the UTF-8 `bytes_in`
+        matched and `bytes_out` produced, and how many replacements
+        `changed` the matched text.
+        """
+        counts = {rule.name: 0 for rule in self.rules}
+        self._start_profile(profile)
+        out = None
+        pos = 0
+        for rule, match in self._walk(text, self._patterns, text, profile):
+            if out is None:
+                out = io.StringIO()
+            out.write(text[pos:match.start()])
+            out.write(self._replace(rule, match.group(), profile))
+            counts[rule.name] += 1
+            pos = match.end()
+        if out is None:
+            return text, counts
+        out.write(text[pos:])
+        return out.getvalue(), counts
+
+    def stream(self, path, profile=None, chunk_size=STREAM_CHUNK):
+        """Rewrite the UTF-8 file at `path` in place without reading it into memory.
+
+        The file is memory-mapped and searched as bytes. Only matched spans
+        are decoded, and the text between them is copied `chunk_size` bytes
+        at a time into a temporary file next to `path`, which then replaces
+        it atomically. Memory therefore stays around `chunk_size` plus the
+        largest match, whatever the page size. The temporary file is only
+        created once a replacement actually changes something, so an
+        unchanged page is never written.
+
+        Rules must be regex strings or offer `binary()` (like
+        `ElementPattern`). `\\w`, `\\b` and case folding only know ASCII on
+        bytes, so a rule relying on them next to non-ASCII text could match
+        differently than with `scan`. Returns a `StreamResult`; `profile`
+        works as in `scan`.
+        """
+        path = Path(path)
+        counts = {rule.name: 0 for rule in self.rules}
+        self._start_profile(profile)
+        size = path.stat().st_size
+        if size == 0:
+            return StreamResult(False, counts, 0, 0, 0, 0)
+
+        with open(path, 'rb') as source, mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            newlines = _count(data, b'\n', 0, size, chunk_size)
+            out = None
+            tmp = None
+            pos = 0
+            written = 0
+            delta = 0
+            try:
+                for rule, match in self._walk(data, self._binary_patterns(), _MappedPage(data), profile):
+                    matched = match.group()
+                    replacement = self._replace(rule, matched.decode('utf-8'), profile).encode('utf-8')
+                    counts[rule.name] += 1
+                    if replacement != matched:
+                        if out is None:
+                            out = tempfile.NamedTemporaryFile(dir=path.parent, prefix=f'.{path.name}.',
+                                                              suffix='.tmp', delete=False)
+                            tmp = Path(out.name)
+                        written += _copy(data, pos, match.start(), out, chunk_size)
+                        out.write(replacement)
+                        written += len(replacement)
+                        delta += replacement.count(b'\n') - matched.count(b'\n')
+                        pos = match.end()
+                if out is None:
+                    return StreamResult(False, counts, size, size, newlines, newlines)
+                written += _copy(data, pos, size, out, chunk_size)
+                out.close()
+                shutil.copymode(path, tmp)
+                os.replace(tmp, path)
+            except BaseException:
+                if out is not None:
+                    out.close()
+                    tmp.unlink(missing_ok=True)
+                raise
+        return StreamResult(True, counts, size, written, newlines, newlines + delta)
+
+    def _binary_patterns(self):
+        if self._bytes_patterns is None:
+            self._bytes_patterns = tuple(
+                _binary_pattern(rule) for rule in self.rules
+            )
+        return self._bytes_patterns
+
+    def apply(self, text):
+        """Rewrite `text` and return the result."""
+        return self.scan(text)[0]
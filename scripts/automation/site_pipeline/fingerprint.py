@@ -0,0 +1,235 @@
+"""
+Content-hash asset fingerprinting.
+
+Every local CSS/JS/image/font reference in a page gets `?v=<hash>`, where
+the hash is taken from the referenced file's bytes. Hashes are computed
+once per run into an `AssetManifest` (persisted with size/mtime so the
+next run only re-hashes files that changed) and shared with the workers.
+The same manifest drives the cache rules written to `_headers` and
+`vercel.json`.
+
+The hashes replace hand-set tokens such as `?v=20260805-consent-v2`. The
+`scripts/*.check.js` contracts that pin those tokens also accept the file's
+content hash (`sha256(bytes)[:10]`, `file_version`), so keep the two in step.
+
+    cd scripts/automation
+    python -m site_pipeline.fingerprint [--root ../..] [--write-headers]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import posixpath
+import re
+from pathlib import Path
+
+from .batch import REPO_ROOT
+from .manifest import MANIFEST_DIR
+
+FINGERPRINT_EXTENSIONS = frozenset({
+    '.css', '.js', '.mjs',
+    '.png', '.jpg', '.jpeg', '.webp', '.avif', '.gif', '.svg', '.ico',
+    '.woff', '.woff2',
+})
+
+# Hash length kept in the URL (hex chars)
+VERSION_LENGTH = 10
+
+# Never fingerprint build output or tooling
+SKIP_DIRS = frozenset({'.git', 'node_modules', 'public', MANIFEST_DIR, '__pycache__', 'scripts', 'api'})
+
+# src="..." / href="..." pointing at a file we may fingerprint
+ASSET_REF_PATTERN = r'\b(?:src|href)="[^"]*\.(?:css|js|mjs|png|jpe?g|webp|avif|gif|svg|ico|woff2?)(?:\?[^"#]*)?(?:#[^"]*)?"'
+
+_REF_PARTS = re.compile(r'^(\w+)="([^"?#]*)(\?[^"#]*)?(#[^"]*)?"$')
+_V_PARAM = re.compile(r'(^|&)v=[^&]*')
+
+# Hashed into rule digests so fingerprinting changes invalidate manifests
+FINGERPRINT_SOURCE = Path(__file__)
+
+# Directories served with long-lived cache rules
+CACHEABLE_DIRECTORIES = ('assets', 'css', 'js')
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'public, max-age=3600, must-revalidate'
+
+
+def file_version(data):
+    """Short content hash used as the `?v=` token."""
+    return hashlib.sha256(data).hexdigest()[:VERSION_LENGTH]
+
+
+class AssetManifest:
+    """`{root-relative path: content version}` for every fingerprintable file."""
+
+    def __init__(self, root, versions=None):
+        self.root = Path(root)
+        self.versions = dict(versions or {})
+
+    @classmethod
+    def build(cls, root, cache_path=None):
+        """Hash every asset under `root`, reusing `cache_path` entries by stat."""
+        root = Path(root)
+        cache_path = Path(cache_path or root / MANIFEST_DIR / 'assets.json')
+        try:
+            cached = json.loads(cache_path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            cached = {}
+
+        versions, stats = {}, {}
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames[:] = sorted(d for d in dirnames if d not in SKIP_DIRS)
+            for filename in filenames:
+                if Path(filename).suffix.lower() not in FINGERPRINT_EXTENSIONS:
+                    continue
+                path = Path(dirpath) / filename
+                rel = path.relative_to(root).as_posix()
+                stat = path.stat()
+                entry = cached.get(rel)
+                if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+                    version = entry['v']
+                else:
+                    version = file_version(path.read_bytes())
+                versions[rel] = version
+                stats[rel] = {'v': version, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        cache_path.write_text(json.dumps(stats, indent=2, sort_keys=True), encoding='utf-8')
+        return cls(root, versions)
+
+    def resolve(self, url_path, page_rel):
+        """Root-relative path of `url_path` as referenced from `page_rel`."""
+        if not url_path or re.match(r'^(?:[a-z][a-z0-9+.-]*:|//)', url_path, re.IGNORECASE):
+            return None
+        url_path = url_path.replace('%20', ' ')
+        if url_path.startswith('/'):
+            rel = posixpath.normpath(url_path.lstrip('/'))
+        else:
+            rel = posixpath.normpath(posixpath.join(posixpath.dirname(page_rel), url_path))
+        return None if rel.startswith('..') else rel
+
+    def version_for(self, url_path, page_rel):
+        rel = self.resolve(url_path, page_rel)
+        return self.versions.get(rel) if rel else None
+
+
+def fingerprint_ref(ref, manifest, page_rel):
+    """Rewrite one `src="..."`/`href="..."` attribute with its content version."""
+    parts = _REF_PARTS.match(ref)
+    if parts is None:
+        return ref
+    attr, url_path, query, fragment = parts.groups()
+    version = manifest.version_for(url_path, page_rel)
+    if version is None:
+        return ref
+
+    query = (query or '')[1:]
+    if _V_PARAM.search(query):
+        query = _V_PARAM.sub(lambda m: f'{m.group(1)}v={version}', query, count=1)
+    else:
+        query = f'{query}&v={version}' if query else f'v={version}'
+    return f'{attr}="{url_path}?{query}{fragment or ""}"'
+
+
+def fingerprint_content(content, manifest, page_rel):
+    """Fingerprint every local asset reference in `content`."""
+    return re.sub(ASSET_REF_PATTERN, lambda m: fingerprint_ref(m.group(0), manifest, page_rel), content)
+
+
+def referenced_assets(content, manifest, page_rel):
+    """Root-relative paths of the local assets `content` references."""
+    paths = set()
+    for match in re.finditer(ASSET_REF_PATTERN, content):
+        parts = _REF_PARTS.match(match.group(0))
+        rel = parts and manifest.resolve(parts.group(2), page_rel)
+        if rel:
+            paths.add(rel)
+    return paths
+
+
+def cache_directories(manifest):
+    """Long-cached top-level directories that hold fingerprinted assets."""
+    present = {rel.split('/', 1)[0] for rel in manifest.versions if '/' in rel}
+    return [directory for directory in CACHEABLE_DIRECTORIES if directory in present]
+
+
+def update_headers_file(path, manifest):
+    """Regenerate the asset cache rules in a Netlify-style `_headers` file.
+
+    `_headers` cannot match on the query string, so fingerprinted
+    directories revalidate instead of being `immutable` under a stale URL.
+    """
+    path = Path(path)
+    text = path.read_text(encoding='utf-8')
+    for directory in cache_directories(manifest):
+        block = re.compile(rf'^/{re.escape(directory)}/\*\n(?:[ \t]+.*\n?)*', re.MULTILINE)
+        match = block.search(text)
+        if match is None:
+            text = text.rstrip('\n') + f'\n\n/{directory}/*\n  Cache-Control: {REVALIDATE}\n'
+            continue
+        rules = match.group(0)
+        if re.search(r'^[ \t]+Cache-Control:', rules, re.MULTILINE):
+            rules = re.sub(r'^([ \t]+Cache-Control: ).*$', rf'\g<1>{REVALIDATE}', rules,
+                           count=1, flags=re.MULTILINE)
+        else:
+            rules = rules.rstrip('\n') + f'\n  Cache-Control: {REVALIDATE}\n'
+        text = text[:match.start()] + rules + text[match.end():]
+    path.write_text(text, encoding='utf-8')
+
+
+def _is_generated(entry):
+    return any(cond.get('type') == 'query' and cond.get('key') == 'v' for cond in entry.get('has', []))
+
+
+def update_vercel_config(path, manifest):
+    """Regenerate the asset cache rules in `vercel.json`.
+
+    URLs carrying `?v=` are content-addressed, so they are `immutable`;
+    the same paths without a version revalidate.
+    """
+    path = Path(path)
+    config = json.loads(path.read_text(encoding='utf-8'))
+    headers = [entry for entry in config.get('headers', []) if not _is_generated(entry)]
+
+    for directory in cache_directories(manifest):
+        source = f'/{directory}/:path*'
+        existing = next((entry for entry in headers if entry.get('source') == source), None)
+        if existing is None:
+            existing = {'source': source, 'headers': []}
+            headers.append(existing)
+        cache = next((h for h in existing['headers'] if h['key'] == 'Cache-Control'), None)
+        if cache is None:
+            existing['headers'].append({'key': 'Cache-Control', 'value': REVALIDATE})
+        else:
+            cache['value'] = REVALIDATE
+
+    for directory in cache_directories(manifest):
+        headers.append({
+            'source': f'/{directory}/:path*',
+            'has': [{'type': 'query', 'key': 'v'}],
+            'headers': [{'key': 'Cache-Control', 'value': IMMUTABLE}],
+        })
+
+    config['headers'] = headers
+    path.write_text(json.dumps(config, indent=2, ensure_ascii=False) + '\n', encoding='utf-8')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the asset content-hash manifest')
+    parser.add_argument('--root', type=Path, default=REPO_ROOT)
+    parser.add_argument('--write-headers', action='store_true',
+                        help='regenerate the cache rules in _headers and vercel.json')
+    args = parser.parse_args()
+
+    manifest = AssetManifest.build(args.root)
+    print(f"🔑 {len(manifest.versions)} assets fingerprinted "
+          f"({', '.join(cache_directories(manifest))})")
+    if args.write_headers:
+        update_headers_file(args.root / '_headers', manifest)
+        update_vercel_config(args.root / 'vercel.json', manifest)
+        print("📝 _headers and vercel.json cache rules updated")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,334 @@
+"""
+Resource hints and image loading priorities, computed from what a page loads.
+
+`resource_hints` reads the page's stylesheets, scripts and images in
+document order and injects into `<head>`, before its first resource tag:
+
+- `preconnect` for the first `MAX_PRECONNECTS` external origins the page
+  fetches from (stylesheets and their font origins first, then scripts,
+  then the top image), `dns-prefetch` for the others; font origins get
+  `crossorigin`,
+- `preload as="style"` for critical stylesheets the browser finds late:
+  font stylesheets loaded through `data-deferred-stylesheet` (the page
+  renders with them, they are only loaded out of the way of the first
+  paint), external `@import`s of the blocking stylesheets and blocking
+  stylesheets linked from `<body>`.
+
+The first image above the fold (in a `<header>`, a hero element or the
+body's first `<section>`) gets `fetchpriority="high"` unless the page
+already has a high-priority image: an image with `fetchpriority="high"` or
+a `<link rel="preload" as="image">`. An image the author made
+`loading="lazy"` is never promoted. Images after the first `EAGER_IMAGES`,
+outside `<nav>` and `<header>`, get `loading="lazy"`, and every other image
+`decoding="async"`. Attributes a tag already has are left alone.
+
+Hints this module wrote carry `data-resource-hint` and are recomputed on
+every run, so they follow the page; hand-written hints are respected and
+never duplicated. Origins only known at runtime (an API host read from a
+config script) are not visible here. Each injection is recorded as a note
+for the run report.
+"""
+
+import functools
+import html
+import posixpath
+import re
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from .references import parse_attributes
+
+# Hashed into rule digests so hint changes invalidate manifests
+HINTS_SOURCE = Path(__file__)
+
+MAX_PRECONNECTS = 4
+
+# Images at the top of the body that are never lazy-loaded
+EAGER_IMAGES = 2
+
+# Marks the hints this module owns
+OWNED = 'data-resource-hint'
+
+# Stylesheet origin → origin its fonts are served from
+FONT_ORIGINS = {'https://fonts.googleapis.com': 'https://fonts.gstatic.com'}
+
+# Preconnect priority by what the origin serves
+_STYLESHEET, _SCRIPT, _IMAGE = range(3)
+
+_TOKENS = re.compile(
+    r'<!--.*?-->'
+    r'|<(noscript|template|textarea)\b[^>]*>.*?</\1\s*>'
+    r'|<style\b[^>]*>(.*?)</style\s*>'
+    r'|<script\b((?:"[^"]*"|\'[^\']*\'|[^\'">])*)>.*?</script\s*>'
+    r'|<(/?)([a-zA-Z][\w:-]*)((?:"[^"]*"|\'[^\']*\'|[^\'">])*)>',
+    re.DOTALL | re.IGNORECASE,
+)
+_OWNED_HINT = re.compile(rf'[ \t]*<link\b[^>]*\b{OWNED}\b[^>]*>\n?', re.IGNORECASE)
+_CSS_COMMENT = re.compile(r'/\*.*?\*/', re.DOTALL)
+_CSS_IMPORT = re.compile(r'''@import\s+(?:url\(\s*)?["']?([^"')\s;]+)["']?\s*\)?''', re.IGNORECASE)
+_TAG_END = re.compile(r'\s*/?>$')
+_HERO_CLASS = re.compile(r'(?:^|-)hero(?:-|$)')
+_VOID_ELEMENTS = frozenset({
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'source', 'track', 'wbr',
+})
+
+
+def origin(url):
+    """`scheme://host[:port]` of an absolute (or protocol-relative) URL, else None."""
+    if url.startswith('//'):
+        url = 'https:' + url
+    parts = urlsplit(url)
+    if parts.scheme not in ('http', 'https') or not parts.netloc:
+        return None
+    return f'{parts.scheme}://{parts.netloc.lower()}'
+
+
+@functools.lru_cache(maxsize=256)
+def _stylesheet_imports(path, mtime_ns):
+    try:
+        css = Path(path).read_text(encoding='utf-8', errors='replace')
+    except OSError:
+        return ()
+    return tuple(_CSS_IMPORT.findall(_CSS_COMMENT.sub('', css)))
+
+
+def _imports(href, page_rel, root):
+    """External `@import` URLs of the local stylesheet `href` links to."""
+    if root is None or origin(href):
+        return []
+    path = href.split('?', 1)[0].split('#', 1)[0].replace('%20', ' ')
+    rel = posixpath.normpath(path.lstrip('/') if path.startswith('/')
+                             else posixpath.join(posixpath.dirname(page_rel), path))
+    file = Path(root) / rel
+    if rel.startswith('..') or not file.is_file():
+        return []
+    return [url for url in _stylesheet_imports(str(file), file.stat().st_mtime_ns) if origin(url)]
+
+
+def _with_attributes(tag, attributes):
+    end = _TAG_END.search(tag)
+    added = ''.join(f' {name}="{value}"' for name, value in attributes.items())
+    return tag[:end.start()] + added + tag[end.start():]
+
+
+class _Scan:
+    """What `resource_hints` needs from one pass over the page."""
+
+    def __init__(self):
+        self.uses = []             # (priority, position, origin, crossorigin)
+        self.preconnected = set()  # (origin, crossorigin)
+        self.prefetched = set()
+        self.preloaded = set()
+        self.high_priority = False
+        self.insert_at = None
+        self.head_end = None
+        self.site = None
+        self.preloads = []         # (href, reason)
+        self.images = []           # (match, attributes, in nav/header, above the fold)
+        self.sections = 0
+
+
+def _scan(content, page_rel, root):
+    scan = _Scan()
+    stack = []  # [tag, kind, same-tag elements open inside it] of the banners, heroes and sections
+    in_body = False
+
+    def use(priority, position, url, crossorigin=False):
+        host = origin(url)
+        if host:
+            scan.uses.append((priority, position, host, crossorigin))
+            font_origin = FONT_ORIGINS.get(host)
+            if font_origin:
+                scan.uses.append((priority, position, font_origin, True))
+
+    def mark_resource(position):
+        if scan.insert_at is None and not in_body:
+            scan.insert_at = position
+
+    for match in _TOKENS.finditer(content):
+        if match.group(2) is not None:
+            if not in_body:
+                for url in _CSS_IMPORT.findall(_CSS_COMMENT.sub('', match.group(2))):
+                    if origin(url):
+                        scan.preloads.append((url, 'inline @import'))
+            continue
+        if match.group(3) is not None:
+            attributes = parse_attributes(match.group(3))
+            src = attributes.get('src', '')
+            if src:
+                mark_resource(match.start())
+                cors = 'crossorigin' in attributes or attributes.get('type', '').lower() == 'module'
+                use(_SCRIPT, match.start(), src, cors)
+            continue
+        tag = (match.group(5) or '').lower()
+        if not tag:
+            continue
+        if match.group(4):
+            same = [entry for entry in stack if entry[0] == tag]
+            if same and same[-1][2]:
+                same[-1][2] -= 1
+            elif same:
+                del stack[stack.index(same[-1]):]
+            elif tag == 'head':
+                scan.head_end = match.start()
+            continue
+        attributes = parse_attributes(match.group(6))
+        if tag == 'body':
+            in_body = True
+            if scan.head_end is None:
+                scan.head_end = match.start()
+        elif tag == 'link':
+            _link(scan, match, attributes, in_body, page_rel, root, use, mark_resource)
+        elif tag == 'img' and in_body:
+            above_fold = any(kind in ('header', 'hero', 'first_section') for _, kind, _ in stack)
+            if above_fold and not any(image[3] for image in scan.images):
+                use(_IMAGE, match.start(), attributes.get('src', ''))
+            scan.images.append((match, attributes, any(kind in ('nav', 'header') for _, kind, _ in stack),
+                                above_fold))
+            if attributes.get('fetchpriority', '').lower() == 'high':
+                scan.high_priority = True
+        elif in_body and tag not in _VOID_ELEMENTS:
+            for entry in stack:
+                if entry[0] == tag:
+                    entry[2] += 1
+            kind = _kind(tag, attributes, stack, scan)
+            if kind:
+                stack.append([tag, kind, 0])
+    return scan
+
+
+def _kind(tag, attributes, stack, scan):
+    """How an element opening in the body bears on its images, None if it does not."""
+    if tag in ('nav', 'header'):
+        return tag
+    if any(_HERO_CLASS.search(name) for name in attributes.get('class', '').split()):
+        return 'hero'
+    if tag == 'section':
+        if any(kind.endswith('section') for _, kind, _ in stack):
+            return 'section'
+        scan.sections += 1
+        return 'first_section' if scan.sections == 1 else 'section'
+    return None
+
+
+def _link(scan, match, attributes, in_body, page_rel, root, use, mark_resource):
+    rel = attributes.get('rel', '').lower().split()
+    href = attributes.get('href', '')
+    cors = 'crossorigin' in attributes
+    if 'canonical' in rel:
+        scan.site = origin(href)
+    elif 'preconnect' in rel:
+        scan.preconnected.add((origin(href), cors))
+        mark_resource(match.start())
+    elif 'dns-prefetch' in rel:
+        scan.prefetched.add(origin(href))
+    elif 'preload' in rel or 'modulepreload' in rel:
+        scan.preloaded.add(href)
+        # A preloaded image is the one the page already chose to fetch first
+        if attributes.get('as', '').lower() == 'image':
+            scan.high_priority = True
+        mark_resource(match.start())
+    elif 'data-deferred-stylesheet' in attributes:
+        href = attributes.get('data-href', '')
+        mark_resource(match.start())
+        use(_STYLESHEET, match.start(), href)
+        if origin(href) in FONT_ORIGINS:
+            scan.preloads.append((href, 'deferred font stylesheet'))
+    elif 'stylesheet' in rel:
+        mark_resource(match.start())
+        use(_STYLESHEET, match.start(), href, cors)
+        if in_body:
+            scan.preloads.append((href, 'stylesheet linked from <body>'))
+        for url in _imports(href, page_rel, root):
+            use(_STYLESHEET, match.start(), url)
+            scan.preloads.append((url, f'@import of {href.split("?", 1)[0]}'))
+
+
+def _hint_tags(scan, notes):
+    """`<link>`s to inject, best first."""
+    tags = []
+    first_use = {}
+    for priority, position, host, cors in sorted(scan.uses, key=lambda use: use[:2]):
+        if host != scan.site:
+            first_use.setdefault((host, cors), (priority, position))
+    budget = MAX_PRECONNECTS - len(scan.preconnected)
+    for host, cors in sorted(first_use, key=first_use.get):
+        if (host, cors) in scan.preconnected:
+            continue
+        if budget > 0:
+            budget -= 1
+            scan.preconnected.add((host, cors))
+            tags.append(f'<link rel="preconnect" href="{host}"{" crossorigin" if cors else ""} {OWNED}>')
+            notes.append(f'preconnect {host}' + (' (crossorigin)' if cors else ''))
+        elif host not in scan.prefetched and not any(h == host for h, _ in scan.preconnected):
+            scan.prefetched.add(host)
+            tags.append(f'<link rel="dns-prefetch" href="{host}" {OWNED}>')
+            notes.append(f'dns-prefetch {host}')
+    for href, reason in scan.preloads:
+        if href in scan.preloaded:
+            continue
+        scan.preloaded.add(href)
+        tags.append(f'<link rel="preload" as="style" href="{html.escape(href)}" {OWNED}>')
+        notes.append(f'preload style {href} ({reason})')
+    return tags
+
+
+def _image_tags(scan, notes):
+    """`{match start: (end, new tag)}` for the body images to change."""
+    edits = {}
+    top = None
+    if not scan.high_priority:
+        top = next((index for index, (_, attributes, _, above_fold) in enumerate(scan.images)
+                    if above_fold and attributes.get('loading', '').lower() != 'lazy'), None)
+    for index, (match, attributes, in_banner, _) in enumerate(scan.images):
+        src = attributes.get('src', '') or attributes.get('data-src', '')
+        added = {}
+        if index == top:
+            added['fetchpriority'] = 'high'
+            notes.append(f'fetchpriority=high {src}')
+        elif attributes.get('fetchpriority', '').lower() != 'high':
+            if 'decoding' not in attributes:
+                added['decoding'] = 'async'
+                notes.append(f'decoding=async {src}')
+            if (index >= EAGER_IMAGES and not in_banner and 'loading' not in attributes
+                    and 'fetchpriority' not in attributes):
+                added['loading'] = 'lazy'
+                notes.append(f'loading=lazy {src}')
+        if added:
+            edits[match.start()] = (match.end(), _with_attributes(match.group(0), added))
+    return edits
+
+
+def resource_hints(content, page_rel, root=None, notes=None):
+    """Inject the hints and image priorities described in the module docstring.
+
+    `root` (the site root) is needed to follow local stylesheets' `@import`s;
+    `notes` collects one line per injection.
+    """
+    notes = [] if notes is None else notes
+    content = _OWNED_HINT.sub('', content)
+    scan = _scan(content, page_rel, root)
+    if scan.head_end is None:
+        return content
+
+    edits = _image_tags(scan, notes)
+    tags = _hint_tags(scan, notes)
+    insert_at = scan.insert_at if scan.insert_at is not None else scan.head_end
+    if tags:
+        line_start = content.rfind('\n', 0, insert_at) + 1
+        indent = re.match(r'[ \t]*', content[line_start:insert_at]).group(0)
+        if content[line_start:insert_at].strip():
+            block = ''.join(f'\n{indent}{tag}' for tag in tags) + '\n' + indent
+        else:
+            block = ''.join(f'{tag}\n{indent}' for tag in tags)
+        edits[insert_at] = (insert_at, block)
+
+    out = []
+    pos = 0
+    for start in sorted(edits):
+        end, text = edits[start]
+        out.append(content[pos:start])
+        out.append(text)
+        pos = end
+    out.append(content[pos:])
+    return ''.join(out)
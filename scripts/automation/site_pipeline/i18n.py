@@ -0,0 +1,417 @@
+"""
+Static per-language pages from the `data-i18n` keys.
+
+Runs on the build output (`public/`, after `npm run build:public` and
+before minify/compress). Every `data-i18n` element gets the text of its
+key and every `data-i18n-ph` field its placeholder, the way
+`assets/i18n-runtime.js` would after `DOMContentLoaded`. The dictionaries are
+`assets/i18n/{en,pt,es}.json` (`npm run i18n:export` writes them from
+`assets/i18n.js`):
+
+- English stays at the page's own URL, pre-rendered in place,
+- each other language of `LANGUAGE_DIRS` gets a copy under `<lang>/`
+  (`pt/about.html` is served as `/pt/about`) with `<html lang>`, its own
+  canonical URL, relative URLs rebased and links to other translated
+  pages kept in the language,
+- pages with a canonical URL get `hreflang` alternates for every language
+  plus `x-default` (English).
+
+A key missing from a language falls back to English, and one missing
+from English too leaves the page's own text; both are reported per
+language. The runtime stays on the pages for what only it can translate
+(components, untagged text, strings scripts set), and the copies store
+their language where it reads it, so it keeps the text they were built
+with. Only pages that use `data-i18n` get copies; the language
+directories belong to this stage and copies of pages that are gone are
+removed.
+
+    cd scripts/automation
+    python -m site_pipeline.i18n [--out ../../public] [--json]
+"""
+
+import argparse
+import html
+import json
+import os
+import posixpath
+import re
+import sys
+from functools import partial
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from .batch import FAILED, LANGUAGE_DIRS, REPO_ROOT, UNCHANGED, UPDATED, PageResult, discover_pages, merge_results, run_batch
+from .elements import ElementPattern
+from .profiling import PageProfile, add_profiling_arguments, finish_profiling, profiled_worker
+from .references import parse_attributes
+
+# Hashed into rule digests so changes here rebuild the language pages
+I18N_SOURCE = Path(__file__)
+
+DEFAULT_LANGUAGE = 'en'
+LANGUAGES = (DEFAULT_LANGUAGE, *LANGUAGE_DIRS)
+DICTIONARY_DIR = 'assets/i18n'
+
+# Where assets/i18n-runtime.js keeps the visitor's language
+STORAGE_KEY = 'gb_lang'
+
+# Marks the tags this stage owns
+OWNED = 'data-i18n-static'
+
+VOID_ELEMENTS = frozenset({
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta',
+    'source', 'track', 'wbr',
+})
+
+# Attributes holding a URL (srcset: a list of them)
+URL_ATTRIBUTES = frozenset({'href', 'src', 'srcset', 'data-href', 'data-src', 'data-srcset', 'action', 'poster'})
+# Elements whose `href`/`action` navigate, so they follow the page's language
+LINK_ELEMENTS = frozenset({'a', 'area', 'form'})
+
+_QUOTED_OR_OTHER = r'''(?:"[^"]*"|'[^']*'|[^'">])*'''
+_TOKENS = re.compile(
+    r'<!--.*?-->'
+    rf'|<(script|style|template|noscript)\b({_QUOTED_OR_OTHER})>(.*?)</\1\s*>'
+    rf'|<([a-zA-Z][\w:-]*)({_QUOTED_OR_OTHER})>',
+    re.DOTALL | re.IGNORECASE,
+)
+_ATTRIBUTE_VALUE = re.compile(r'''(\s)([^\s=/>"']+)(\s*=\s*)("[^"]*"|'[^']*'|[^\s>"']+)''')
+_CSS_URL = re.compile(r'''url\(\s*(["']?)([^"')\s]+)\1\s*\)''', re.IGNORECASE)
+_NOT_RELATIVE = re.compile(r'^(?:#|[a-z][a-z0-9+.-]*:|//|\?|$)', re.IGNORECASE)
+_OWNED_TAG = re.compile(rf'[ \t]*(?:<link\b[^>]*\b{OWNED}\b[^>]*>|<script\b[^>]*\b{OWNED}\b[^>]*>.*?</script>)\n?',
+                        re.DOTALL | re.IGNORECASE)
+_HTML_TAG = re.compile(r'<html\b([^>]*)>', re.IGNORECASE)
+_HEAD_END = re.compile(r'[ \t]*</head\s*>', re.IGNORECASE)
+_KEYED = re.compile(r'\bdata-i18n(?:-ph)?=')
+
+
+def load_dictionaries(root):
+    """`{language: dictionary}` from `assets/i18n/<language>.json` (empty if missing)."""
+    dictionaries = {}
+    for language in LANGUAGES:
+        try:
+            text = (Path(root) / DICTIONARY_DIR / f'{language}.json').read_text(encoding='utf-8')
+            dictionaries[language] = json.loads(text)
+        except FileNotFoundError:
+            dictionaries[language] = {}
+    return dictionaries
+
+
+def read_path(dictionary, key):
+    """Value of a dotted `key` (mirrors `readPath` in assets/i18n.js), else None."""
+    if not isinstance(dictionary, dict):
+        return None
+    if key in dictionary:
+        return dictionary[key]
+    parts = key.split('.')
+    cursor = dictionary
+    for index, part in enumerate(parts):
+        remaining = '.'.join(parts[index:])
+        if isinstance(cursor, dict) and remaining in cursor:
+            return cursor[remaining]
+        if not isinstance(cursor, dict) or part not in cursor:
+            return None
+        cursor = cursor[part]
+    return cursor
+
+
+def translate(dictionaries, language, key):
+    """`(text, language it came from)`, the language None when no dictionary has it."""
+    for source in dict.fromkeys((language, DEFAULT_LANGUAGE)):
+        value = read_path(dictionaries.get(source), key)
+        if isinstance(value, str):
+            return value, source
+    return None, None
+
+
+def set_attribute(tag, name, value):
+    """`tag` with attribute `name` set to `value` (added before the `>` if absent)."""
+    escaped = html.escape(value)
+    pattern = re.compile(rf'''(\s{re.escape(name)}\s*=\s*)("[^"]*"|'[^']*'|[^\s>"']+)''', re.IGNORECASE)
+    if pattern.search(tag):
+        return pattern.sub(lambda m: f'{m.group(1)}"{escaped}"', tag, count=1)
+    end = len(tag) - (2 if tag.endswith('/>') else 1)
+    return f'{tag[:end].rstrip()} {name}="{escaped}"{tag[end:]}'
+
+
+def render_language(content, language, dictionaries, missing=None):
+    """Resolve the page's `data-i18n`/`data-i18n-ph` keys in `language`.
+
+    `missing` maps each key `language` lacks to the language it fell back
+    to (None: the page's own text was kept).
+    """
+    missing = {} if missing is None else missing
+    out = []
+    pos = 0
+    scan = 0
+    while True:
+        match = _TOKENS.search(content, scan)
+        if match is None:
+            break
+        scan = match.end()
+        tag = match.group(4)
+        if tag is None:
+            continue
+        attributes = parse_attributes(match.group(5))
+        markup = match.group(0)
+        if 'data-i18n-ph' in attributes:
+            key = attributes['data-i18n-ph']
+            text, source = translate(dictionaries, language, key)
+            if source != language:
+                missing[key] = source
+            if text is not None:
+                markup = set_attribute(markup, 'placeholder', text)
+        key = attributes.get('data-i18n')
+        if key and tag.lower() not in VOID_ELEMENTS and not markup.endswith('/>'):
+            end = ElementPattern(tag).close(content, match.end())
+            text, source = translate(dictionaries, language, key)
+            if source != language:
+                missing[key] = source
+            if end is not None and text is not None:
+                out.append(content[pos:match.start()])
+                out.append(markup + html.escape(text, quote=False) + content[content.rfind('<', 0, end):end])
+                pos = scan = end
+                continue
+        if markup != match.group(0):
+            out.append(content[pos:match.start()])
+            out.append(markup)
+            pos = match.end()
+    out.append(content[pos:])
+    content = ''.join(out)
+    html_tag = _HTML_TAG.search(content)
+    if html_tag:
+        content = content[:html_tag.start()] + set_attribute(html_tag.group(0), 'lang', language) + content[html_tag.end():]
+    return content
+
+
+def page_for(target):
+    """Page rel a root-relative link target is served from (clean URLs included)."""
+    target = target.strip('/')
+    if target in ('', '.'):
+        return 'index.html'
+    return target if target.endswith('.html') else f'{target}.html'
+
+
+def localize_url(url, page_rel, language, translated, link=False):
+    """`url` as written on `page_rel`'s copy under `<language>/`.
+
+    Relative URLs are rebased one level up; with `link`, URLs of
+    `translated` pages point at their `language` copy instead.
+    """
+    url = url.strip()
+    if _NOT_RELATIVE.match(url):
+        return url
+    path, suffix = re.match(r'([^?#]*)(.*)', url, re.DOTALL).groups()
+    if url.startswith('/'):
+        if link and page_for(path) in translated:
+            return f'/{language}{path.rstrip("/")}{suffix}' if path != '/' else f'/{language}{suffix}'
+        return url
+    target = posixpath.normpath(posixpath.join(posixpath.dirname(page_rel), path))
+    if link and page_for(target) in translated:
+        return url
+    return '../' + url
+
+
+def _localize_attributes(attributes_text, tag, page_rel, language, translated):
+    link = tag.lower() in LINK_ELEMENTS
+
+    def replace(match):
+        name = match.group(2).lower()
+        quoted = match.group(4)
+        quote = quoted[0] if quoted[0] in '"\'' else ''
+        value = quoted[1:-1] if quote else quoted
+        if name in ('srcset', 'data-srcset'):
+            value = ', '.join(
+                ' '.join([localize_url(candidate.split()[0], page_rel, language, translated),
+                          *candidate.split()[1:]])
+                for candidate in value.split(',') if candidate.strip()
+            )
+        elif name in URL_ATTRIBUTES:
+            value = localize_url(html.unescape(value), page_rel, language, translated,
+                                 link and name in ('href', 'action'))
+            value = html.escape(value) if quote else value
+        elif name == 'style':
+            value = _localize_css(value, page_rel, language, translated)
+        else:
+            return match.group(0)
+        return f'{match.group(1)}{match.group(2)}{match.group(3)}{quote}{value}{quote}'
+
+    return _ATTRIBUTE_VALUE.sub(replace, attributes_text)
+
+
+def _localize_css(css, page_rel, language, translated):
+    return _CSS_URL.sub(lambda m: f'url({m.group(1)}{localize_url(m.group(2), page_rel, language, translated)}'
+                                  f'{m.group(1)})', css)
+
+
+def localize_urls(content, page_rel, language, translated):
+    """Rebase the relative URLs of a page moved to `<language>/` (see `localize_url`)."""
+    def replace(match):
+        if match.group(1):
+            tag, attributes, body = match.group(1), match.group(2), match.group(3)
+            attributes = _localize_attributes(attributes, tag, page_rel, language, translated)
+            if tag.lower() == 'style':
+                body = _localize_css(body, page_rel, language, translated)
+            return f'<{tag}{attributes}>{body}</{tag}>'
+        if match.group(4):
+            return f'<{match.group(4)}{_localize_attributes(match.group(5), match.group(4), page_rel, language, translated)}>'
+        return match.group(0)
+    return _TOKENS.sub(replace, content)
+
+
+def language_url(url, language):
+    """The `language` version of an absolute page URL."""
+    if language == DEFAULT_LANGUAGE:
+        return url
+    parts = urlsplit(url)
+    path = parts.path.rstrip('/')
+    return parts._replace(path=f'/{language}{path}').geturl()
+
+
+def _canonical(content):
+    for match in re.finditer(r'<link\b[^>]*>', content, re.IGNORECASE):
+        attributes = parse_attributes(match.group(0)[5:-1])
+        if 'canonical' in attributes.get('rel', '').lower().split():
+            return match, attributes.get('href', '')
+    return None, None
+
+
+def head_block(content, language, alternates):
+    """Insert the hreflang alternates (and, for a copy, its stored language).
+
+    `content` must not hold a previous block (`_OWNED_TAG` removes it).
+    Returns the content with the canonical URL switched to `language`.
+    """
+    canonical, url = _canonical(content)
+    tags = []
+    if canonical is not None and url and alternates:
+        for alternate in LANGUAGES:
+            tags.append(f'<link rel="alternate" hreflang="{alternate}" href="{html.escape(language_url(url, alternate))}" {OWNED}>')
+        tags.append(f'<link rel="alternate" hreflang="x-default" href="{html.escape(url)}" {OWNED}>')
+        if language != DEFAULT_LANGUAGE:
+            localized = language_url(url, language)
+            content = content.replace(canonical.group(0), set_attribute(canonical.group(0), 'href', localized), 1)
+            content = re.sub(rf'''(<meta\b[^>]*\bproperty=["']og:url["'][^>]*\bcontent=["']){re.escape(url)}(["'])''',
+                             lambda m: m.group(1) + localized + m.group(2), content, count=1, flags=re.IGNORECASE)
+            canonical, _ = _canonical(content)
+    if language != DEFAULT_LANGUAGE:
+        tags.append(f'<script {OWNED}>try{{localStorage.setItem("{STORAGE_KEY}","{language}")}}catch(e){{}}</script>')
+    if not tags:
+        return content
+    if canonical is not None:
+        line_start = content.rfind('\n', 0, canonical.start()) + 1
+        indent = re.match(r'[ \t]*', content[line_start:]).group(0)
+        at = canonical.end()
+        return content[:at] + ''.join(f'\n{indent}{tag}' for tag in tags) + content[at:]
+    head_end = _HEAD_END.search(content)
+    if head_end is None:
+        return content
+    indent = re.match(r'[ \t]*', head_end.group(0)).group(0) + '  '
+    return content[:head_end.start()] + ''.join(f'{indent}{tag}\n' for tag in tags) + content[head_end.start():]
+
+
+def localize_page(path, out, dictionaries, translated):
+    """Worker: pre-render one output page in English and write its language copies."""
+    path = Path(path)
+    rel = Path(os.path.relpath(path, out)).as_posix()
+    try:
+        content = _OWNED_TAG.sub('', path.read_text(encoding='utf-8'))
+        has_copies = rel in translated
+        profile = PageProfile()
+        missing = {}
+        written = []
+        for language in LANGUAGES if has_copies else (DEFAULT_LANGUAGE,):
+            missing[language] = {}
+            rendered = profile.run(f'i18n_{language}', render_language, content, language, dictionaries,
+                                   missing[language])
+            if language == DEFAULT_LANGUAGE:
+                target = path
+            else:
+                target = Path(out) / language / rel
+                rendered = localize_urls(rendered, rel, language, translated)
+            rendered = head_block(rendered, language, has_copies)
+            try:
+                current = target.read_text(encoding='utf-8')
+            except FileNotFoundError:
+                current = None
+            if rendered != current:
+                target.parent.mkdir(parents=True, exist_ok=True)
+                target.write_text(rendered, encoding='utf-8')
+                written.append(language)
+        stats = {'profile': profile.as_list(), 'missing': missing, 'copies': has_copies}
+        if not written:
+            return PageResult(str(path), UNCHANGED, f"✓ {rel}: translations current", stats=stats)
+        return PageResult(str(path), UPDATED, f"✅ {rel}: {', '.join(written)}", stats=stats)
+    except Exception as e:
+        return PageResult(str(path), FAILED, f"❌ Error in {rel}: {e}")
+
+
+def stale_copies(out, translated):
+    """Pages under the language directories whose English page has no copies any more."""
+    stale = []
+    for language in LANGUAGE_DIRS:
+        directory = Path(out) / language
+        for path in directory.rglob('*.html') if directory.is_dir() else ():
+            if path.relative_to(directory).as_posix() not in translated:
+                stale.append(path)
+    return sorted(stale)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Write statically translated pages per language')
+    parser.add_argument('--root', type=Path, default=REPO_ROOT, help='site root (holds assets/i18n/)')
+    parser.add_argument('--out', type=Path, help='build output to translate (default: ROOT/public)')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--json', action='store_true', help='print the missing keys per language as JSON')
+    add_profiling_arguments(parser)
+    args = parser.parse_args()
+    out = args.out or args.root / 'public'
+    if not out.is_dir():
+        parser.error(f'{out} does not exist; run `npm run build:public` first')
+
+    dictionaries = load_dictionaries(args.root)
+    pages = discover_pages(out)
+    translated = frozenset(
+        Path(os.path.relpath(page, out)).as_posix() for page in pages
+        if _KEYED.search(page.read_text(encoding='utf-8', errors='replace'))
+    )
+    for path in stale_copies(out, translated):
+        path.unlink()
+    worker = partial(localize_page, out=out, dictionaries=dictionaries, translated=translated)
+    results = run_batch(profiled_worker(worker, args, out), pages, args.workers)
+
+    missing = {language: {} for language in LANGUAGES}
+    for result in results:
+        rel = Path(os.path.relpath(result.page, out)).as_posix()
+        for language, keys in result.stats.get('missing', {}).items():
+            for key, fallback in keys.items():
+                entry = missing[language].setdefault(key, {'fallback': fallback, 'pages': []})
+                entry['pages'].append(rel)
+    if args.json:
+        print(json.dumps(missing, indent=2))
+        return
+
+    for result in results:
+        if result.status in (UPDATED, FAILED):
+            print(result.message)
+    summary = merge_results(results)
+    print(f"\n🌐 {len(translated)} pages in {', '.join(LANGUAGES)}, {summary[UPDATED]} updated, "
+          f"{summary[UNCHANGED]} unchanged, {summary[FAILED]} failed")
+    for language, keys in missing.items():
+        if not keys:
+            continue
+        untranslated = sum(entry['fallback'] is None for entry in keys.values())
+        if language == DEFAULT_LANGUAGE:
+            print(f"⚠️  {language}: {len(keys)} keys missing (page text kept)")
+        else:
+            print(f"⚠️  {language}: {len(keys)} keys missing ({len(keys) - untranslated} shown in English, "
+                  f"{untranslated} in no dictionary: page text kept)")
+        for key, entry in sorted(keys.items(), key=lambda item: -len(item[1]['pages']))[:10]:
+            print(f"   {key} ({len(entry['pages'])} pages)")
+    finish_profiling(args, results, out)
+    if summary[FAILED]:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
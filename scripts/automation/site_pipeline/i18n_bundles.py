@@ -0,0 +1,352 @@
+"""
+Per-page, per-language dictionaries for the pages that translate at runtime.
+
+`assets/i18n.js` carries every string of every page in every language.
+Runs on the build output (`public/`, after `site_pipeline.i18n` and before
+minify/compress). For each page that loads it, this stage collects the keys
+the page can show:
+
+- the `data-i18n`/`data-i18n-ph` keys of the page itself,
+- those of `components/*.html` when the page loads components,
+- those written in the local scripts it loads (markup they insert),
+
+resolves them in every language (falling back to English, as the runtime
+does) and adds the translations of untagged text (`static-text.json` and
+the English → language pairs of the dictionaries) the page, its components
+or its scripts contain. Each language's strings go to
+`assets/i18n/bundles/<lang>-<hash>.json`; pages with the same strings share
+the file. The page's `assets/i18n.js` becomes `assets/i18n-lite.js`, which
+fetches those files, named in `data-i18n-<lang>`, for the same
+`assets/i18n-runtime.js`; the page's own language is preloaded.
+
+Pages whose scripts read `window.DICTS` look strings up by keys built at
+runtime, so they keep the full dictionaries; the report says which script
+does. Bundles no page uses any more are removed.
+
+    cd scripts/automation
+    python -m site_pipeline.i18n_bundles [--out ../../public] [--json]
+"""
+
+import argparse
+import functools
+import html
+import json
+import os
+import re
+import sys
+import time
+from functools import partial
+from pathlib import Path
+
+from .batch import (
+    FAILED,
+    OUTPUT_SECTIONS,
+    REPO_ROOT,
+    UNCHANGED,
+    UPDATED,
+    PageResult,
+    discover_pages,
+    merge_results,
+    run_batch,
+)
+from .fingerprint import AssetManifest, file_version
+from .i18n import DEFAULT_LANGUAGE, DICTIONARY_DIR, LANGUAGES, load_dictionaries, set_attribute, translate
+from .profiling import TransformStat, add_profiling_arguments, finish_profiling, profiled_worker
+from .references import parse_attributes
+from .script_loading import INLINE, scan_scripts
+
+# Hashed into rule digests so changes here rebuild the bundles
+I18N_BUNDLES_SOURCE = Path(__file__)
+
+# The dictionary scripts (all of them, or the page's own) and the runtime both load
+RUNTIME = 'assets/i18n.js'
+LITE_RUNTIME = 'assets/i18n-lite.js'
+SHARED_RUNTIME = 'assets/i18n-runtime.js'
+BUNDLE_DIR = f'{DICTIONARY_DIR}/bundles'
+STATIC_TEXT = f'{DICTIONARY_DIR}/static-text.json'
+
+# Marks the preload this stage owns
+OWNED = 'data-i18n-bundle'
+
+_KEY_ATTRIBUTE = re.compile(r'''\bdata-i18n(?:-ph)?\s*=\s*(?:\\?["'])([^"'\\<>]+)''')
+_DICTS = re.compile(r'\bDICTS\b')
+_SKIPPED = re.compile(r'<!--.*?-->|<(script|style|noscript|iframe|svg)\b[^>]*>.*?</\1\s*>', re.DOTALL | re.IGNORECASE)
+_START_TAG = re.compile(r'<[a-zA-Z][\w:-]*((?:"[^"]*"|\'[^\']*\'|[^\'">])*)>')
+_ANY_TAG = re.compile(r'<[^>]*>')
+_TEXT_ATTRIBUTES = ('placeholder', 'title', 'aria-label')
+_BUNDLE_ATTRIBUTES = re.compile(r'\s+data-i18n-(?:en|pt|es)\s*=\s*(?:"[^"]*"|\'[^\']*\'|[^\s>]+)', re.IGNORECASE)
+_OWNED_PRELOAD = re.compile(rf'[ \t]*<link\b[^>]*\b{OWNED}\b[^>]*>\n?', re.IGNORECASE)
+_HTML_LANG = re.compile(r'''<html\b[^>]*\blang\s*=\s*["']?([a-zA-Z-]+)''', re.IGNORECASE)
+_BUNDLE_NAME = re.compile(r'^[a-z]{2}-[0-9a-f]+\.json$')
+
+
+def normalize_text(text):
+    """Text the way the runtime looks it up (whitespace collapsed, trimmed)."""
+    return ' '.join(text.split())
+
+
+def _text_pairs(source, target, pairs):
+    """Port of `collectStaticTextPairs`: English string → translation."""
+    for key, value in source.items():
+        other = target.get(key) if isinstance(target, dict) else None
+        if isinstance(value, str) and isinstance(other, str):
+            normalized = normalize_text(value)
+            if len(normalized) > 1:
+                pairs[normalized] = other
+        elif isinstance(value, dict) and isinstance(other, dict):
+            _text_pairs(value, other, pairs)
+    return pairs
+
+
+def static_text_maps(dictionaries, static_text):
+    """`{language: {English text: translation}}` the runtime uses for untagged text."""
+    maps = {DEFAULT_LANGUAGE: {}}
+    for language in LANGUAGES[1:]:
+        pairs = _text_pairs(dictionaries.get(DEFAULT_LANGUAGE, {}), dictionaries.get(language, {}), {})
+        pairs.update(static_text.get(language, {}))
+        maps[language] = pairs
+    return maps
+
+
+def markup_keys(text):
+    """`data-i18n`/`data-i18n-ph` keys written in markup or in script strings."""
+    return {html.unescape(key) for key in _KEY_ATTRIBUTE.findall(text)}
+
+
+def markup_texts(text):
+    """Normalized text nodes and translatable attribute values of some markup."""
+    texts = set()
+    stripped = _SKIPPED.sub(' ', text)
+    for match in _START_TAG.finditer(stripped):
+        attributes = parse_attributes(match.group(1))
+        texts.update(normalize_text(attributes[name]) for name in _TEXT_ATTRIBUTES if name in attributes)
+    for chunk in _ANY_TAG.split(stripped):
+        texts.add(normalize_text(html.unescape(chunk)))
+    texts.discard('')
+    return texts
+
+
+@functools.lru_cache(maxsize=256)
+def _source(path, mtime_ns):
+    try:
+        return Path(path).read_text(encoding='utf-8', errors='replace')
+    except OSError:
+        return ''
+
+
+def read_source(out, rel):
+    path = Path(out) / rel
+    try:
+        return _source(str(path), path.stat().st_mtime_ns)
+    except OSError:
+        return ''
+
+
+@functools.lru_cache(maxsize=1024)
+def _script_texts(source, candidates):
+    return frozenset(text for text in candidates if text in source)
+
+
+@functools.lru_cache(maxsize=8)
+def _components(out):
+    """Keys and texts of the components the loader inserts."""
+    keys, texts = set(), set()
+    for path in sorted((Path(out) / 'components').glob('*.html')):
+        source = path.read_text(encoding='utf-8', errors='replace')
+        keys |= markup_keys(source)
+        texts |= markup_texts(source)
+    return frozenset(keys), frozenset(texts)
+
+
+def page_strings(content, out, scripts, candidates):
+    """`(keys, texts, reason)` a page can show; `reason` says why it needs every dictionary."""
+    keys = markup_keys(content)
+    texts = markup_texts(content)
+    if 'data-component' in content or 'component-loader' in content:
+        component_keys, component_texts = _components(str(out))
+        keys |= component_keys
+        texts |= component_texts
+    for script in scripts:
+        if script.rel in (RUNTIME, LITE_RUNTIME, SHARED_RUNTIME):
+            continue
+        if script.kind == INLINE:
+            source = content[script.start:script.end]
+            name = 'an inline script'
+        elif script.rel:
+            source = read_source(out, script.rel)
+            name = script.rel
+        else:
+            continue
+        if _DICTS.search(source):
+            return keys, texts, f'{name} reads window.DICTS'
+        keys |= markup_keys(source)
+        texts |= _script_texts(source, candidates)
+    return keys, texts, None
+
+
+def build_bundle(keys, texts, language, dictionaries, text_maps):
+    """JSON of the strings `language` needs for `keys` and `texts`."""
+    resolved = {}
+    for key in sorted(keys):
+        text, _ = translate(dictionaries, language, key)
+        if text is not None:
+            resolved[key] = text
+    text_map = text_maps[language]
+    # The runtime also looks up a key's English value when the language lacks the key
+    wanted = texts | {normalize_text(value) for value in resolved.values()}
+    bundle = {'keys': resolved, 'text': {text: text_map[text] for text in sorted(wanted) if text in text_map}}
+    return json.dumps(bundle, ensure_ascii=False, separators=(',', ':'), sort_keys=True).encode('utf-8')
+
+
+def write_bundle(out, language, data):
+    """Write `data` as the bundle of `language` (once per content); returns its rel."""
+    rel = f'{BUNDLE_DIR}/{language}-{file_version(data)}.json'
+    path = Path(out) / rel
+    if not path.is_file():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+    return rel
+
+
+def runtime_tag(tag, prefix, runtime, version, bundles):
+    """The runtime `<script>` start tag loading `runtime` with `bundles` (`{language: rel}`)."""
+    tag = _BUNDLE_ATTRIBUTES.sub('', tag)
+    tag = set_attribute(tag, 'src', f'{prefix}{runtime}?v={version}')
+    for language, rel in bundles.items():
+        tag = set_attribute(tag, f'data-i18n-{language}', prefix + rel)
+    return tag
+
+
+def split_page(path, out, dictionaries, text_maps, candidates, runtimes):
+    """Worker: point one page at its own dictionaries (or back at the full dictionaries)."""
+    path = Path(path)
+    rel = Path(os.path.relpath(path, out)).as_posix()
+    try:
+        original = path.read_text(encoding='utf-8')
+        content = _OWNED_PRELOAD.sub('', original)
+        scripts = scan_scripts(content, rel, AssetManifest(out))
+        runtime = next((script for script in scripts if script.rel in (RUNTIME, LITE_RUNTIME)), None)
+        if runtime is None:
+            return PageResult(str(path), UNCHANGED, f"✓ {rel}: no i18n runtime", stats={})
+
+        start = time.perf_counter()
+        keys, texts, reason = page_strings(content, out, scripts, candidates)
+        src = re.split(r'[?#]', runtime.src.strip(), maxsplit=1)[0]
+        prefix = src[:len(src) - len(runtime.rel)]
+        start_tag = content[runtime.start:content.index('>', runtime.start) + 1]
+        stats = {'reason': reason}
+        if reason:
+            new_tag = runtime_tag(start_tag, prefix, RUNTIME, runtimes[RUNTIME][0], {})
+            stats['bytes'] = runtimes[RUNTIME][1] + runtimes[SHARED_RUNTIME][1]
+        else:
+            bundles = {}
+            sizes = {}
+            for language in LANGUAGES:
+                data = build_bundle(keys, texts, language, dictionaries, text_maps)
+                bundles[language] = write_bundle(out, language, data)
+                sizes[language] = len(data)
+            new_tag = runtime_tag(start_tag, prefix, LITE_RUNTIME, runtimes[LITE_RUNTIME][0], bundles)
+            lang = _HTML_LANG.search(content)
+            language = lang.group(1).lower().split('-')[0] if lang else DEFAULT_LANGUAGE
+            language = language if language in bundles else DEFAULT_LANGUAGE
+            line_start = content.rfind('\n', 0, runtime.start) + 1
+            indent = re.match(r'[ \t]*', content[line_start:runtime.start]).group(0)
+            preload = f'<link rel="preload" as="fetch" href="{html.escape(prefix + bundles[language])}" crossorigin {OWNED}>'
+            new_tag = f'{preload}\n{indent}{new_tag}' if content[line_start:runtime.start].strip() == '' else \
+                f'{preload}{new_tag}'
+            stats.update(bundles=bundles, keys=len(keys), sizes=sizes, language=language,
+                         bytes=runtimes[LITE_RUNTIME][1] + runtimes[SHARED_RUNTIME][1] + sizes[language])
+        content = content[:runtime.start] + new_tag + content[runtime.start + len(start_tag):]
+        stats['profile'] = [TransformStat('i18n_bundles', time.perf_counter() - start, len(original), len(content),
+                                          len(keys), content != original, notes=[reason] if reason else []).as_dict()]
+        if content == original:
+            return PageResult(str(path), UNCHANGED, f"✓ {rel}: dictionaries current", stats=stats)
+        path.write_text(content, encoding='utf-8')
+        if reason:
+            return PageResult(str(path), UPDATED, f"⏭️  {rel}: full dictionaries ({reason})", stats=stats)
+        return PageResult(str(path), UPDATED, f"✅ {rel}: {len(keys)} keys, {stats['bytes']:,} bytes "
+                          f"in {language}", stats=stats)
+    except Exception as e:
+        return PageResult(str(path), FAILED, f"❌ Error in {rel}: {e}")
+
+
+def prune_bundles(out, keep):
+    """Delete the bundles not in `keep` (bundle rels); returns how many."""
+    directory = Path(out) / BUNDLE_DIR
+    removed = 0
+    for path in directory.glob('*.json') if directory.is_dir() else ():
+        if _BUNDLE_NAME.match(path.name) and f'{BUNDLE_DIR}/{path.name}' not in keep:
+            path.unlink()
+            removed += 1
+    return removed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Split the i18n dictionaries per page and language')
+    parser.add_argument('--root', type=Path, default=REPO_ROOT, help='site root (holds assets/i18n/)')
+    parser.add_argument('--out', type=Path, help='build output to rewrite (default: ROOT/public)')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--json', action='store_true', help='print the per-page report as JSON')
+    add_profiling_arguments(parser)
+    args = parser.parse_args()
+    out = args.out or args.root / 'public'
+    if not (out / LITE_RUNTIME).is_file():
+        parser.error(f'{out / LITE_RUNTIME} does not exist; run `npm run build:public` first')
+
+    dictionaries = load_dictionaries(args.root)
+    try:
+        static_text = json.loads((args.root / STATIC_TEXT).read_text(encoding='utf-8'))
+    except FileNotFoundError:
+        static_text = {}
+    text_maps = static_text_maps(dictionaries, static_text)
+    # Untagged text is looked up by its English, whatever the language
+    candidates = frozenset(text for language in LANGUAGES for text in text_maps[language])
+    runtimes = {}
+    for rel in (RUNTIME, LITE_RUNTIME, SHARED_RUNTIME):
+        data = (out / rel).read_bytes()
+        runtimes[rel] = (file_version(data), len(data))
+
+    pages = discover_pages(out, OUTPUT_SECTIONS)
+    worker = partial(split_page, out=out, dictionaries=dictionaries, text_maps=text_maps,
+                     candidates=candidates, runtimes=runtimes)
+    results = run_batch(profiled_worker(worker, args, out), pages, args.workers)
+    used = {rel for result in results for rel in result.stats.get('bundles', {}).values()}
+    removed = prune_bundles(out, used)
+
+    report = {}
+    for result in results:
+        if 'bytes' in result.stats:
+            rel = Path(os.path.relpath(result.page, out)).as_posix()
+            report[rel] = {name: result.stats[name] for name in ('reason', 'keys', 'sizes', 'bundles', 'bytes')
+                           if result.stats.get(name) is not None}
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    for result in results:
+        if result.status in (UPDATED, FAILED):
+            print(result.message)
+    summary = merge_results(results)
+    split = [entry for entry in report.values() if 'reason' not in entry]
+    kept = {}
+    for entry in report.values():
+        if 'reason' in entry:
+            kept[entry['reason']] = kept.get(entry['reason'], 0) + 1
+    print(f"\n🌐 {len(split)} pages on per-page dictionaries ({len(used)} files, {removed} stale removed), "
+          f"{len(report) - len(split)} on the full dictionaries, {summary[FAILED]} failed")
+    if split:
+        average = sum(entry['bytes'] for entry in split) / len(split)
+        full = runtimes[RUNTIME][1] + runtimes[SHARED_RUNTIME][1]
+        print(f"📉 i18n per page view: {full / 1024:.1f} KB → {average / 1024:.1f} KB on average "
+              f"(runtime + one language)")
+    for reason, count in sorted(kept.items(), key=lambda item: -item[1]):
+        print(f"   full dictionaries: {reason} ({count} pages)")
+    finish_profiling(args, results, out)
+    if summary[FAILED]:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,741 @@
+"""
+Responsive image variants and intrinsic dimensions.
+
+Works from the images the reference index (`references.py`) lists for
+the pages and components:
+
+- the intrinsic size of every referenced image is read from its header
+  (PNG, JPEG with its EXIF orientation, GIF, WebP, AVIF, SVG), so no
+  imaging library is needed for it,
+- `<img>` tags without `width`/`height` get them, which reserves their
+  box and removes the layout shift while they load,
+- PNG/JPEG images get resized WebP and AVIF variants with whatever the
+  local toolchain offers (sharp, the `devDependency`, through
+  `scripts/encode-image.mjs`; else Pillow, ImageMagick, or `cwebp` for
+  WebP only), and the `<img>` is wrapped in a `<picture
+  data-image-variants>` with one `<source srcset>` per format. Without a
+  tool only the dimensions are written.
+
+The width/height written keep the rendered size: taken from a `px` size
+in the tag's `style` when there is one, completed from the aspect ratio
+when only one attribute is set, the intrinsic size otherwise. An image
+that page CSS sizes on one axis only (`.brand img { height: 48px }`) is
+left without attributes, since the other attribute would then stretch
+it. Matching CSS is approximated from the classes of the image and its
+ancestors, erring towards skipping. For the same reason an image that CSS
+selects as a child or sibling (`.figure-ratio > img`, `img:first-child`)
+is not wrapped in a `<picture>`.
+
+An image whose rendered width is known gets `1x`/`2x` variants, the
+others width variants at 480/960/1440 px below the intrinsic width with
+the tag's `sizes` (or `DEFAULT_SIZES`). Variants live in
+`assets/images/variants/` under a name holding the source's content hash,
+so they are cached by source hash: unchanged sources are never
+re-encoded, and variants of sources that changed or went away are
+pruned. Pictures this stage wrapped are unwrapped and rebuilt on every
+run.
+
+An `<img>` that already has a `srcset` (such as the WebP ones `npm run
+seo:images`, `scripts/apply-image-performance.mjs`, writes into
+`assets/images/responsive/`) keeps it and only gets an AVIF `<source>`.
+
+    cd scripts/automation
+    python -m site_pipeline.images [--root ../..] [--json]
+"""
+
+import argparse
+import functools
+import json
+import os
+import posixpath
+import re
+import shutil
+import struct
+import subprocess
+import sys
+import warnings
+from functools import partial
+from pathlib import Path
+
+from .batch import CACHED, FAILED, NOT_FOUND, REPO_ROOT, UNCHANGED, UPDATED, PageResult, merge_results, run_batch
+from .fingerprint import AssetManifest
+from .manifest import MANIFEST_DIR, BuildManifest, content_digest, rules_digest, run_incremental
+from .profiling import PageProfile, add_profiling_arguments, finish_profiling, profiled_worker
+from .references import ReferenceIndex, index_sources, page_references, parse_attributes
+
+# Hashed into the page manifest rules so changes here rewrite every page
+IMAGES_SOURCE = Path(__file__)
+
+VARIANT_DIR = 'assets/images/variants'
+
+# WebP variants scripts/apply-image-performance.mjs writes for srcset
+RESPONSIVE_DIR = 'assets/images/responsive'
+
+# Encodes with sharp (package.json devDependency)
+SHARP_ENCODER = REPO_ROOT / 'scripts' / 'encode-image.mjs'
+
+# <source> order: the first format the browser supports wins
+FORMATS = ('avif', 'webp')
+MIME_TYPES = {'avif': 'image/avif', 'webp': 'image/webp'}
+QUALITY = {'avif': 55, 'webp': 78}
+
+# Source hash length kept in variant names (hex chars)
+HASH_LENGTH = 10
+
+SIZED_TYPES = frozenset({'.png', '.jpg', '.jpeg', '.gif', '.webp', '.avif', '.svg'})
+VARIANT_SOURCES = frozenset({'.png', '.jpg', '.jpeg'})
+
+BREAKPOINTS = (480, 960, 1440)
+DEFAULT_SIZES = '(max-width: 720px) 100vw, (max-width: 1200px) 50vw, 960px'
+
+# Marks the <picture> elements this stage owns
+OWNED = 'data-image-variants'
+
+
+# --- intrinsic sizes --------------------------------------------------------
+
+# JPEG start-of-frame markers (C4, C8 and CC are not frames)
+_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+_SVG_ROOT = re.compile(rb'<svg\b((?:"[^"]*"|\'[^\']*\'|[^\'">])*)>', re.IGNORECASE)
+_SVG_LENGTH = re.compile(r'^\s*([\d.]+)\s*(?:px)?\s*$')
+
+
+def _exif_orientation(segment):
+    """EXIF orientation (1-8) of a JPEG APP1 segment, None if it has none."""
+    if not segment.startswith(b'Exif\0\0'):
+        return None
+    tiff = segment[6:]
+    order = {b'II': '<', b'MM': '>'}.get(tiff[:2])
+    if order is None or len(tiff) < 8:
+        return None
+    offset = struct.unpack(order + 'I', tiff[4:8])[0]
+    if offset + 2 > len(tiff):
+        return None
+    count = struct.unpack(order + 'H', tiff[offset:offset + 2])[0]
+    for index in range(count):
+        entry = tiff[offset + 2 + index * 12:offset + 14 + index * 12]
+        if len(entry) == 12 and struct.unpack(order + 'H', entry[:2])[0] == 0x0112:
+            return struct.unpack(order + 'H', entry[8:10])[0]
+    return None
+
+
+def _jpeg_size(data):
+    orientation = None
+    index = 2
+    while index + 4 <= len(data):
+        if data[index] != 0xFF:
+            index += 1
+            continue
+        marker = data[index + 1]
+        if marker == 0xFF or marker == 0x01 or 0xD0 <= marker <= 0xD8:
+            index += 1 if marker == 0xFF else 2
+            continue
+        length = struct.unpack('>H', data[index + 2:index + 4])[0]
+        if marker == 0xE1 and orientation is None:
+            orientation = _exif_orientation(data[index + 4:index + 2 + length])
+        if marker in _SOF_MARKERS:
+            height, width = struct.unpack('>HH', data[index + 5:index + 9])
+            if orientation in (5, 6, 7, 8):
+                width, height = height, width
+            return width, height, orientation or 1
+        index += 2 + length
+    return None
+
+
+def _svg_size(data):
+    match = _SVG_ROOT.search(data)
+    if match is None:
+        return None
+    attributes = parse_attributes(match.group(1).decode('utf-8', errors='replace'))
+    width, height = (_SVG_LENGTH.match(attributes.get(name, '')) for name in ('width', 'height'))
+    if width and height:
+        return round(float(width.group(1))), round(float(height.group(1)))
+    box = attributes.get('viewbox', '').replace(',', ' ').split()
+    if len(box) == 4:
+        try:
+            return round(float(box[2])), round(float(box[3]))
+        except ValueError:
+            return None
+    return None
+
+
+def image_size(data):
+    """`(width, height)` of an image as displayed, or None if unknown.
+
+    JPEGs give `(width, height, orientation)`; orientations 5-8 are
+    rotated a quarter turn, so their stored width and height are swapped.
+    """
+    if data[:8] == b'\x89PNG\r\n\x1a\n' and data[12:16] == b'IHDR':
+        return struct.unpack('>II', data[16:24])
+    if data[:6] in (b'GIF87a', b'GIF89a'):
+        return struct.unpack('<HH', data[6:10])
+    if data[:2] == b'\xff\xd8':
+        return _jpeg_size(data)
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        chunk = data[12:16]
+        if chunk == b'VP8 ':
+            width, height = struct.unpack('<HH', data[26:30])
+            return width & 0x3FFF, height & 0x3FFF
+        if chunk == b'VP8L':
+            bits = int.from_bytes(data[21:25], 'little')
+            return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+        if chunk == b'VP8X':
+            return int.from_bytes(data[24:27], 'little') + 1, int.from_bytes(data[27:30], 'little') + 1
+        return None
+    if data[4:8] == b'ftyp' and data[8:12] in (b'avif', b'avis'):
+        box = data.find(b'ispe')
+        return struct.unpack('>II', data[box + 8:box + 16]) if box > 0 else None
+    if b'<svg' in data[:4096]:
+        return _svg_size(data)
+    return None
+
+
+def scan_image(path):
+    """Worker: `{width, height, sha256[, orientation]}` of one image, None if unreadable."""
+    try:
+        data = Path(path).read_bytes()
+    except OSError:
+        return None
+    size = image_size(data)
+    if not size or not size[0] or not size[1]:
+        return None
+    info = {'width': size[0], 'height': size[1], 'sha256': content_digest(data)}
+    if len(size) == 3 and size[2] != 1:
+        info['orientation'] = size[2]
+    return info
+
+
+def referenced_images(root, index):
+    """Root-relative paths of the local images with a known type the index lists."""
+    return sorted(
+        rel for rel in index.targets('images')
+        if posixpath.splitext(rel)[1].lower() in SIZED_TYPES
+        and not rel.startswith((VARIANT_DIR + '/', RESPONSIVE_DIR + '/')) and (Path(root) / rel).is_file()
+    )
+
+
+def scan_images(root, rels, manifest, workers=None):
+    """`{rel: info}` of `rels`, rescanning only images the manifest does not know."""
+    root = Path(root)
+    stale = [root / rel for rel in rels if not manifest.is_fresh(root / rel)]
+    for path, info in zip(stale, run_batch(scan_image, stale, workers)):
+        if info is None:
+            manifest.forget(path)
+        else:
+            manifest.record(path, info=info)
+    keep = set(rels)
+    manifest.pages = {rel: entry for rel, entry in manifest.pages.items() if rel in keep}
+    manifest.save()
+    return {rel: manifest.entry(root / rel)['info'] for rel in rels if manifest.entry(root / rel)}
+
+
+# --- variant encoders -------------------------------------------------------
+
+def _magick_command():
+    # `convert` is a disk tool on Windows
+    return shutil.which('magick') or (shutil.which('convert') if os.name != 'nt' else None)
+
+
+def _sharp_formats():
+    node = shutil.which('node')
+    if node is None or not SHARP_ENCODER.is_file():
+        return set()
+    try:
+        listing = subprocess.run([node, str(SHARP_ENCODER), '--formats'], capture_output=True, text=True, timeout=30)
+    except (OSError, subprocess.SubprocessError):
+        return set()
+    return set(listing.stdout.split()) & set(FORMATS) if listing.returncode == 0 else set()
+
+
+def _pillow_formats():
+    try:
+        from PIL import features
+    except ImportError:
+        return set()
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        return {fmt for fmt in FORMATS if features.check(fmt)}
+
+
+def _magick_formats():
+    command = _magick_command()
+    if command is None:
+        return set()
+    try:
+        listing = subprocess.run([command, '-list', 'format'], capture_output=True, text=True, timeout=30).stdout
+    except (OSError, subprocess.SubprocessError):
+        return set()
+    return {match.lower() for match in re.findall(r'^\s*(AVIF|WEBP)\*?\s+\S+\s+[r-]w', listing, re.MULTILINE)}
+
+
+@functools.lru_cache(maxsize=None)
+def available_backends():
+    """`{format: backend}`: the first local tool that writes each format."""
+    backends = {}
+    tools = (
+        ('sharp', _sharp_formats()),
+        ('pillow', _pillow_formats()),
+        ('magick', _magick_formats()),
+        ('cwebp', {'webp'} if shutil.which('cwebp') else set()),
+    )
+    for backend, formats in tools:
+        for fmt in FORMATS:
+            if fmt in formats:
+                backends.setdefault(fmt, backend)
+    return backends
+
+
+def _encode_sharp(source, target, width, fmt):
+    subprocess.run([shutil.which('node'), str(SHARP_ENCODER), str(source), str(target), str(width), fmt,
+                    str(QUALITY[fmt])], check=True, capture_output=True)
+
+
+def _encode_pillow(source, target, width, fmt):
+    from PIL import Image, ImageOps
+
+    with Image.open(source) as image:
+        image = ImageOps.exif_transpose(image)
+        height = max(1, round(image.height * width / image.width))
+        image = image.resize((width, height), Image.Resampling.LANCZOS)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'transparency' in image.info or 'A' in image.getbands() else 'RGB')
+        image.save(target, format=fmt.upper(), quality=QUALITY[fmt])
+
+
+def _encode_magick(source, target, width, fmt):
+    subprocess.run([_magick_command(), str(source), '-auto-orient', '-resize', f'{width}x', '-strip',
+                    '-quality', str(QUALITY[fmt]), f'{fmt}:{target}'], check=True, capture_output=True)
+
+
+def _encode_cwebp(source, target, width, fmt):
+    subprocess.run(['cwebp', '-quiet', '-q', str(QUALITY[fmt]), '-resize', str(width), '0',
+                    '-metadata', 'none', str(source), '-o', str(target)], check=True, capture_output=True)
+
+
+ENCODERS = {'sharp': _encode_sharp, 'pillow': _encode_pillow, 'magick': _encode_magick, 'cwebp': _encode_cwebp}
+
+
+def variant_rel(rel, info, width, fmt):
+    stem = re.sub(r'[^a-z0-9]+', '-', posixpath.splitext(posixpath.basename(rel))[0].lower()).strip('-')
+    return f'{VARIANT_DIR}/{stem or "image"}-{info["sha256"][:HASH_LENGTH]}-{width}.{fmt}'
+
+
+def make_variant(job, root):
+    """Worker: encode one `(source rel, width, format, backend, target rel)` job.
+
+    Returns None on success, else the error.
+    """
+    rel, width, fmt, backend, target = job
+    target = Path(root) / target
+    tmp = target.with_name(f'{target.name}.{os.getpid()}.tmp')
+    try:
+        target.parent.mkdir(parents=True, exist_ok=True)
+        ENCODERS[backend](Path(root) / rel, tmp, width, fmt)
+        os.replace(tmp, target)
+        return None
+    except Exception as e:
+        tmp.unlink(missing_ok=True)
+        return f'{rel} → {fmt} {width}w ({backend}): {e}'
+
+
+def build_variants(root, images, requests, workers=None):
+    """Encode the requested `(rel, width, format)` variants that are not cached yet.
+
+    Returns `({rel: {format: {width: variant rel}}}, encoded count, errors)`
+    covering every requested variant that exists afterwards.
+    """
+    root = Path(root)
+    backends = available_backends()
+    table, jobs = {}, []
+    for rel, width, fmt in requests:
+        info = images[rel]
+        target = variant_rel(rel, info, width, fmt)
+        backend = backends.get(fmt)
+        if (root / target).is_file():
+            table.setdefault(rel, {}).setdefault(fmt, {})[width] = target
+        # cwebp ignores EXIF orientation
+        elif backend and not (backend == 'cwebp' and info.get('orientation', 1) != 1):
+            jobs.append((rel, width, fmt, backend, target))
+    errors = []
+    for job, error in zip(jobs, run_batch(partial(make_variant, root=root), jobs, workers)):
+        if error is None:
+            rel, width, fmt, _, target = job
+            table.setdefault(rel, {}).setdefault(fmt, {})[width] = target
+        else:
+            errors.append(error)
+    return table, len(jobs) - len(errors), errors
+
+
+def prune_variants(root, images):
+    """Delete variants whose source hash is no longer a referenced image's."""
+    directory = Path(root) / VARIANT_DIR
+    hashes = {info['sha256'][:HASH_LENGTH] for info in images.values()}
+    removed = 0
+    for path in directory.glob('*') if directory.is_dir() else ():
+        match = re.search(r'-([0-9a-f]+)-\d+\.(?:avif|webp)$', path.name)
+        if match and match.group(1) not in hashes:
+            path.unlink()
+            removed += 1
+    return removed
+
+
+def variant_widths(intrinsic, display=None):
+    """`[(width, srcset descriptor)]` of the variants for one image.
+
+    With a known rendered width the variants are 1x and 2x of it (capped at
+    the intrinsic width); otherwise the breakpoints below the intrinsic
+    width plus the intrinsic width, as `w` descriptors.
+    """
+    if display:
+        widths = {}
+        for density in (1, 2):
+            width = min(display * density, intrinsic)
+            widths.setdefault(width, f'{width / display:.3g}x')
+        return sorted(widths.items())
+    if intrinsic <= BREAKPOINTS[0]:
+        return [(intrinsic, '')]
+    return [(width, f'{width}w') for width in BREAKPOINTS if width < intrinsic] + [(intrinsic, f'{intrinsic}w')]
+
+
+# --- CSS that sizes images --------------------------------------------------
+
+_CSS_COMMENT = re.compile(r'/\*.*?\*/', re.DOTALL)
+_CSS_BLOCK = re.compile(r'([^{}]+)\{([^{}]*)\}')
+_CSS_SIZE = re.compile(r'(?:^|;)\s*(width|height)\s*:\s*([^;]+)', re.IGNORECASE)
+_SELECTOR_SPLIT = re.compile(r'\s*([>+~])\s*|\s+')
+_PSEUDO = re.compile(r'::?[\w-]+(?:\([^)]*\))?|\[[^\]]*\]')
+_STRUCTURAL = re.compile(r':(?:first|last|only|nth)-', re.IGNORECASE)
+_STYLE_BLOCK = re.compile(r'<style\b[^>]*>(.*?)</style\s*>', re.DOTALL | re.IGNORECASE)
+_NOT_A_SIZE = frozenset({'', 'auto', 'initial', 'unset', 'inherit', 'revert', 'revert-layer'})
+
+
+def _compound(text):
+    """`(tag, classes, ids, pseudo-element?, structural?)` of a compound selector."""
+    core = _PSEUDO.sub('', text)
+    tag = re.match(r'[a-zA-Z][\w-]*|\*', core)
+    return (
+        tag.group(0).lower() if tag else '*',
+        frozenset(re.findall(r'\.([\w-]+)', core)),
+        frozenset(re.findall(r'#([\w-]+)', core)),
+        '::' in text or re.search(r':(?:before|after)\b', text, re.IGNORECASE) is not None,
+        _STRUCTURAL.search(text) is not None,
+    )
+
+
+def parse_css_rules(css):
+    """Rules that may size an `<img>` or select it by position.
+
+    Each rule is `(compounds, last combinator, {axis: value})`; at-rule
+    blocks are flattened, so rules under media queries count too.
+    """
+    rules = []
+    for match in _CSS_BLOCK.finditer(_CSS_COMMENT.sub('', css)):
+        selectors, body = match.groups()
+        if selectors.strip().startswith('@'):
+            continue
+        sizes = {axis.lower(): value.replace('!important', '').strip().lower()
+                 for axis, value in _CSS_SIZE.findall(body)}
+        for selector in selectors.split(','):
+            parts = _SELECTOR_SPLIT.split(selector.strip())
+            compounds = [_compound(part) for part in parts[::2] if part]
+            combinators = [part or ' ' for part in parts[1::2]]
+            if not compounds or compounds[-1][0] not in ('*', 'img'):
+                continue
+            last = combinators[-1] if combinators else ' '
+            if sizes or last != ' ' or compounds[-1][4]:
+                rules.append((compounds, last, sizes))
+    return rules
+
+
+@functools.lru_cache(maxsize=256)
+def _stylesheet_rules(path, mtime_ns):
+    try:
+        return parse_css_rules(Path(path).read_text(encoding='utf-8', errors='replace'))
+    except OSError:
+        return []
+
+
+def page_css_rules(content, page_rel, root, resolver):
+    """The image rules of a page's local stylesheets and `<style>` blocks."""
+    rules = []
+    for rel in sorted(page_references(content, page_rel, resolver)['stylesheets']):
+        path = Path(root) / rel
+        if path.is_file():
+            rules.extend(_stylesheet_rules(str(path), path.stat().st_mtime_ns))
+    for block in _STYLE_BLOCK.findall(content):
+        rules.extend(parse_css_rules(block))
+    return rules
+
+
+def _compound_matches(compound, element):
+    tag, classes, ids, _, _ = compound
+    return tag in ('*', element[0]) and classes <= element[1] and ids <= element[2]
+
+
+def _rule_matches(rule, image, ancestors):
+    """Whether `rule` may select `image` (errs towards True)."""
+    compounds = rule[0]
+    if compounds[-1][3] or not _compound_matches(compounds[-1], image):
+        return False
+    return all(any(_compound_matches(compound, element) for element in ancestors)
+               for compound in compounds[:-1])
+
+
+def _px(value):
+    match = re.match(r'^\s*(\d+(?:\.\d+)?)\s*(?:px)?\s*$', value or '')
+    return round(float(match.group(1))) if match else None
+
+
+def _style_sizes(style):
+    return {axis.lower(): value.replace('!important', '').strip().lower() for axis, value in _CSS_SIZE.findall(style)}
+
+
+# --- markup -----------------------------------------------------------------
+
+_TOKENS = re.compile(
+    r'<!--.*?-->'
+    r'|<(script|style|textarea)\b[^>]*>.*?</\1\s*>'
+    r'|<(/?)([a-zA-Z][\w:-]*)((?:"[^"]*"|\'[^\']*\'|[^\'">])*)>',
+    re.DOTALL | re.IGNORECASE,
+)
+_OWNED_PICTURE = re.compile(
+    rf'<picture {OWNED}>(?:<source\b[^>]*>)*(<img\b(?:"[^"]*"|\'[^\']*\'|[^\'">])*>)</picture>',
+    re.IGNORECASE,
+)
+_TAG_END = re.compile(r'\s*/?>$')
+
+VOID_ELEMENTS = frozenset({
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'source', 'track', 'wbr',
+})
+
+
+def _element(tag, attributes):
+    return tag, frozenset(attributes.get('class', '').split()), frozenset(filter(None, [attributes.get('id')]))
+
+
+def _with_attributes(tag, attributes):
+    end = _TAG_END.search(tag)
+    added = ''.join(f' {name}="{value}"' for name, value in attributes.items())
+    return tag[:end.start()] + added + tag[end.start():]
+
+
+def _variant_url(target, page_rel, absolute):
+    if absolute:
+        return '/' + target
+    return posixpath.relpath(target, posixpath.dirname(page_rel) or '.')
+
+
+def _dimensions(attributes, info, css_sizes):
+    """`({attribute: value} to add, rendered width or None)`; None if unsafe."""
+    width, height = info['width'], info['height']
+    attr_width, attr_height = _px(attributes.get('width')), _px(attributes.get('height'))
+    style = _style_sizes(attributes.get('style', ''))
+    style_width, style_height = _px(style.get('width')), _px(style.get('height'))
+    if attr_width and attr_height:
+        # The intrinsic size (possibly written by an earlier run) says nothing about the rendered one
+        intrinsic = (attr_width, attr_height) == (width, height)
+        return {}, None if intrinsic else attr_width
+    if attr_width or attr_height:
+        if attr_width:
+            return {'height': round(attr_width * height / width)}, attr_width
+        return {'width': round(attr_height * width / height)}, round(attr_height * width / height)
+    if style_width or style_height:
+        shown = style_width or round(style_height * width / height)
+        return {'width': shown, 'height': style_height or round(style_width * height / width)}, shown
+
+    # Sizes from CSS (or a non-px inline size) on one axis only: the other
+    # attribute would stretch the image
+    declared = {axis: set(values) for axis, values in css_sizes.items()}
+    for axis, value in style.items():
+        declared.setdefault(axis, set()).add(value)
+    fixed = {axis for axis, values in declared.items() if values - _NOT_A_SIZE}
+    if fixed and len(declared) < 2:
+        return None, None
+    return {'width': width, 'height': height}, None
+
+
+def _css_width(css_sizes, info):
+    """Largest `px` width the matching CSS renders the image at, if all are `px`."""
+    widths = css_sizes.get('width', set()) - _NOT_A_SIZE
+    heights = css_sizes.get('height', set()) - _NOT_A_SIZE
+    values, scale = (widths, 1) if widths else (heights, info['width'] / info['height'])
+    sizes = [_px(value) for value in values]
+    return round(max(sizes) * scale) if sizes and all(sizes) else None
+
+
+def _picture(tag, attributes, rel, info, display, page_rel, variants, formats=FORMATS):
+    """`<picture>` markup for an image's variants in `formats`; `(markup, requested variants)`."""
+    widths = variant_widths(info['width'], display)
+    requests = [(rel, width, fmt) for fmt in formats for width, _ in widths]
+    if variants is None:
+        return tag, requests
+    sources = []
+    absolute = attributes.get('src', '').startswith('/')
+    for fmt in formats:
+        available = variants.get(rel, {}).get(fmt, {})
+        if not all(width in available for width, _ in widths):
+            continue
+        srcset = ', '.join(
+            f'{_variant_url(available[width], page_rel, absolute)} {descriptor}'.rstrip()
+            for width, descriptor in widths
+        )
+        sizes = ''
+        if widths[-1][1].endswith('w'):
+            sizes = f' sizes="{attributes.get("sizes") or DEFAULT_SIZES}"'
+        sources.append(f'<source type="{MIME_TYPES[fmt]}" srcset="{srcset}"{sizes}>')
+    if not sources:
+        return tag, requests
+    return f'<picture {OWNED}>' + ''.join(sources) + tag + '</picture>', requests
+
+
+def rewrite_images(content, page_rel, images, rules, resolver, variants=None, report=None):
+    """Add dimensions (and, given the variant table, `<picture>`s) to a page's images.
+
+    `report` collects per-page counts and the `(rel, width)` variants the
+    page asks for.
+    """
+    report = {} if report is None else report
+    for key in ('images', 'sized', 'pictures', 'css_sized', 'requests'):
+        report.setdefault(key, [] if key == 'requests' else 0)
+    content = _OWNED_PICTURE.sub(r'\1', content)
+    out = []
+    pos = 0
+    stack = []
+    for match in _TOKENS.finditer(content):
+        if match.group(3) is None:
+            continue
+        tag = match.group(3).lower()
+        if match.group(2):
+            for index in range(len(stack) - 1, -1, -1):
+                if stack[index][0] == tag:
+                    del stack[index:]
+                    break
+            continue
+        attributes = parse_attributes(match.group(4))
+        if tag != 'img':
+            if tag not in VOID_ELEMENTS and not match.group(4).rstrip().endswith('/'):
+                stack.append(_element(tag, attributes))
+            continue
+
+        src = re.split(r'[?#]', attributes.get('src', '').strip(), maxsplit=1)[0]
+        rel = resolver.resolve(src, page_rel) if src else None
+        info = images.get(rel)
+        if info is None:
+            continue
+        report['images'] += 1
+        image = _element('img', attributes)
+        matching = [rule for rule in rules if _rule_matches(rule, image, stack)]
+        css_sizes = {}
+        for _, _, sizes in matching:
+            for axis, value in sizes.items():
+                css_sizes.setdefault(axis, set()).add(value)
+
+        added, display = _dimensions(attributes, info, css_sizes)
+        if added is None:
+            report['css_sized'] += 1
+            added = {}
+        elif added:
+            report['sized'] += 1
+        markup = _with_attributes(match.group(0), added) if added else match.group(0)
+        display = display or _css_width(css_sizes, info)
+
+        positional = any(rule[1] != ' ' or rule[0][-1][4] for rule in matching)
+        in_picture = bool(stack) and stack[-1][0] == 'picture'
+        if posixpath.splitext(rel)[1].lower() in VARIANT_SOURCES and not in_picture and not positional:
+            # An existing srcset stays the <img>'s own; AVIF is the only format added in front of it
+            formats = ('avif',) if 'srcset' in attributes else FORMATS
+            markup, requests = _picture(markup, attributes, rel, info, display, page_rel, variants, formats)
+            report['requests'].extend(requests)
+            report['pictures'] += markup.startswith('<picture')
+        out.append(content[pos:match.start()])
+        out.append(markup)
+        pos = match.end()
+    out.append(content[pos:])
+    return ''.join(out)
+
+
+def process_page(path, root, images, variants=None, write=True):
+    """Worker: rewrite one page's images (with `write=False`, only plan them)."""
+    path = Path(path)
+    rel = Path(os.path.relpath(path, root)).as_posix()
+    if not path.exists():
+        return PageResult(str(path), NOT_FOUND, f"⚠️  {rel} not found")
+    try:
+        content = path.read_text(encoding='utf-8')
+        resolver = AssetManifest(root)
+        rules = page_css_rules(content, rel, root, resolver)
+        report = {}
+        profile = PageProfile()
+        updated = profile.run('images', rewrite_images, content, rel, images, rules, resolver, variants, report)
+        stats = {'profile': profile.as_list(), 'images': report}
+        if updated == content or not write:
+            return PageResult(str(path), UNCHANGED, f"✓ {rel}: images unchanged", stats=stats)
+        path.write_text(updated, encoding='utf-8')
+        message = (f"✅ {rel}: {report['sized']} images sized, {report['pictures']} with variants"
+                   + (f", {report['css_sized']} sized by CSS left alone" if report['css_sized'] else ''))
+        return PageResult(str(path), UPDATED, message, stats=stats)
+    except Exception as e:
+        return PageResult(str(path), FAILED, f"❌ Error in {rel}: {e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Write image dimensions and responsive WebP/AVIF variants')
+    parser.add_argument('--root', type=Path, default=REPO_ROOT)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--force', action='store_true', help='rewrite pages the last run already handled')
+    parser.add_argument('--json', action='store_true', help='print the per-page image report as JSON')
+    add_profiling_arguments(parser)
+    args = parser.parse_args()
+    root = args.root
+
+    index = ReferenceIndex.build(root, workers=args.workers)
+    index.save()
+    image_manifest = BuildManifest(root / MANIFEST_DIR / 'images.json', root, rules_digest(IMAGES_SOURCE))
+    images = scan_images(root, referenced_images(root, index), image_manifest, args.workers)
+
+    sources = index_sources(root)
+    plan = run_batch(partial(process_page, root=root, images=images, write=False), sources, args.workers)
+    requests = sorted({tuple(request) for result in plan for request in result.stats.get('images', {}).get('requests', ())})
+    variants, encoded, errors = build_variants(root, images, requests, args.workers)
+    pruned = prune_variants(root, images)
+
+    stylesheets = sorted(root / rel for rel in index.targets('stylesheets') if (root / rel).is_file())
+    rules = rules_digest(IMAGES_SOURCE, json.dumps(images, sort_keys=True),
+                         json.dumps(variants, sort_keys=True), *stylesheets)
+    manifest = BuildManifest(root / MANIFEST_DIR / 'images-pages.json', root, rules)
+    if args.force:
+        manifest.pages = {}
+    worker = partial(process_page, root=root, images=images, variants=variants)
+    results = run_incremental(profiled_worker(worker, args), sources, args.workers, manifest)
+
+    if args.json:
+        print(json.dumps({
+            index.rel(result.page): {k: v for k, v in result.stats['images'].items() if k != 'requests'}
+            for result in results if 'images' in result.stats
+        }, indent=2))
+        return
+
+    for result in results:
+        if result.status in (UPDATED, FAILED):
+            print(result.message)
+    for error in errors:
+        print(f"❌ {error}")
+    backends = available_backends()
+    if not backends:
+        print("ℹ️  No WebP/AVIF encoder found (Pillow, ImageMagick, cwebp): writing dimensions only")
+    elif set(backends) != set(FORMATS):
+        print(f"ℹ️  No encoder for {', '.join(sorted(set(FORMATS) - set(backends)))}")
+
+    summary = merge_results(results)
+    totals = {key: sum(result.stats.get('images', {}).get(key, 0) for result in results)
+              for key in ('sized', 'pictures', 'css_sized')}
+    print(f"\n🖼️  {len(images)} referenced images, {encoded} variants encoded, {pruned} stale variants pruned")
+    print(f"📦 {summary[UPDATED]} pages updated: {totals['sized']} images sized, {totals['pictures']} with variants, "
+          f"{totals['css_sized']} sized by CSS left alone; {summary[CACHED]} pages skipped")
+    finish_profiling(args, results)
+    if summary[FAILED] or errors:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,200 @@
+"""
+Content-hash build manifest for incremental runs.
+
+The manifest remembers, for each page, the SHA-256 of the file as the last
+run left it plus its size and mtime, together with a digest of the
+transform rules that produced it. On the next run a page whose stat is
+unchanged is skipped without being opened; a page whose stat changed is
+hashed, and only skipped if the hash still matches. Changing the rules
+invalidates every entry.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+from .batch import CACHED, FAILED, NOT_FOUND, PageResult, run_batch
+
+# Manifests live next to the site, one per script
+MANIFEST_DIR = '.site-pipeline'
+
+MANIFEST_VERSION = 1
+
+
+def content_digest(data):
+    """SHA-256 hex digest of `bytes` or `str` (UTF-8) content."""
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    return hashlib.sha256(data).hexdigest()
+
+
+def rules_digest(*parts):
+    """Digest of everything that defines a transform.
+
+    Each part is either a string (template, pattern, version token) or a
+    `Path` whose bytes are hashed, typically the script's own source.
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, Path):
+            part = part.read_bytes()
+        elif isinstance(part, str):
+            part = part.encode('utf-8')
+        digest.update(len(part).to_bytes(8, 'big'))
+        digest.update(part)
+    return digest.hexdigest()
+
+
+class BuildManifest:
+    """Per-script record of the pages a previous run already produced."""
+
+    def __init__(self, path, root, rules):
+        self.path = Path(path)
+        self.root = Path(root)
+        self.rules = rules
+        self.pages = {}
+        self._load()
+
+    def _load(self):
+        try:
+            data = json.loads(self.path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return
+        if data.get('version') == MANIFEST_VERSION and data.get('rules') == self.rules:
+            self.pages = data.get('pages', {})
+
+    def _key(self, page):
+        return Path(os.path.relpath(page, self.root)).as_posix()
+
+    def is_fresh(self, page):
+        """True when `page` is exactly what the last run with these rules left."""
+        entry = self.pages.get(self._key(page))
+        if entry is None:
+            return False
+        try:
+            stat = os.stat(page)
+        except OSError:
+            return False
+        if stat.st_size != entry['size']:
+            return False
+        if stat.st_mtime_ns == entry['mtime_ns']:
+            return True
+        # Touched but maybe not edited: fall back to the content hash
+        if content_digest(Path(page).read_bytes()) != entry['sha256']:
+            return False
+        entry['mtime_ns'] = stat.st_mtime_ns
+        return True
+
+    def record(self, page, **extra):
+        """Remember the current state of `page` as up to date.
+
+        `extra` is stored with the entry (see `entry`), e.g. what a stage
+        derived from the page, so a fresh page need not be read again.
+        """
+        data = Path(page).read_bytes()
+        stat = os.stat(page)
+        self.pages[self._key(page)] = {
+            'sha256': content_digest(data),
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            **extra,
+        }
+
+    def entry(self, page):
+        """The recorded entry of `page`, or None."""
+        return self.pages.get(self._key(page))
+
+    def forget(self, page):
+        self.pages.pop(self._key(page), None)
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix('.tmp')
+        tmp.write_text(json.dumps({
+            'version': MANIFEST_VERSION,
+            'rules': self.rules,
+            'pages': dict(sorted(self.pages.items())),
+        }, indent=2), encoding='utf-8')
+        os.replace(tmp, self.path)
+
+
+class ResultCache:
+    """Content-addressed results of a deterministic stage, kept between runs.
+
+    Entries live in `.site-pipeline/cache/<name>/` under a key derived from
+    the stage's rules digest and its input, so a rebuilt output tree whose
+    files did not change is served from the cache instead of reprocessed.
+    Writes are atomic, so parallel workers can share one cache.
+    """
+
+    def __init__(self, root, name, rules, suffix=''):
+        self.directory = Path(root) / MANIFEST_DIR / 'cache' / name
+        self.rules = rules
+        self.suffix = suffix
+
+    def key(self, *parts):
+        """Key for an input given as `bytes`/`str` parts."""
+        return rules_digest(self.rules, *parts)
+
+    def path(self, key):
+        return self.directory / key[:2] / f'{key}{self.suffix}'
+
+    def get(self, key):
+        """Cached `bytes` for `key`, or None."""
+        try:
+            return self.path(key).read_bytes()
+        except OSError:
+            return None
+
+    def put(self, key, data):
+        path = self.path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+
+    def prune(self, keep):
+        """Delete every entry whose key is not in `keep`; returns how many went."""
+        removed = 0
+        for path in self.directory.glob(f'*/*{self.suffix}'):
+            if path.name[:len(path.name) - len(self.suffix)] not in keep:
+                path.unlink()
+                removed += 1
+        return removed
+
+
+def manifest_for(args, name, rules):
+    """Manifest for a script run; `--force` starts it from scratch."""
+    manifest = BuildManifest(Path(args.root) / MANIFEST_DIR / f'{name}.json', args.root, rules)
+    if getattr(args, 'force', False):
+        manifest.pages = {}
+    return manifest
+
+
+def run_incremental(worker, paths, workers=None, manifest=None):
+    """`run_batch` that skips pages the manifest already knows are current.
+
+    Skipped pages get a `CACHED` result without being read. Every page the
+    worker handled successfully is recorded and the manifest is saved.
+    """
+    paths = list(paths)
+    if manifest is None:
+        return run_batch(worker, paths, workers)
+
+    stale = [path for path in paths if not manifest.is_fresh(path)]
+    processed = dict(zip(map(str, stale), run_batch(worker, stale, workers)))
+
+    results = []
+    for path in paths:
+        result = processed.get(str(path))
+        if result is None:
+            result = PageResult(str(path), CACHED, f"⏭️  {Path(path).name} (cache)")
+        elif result.status in (FAILED, NOT_FOUND):
+            manifest.forget(path)
+        else:
+            manifest.record(path)
+        results.append(result)
+
+    manifest.save()
+    return results
@@ -0,0 +1,138 @@
+"""
+Page markers: which of the strings the pipeline cares about a page contains.
+
+Each transform used to ask its own questions of a page (`'gb-navbar' in
+content`, `'component-loader.js' not in content`, `'<body' in content`,
+...), and several ran a regex search only to find nothing.
+`page_markers` answers all of them once per page and the pipeline decides
+from the result which transforms can be skipped outright (see
+`Transform.when`). The same marker sets give a site-wide inventory of the
+navbar generation each page is on:
+
+    cd scripts/automation
+    python -m site_pipeline.markers [--root ../..] [--json]
+
+The markers are searched with `str.__contains__` one after the other. On
+the 101-page tree that takes ~12 ms in total, against ~35 ms for one
+alternation regex and ~190 ms for an Aho-Corasick automaton written in
+Python, so a "single pass" automaton would only be a win as a C extension.
+"""
+
+import argparse
+import json
+import os
+from collections import Counter
+from functools import partial
+from pathlib import Path
+
+from .batch import REPO_ROOT, discover_pages, run_batch
+
+# Hashed into rule digests: transforms are skipped based on these markers
+MARKERS_SOURCE = Path(__file__)
+
+# name → needle; a marker is present when its needle occurs in the page
+MARKERS = {
+    'gb_navbar': 'gb-navbar',
+    'gb_navbar_element': '<nav class="gb-navbar"',
+    'gb_footer_element': '<footer class="gb-footer"',
+    'old_navbar': '<nav class="navbar">',
+    'enhanced_navbar_css': 'enhanced-navbar.css',
+    'navbar_placeholder': 'data-component="navbar"',
+    'footer_placeholder': 'data-component="footer"',
+    'prerendered_navbar': '<!-- Navbar Component (prerendered',
+    'prerendered_footer': '<!-- Footer Component (prerendered',
+    'component_loader': 'component-loader.js',
+    'i18n_script': '<script defer src="assets/i18n.js',
+    'body': '<body',
+}
+
+# Navbar generations, newest first; a page is on the first one it matches
+NAVBAR_GENERATIONS = {
+    'prerendered': ('prerendered_navbar',),
+    'placeholder': ('navbar_placeholder',),
+    'gb_navbar': ('gb_navbar_element',),
+    'old_navbar': ('old_navbar',),
+}
+NO_NAVBAR = 'none'
+
+
+def page_markers(content):
+    """The names of the `MARKERS` found in `content`."""
+    return frozenset(name for name, needle in MARKERS.items() if needle in content)
+
+
+def any_of(*names):
+    """`Transform.when` predicate: at least one of `names` is present."""
+    return lambda markers: not markers.isdisjoint(names)
+
+
+def navbar_generation(markers):
+    for generation, names in NAVBAR_GENERATIONS.items():
+        if not markers.isdisjoint(names):
+            return generation
+    return NO_NAVBAR
+
+
+def components_used(markers):
+    """`navbar`/`footer` the page shows as a placeholder, pre-rendered block or markup."""
+    used = set()
+    if not markers.isdisjoint({'navbar_placeholder', 'prerendered_navbar', 'gb_navbar_element'}):
+        used.add('navbar')
+    if not markers.isdisjoint({'footer_placeholder', 'prerendered_footer', 'gb_footer_element'}):
+        used.add('footer')
+    return used
+
+
+def scan_page(path, root):
+    """Worker: `(page rel, sorted markers)`; markers are None if unreadable."""
+    rel = Path(os.path.relpath(path, root)).as_posix()
+    try:
+        content = Path(path).read_text(encoding='utf-8')
+    except (OSError, UnicodeDecodeError):
+        return rel, None
+    return rel, sorted(page_markers(content))
+
+
+def inventory(root, pages=None, workers=None):
+    """`{page rel: sorted markers}` for every page, scanned in parallel."""
+    pages = discover_pages(root) if pages is None else pages
+    return dict(run_batch(partial(scan_page, root=root), pages, workers))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Site-wide inventory of page markers and navbar generations')
+    parser.add_argument('--root', type=Path, default=REPO_ROOT)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--json', action='store_true', help='print every page with its markers and generation')
+    args = parser.parse_args()
+
+    pages = inventory(args.root, workers=args.workers)
+    generations = {
+        page: navbar_generation(frozenset(markers)) if markers is not None else None
+        for page, markers in pages.items()
+    }
+    if args.json:
+        print(json.dumps({
+            page: {'generation': generations[page], 'markers': markers}
+            for page, markers in pages.items()
+        }, indent=2))
+        return
+
+    counts = Counter(generations.values())
+    print(f"🧭 Navbar generation of {len(pages)} pages:")
+    for generation in [*NAVBAR_GENERATIONS, NO_NAVBAR]:
+        print(f"   {generation:<12} {counts[generation]}")
+    mixed = [page for page, markers in pages.items()
+             if markers and sum(not frozenset(markers).isdisjoint(names)
+                                for names in NAVBAR_GENERATIONS.values()) > 1]
+    if mixed:
+        print(f"⚠️  {len(mixed)} pages carry more than one navbar generation:")
+        for page in mixed:
+            print(f"   - {page}")
+    unreadable = [page for page, markers in pages.items() if markers is None]
+    if unreadable:
+        print(f"❌ {len(unreadable)} pages could not be read: {', '.join(unreadable)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,236 @@
+"""
+HTML minification of the build output.
+
+Runs on the deploy tree (`public/`, written by `npm run build:public`), never
+on the source pages. It is deliberately conservative:
+
+- `<pre>`, `<textarea>` (and the obsolete `<xmp>`/`<listing>`) are kept
+  byte for byte, as are JSON-LD and every other non-JavaScript `<script>`,
+- text between tags only has each whitespace run collapsed to one space
+  (or one newline if it held one), never removed, and `&nbsp;` stays,
+- whitespace inside tags is collapsed outside attribute values,
+- comments are dropped except conditional (`<!--[if`), `<!--!` and `<!--#`,
+- inline CSS loses comments (except `/*!`) and the whitespace around
+  `{ } ; , >` and after `:`, strings and `url()` untouched,
+- inline JavaScript only loses indentation, blank lines and whole-line
+  `//` comments, and is left alone if it holds a template literal or a
+  line continuation; lines are never joined, so ASI is unaffected.
+
+Results are cached by content hash (`ResultCache`), so a rebuilt `public/`
+whose pages did not change is served from the cache, and every run reports
+the size of each page before and after.
+
+    cd scripts/automation
+    python -m site_pipeline.minify [--out ../../public] [--report minify.csv]
+"""
+
+import argparse
+import os
+import re
+from functools import partial
+from pathlib import Path
+
+from .batch import (
+    CACHED,
+    FAILED,
+    NOT_FOUND,
+    OUTPUT_SECTIONS,
+    REPO_ROOT,
+    UNCHANGED,
+    UPDATED,
+    PageResult,
+    discover_pages,
+    merge_results,
+)
+from .manifest import MANIFEST_DIR, BuildManifest, ResultCache, rules_digest, run_incremental
+from .profiling import PageProfile, add_profiling_arguments, finish_profiling, profiled_worker
+from .references import parse_attributes
+
+# Hashed into the cache key so minifier changes invalidate cached results
+MINIFY_SOURCE = Path(__file__)
+
+_QUOTED_OR_OTHER = r'''(?:"[^"]*"|'[^']*'|[^'">])*'''
+
+_TOKENS = re.compile(
+    r'(?P<comment><!--.*?-->)'
+    rf'|(?P<raw><(?P<raw_tag>pre|textarea|xmp|listing)\b{_QUOTED_OR_OTHER}>.*?</(?P=raw_tag)\s*>)'
+    rf'|(?P<script_open><script\b(?P<script_attrs>{_QUOTED_OR_OTHER})>)(?P<script_body>.*?)(?P<script_close></script\s*>)'
+    rf'|(?P<style_open><style\b(?P<style_attrs>{_QUOTED_OR_OTHER})>)(?P<style_body>.*?)(?P<style_close></style\s*>)'
+    rf'|(?P<tag></?[a-zA-Z][^\s/>]*{_QUOTED_OR_OTHER}>)'
+    r'|(?P<declaration><![^>]*>)',
+    re.DOTALL | re.IGNORECASE,
+)
+
+# HTML whitespace only: U+00A0 (&nbsp;) is content
+_HTML_SPACE = re.compile(r'[ \t\n\r\f]+')
+_TAG_PARTS = re.compile(r'''"[^"]*"|'[^']*'|[ \t\n\r\f]+''')
+_SPACE_BEFORE_CLOSE = re.compile(r'[ \t\n\r\f]+>$')
+
+_KEPT_COMMENTS = ('<!--[if', '<!--!', '<!--#')
+
+JS_TYPES = frozenset({
+    '', 'text/javascript', 'application/javascript', 'module',
+    'text/ecmascript', 'application/ecmascript',
+})
+
+_CSS_COMMENTS = re.compile(r'''(/\*.*?\*/|"(?:\\.|[^"\\\n])*"|'(?:\\.|[^'\\\n])*')''', re.DOTALL)
+_CSS_LITERALS = re.compile(r'''("(?:\\.|[^"\\\n])*"|'(?:\\.|[^'\\\n])*'|url\(\s*[^)"'\s]*\s*\))''')
+_CSS_PUNCTUATION = re.compile(r' ?([{};,>]) ?')
+_JS_UNSAFE = re.compile(r'`|\\\r?\n')
+
+
+def _collapse(text):
+    return _HTML_SPACE.sub(lambda m: '\n' if '\n' in m.group() else ' ', text)
+
+
+def minify_tag(tag):
+    """Collapse the whitespace of a start/end tag outside attribute values."""
+    tag = _TAG_PARTS.sub(lambda m: m.group() if m.group()[0] in '"\'' else ' ', tag)
+    return _SPACE_BEFORE_CLOSE.sub('>', tag)
+
+
+def minify_css(css):
+    """Conservative CSS minification (comments and optional whitespace)."""
+    css = ''.join(
+        (' ' if part.startswith('/*') and not part.startswith('/*!') else part) if index % 2 else part
+        for index, part in enumerate(_CSS_COMMENTS.split(css))
+    )
+    parts = _CSS_LITERALS.split(css)
+    for index in range(0, len(parts), 2):
+        code = _HTML_SPACE.sub(' ', parts[index])
+        code = _CSS_PUNCTUATION.sub(r'\1', code).replace(': ', ':').replace(';}', '}')
+        parts[index] = code
+    return ''.join(parts).strip()
+
+
+def minify_js(js):
+    """Conservative JavaScript minification: indentation, blank lines, `//` lines."""
+    if _JS_UNSAFE.search(js):
+        return js.strip()
+    lines = (line.strip() for line in js.splitlines())
+    return '\n'.join(line for line in lines if line and not line.startswith('//'))
+
+
+def _script(match):
+    attributes = parse_attributes(match.group('script_attrs'))
+    body = match.group('script_body')
+    if attributes.get('type', '').strip().lower() in JS_TYPES:
+        body = minify_js(body)
+    return minify_tag(match.group('script_open')) + body + match.group('script_close')
+
+
+def _style(match):
+    attributes = parse_attributes(match.group('style_attrs'))
+    body = match.group('style_body')
+    if attributes.get('type', 'text/css').strip().lower() == 'text/css':
+        body = minify_css(body)
+    return minify_tag(match.group('style_open')) + body + match.group('style_close')
+
+
+def minify_html(html):
+    """Minify a page; see the module docstring for what is (not) touched."""
+    out = []
+    pos = 0
+    dropped = False
+    for match in _TOKENS.finditer(html):
+        text = html[pos:match.start()]
+        if dropped and out and out[-1][-1:] in (' ', '\n'):
+            # A removed comment leaves one whitespace run, not two
+            text = text.lstrip(' \t\n\r\f')
+        if text:
+            out.append(_collapse(text))
+        dropped = False
+        if match.group('comment') is not None:
+            comment = match.group('comment')
+            if comment.startswith(_KEPT_COMMENTS):
+                out.append(comment)
+            else:
+                dropped = True
+        elif match.group('raw') is not None:
+            out.append(match.group('raw'))
+        elif match.group('script_open') is not None:
+            out.append(_script(match))
+        elif match.group('style_open') is not None:
+            out.append(_style(match))
+        elif match.group('tag') is not None:
+            out.append(minify_tag(match.group('tag')))
+        else:
+            out.append(match.group())
+        pos = match.end()
+    text = html[pos:]
+    if dropped and out and out[-1][-1:] in (' ', '\n'):
+        text = text.lstrip(' \t\n\r\f')
+    out.append(_collapse(text))
+    return ''.join(out).strip() + '\n'
+
+
+def minify_page(path, cache, root):
+    """Worker: minify one output page in place, through the result cache."""
+    path = Path(path)
+    page_rel = Path(os.path.relpath(path, root)).as_posix()
+    if not path.exists():
+        return PageResult(str(path), NOT_FOUND, f"⚠️  {page_rel} not found")
+    try:
+        data = path.read_bytes()
+        content = data.decode('utf-8')
+        key = cache.key(data)
+        cached = cache.get(key)
+        profile = PageProfile()
+        if cached is None:
+            minified = profile.run('minify_html', minify_html, content)
+            cache.put(key, minified.encode('utf-8'))
+        else:
+            minified = profile.run('minify_html', lambda _: cached.decode('utf-8'), content)
+        stats = {'profile': profile.as_list(), 'cache_hit': cached is not None, 'cache_key': key}
+        before, after = len(data), len(minified.encode('utf-8'))
+        if minified == content:
+            return PageResult(str(path), UNCHANGED, f"✓ {page_rel}: already minified", stats=stats)
+        path.write_text(minified, encoding='utf-8')
+        source = 'cache' if cached is not None else 'minified'
+        message = (f"✅ {page_rel}: {before / 1024:.1f} KB → {after / 1024:.1f} KB "
+                   f"({(after - before) / before:+.1%}, {source})")
+        return PageResult(str(path), UPDATED, message, stats=stats)
+    except Exception as e:
+        return PageResult(str(path), FAILED, f"❌ Error in {page_rel}: {e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Minify the HTML pages of the build output')
+    parser.add_argument('--root', type=Path, default=REPO_ROOT, help='site root (holds .site-pipeline/)')
+    parser.add_argument('--out', type=Path, help='build output to minify in place (default: ROOT/public)')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--force', action='store_true', help='reprocess pages the last run already minified')
+    add_profiling_arguments(parser)
+    args = parser.parse_args()
+    out = args.out or args.root / 'public'
+    if not out.is_dir():
+        parser.error(f'{out} does not exist; run `npm run build:public` first')
+
+    rules = rules_digest(MINIFY_SOURCE)
+    cache = ResultCache(args.root, 'minify', rules, suffix='.html')
+    manifest = BuildManifest(args.root / MANIFEST_DIR / 'minify-output.json', out, rules)
+    if args.force:
+        manifest.pages = {}
+    pages = discover_pages(out, OUTPUT_SECTIONS)
+    worker = partial(minify_page, cache=cache, root=out)
+    results = run_incremental(profiled_worker(worker, args, out), pages, args.workers, manifest)
+    for result in results:
+        if result.status in (UPDATED, FAILED):
+            print(result.message)
+
+    summary = merge_results(results)
+    before = sum(stat['bytes_in'] for r in results for stat in r.stats.get('profile', ()))
+    after = sum(stat['bytes_out'] for r in results for stat in r.stats.get('profile', ()))
+    hits = sum(r.stats.get('cache_hit', False) for r in results)
+    print(f"\n📦 {summary[UPDATED]} pages minified ({hits} from cache), {summary[UNCHANGED]} already minified, "
+          f"{summary[CACHED]} skipped, {summary[FAILED]} failed")
+    if before:
+        print(f"📉 {before / 1024:.1f} KB → {after / 1024:.1f} KB ({(after - before) / before:+.1%})")
+    if not summary[CACHED]:
+        # Every page was looked up, so entries no page used are stale
+        cache.prune({r.stats['cache_key'] for r in results if 'cache_key' in r.stats})
+    finish_profiling(args, results, out)
+
+
+if __name__ == '__main__':
+    main()
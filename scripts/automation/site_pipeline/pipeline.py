@@ -0,0 +1,197 @@
+"""
+Unified transform pipeline.
+
+Each page edit the standalone scripts make is registered here as a named
+transform, a function `(content, page) -> content`. A run reads every
+selected page once, passes it through the selected transforms in memory,
+in registry order, and writes it once, and only if something changed.
+
+The built-in transforms live in `transforms.py`. Others can be added with
+`@register(...)` before `run_pipeline` is called, from a module the workers
+import too.
+"""
+
+import json
+import os
+from dataclasses import dataclass, field
+from functools import partial
+from pathlib import Path
+from typing import Callable, Optional
+
+from .batch import FAILED, NOT_FOUND, UNCHANGED, UPDATED, PageResult
+from .components import component_sources, load_components
+from .engine import ENGINE_SOURCE
+from .fingerprint import FINGERPRINT_SOURCE, AssetManifest
+from .manifest import rules_digest, run_incremental
+from .markers import MARKERS_SOURCE, page_markers
+from .profiling import PageProfile, run_profiled
+
+# Hashed into rule digests so pipeline changes invalidate manifests
+PIPELINE_SOURCE = Path(__file__)
+
+# What a transform may need built once per run and shared with the workers
+ASSETS = 'assets'
+COMPONENTS = 'components'
+
+
+@dataclass(frozen=True)
+class Transform:
+    """A registered page transform.
+
+    `needs` lists the shared run data it reads from `Page` (`ASSETS`,
+    `COMPONENTS`); `sources` are files whose content defines its output,
+    `root_sources` site files (config) that do, relative to the run's root;
+    `conflicts` names transforms it cannot run together with. `when`, given
+    the page's markers (`markers.page_markers`), is False when the
+    transform would leave the page as it is, so it is not called at all.
+    """
+
+    name: str
+    func: Callable[[str, 'Page'], str]
+    description: str
+    needs: frozenset = frozenset()
+    sources: tuple = ()
+    conflicts: tuple = ()
+    when: Optional[Callable[[frozenset], bool]] = None
+    root_sources: tuple = ()
+
+
+@dataclass(frozen=True)
+class Page:
+    """The page a transform is applied to.
+
+    Transforms may append to `notes` what they did (one line per edit);
+    the notes end up in the run report.
+    """
+
+    rel: str
+    name: str
+    assets: Optional[AssetManifest] = None
+    components: Optional[dict] = None
+    notes: list = field(default_factory=list)
+
+
+# name → Transform, in the order transforms run
+TRANSFORMS = {}
+
+
+def register(name, description, needs=(), sources=(), conflicts=(), when=None, root_sources=()):
+    """Decorator adding a `(content, page) -> content` function to the registry."""
+    def decorator(func):
+        if name in TRANSFORMS:
+            raise ValueError(f'transform {name!r} is already registered')
+        TRANSFORMS[name] = Transform(name, func, description, frozenset(needs),
+                                     tuple(sources), tuple(conflicts), when, tuple(root_sources))
+        return func
+    return decorator
+
+
+def select_transforms(names):
+    """Registered transforms named in `names`, in registry order."""
+    unknown = [name for name in names if name not in TRANSFORMS]
+    if unknown:
+        raise ValueError(f"unknown transform(s): {', '.join(unknown)} "
+                         f"(available: {', '.join(TRANSFORMS)})")
+    selected = [transform for transform in TRANSFORMS.values() if transform.name in names]
+    for transform in selected:
+        clash = [other for other in transform.conflicts if other in names]
+        if clash:
+            raise ValueError(f"transform {transform.name!r} cannot run with {', '.join(clash)}")
+    return selected
+
+
+def apply_transforms(content, transforms, page, profile=None):
+    """Run `transforms` over `content`; returns `(content, names of those that changed it)`.
+
+    The page's markers are found once up front, and again only after a
+    transform changed it; transforms whose `when` rejects them are skipped.
+    With a `PageProfile`, each transform call (or skip) is recorded in it.
+    """
+    changed = []
+    markers = page_markers(content)
+    for transform in transforms:
+        if transform.when is not None and not transform.when(markers):
+            if profile is not None:
+                profile.skip(transform.name, content)
+            continue
+        if profile is None:
+            new_content = transform.func(content, page)
+        else:
+            noted = len(page.notes)
+            new_content = profile.run(transform.name, transform.func, content, page)
+            profile.annotate(page.notes[noted:])
+        if new_content != content:
+            changed.append(transform.name)
+            content = new_content
+            markers = page_markers(content)
+    return content, changed
+
+
+def process_page(path, names, root, assets=None, components=None):
+    """Worker: one read, every selected transform in memory, at most one write."""
+    path = Path(path)
+    page_rel = Path(os.path.relpath(path, root)).as_posix()
+    if not path.exists():
+        return PageResult(str(path), NOT_FOUND, f"⚠️  {page_rel} not found")
+    try:
+        content = path.read_text(encoding='utf-8')
+        page = Page(page_rel, path.name, assets, components)
+        profile = PageProfile()
+        new_content, changed = apply_transforms(content, select_transforms(names), page, profile)
+        stats = {'transforms': changed, 'profile': profile.as_list()}
+        if new_content == content:
+            return PageResult(str(path), UNCHANGED, f"✓ {page_rel}: no changes", stats=stats)
+        path.write_text(new_content, encoding='utf-8')
+        lines_removed = content.count('\n') - new_content.count('\n')
+        return PageResult(str(path), UPDATED, f"✅ {page_rel}: {', '.join(changed)}",
+                          lines_removed, stats)
+    except Exception as e:
+        return PageResult(str(path), FAILED, f"❌ Error in {page_rel}: {e}")
+
+
+def _needs(transforms):
+    return set().union(*(transform.needs for transform in transforms))
+
+
+def load_shared_data(transforms, root):
+    """`(assets, components)` the selected transforms need, built once per run."""
+    needs = _needs(transforms)
+    assets = AssetManifest.build(root) if ASSETS in needs else None
+    components = load_components(root) if COMPONENTS in needs else None
+    return assets, components
+
+
+def pipeline_digest(transforms, root, assets=None):
+    """Rules digest for a selection: its code, templates and shared data."""
+    parts = [PIPELINE_SOURCE, ENGINE_SOURCE, MARKERS_SOURCE, ' '.join(t.name for t in transforms)]
+    for transform in transforms:
+        parts.extend(transform.sources)
+        for rel in transform.root_sources:
+            path = Path(root) / rel
+            parts.append(path if path.is_file() else f'{rel}: missing')
+    needs = _needs(transforms)
+    if ASSETS in needs:
+        parts.extend([FINGERPRINT_SOURCE, json.dumps(assets.versions, sort_keys=True)])
+    if COMPONENTS in needs:
+        parts.extend(component_sources(root))
+    return rules_digest(*parts)
+
+
+def run_pipeline(pages, transforms, root, workers=None, manifest=None, assets=None, components=None,
+                 cprofile_dir=None):
+    """Apply `transforms` to `pages`; returns one PageResult per page.
+
+    `assets`/`components` come from `load_shared_data` and are handed to
+    the workers as is. With a `manifest`, pages it knows are current are
+    skipped. With `cprofile_dir`, every page runs under cProfile and its
+    dump is written there.
+    """
+    worker = partial(process_page, names=tuple(t.name for t in transforms), root=root,
+                     assets=assets, components=components)
+    if cprofile_dir:
+        worker = partial(run_profiled, worker, cprofile_dir=cprofile_dir, root=root)
+    return run_incremental(worker, pages, workers, manifest)
+
+
+# The built-in transforms register themselves on import
+from . import transforms as _builtin_transforms  # noqa: E402,F401
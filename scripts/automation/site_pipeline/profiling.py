@@ -0,0 +1,206 @@
+"""
+Per-transform instrumentation and run reports.
+
+Workers wrap each transform in a `PageProfile`, which records its time,
+the bytes it consumed and produced, its match count and whether it was a
+no-op (changed nothing), and return the records in
+`PageResult.stats['profile']`. For a whole-page function the bytes are
+the page before and after; for a `SinglePassEngine` rule they are the
+matched text and its replacement. Either way `bytes_in - bytes_out` is
+what the transform removed.
+
+`--report run.json|run.csv` writes the records of every page, and
+`--cprofile DIR` keeps cProfile dumps of the `--cprofile-top` slowest
+pages.
+"""
+
+import cProfile
+import csv
+import json
+import os
+import time
+from dataclasses import asdict, dataclass, field
+from functools import partial
+from pathlib import Path
+
+from .batch import CACHED
+
+
+@dataclass
+class TransformStat:
+    """What one transform did to one page."""
+
+    name: str
+    seconds: float = 0.0
+    bytes_in: int = 0
+    bytes_out: int = 0
+    matches: int = 0
+    changed: bool = False
+    skipped: bool = False
+    notes: list = field(default_factory=list)
+
+    @property
+    def noop(self):
+        return not self.changed
+
+    def as_dict(self):
+        return {**asdict(self), 'seconds': round(self.seconds, 6), 'noop': self.noop}
+
+
+def _size(text):
+    return len(text.encode('utf-8'))
+
+
+class PageProfile:
+    """Records every transform applied to one page."""
+
+    def __init__(self):
+        self.stats = []
+
+    def run(self, name, func, content, *args, matches=None):
+        """Call `func(content, *args)` and record it.
+
+        `matches(before, after)` counts what the transform matched;
+        without it a changed page counts as one match.
+        """
+        start = time.perf_counter()
+        result = func(content, *args)
+        elapsed = time.perf_counter() - start
+        after = content if result is None else result
+        changed = after != content
+        count = matches(content, after) if matches else int(changed)
+        self.stats.append(TransformStat(name, elapsed, _size(content), _size(after), count, changed))
+        return result
+
+    def skip(self, name, content):
+        """Record a transform the page's markers ruled out without calling it."""
+        size = _size(content)
+        self.stats.append(TransformStat(name, 0.0, size, size, skipped=True))
+
+    def annotate(self, notes):
+        """Attach `notes` (what the last recorded transform did) to its record."""
+        self.stats[-1].notes.extend(notes)
+
+    def add_engine(self, counts, rule_profile):
+        """Record the rules of one `SinglePassEngine.scan(..., profile=...)` call."""
+        for name, count in counts.items():
+            entry = rule_profile.get(name, {})
+            self.stats.append(TransformStat(name, entry.get('seconds', 0.0),
+                                            entry.get('bytes_in', 0), entry.get('bytes_out', 0),
+                                            count, entry.get('changed', 0) > 0))
+
+    def as_list(self):
+        return [stat.as_dict() for stat in self.stats]
+
+
+def add_profiling_arguments(parser):
+    """`--report`, `--cprofile` and `--cprofile-top` for a script's CLI."""
+    parser.add_argument('--report', type=Path, metavar='FILE',
+                        help='write per-page, per-transform stats (.json or .csv)')
+    parser.add_argument('--cprofile', type=Path, metavar='DIR',
+                        help='profile every page with cProfile and keep the slowest dumps in DIR '
+                             "(the run's other dumps are removed)")
+    parser.add_argument('--cprofile-top', type=int, default=5, metavar='N',
+                        help='number of slowest pages whose cProfile dump is kept (default: 5)')
+    return parser
+
+
+def _dump_name(page, root):
+    return Path(os.path.relpath(page, root)).as_posix().replace('/', '__') + '.prof'
+
+
+def run_profiled(worker, path, cprofile_dir, root):
+    """Worker wrapper: `worker(path)` under cProfile, dumped to `cprofile_dir`."""
+    profiler = cProfile.Profile()
+    result = profiler.runcall(worker, path)
+    Path(cprofile_dir).mkdir(parents=True, exist_ok=True)
+    profiler.dump_stats(Path(cprofile_dir) / _dump_name(path, root))
+    return result
+
+
+def profiled_worker(worker, args, root=None):
+    """`worker` wrapped for cProfile when `--cprofile` was given."""
+    if getattr(args, 'cprofile', None):
+        return partial(run_profiled, worker, cprofile_dir=args.cprofile, root=root or args.root)
+    return worker
+
+
+def page_seconds(result):
+    return sum(stat['seconds'] for stat in result.stats.get('profile', ()))
+
+
+def summarize(results):
+    """Per-transform totals across pages: `{name: {...}}` in first-seen order."""
+    totals = {}
+    for result in results:
+        for stat in result.stats.get('profile', ()):
+            entry = totals.setdefault(stat['name'], {
+                'pages': 0, 'noop_pages': 0, 'skipped_pages': 0, 'seconds': 0.0,
+                'bytes_in': 0, 'bytes_out': 0, 'matches': 0,
+            })
+            entry['pages'] += 1
+            entry['noop_pages'] += stat['noop']
+            entry['skipped_pages'] += stat.get('skipped', False)
+            entry['seconds'] += stat['seconds']
+            entry['bytes_in'] += stat['bytes_in']
+            entry['bytes_out'] += stat['bytes_out']
+            entry['matches'] += stat['matches']
+    for entry in totals.values():
+        entry['seconds'] = round(entry['seconds'], 6)
+    return totals
+
+
+def write_report(path, results, root):
+    """Write the run's transform records as JSON (default) or CSV (`.csv`)."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    pages = [
+        {
+            'page': Path(os.path.relpath(result.page, root)).as_posix(),
+            'status': result.status,
+            'seconds': round(page_seconds(result), 6),
+            'transforms': result.stats.get('profile', []),
+        }
+        for result in results
+    ]
+    if path.suffix.lower() == '.csv':
+        fields = ['page', 'status', 'name', 'seconds', 'bytes_in', 'bytes_out', 'matches', 'changed', 'skipped',
+                  'noop', 'notes']
+        with path.open('w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=fields)
+            writer.writeheader()
+            for page in pages:
+                for stat in page['transforms']:
+                    writer.writerow({'page': page['page'], 'status': page['status'], **stat,
+                                     'notes': '; '.join(stat.get('notes', ()))})
+        return
+    path.write_text(json.dumps({'transforms': summarize(results), 'pages': pages}, indent=2),
+                    encoding='utf-8')
+
+
+def prune_cprofile_dumps(directory, results, keep, root):
+    """Keep the dumps of the `keep` slowest pages; returns the kept paths.
+
+    Only dumps this run wrote are removed: cached pages were not profiled,
+    and other files in `directory` are not the run's.
+    """
+    directory = Path(directory)
+    ranked = sorted((result for result in results if result.status != CACHED), key=page_seconds, reverse=True)
+    kept = {_dump_name(result.page, root) for result in ranked[:keep]}
+    for result in ranked[keep:]:
+        (directory / _dump_name(result.page, root)).unlink(missing_ok=True)
+    return sorted(directory / name for name in kept if (directory / name).exists())
+
+
+def finish_profiling(args, results, root=None):
+    """Write the report and prune cProfile dumps as requested on the CLI.
+
+    Page paths are reported relative to `root` (default: `args.root`).
+    """
+    root = root or args.root
+    if getattr(args, 'report', None):
+        write_report(args.report, results, root)
+        print(f"📈 Report: {args.report}")
+    if getattr(args, 'cprofile', None):
+        kept = prune_cprofile_dumps(args.cprofile, results, args.cprofile_top, root)
+        print(f"🔬 cProfile dumps of the {len(kept)} slowest pages in {args.cprofile}")
@@ -0,0 +1,319 @@
+"""
+Site-wide reference index.
+
+For every page (and `components/*.html`) the index records what it
+references, by kind:
+
+- `scripts`: `<script src>`, deferred `data-src` scripts and
+  `<link rel="preload" as="script">`
+- `stylesheets`: `<link rel="stylesheet">`, deferred `data-href` links and
+  `as="style"` preloads
+- `images`: `<img>`/`<source>` `src`/`srcset`, icons and `as="image"` preloads
+- `fonts`: `as="font"` preloads
+- `components`: `navbar`/`footer`, whether as a placeholder, a pre-rendered
+  block or hand-written markup
+- `links`: internal `<a href>` pages
+- `assets`: every local file cache busting versions (`fingerprint.py`)
+
+Local targets are root-relative paths; external ones keep their URL. The
+reverse mapping (target → pages) is derived from it. The index lives in
+`.site-pipeline/references.json` and is updated incrementally the same way
+as `BuildManifest`: pages whose size/mtime (or, failing that, content hash)
+did not change keep their entry, the others are rescanned in parallel.
+
+    cd scripts/automation
+    python -m site_pipeline.references --who css/components/enhanced-navbar.css
+    python -m site_pipeline.references --who js/utils/component-loader.js --kind scripts
+    python -m site_pipeline.references --page index.html
+"""
+
+import argparse
+import html
+import json
+import os
+import re
+from functools import partial
+from pathlib import Path
+
+from .batch import REPO_ROOT, discover_pages, run_batch
+from .components import COMPONENT_NAMES
+from .fingerprint import FINGERPRINT_SOURCE, AssetManifest, referenced_assets
+from .manifest import MANIFEST_DIR, content_digest, rules_digest
+from .markers import MARKERS_SOURCE, components_used, page_markers
+
+INDEX_VERSION = 1
+
+# Hashed with fingerprint.py and markers.py into the index so parser changes rebuild it
+REFERENCES_SOURCE = Path(__file__)
+
+KINDS = ('scripts', 'stylesheets', 'images', 'fonts', 'components', 'links', 'assets')
+
+# Comments and <style> bodies are skipped; <script> only counts by its tag
+_TOKENS = re.compile(
+    r'<!--.*?-->'
+    r'|<(script)\b([^>]*)>.*?</script\s*>'
+    r'|<style\b[^>]*>.*?</style\s*>'
+    r'|<(link|img|source|a)\b([^>]*)>',
+    re.DOTALL | re.IGNORECASE,
+)
+_ATTRIBUTE = re.compile(r'''([^\s=/>]+)(?:\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]+)))?''')
+_EXTERNAL = re.compile(r'^(?:https?:)?//', re.IGNORECASE)
+_NOT_A_FILE = re.compile(r'^(?:#|[a-z][a-z0-9+.-]*:)', re.IGNORECASE)
+
+_PRELOAD_KINDS = {'script': 'scripts', 'style': 'stylesheets', 'image': 'images', 'font': 'fonts'}
+
+
+def component_path(name):
+    return f'components/{name}.html'
+
+
+def parse_attributes(text):
+    """`{name: value}` of a start tag's attributes (lower-cased names, unescaped values)."""
+    attributes = {}
+    for match in _ATTRIBUTE.finditer(text):
+        name, *values = match.groups()
+        value = next((v for v in values if v is not None), '')
+        attributes.setdefault(name.lower(), html.unescape(value))
+    return attributes
+
+
+def _srcset_urls(srcset):
+    return [candidate.split()[0] for candidate in srcset.split(',') if candidate.strip()]
+
+
+def _target(url, page_rel, resolver):
+    """Root-relative path of a local URL, the URL itself if external, else None."""
+    url = url.strip()
+    if not url or url.startswith('data:'):
+        return None
+    if _EXTERNAL.match(url):
+        return 'https:' + url if url.startswith('//') else url
+    if _NOT_A_FILE.match(url):
+        return None
+    path = re.split(r'[?#]', url, maxsplit=1)[0]
+    return resolver.resolve(path, page_rel) if path else None
+
+
+def _is_page(target):
+    """Local `.html` page or directory (served as its index page)."""
+    if _EXTERNAL.match(target):
+        return False
+    name = target.rsplit('/', 1)[-1]
+    return name.endswith('.html') or '.' not in name
+
+
+def page_references(content, page_rel, resolver):
+    """`{kind: set of targets}` for one page's markup."""
+    refs = {kind: set() for kind in KINDS}
+
+    def add(kind, url):
+        target = _target(url, page_rel, resolver)
+        if target:
+            refs[kind].add(target)
+
+    for match in _TOKENS.finditer(content):
+        if match.group(1):
+            attributes = parse_attributes(match.group(2))
+            src = attributes.get('src') or attributes.get('data-src', '')
+            if src and ('src' in attributes or 'data-deferred-script' in attributes):
+                add('scripts', src)
+            continue
+        tag = (match.group(3) or '').lower()
+        if not tag:
+            continue
+        attributes = parse_attributes(match.group(4))
+        if tag == 'a':
+            target = _target(attributes.get('href', ''), page_rel, resolver)
+            if target and _is_page(target):
+                refs['links'].add(target)
+        elif tag in ('img', 'source'):
+            for url in [attributes.get('src', '')] + _srcset_urls(attributes.get('srcset', '')):
+                add('images', url)
+        elif tag == 'link':
+            rel = attributes.get('rel', '').lower().split()
+            href = attributes.get('href') or attributes.get('data-href', '')
+            if 'stylesheet' in rel or 'data-deferred-stylesheet' in attributes:
+                add('stylesheets', href)
+            elif 'preload' in rel or 'modulepreload' in rel:
+                kind = 'scripts' if 'modulepreload' in rel else _PRELOAD_KINDS.get(attributes.get('as', ''))
+                if kind:
+                    add(kind, href)
+            elif any(value in rel for value in ('icon', 'apple-touch-icon')):
+                add('images', href)
+
+    refs['components'] = components_used(page_markers(content))
+    refs['assets'] = referenced_assets(content, resolver, page_rel)
+    return refs
+
+
+def scan_page(path, root):
+    """Worker: one page's index entry (`None` if it cannot be read)."""
+    path = Path(path)
+    try:
+        data = path.read_bytes()
+        stat = path.stat()
+    except OSError:
+        return None
+    rel = Path(os.path.relpath(path, root)).as_posix()
+    refs = page_references(data.decode('utf-8', errors='replace'), rel, AssetManifest(root))
+    return {
+        'sha256': content_digest(data),
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'refs': {kind: sorted(targets) for kind, targets in refs.items()},
+    }
+
+
+def index_sources(root):
+    """Pages plus the component files the index covers."""
+    root = Path(root)
+    components = [root / component_path(name) for name in COMPONENT_NAMES]
+    return discover_pages(root) + [path for path in components if path.exists()]
+
+
+class ReferenceIndex:
+    """`{page: {kind: [targets]}}` plus the reverse mapping, persisted on disk."""
+
+    def __init__(self, root, path=None):
+        self.root = Path(root)
+        self.path = Path(path or self.root / MANIFEST_DIR / 'references.json')
+        self.rules = rules_digest(REFERENCES_SOURCE, FINGERPRINT_SOURCE, MARKERS_SOURCE)
+        self.entries = {}
+        self._reverse = None
+
+    @classmethod
+    def load(cls, root, path=None):
+        index = cls(root, path)
+        try:
+            data = json.loads(index.path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return index
+        if data.get('version') == INDEX_VERSION and data.get('rules') == index.rules:
+            index.entries = data.get('pages', {})
+        return index
+
+    @classmethod
+    def build(cls, root, paths=None, workers=None, path=None):
+        """Load the stored index and bring it up to date with `paths`.
+
+        `paths` defaults to every page and component; entries for files no
+        longer among them are dropped.
+        """
+        index = cls.load(root, path)
+        paths = index_sources(root) if paths is None else list(paths)
+        keep = {index.rel(p) for p in paths}
+        index.entries = {rel: entry for rel, entry in index.entries.items() if rel in keep}
+        index.update(paths, workers)
+        return index
+
+    def rel(self, path):
+        return Path(os.path.relpath(path, self.root)).as_posix()
+
+    def _is_fresh(self, path):
+        entry = self.entries.get(self.rel(path))
+        if entry is None:
+            return False
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return False
+        if stat.st_size != entry['size']:
+            return False
+        if stat.st_mtime_ns == entry['mtime_ns']:
+            return True
+        if content_digest(Path(path).read_bytes()) != entry['sha256']:
+            return False
+        entry['mtime_ns'] = stat.st_mtime_ns
+        return True
+
+    def update(self, paths, workers=None):
+        """Rescan the `paths` that changed since they were indexed; returns their rels."""
+        stale = [path for path in paths if not self._is_fresh(path)]
+        for path, entry in zip(stale, run_batch(partial(scan_page, root=self.root), stale, workers)):
+            if entry is None:
+                self.entries.pop(self.rel(path), None)
+            else:
+                self.entries[self.rel(path)] = entry
+        if stale:
+            self._reverse = None
+        return [self.rel(path) for path in stale]
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix('.tmp')
+        tmp.write_text(json.dumps({
+            'version': INDEX_VERSION,
+            'rules': self.rules,
+            'pages': dict(sorted(self.entries.items())),
+            'referrers': self.reverse(),
+        }, indent=2), encoding='utf-8')
+        os.replace(tmp, self.path)
+
+    def refs(self, page_rel, kind=None):
+        """Targets `page_rel` references (of one `kind`, or `{kind: [...]}`)."""
+        refs = self.entries.get(page_rel, {}).get('refs', {})
+        return refs.get(kind, []) if kind else refs
+
+    def reverse(self):
+        """`{kind: {target: [pages]}}`."""
+        if self._reverse is None:
+            reverse = {kind: {} for kind in KINDS}
+            for page, entry in sorted(self.entries.items()):
+                for kind, targets in entry['refs'].items():
+                    for target in targets:
+                        reverse[kind].setdefault(target, []).append(page)
+            self._reverse = {kind: dict(sorted(targets.items())) for kind, targets in reverse.items()}
+        return self._reverse
+
+    def referrers(self, target, kind=None):
+        """Pages referencing `target` (as `kind`, or as anything)."""
+        kinds = [kind] if kind else KINDS
+        pages = set()
+        for name in kinds:
+            pages.update(self.reverse()[name].get(target, ()))
+        return sorted(pages)
+
+    def targets(self, kind):
+        """Every target of `kind` referenced somewhere."""
+        return list(self.reverse()[kind])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build and query the site-wide reference index')
+    parser.add_argument('--root', type=Path, default=REPO_ROOT)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--who', metavar='TARGET', help='pages referencing a root-relative path or URL')
+    parser.add_argument('--kind', choices=KINDS, help='restrict --who to one kind of reference')
+    parser.add_argument('--page', metavar='PAGE', help="a page's references, by kind")
+    parser.add_argument('--json', action='store_true', help='print the answer as JSON')
+    args = parser.parse_args()
+
+    index = ReferenceIndex.build(args.root, workers=args.workers)
+    index.save()
+
+    if args.who:
+        answer = index.referrers(args.who, args.kind)
+    elif args.page:
+        answer = index.refs(args.page)
+    else:
+        answer = {kind: len(targets) for kind, targets in index.reverse().items()}
+
+    if args.json:
+        print(json.dumps(answer, indent=2))
+    elif args.who:
+        print(f"🔎 {len(answer)} pages reference {args.who}")
+        for page in answer:
+            print(f"   - {page}")
+    elif args.page:
+        for kind, targets in answer.items():
+            print(f"{kind} ({len(targets)}):")
+            for target in targets:
+                print(f"   - {target}")
+    else:
+        print(f"🗂️  {len(index.entries)} pages indexed in {index.path}")
+        for kind, count in answer.items():
+            print(f"   {kind:<12} {count} distinct targets")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,462 @@
+"""
+Script loading: render-blocking scripts deferred and, optionally, bundled.
+
+A classic `<script src>` without `defer`/`async` stops the parser (and,
+in `<head>`, the first render) while it downloads and runs.
+`defer_scripts` walks a page's scripts from the end and gives such a
+script `defer` when that changes nothing any script can observe:
+
+- no inline classic script and no script left blocking comes after it
+  (those run while the page is parsed and may use what it defines),
+- it is not in `KEEP_BLOCKING` (scripts that must run before the page
+  renders, like the canonical host redirect) and, when local, does not
+  call `document.write`.
+
+Deferred scripts run after parsing, in document order. A script that
+becomes deferred after an ordered one (`defer`, `type="module"`) is
+therefore moved in front of the first of them, so it still runs before
+them as it did while blocking. `async` is never added: it gives up the
+order these pages rely on.
+
+With `--bundle`, same-origin deferred scripts that follow each other with
+only whitespace between them and always load together (every page that
+loads one loads the others) are concatenated in order into
+`js/bundles/bundle-<content hash>.js`, which replaces them. An uncaught
+error now stops the rest of its bundle, hence the opt-in. Scripts with a
+`"use strict"` prologue or reading `document.currentScript` stay out of
+bundles, since concatenation changes what they see. The bundle tag keeps
+the original `src`s in `data-script-bundle`: pages are unbundled and
+rebundled on every run, and bundles no page uses any more are deleted.
+
+The `script_defer` pipeline transform only defers; this stage also
+bundles and reports each page's blocking scripts before and after.
+
+    cd scripts/automation
+    python -m site_pipeline.script_loading [--bundle] [--json]
+"""
+
+import argparse
+import functools
+import html
+import json
+import os
+import posixpath
+import re
+import sys
+from collections import defaultdict
+from dataclasses import dataclass
+from functools import partial
+from pathlib import Path
+from typing import Optional
+
+from .batch import (
+    CACHED,
+    FAILED,
+    NOT_FOUND,
+    REPO_ROOT,
+    UNCHANGED,
+    UPDATED,
+    PageResult,
+    discover_pages,
+    merge_results,
+    run_batch,
+)
+from .fingerprint import AssetManifest, file_version
+from .manifest import MANIFEST_DIR, BuildManifest, rules_digest, run_incremental
+from .minify import JS_TYPES
+from .profiling import PageProfile, add_profiling_arguments, finish_profiling, profiled_worker
+from .references import parse_attributes
+
+# Hashed into rule digests so changes here rewrite every page
+SCRIPT_LOADING_SOURCE = Path(__file__)
+
+# Local scripts that have to run before the page renders
+KEEP_BLOCKING = frozenset({'js/utils/canonical-host-redirect.js'})
+
+BUNDLE_DIR = 'js/bundles'
+MIN_BUNDLE = 2
+
+# Marks the bundle tags this stage owns
+OWNED = 'data-script-bundle'
+
+# How a script runs
+BLOCKING = 'blocking'
+ORDERED = 'ordered'    # after parsing, in document order (defer, module)
+ASYNC = 'async'
+INLINE = 'inline'      # classic inline: while parsing
+
+_TOKENS = re.compile(
+    r'<!--.*?-->'
+    r'|<(noscript|template|textarea)\b[^>]*>.*?</\1\s*>'
+    r'|<script\b((?:"[^"]*"|\'[^\']*\'|[^\'">])*)>.*?</script\s*>',
+    re.DOTALL | re.IGNORECASE,
+)
+_OWNED_BUNDLE = re.compile(rf'([ \t]*)<script\b[^>]*\b{OWNED}="([^"]*)"[^>]*>\s*</script\s*>', re.IGNORECASE)
+_DOCUMENT_WRITE = re.compile(r'\bdocument\s*\.\s*write(?:ln)?\s*\(')
+_STRICT_PROLOGUE = re.compile(r'''^(?:\s+|//[^\n]*\n|/\*.*?\*/)*(["'])use strict\1''', re.DOTALL)
+_BUNDLE_NAME = re.compile(r'^bundle-[0-9a-f]+\.js$')
+
+
+@dataclass
+class Script:
+    """One `<script>` of a page that runs JavaScript."""
+
+    start: int
+    end: int
+    attributes: dict
+    kind: str
+    rel: Optional[str] = None   # root-relative target of a local src
+
+    @property
+    def src(self):
+        return self.attributes.get('src')
+
+
+def _kind(attributes):
+    script_type = attributes.get('type', '').strip().lower()
+    if script_type not in JS_TYPES:
+        return None
+    if script_type == 'module':
+        return ASYNC if 'async' in attributes else ORDERED
+    if 'src' not in attributes:
+        return INLINE
+    if 'async' in attributes:
+        return ASYNC
+    return ORDERED if 'defer' in attributes else BLOCKING
+
+
+def scan_scripts(content, page_rel, resolver):
+    """The page's JavaScript `<script>`s in document order (data blocks left out)."""
+    scripts = []
+    for match in _TOKENS.finditer(content):
+        if match.group(2) is None:
+            continue
+        attributes = parse_attributes(match.group(2))
+        kind = _kind(attributes)
+        if kind is None:
+            continue
+        src = re.split(r'[?#]', attributes.get('src', '').strip(), maxsplit=1)[0]
+        rel = resolver.resolve(src, page_rel) if src else None
+        scripts.append(Script(match.start(), match.end(), attributes, kind, rel))
+    return scripts
+
+
+@functools.lru_cache(maxsize=512)
+def _script_traits(path, mtime_ns):
+    """`(writes the document, bundleable)` for a local script."""
+    js = Path(path).read_text(encoding='utf-8', errors='replace')
+    writes = bool(_DOCUMENT_WRITE.search(js))
+    bundleable = not (writes or _STRICT_PROLOGUE.match(js) or 'currentScript' in js)
+    return writes, bundleable
+
+
+def script_traits(root, rel):
+    """`_script_traits` of a root-relative script, None if it is not a file."""
+    path = Path(root) / rel
+    try:
+        return _script_traits(str(path), path.stat().st_mtime_ns)
+    except OSError:
+        return None
+
+
+def _keep_reason(script, root, parsed_after):
+    if script.rel in KEEP_BLOCKING:
+        return 'must run before render'
+    if parsed_after:
+        return f'runs before {parsed_after}'
+    traits = script_traits(root, script.rel) if script.rel else None
+    if traits and traits[0]:
+        return 'document.write'
+    return None
+
+
+def _line_span(content, start, end):
+    """`(start, end)` of the whole line when `start:end` is alone on it."""
+    line_start = content.rfind('\n', 0, start) + 1
+    line_end = content.find('\n', end)
+    line_end = len(content) if line_end == -1 else line_end + 1
+    if content[line_start:start].strip() or content[end:line_end].strip():
+        return start, end
+    return line_start, line_end
+
+
+def _apply(content, edits):
+    out = []
+    pos = 0
+    for start, end, text in sorted(edits, key=lambda edit: edit[:2]):
+        out.append(content[pos:start])
+        out.append(text)
+        pos = end
+    out.append(content[pos:])
+    return ''.join(out)
+
+
+def defer_scripts(content, page_rel, resolver, notes=None, report=None):
+    """Defer what can be deferred (see the module docstring).
+
+    `notes` collects one line per script deferred; `report` gets the
+    `blocking` counts `before` and `after` and the scripts `kept` blocking.
+    """
+    notes = [] if notes is None else notes
+    report = {} if report is None else report
+    scripts = scan_scripts(content, page_rel, resolver)
+    deferred, kept = [], {}
+    # The first script after the current one that runs while parsing
+    parsed_after = None
+    for script in reversed(scripts):
+        if script.kind == INLINE:
+            line = content.count('\n', 0, script.start) + 1
+            parsed_after = f'the inline script on line {line}'
+        elif script.kind == BLOCKING:
+            reason = _keep_reason(script, resolver.root, parsed_after)
+            if reason:
+                kept[script.src] = reason
+                parsed_after = parsed_after or script.src
+            else:
+                deferred.append(script)
+    deferred.reverse()
+    before = sum(script.kind == BLOCKING for script in scripts)
+    report.update(before=before, after=before - len(deferred), kept=kept)
+    if not deferred:
+        return content
+
+    first_ordered = next((script for script in scripts if script.kind == ORDERED), None)
+    edits, moved = [], []
+    for script in deferred:
+        tag = content[script.start:script.end]
+        tag = tag[:len('<script')] + ' defer' + tag[len('<script'):]
+        if first_ordered is not None and first_ordered.start < script.start:
+            moved.append(tag)
+            edits.append((*_line_span(content, script.start, script.end), ''))
+            notes.append(f'defer {script.src} (moved before {first_ordered.src} to keep its order)')
+        else:
+            edits.append((script.start, script.start + len('<script'), '<script defer'))
+            notes.append(f'defer {script.src}')
+    if moved:
+        line_start = content.rfind('\n', 0, first_ordered.start) + 1
+        indent = content[line_start:first_ordered.start]
+        if indent.strip():
+            edits.append((first_ordered.start, first_ordered.start, ''.join(moved)))
+        else:
+            edits.append((line_start, line_start, ''.join(f'{indent}{tag}\n' for tag in moved)))
+    notes.append(f'blocking scripts {report["before"]} → {report["after"]}')
+    return _apply(content, edits)
+
+
+def unbundle(content):
+    """Put back the scripts of every bundle tag this stage wrote."""
+    def restore(match):
+        indent = match.group(1)
+        return '\n'.join(f'{indent}<script defer src="{html.escape(src)}"></script>'
+                         for src in html.unescape(match.group(2)).split())
+    return _OWNED_BUNDLE.sub(restore, content)
+
+
+def _bundleable(script, root):
+    if (script.kind != ORDERED or script.rel is None or set(script.attributes) != {'src', 'defer'}
+            or re.search(r'\s', script.src)):
+        return False
+    traits = script_traits(root, script.rel)
+    return traits is not None and traits[1]
+
+
+def script_runs(content, page_rel, resolver):
+    """Bundleable scripts that follow each other with only whitespace between them."""
+    runs, run = [], []
+    for script in scan_scripts(content, page_rel, resolver):
+        if not _bundleable(script, resolver.root):
+            run = []
+            continue
+        if run and content[run[-1].end:script.start].strip():
+            run = []
+        if not run:
+            runs.append(run)
+        run.append(script)
+    return [run for run in runs if len(run) >= MIN_BUNDLE]
+
+
+def plan_bundles(pages):
+    """Script groups to bundle, from `{page: {'scripts': [rels], 'runs': [[rels]]}}`.
+
+    A run is cut wherever two neighbours are not loaded by exactly the same
+    pages; the pieces of `MIN_BUNDLE` scripts or more are the groups.
+    """
+    loaded_by = defaultdict(set)
+    for page, entry in pages.items():
+        for rel in entry['scripts']:
+            loaded_by[rel].add(page)
+    groups = set()
+    for entry in pages.values():
+        for run in entry['runs']:
+            group = [run[0]]
+            for rel in run[1:]:
+                if loaded_by[rel] == loaded_by[group[-1]] and rel not in group:
+                    group.append(rel)
+                    continue
+                if len(group) >= MIN_BUNDLE:
+                    groups.add(tuple(group))
+                group = [rel]
+            if len(group) >= MIN_BUNDLE:
+                groups.add(tuple(group))
+    return sorted(groups)
+
+
+def build_bundles(root, groups):
+    """Write the bundle of every group; returns `{group: bundle rel}`."""
+    root = Path(root)
+    bundles = {}
+    for group in groups:
+        source = ''.join(f'/* {rel} */\n{(root / rel).read_text(encoding="utf-8").rstrip()}\n;\n'
+                         for rel in group)
+        data = source.encode('utf-8')
+        rel = f'{BUNDLE_DIR}/bundle-{file_version(data)}.js'
+        path = root / rel
+        if not path.is_file():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+            tmp.write_bytes(data)
+            os.replace(tmp, path)
+        bundles[group] = rel
+    return bundles
+
+
+def prune_bundles(root, keep):
+    """Delete the bundles not in `keep` (bundle rels); returns how many."""
+    directory = Path(root) / BUNDLE_DIR
+    removed = 0
+    for path in directory.glob('bundle-*.js') if directory.is_dir() else ():
+        if _BUNDLE_NAME.match(path.name) and f'{BUNDLE_DIR}/{path.name}' not in keep:
+            path.unlink()
+            removed += 1
+    return removed
+
+
+def bundle_scripts(content, page_rel, resolver, bundles, notes=None):
+    """Replace the runs of scripts `bundles` (`{group: bundle rel}`) covers."""
+    notes = [] if notes is None else notes
+    edits = []
+    for run in script_runs(content, page_rel, resolver):
+        index = 0
+        while index < len(run):
+            for end in range(len(run), index + 1, -1):
+                bundle = bundles.get(tuple(script.rel for script in run[index:end]))
+                if bundle:
+                    break
+            else:
+                index += 1
+                continue
+            scripts = run[index:end]
+            absolute = scripts[0].src.startswith('/')
+            url = '/' + bundle if absolute else posixpath.relpath(bundle, posixpath.dirname(page_rel) or '.')
+            srcs = html.escape(' '.join(script.src for script in scripts))
+            edits.append((scripts[0].start, scripts[-1].end, f'<script defer src="{url}" {OWNED}="{srcs}"></script>'))
+            notes.append(f'bundle {bundle} ← {", ".join(script.rel for script in scripts)}')
+            index = end
+    return _apply(content, edits)
+
+
+def process_page(path, root, bundles=None, write=True):
+    """Worker: defer (and, given the bundle table, bundle) one page's scripts.
+
+    With `write=False` the page is only planned: `stats['scripts']` then
+    also lists every local script it loads and its bundleable runs.
+    """
+    path = Path(path)
+    rel = Path(os.path.relpath(path, root)).as_posix()
+    if not path.exists():
+        return PageResult(str(path), NOT_FOUND, f"⚠️  {rel} not found")
+    try:
+        content = path.read_text(encoding='utf-8')
+        resolver = AssetManifest(root)
+        profile = PageProfile()
+        notes, report = [], {}
+        requests = len([script for script in scan_scripts(content, rel, resolver) if script.src])
+        updated = profile.run('unbundle', unbundle, content)
+        noted = len(notes)
+        updated = profile.run('script_defer', defer_scripts, updated, rel, resolver, notes, report)
+        profile.annotate(notes[noted:])
+        if not write:
+            scripts = scan_scripts(updated, rel, resolver)
+            report['scripts'] = sorted({script.rel for script in scripts if script.rel})
+            report['runs'] = [[script.rel for script in run] for run in script_runs(updated, rel, resolver)]
+        elif bundles:
+            noted = len(notes)
+            updated = profile.run('script_bundle', bundle_scripts, updated, rel, resolver, bundles, notes)
+            profile.annotate(notes[noted:])
+        report['requests'] = [requests, len([script for script in scan_scripts(updated, rel, resolver) if script.src])]
+        stats = {'profile': profile.as_list(), 'scripts': report}
+        if updated == content or not write:
+            return PageResult(str(path), UNCHANGED, f"✓ {rel}: scripts unchanged", stats=stats)
+        path.write_text(updated, encoding='utf-8')
+        message = f"✅ {rel}: blocking scripts {report['before']} → {report['after']}"
+        bundled = sum(note.startswith('bundle ') for note in notes)
+        if bundled:
+            message += f", {bundled} bundles"
+        return PageResult(str(path), UPDATED, message, stats=stats)
+    except Exception as e:
+        return PageResult(str(path), FAILED, f"❌ Error in {rel}: {e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Defer render-blocking scripts and optionally bundle them')
+    parser.add_argument('--root', type=Path, default=REPO_ROOT)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--force', action='store_true', help='rewrite pages the last run already handled')
+    parser.add_argument('--bundle', action='store_true',
+                        help='also bundle same-origin scripts that always load together')
+    parser.add_argument('--json', action='store_true', help='print the per-page script report as JSON')
+    add_profiling_arguments(parser)
+    args = parser.parse_args()
+    root = args.root
+
+    pages = discover_pages(root)
+    bundles = {}
+    if args.bundle:
+        plan = run_batch(partial(process_page, root=root, write=False), pages, args.workers)
+        planned = {
+            Path(os.path.relpath(result.page, root)).as_posix(): result.stats['scripts']
+            for result in plan if 'scripts' in result.stats
+        }
+        bundles = build_bundles(root, plan_bundles(planned))
+    pruned = prune_bundles(root, set(bundles.values()))
+
+    scripts = {rel: version for rel, version in AssetManifest.build(root).versions.items() if rel.endswith('.js')}
+    rules = rules_digest(SCRIPT_LOADING_SOURCE, json.dumps(scripts, sort_keys=True),
+                         json.dumps(sorted(bundles.items())))
+    manifest = BuildManifest(root / MANIFEST_DIR / 'script-loading.json', root, rules)
+    if args.force:
+        manifest.pages = {}
+    worker = partial(process_page, root=root, bundles=bundles)
+    results = run_incremental(profiled_worker(worker, args), pages, args.workers, manifest)
+
+    reports = {
+        Path(os.path.relpath(result.page, root)).as_posix(): result.stats['scripts']
+        for result in results if 'scripts' in result.stats
+    }
+    if args.json:
+        print(json.dumps(reports, indent=2))
+        return
+
+    for result in results:
+        if result.status in (UPDATED, FAILED):
+            print(result.message)
+    print("\n🧮 Blocking scripts per page (before → after):")
+    for page, report in reports.items():
+        if report['before']:
+            reasons = ', '.join(dict.fromkeys(report['kept'].values()))
+            print(f"   {page}: {report['before']} → {report['after']}" + (f" (kept: {reasons})" if reasons else ''))
+
+    summary = merge_results(results)
+    before = sum(report['before'] for report in reports.values())
+    after = sum(report['after'] for report in reports.values())
+    print(f"\n📦 {summary[UPDATED]} pages updated, {summary[UNCHANGED]} unchanged, {summary[CACHED]} skipped; "
+          f"blocking scripts {before} → {after} on the pages processed")
+    if args.bundle or pruned:
+        print(f"🧩 {len(bundles)} bundles, {pruned} stale bundles removed")
+    finish_profiling(args, results)
+    if summary[FAILED]:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,320 @@
+"""
+Extraction of inline blocks repeated across pages into shared files.
+
+The navbar scripts paste the same `<style>` block into every page they
+touch, so every page view re-downloads it and no cache can share it. This
+stage runs in two parallel passes: the first collects the digest of every
+inline block on every page, the second replaces each block that appears on
+at least `min_pages` pages with a reference to one fingerprinted file
+(`css/shared/inline-<hash>.css`, `js/shared/inline-<hash>.js`) written once.
+
+Blocks under `min_bytes` stay inline: they are not worth a request. A
+stylesheet's relative `url()`s are rebased from the page onto
+`css/shared/`, so the same text on pages in different directories gives
+different files when it points at different assets.
+
+Scripts keep their execution order: an extracted script is only loaded
+with `defer` when nothing after it on the page still runs during parsing
+(inline, synchronous or async classic scripts), and it is then moved in
+front of the page's first deferred script or module, which it ran before
+while inline. Otherwise it becomes a synchronous `<script src>` in the
+same position. A `<head>` script that could not be deferred stays inline,
+as a synchronous request there would hold up the first render, and so do
+the gtag consent defaults, which have to be set before any tag runs.
+"""
+
+import hashlib
+import os
+import posixpath
+import re
+from dataclasses import dataclass
+from functools import partial
+from pathlib import Path
+from typing import Optional
+
+from .batch import FAILED, NOT_FOUND, UNCHANGED, UPDATED, PageResult, run_batch
+from .critical_css import rebase_urls
+from .fingerprint import file_version
+
+
+@dataclass(frozen=True)
+class BlockKind:
+    """An inline element type that can be moved to a shared file."""
+
+    name: str
+    pattern: str
+    directory: str
+    extension: str
+    reference: str
+    # Used instead of `reference` when nothing later on the page needs the block first
+    deferred_reference: Optional[str] = None
+    # Bodies matching this are never moved (they depend on running inline)
+    exclude: Optional[str] = None
+    # Smaller blocks are not worth an extra request
+    min_bytes: int = 0
+    # Rebase relative url()s from the page onto `directory` (stylesheets)
+    rebase: bool = False
+    # <head> blocks that cannot be deferred stay inline (a synchronous request there blocks the first render)
+    skip_head: bool = False
+
+    def render_reference(self, href, deferred=False):
+        template = self.deferred_reference if deferred and self.deferred_reference else self.reference
+        return template.format(href=href)
+
+    def accepts(self, body):
+        body = body.strip()
+        if not body or len(body.encode('utf-8')) < self.min_bytes:
+            return False
+        return self.exclude is None or re.search(self.exclude, body) is None
+
+    def file_body(self, body, page_rel):
+        """The shared file's content for `body` as found on `page_rel`."""
+        body = body.strip()
+        return rebase_urls(body, page_rel, f'{self.directory}/') if self.rebase else body
+
+
+STYLE = BlockKind(
+    name='style',
+    # Only plain blocks: an id/media/nonce would not survive the move
+    pattern=r'<style(?:\s+type="text/css")?\s*>(?P<body>.*?)</style>',
+    directory='css/shared',
+    extension='.css',
+    reference='<link rel="stylesheet" href="{href}">',
+    min_bytes=512,
+    rebase=True,
+)
+
+SCRIPT = BlockKind(
+    name='script',
+    # Only plain classic scripts: no src, id, nonce, module or data types (JSON-LD)
+    pattern=r'<script(?:\s+type="(?:text/)?javascript")?\s*>(?P<body>.*?)</script>',
+    directory='js/shared',
+    extension='.js',
+    reference='<script src="{href}"></script>',
+    deferred_reference='<script defer src="{href}"></script>',
+    # document.write needs the parser; consent defaults must be set before any tag runs
+    exclude=r'\bdocument\.write(?:ln)?\s*\(|\bgtag\(\s*[\'"]consent[\'"]\s*,\s*[\'"]default',
+    min_bytes=512,
+    skip_head=True,
+)
+
+BLOCK_KINDS = {kind.name: kind for kind in (STYLE, SCRIPT)}
+
+_SCRIPT_TAG = re.compile(r'<script\b([^>]*)>', re.IGNORECASE)
+_COMMENT = re.compile(r'<!--.*?-->', re.DOTALL)
+_BODY = re.compile(r'<body\b', re.IGNORECASE)
+_SCRIPT_TYPE = re.compile(r'\btype\s*=\s*["\']?([^"\'\s>]+)', re.IGNORECASE)
+_JS_TYPES = frozenset({'', 'text/javascript', 'application/javascript', 'module'})
+
+
+def block_digest(body):
+    return hashlib.sha256(body.strip().encode('utf-8')).hexdigest()
+
+
+def _candidates(content, kind):
+    """The `kind` blocks of a page that may move, as regex matches."""
+    return [match for match in re.finditer(kind.pattern, content, re.DOTALL) if kind.accepts(match.group('body'))]
+
+
+def _decide(content, kind, matches):
+    """Which of `matches` move and whether each is deferred: `({start: deferred}, first_ordered)`.
+
+    Blocks are decided last to first so that a block followed only by
+    blocks that were themselves deferred can be deferred too. A head
+    block that would have to stay synchronous is left inline.
+    """
+    blockers, first_ordered, head_end = [], None, 0
+    if kind.deferred_reference:
+        comments = [match.span() for match in _COMMENT.finditer(content)]
+        tags = [tag for tag in _SCRIPT_TAG.finditer(content)
+                if not any(start <= tag.start() < end for start, end in comments)]
+        blockers = [tag.start() for tag in tags if runs_during_parsing(tag.group(1))]
+        first_ordered = next((tag.start() for tag in tags if _ordered_script(tag.group(1))), None)
+    if kind.skip_head:
+        body = _BODY.search(content)
+        head_end = body.start() if body else 0
+
+    decided = {}
+    for match in reversed(matches):
+        deferred = bool(kind.deferred_reference) and not any(pos > match.start() for pos in blockers)
+        if not deferred and match.start() < head_end:
+            continue
+        if deferred and match.start() in blockers:
+            blockers.remove(match.start())
+        decided[match.start()] = deferred
+    return decided, first_ordered
+
+
+def collect_blocks(path, kind, root):
+    """Worker: `(page, {digest: file body})` for every movable inline block on the page."""
+    try:
+        content = Path(path).read_text(encoding='utf-8')
+    except OSError:
+        return str(path), {}
+    page_rel = Path(os.path.relpath(path, root)).as_posix()
+    blocks = {}
+    for match in _candidates(content, kind):
+        # Judged alone, as if every other block stayed inline: a block
+        # counted here is then moved whichever of the others are shared
+        if match.start() not in _decide(content, kind, [match])[0]:
+            continue
+        body = kind.file_body(match.group('body'), page_rel)
+        blocks[block_digest(body)] = body
+    return str(path), blocks
+
+
+def plan_shared_blocks(collected, min_pages=2):
+    """Blocks that occur on at least `min_pages` pages: `{digest: body}`."""
+    pages_per_block = {}
+    bodies = {}
+    for _, blocks in collected:
+        for digest, body in blocks.items():
+            pages_per_block[digest] = pages_per_block.get(digest, 0) + 1
+            bodies[digest] = body
+    return {
+        digest: bodies[digest]
+        for digest, count in pages_per_block.items()
+        if count >= min_pages
+    }
+
+
+def write_shared_files(root, kind, shared):
+    """Write one file per shared block; returns `{digest: (root-relative path, version)}`."""
+    paths = {}
+    for digest, body in shared.items():
+        data = (body + '\n').encode('utf-8')
+        version = file_version(data)
+        rel = f'{kind.directory}/inline-{version}{kind.extension}'
+        target = Path(root) / rel
+        if not target.exists() or target.read_bytes() != data:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            target.write_bytes(data)
+        paths[digest] = (rel, version)
+    return paths
+
+
+def shared_href(rel, version, page_rel):
+    """Href to `rel` as seen from `page_rel` (relative, so file:// works too)."""
+    href = posixpath.relpath(rel, posixpath.dirname(page_rel) or '.')
+    return f'{href}?v={version}'
+
+
+def runs_during_parsing(attrs):
+    """True for a `<script>` tag that executes before the document is parsed.
+
+    Inline, synchronous and `async` classic scripts all may; `defer`red
+    external scripts and modules wait, in document order. Data blocks
+    (JSON-LD, templates) never run.
+    """
+    match = _SCRIPT_TYPE.search(attrs)
+    script_type = match.group(1).lower() if match else ''
+    if script_type not in _JS_TYPES:
+        return False
+    if re.search(r'\basync\b', attrs, re.IGNORECASE):
+        return True
+    if script_type == 'module':
+        return False
+    return not (re.search(r'\bsrc\s*=', attrs, re.IGNORECASE) and re.search(r'\bdefer\b', attrs, re.IGNORECASE))
+
+
+def _ordered_script(attrs):
+    """True for a `<script>` that runs after parsing, in document order (`defer`, module)."""
+    match = _SCRIPT_TYPE.search(attrs)
+    script_type = match.group(1).lower() if match else ''
+    if script_type not in _JS_TYPES or re.search(r'\basync\b', attrs, re.IGNORECASE):
+        return False
+    return script_type == 'module' or bool(
+        re.search(r'\bsrc\s*=', attrs, re.IGNORECASE) and re.search(r'\bdefer\b', attrs, re.IGNORECASE))
+
+
+def _line_span(content, start, end):
+    """`(start, end)` of the whole line when `start:end` is alone on it."""
+    line_start = content.rfind('\n', 0, start) + 1
+    line_end = content.find('\n', end)
+    line_end = len(content) if line_end == -1 else line_end + 1
+    if content[line_start:start].strip() or content[end:line_end].strip():
+        return start, end
+    return line_start, line_end
+
+
+def replace_shared_blocks(content, kind, shared_paths, page_rel):
+    """Replace shared inline blocks; returns `(content, stats)`.
+
+    Deferred blocks after the page's first ordered script move in front
+    of it, so they still run before every deferred script.
+    """
+    targets = {}
+    for match in _candidates(content, kind):
+        target = shared_paths.get(block_digest(kind.file_body(match.group('body'), page_rel)))
+        if target is not None:
+            targets[match.start()] = (match, target)
+    decided, first_ordered = _decide(content, kind, [match for match, _ in targets.values()])
+    references = {
+        start: (kind.render_reference(shared_href(*targets[start][1], page_rel), deferred),
+                deferred, targets[start][1][0])
+        for start, deferred in decided.items()
+    }
+
+    stats = {'blocks': 0, 'bytes_saved': 0, 'deferred': 0, 'files': []}
+    edits, moved = [], []
+    for match, _ in targets.values():
+        if match.start() not in references:
+            continue
+        reference, deferred, rel = references[match.start()]
+        if deferred and first_ordered is not None and first_ordered < match.start():
+            # It ran before every deferred script while inline: keep it first
+            moved.append(reference)
+            edits.append((*_line_span(content, match.start(), match.end()), ''))
+        else:
+            edits.append((match.start(), match.end(), reference))
+        stats['blocks'] += 1
+        stats['deferred'] += deferred
+        stats['bytes_saved'] += len(match.group(0).encode('utf-8')) - len(reference.encode('utf-8'))
+        stats['files'].append(rel)
+    if moved:
+        line_start = content.rfind('\n', 0, first_ordered) + 1
+        indent = content[line_start:first_ordered]
+        if indent.strip():
+            edits.append((first_ordered, first_ordered, ''.join(moved)))
+        else:
+            edits.append((line_start, line_start, ''.join(f'{indent}{reference}\n' for reference in moved)))
+
+    parts = []
+    position = 0
+    for start, end, text in sorted(edits, key=lambda edit: edit[:2]):
+        parts.append(content[position:start])
+        parts.append(text)
+        position = end
+    parts.append(content[position:])
+    return ''.join(parts), stats
+
+
+def rewrite_page(path, kind, shared_paths, root):
+    """Worker: swap the page's shared blocks for references to the shared files."""
+    path = Path(path)
+    if not path.exists():
+        return PageResult(str(path), NOT_FOUND, f"⚠️  {path.name} not found")
+    try:
+        content = path.read_text(encoding='utf-8')
+        page_rel = Path(os.path.relpath(path, root)).as_posix()
+        new_content, stats = replace_shared_blocks(content, kind, shared_paths, page_rel)
+        if new_content == content:
+            return PageResult(str(path), UNCHANGED, f"✓ {page_rel}: no shared {kind.name} blocks", stats=stats)
+        path.write_text(new_content, encoding='utf-8')
+        message = (f"✅ {page_rel}: {stats['blocks']} {kind.name} block(s) → shared, "
+                   f"{stats['bytes_saved'] / 1024:.1f} KB saved")
+        return PageResult(str(path), UPDATED, message, stats=stats)
+    except Exception as e:
+        return PageResult(str(path), FAILED, f"❌ Error in {path.name}: {e}")
+
+
+def extract_shared_blocks(pages, root, kind, min_pages=2, workers=None):
+    """Run both passes over `pages`; returns `(results, shared_paths)`."""
+    collected = run_batch(partial(collect_blocks, kind=kind, root=root), pages, workers)
+    shared = plan_shared_blocks(collected, min_pages)
+    shared_paths = write_shared_files(root, kind, shared)
+    results = run_batch(
+        partial(rewrite_page, kind=kind, shared_paths=shared_paths, root=root),
+        pages, workers,
+    )
+    return results, shared_paths
@@ -0,0 +1,192 @@
+"""
+Synthetic site generator for benchmarks.
+
+Writes a self-contained site of any size (a handful of pages up to 100k)
+whose pages mix the layouts the scripts meet in the real tree:
+
+- `old_navbar`: the old `<nav class="navbar">` with its nested `<nav class="nav">`
+- `gb_navbar`: the hand-pasted gb-navbar (nested menu `<nav>`, inline
+  `<style>` and menu `<script>`) and a `gb-footer`
+- `placeholder`: `data-component` placeholders for the runtime loader
+- `bare`: no navbar at all (body insertion)
+
+Every page carries many local `?v=` references to generated CSS/JS/images,
+the i18n script the loader is injected after, and `data-i18n` text. Output
+is deterministic for a given seed.
+
+    cd scripts/automation
+    python -m site_pipeline.synthetic /tmp/site --pages 1000 [--seed 0]
+"""
+
+import argparse
+import random
+from pathlib import Path
+
+from .batch import REPO_ROOT, SITE_SECTIONS
+from .components import COMPONENT_NAMES, FOOTER_COMPONENT, NAVBAR_COMPONENT
+from .navbar import NEW_NAVBAR_CSS, NEW_NAVBAR_HTML, STANDARD_NAVBAR
+
+# Share of pages per layout
+LAYOUT_WEIGHTS = {'old_navbar': 3, 'gb_navbar': 3, 'placeholder': 3, 'bare': 1}
+
+# Body size range (bytes) of the generated content sections
+BODY_BYTES = (4_000, 40_000)
+
+WORDS = (
+    'strength coaching fat loss plan protein sleep recovery habits progress '
+    'training nutrition mobility consistency client results weekly check-in '
+    'calories steps routine structure accountability goals session workout'
+).split()
+
+FOOTER_HTML = '''<footer class="gb-footer" aria-label="Site footer">
+  <div class="gb-footer-main">
+    <a href="privacy.html" data-i18n="footer.privacy">Privacy</a>
+    <a href="terms.html" data-i18n="footer.terms">Terms</a>
+    <img src="assets/images/logo-footer.png?v=20251025" alt="Garcia Builder" loading="lazy">
+  </div>
+</footer>'''
+
+
+def _asset_paths(count):
+    """Root-relative CSS/JS/image paths the pages reference."""
+    per_kind = max(1, count // 3)
+    return (
+        [f'css/synthetic-{i:03d}.css' for i in range(per_kind)],
+        [f'js/modules/synthetic-{i:03d}.js' for i in range(per_kind)],
+        [f'assets/images/synthetic-{i:03d}.png' for i in range(per_kind)],
+    )
+
+
+def write_assets(root, asset_count, rng):
+    """Asset files, shared scripts and the components pages depend on."""
+    root = Path(root)
+    styles, scripts, images = _asset_paths(asset_count)
+    files = {
+        'css/global.css': 'body { margin: 0; }\n',
+        'assets/i18n.js': 'window.GB_I18N_SOURCE = {};\n',
+        'assets/i18n-runtime.js': 'window.GB_I18N = {};\n',
+        'js/utils/component-loader.js': '// runtime component loader\n',
+        'assets/images/logo-footer.png': bytes(rng.getrandbits(8) for _ in range(256)),
+    }
+    for index, path in enumerate(styles):
+        files[path] = f'.synthetic-{index} {{ color: #{index:06x}; padding: {index}px; }}\n' * 20
+    for index, path in enumerate(scripts):
+        files[path] = f'export const synthetic{index} = () => {index};\n' * 20
+    for path in images:
+        files[path] = bytes(rng.getrandbits(8) for _ in range(512))
+
+    for name in COMPONENT_NAMES:
+        real = REPO_ROOT / 'components' / f'{name}.html'
+        fallback = NEW_NAVBAR_HTML if name == 'navbar' else FOOTER_HTML
+        files[f'components/{name}.html'] = real.read_text(encoding='utf-8') if real.exists() else fallback
+
+    for rel, data in files.items():
+        path = root / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if isinstance(data, bytes):
+            path.write_bytes(data)
+        else:
+            path.write_text(data, encoding='utf-8')
+    return styles, scripts, images
+
+
+def _prefix(page_rel):
+    depth = page_rel.count('/')
+    return '../' * depth
+
+
+def _paragraph(rng, words=60):
+    return ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize() + '.'
+
+
+def render_page(page_rel, layout, rng, assets):
+    """HTML for one synthetic page."""
+    styles, scripts, images = assets
+    up = _prefix(page_rel)
+    head = [
+        '<!DOCTYPE html>',
+        '<html lang="en"><head>',
+        '<meta charset="utf-8"/>',
+        f'<title>Synthetic {page_rel}</title>',
+        f'<link rel="stylesheet" href="{up}css/global.css?v=20251003">',
+    ]
+    head += [f'<link rel="stylesheet" href="{up}{path}?v=2025{rng.randrange(1000, 9999)}">'
+             for path in rng.sample(styles, min(len(styles), 4))]
+    head += [f'<script defer src="{up}{path}?v=2025{rng.randrange(1000, 9999)}"></script>'
+             for path in rng.sample(scripts, min(len(scripts), 6))]
+    head += [f'<script defer src="{up}assets/i18n.js?v=20260728"></script>',
+             f'<script defer src="{up}assets/i18n-runtime.js?v=20260728"></script>', '</head>', '<body>']
+
+    body = []
+    if layout == 'old_navbar':
+        body.append(STANDARD_NAVBAR)
+    elif layout == 'gb_navbar':
+        body.append(NEW_NAVBAR_CSS + NEW_NAVBAR_HTML)
+    elif layout == 'placeholder':
+        body.append(NAVBAR_COMPONENT)
+
+    target = rng.randrange(*BODY_BYTES)
+    size = 0
+    section = 0
+    while size < target:
+        image = rng.choice(images)
+        block = (
+            f'<section class="synthetic-{section}">\n'
+            f'  <h2 data-i18n="synthetic.s{section}.title">{_paragraph(rng, 6)}</h2>\n'
+            f'  <p data-i18n="synthetic.s{section}.body">{_paragraph(rng)}</p>\n'
+            f'  <img src="{up}{image}?v=20251025" alt="" width="640" height="360">\n'
+            f'  <a class="btn" href="{up}contact.html" data-i18n="synthetic.cta">Book a call</a>\n'
+            f'</section>\n'
+        )
+        body.append(block)
+        size += len(block)
+        section += 1
+
+    if layout == 'gb_navbar':
+        body.append(FOOTER_HTML)
+    elif layout == 'placeholder':
+        body.append(FOOTER_COMPONENT)
+    return '\n'.join(head + body + ['</body>', '</html>', ''])
+
+
+def generate_site(root, pages, seed=0, asset_count=60):
+    """Write a synthetic site with `pages` pages under `root`.
+
+    Returns `{'pages': n, 'html_bytes': total, 'layouts': {layout: n}}`.
+    """
+    root = Path(root)
+    rng = random.Random(seed)
+    assets = write_assets(root, asset_count, rng)
+    layouts = list(LAYOUT_WEIGHTS)
+    weights = list(LAYOUT_WEIGHTS.values())
+    sections = list(SITE_SECTIONS)
+
+    counts = dict.fromkeys(layouts, 0)
+    total = 0
+    for index in range(pages):
+        section = sections[index % len(sections)]
+        page_rel = f'page-{index:06d}.html' if section == '.' else f'{section}/page-{index:06d}.html'
+        layout = rng.choices(layouts, weights)[0]
+        html = render_page(page_rel, layout, rng, assets)
+        path = root / page_rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(html, encoding='utf-8')
+        counts[layout] += 1
+        total += len(html.encode('utf-8'))
+    return {'pages': pages, 'html_bytes': total, 'layouts': counts}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('root', type=Path, help='directory to write the site into')
+    parser.add_argument('--pages', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    info = generate_site(args.root, args.pages, args.seed)
+    print(f"🏗️  {info['pages']} pages, {info['html_bytes'] / 1e6:.1f} MB of HTML in {args.root}")
+    print('   ' + ', '.join(f'{layout}: {count}' for layout, count in info['layouts'].items()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,324 @@
+"""
+Third-party tags: tracking and vendor scripts loaded after interaction or idle.
+
+Pages load analytics, ads and pixel scripts next to their own code, and
+those compete for the network and the main thread during the first paint.
+`config/third-party-scripts.json` classifies them:
+
+- `lazy`: glob patterns matched against a script's root-relative path
+  (`js/tracking/*`) or, for external scripts, its URL without the query
+  (`https://www.googletagmanager.com/*`),
+- `early`: scripts a lazy pattern matches that must still load with the
+  page, each with the reason (the consent banner, UTM capture, scripts
+  inline handlers call).
+
+`defer_third_party` turns each lazy `<script src>` into an inert
+`<script type="text/plain" data-deferred-script data-src>` placeholder.
+`js/utils/deferred-scripts.js`, added to the page if it lacks it, swaps
+the placeholders back in, in document order, on the first
+interaction (pointer, key, touch, scroll) or once the page is idle after
+`load`. A lazy script is kept as it is, with the reason, when it is
+listed under `early`, when it blocks the parser and an inline or blocking
+script comes after it (that script may use it), and when it is local and
+writes the document, only waits for `DOMContentLoaded`, which has fired
+by the time it runs, or handles clicks, focus, input or submits: loaded
+late, it would miss the very interaction that loads it.
+
+Consent ordering is unchanged: the inline consent defaults and the early
+scripts still run first, and the tag loaders read the stored consent
+whenever they run. Inline snippets that inject tags themselves (the GTM
+container snippet) are not scripts with a `src` and are left alone.
+
+Placeholders and the loader carry `data-third-party`; placeholders are
+put back before every run, so changing the config re-classifies the
+pages. Each page reports the script requests and local bytes taken off
+the page load, and how many of those requests blocked the parser.
+
+    cd scripts/automation
+    python -m site_pipeline.third_party [--json]
+"""
+
+import argparse
+import fnmatch
+import functools
+import json
+import os
+import posixpath
+import re
+import sys
+from dataclasses import dataclass
+from functools import partial
+from pathlib import Path
+
+from .batch import (
+    CACHED,
+    FAILED,
+    NOT_FOUND,
+    REPO_ROOT,
+    UNCHANGED,
+    UPDATED,
+    PageResult,
+    discover_pages,
+    merge_results,
+)
+from .fingerprint import AssetManifest
+from .manifest import MANIFEST_DIR, BuildManifest, rules_digest, run_incremental
+from .profiling import PageProfile, add_profiling_arguments, finish_profiling, profiled_worker
+from .references import parse_attributes
+from .script_loading import BLOCKING, INLINE, scan_scripts
+
+# Hashed into rule digests so changes here rewrite every page
+THIRD_PARTY_SOURCE = Path(__file__)
+
+THIRD_PARTY_CONFIG = 'config/third-party-scripts.json'
+
+DEFERRED_SCRIPTS = 'js/utils/deferred-scripts.js'
+
+# Marks the placeholders and loader tags this stage owns
+OWNED = 'data-third-party'
+
+_PLACEHOLDER_PREFIX = f'<script type="text/plain" data-deferred-script {OWNED}'
+_PLACEHOLDER = re.compile(re.escape(_PLACEHOLDER_PREFIX) + r'((?:"[^"]*"|\'[^\']*\'|[^\'">])*)>')
+_OWNED_LOADER = re.compile(rf'[ \t]*<script\b[^>]*\b{OWNED}\b[^>]*>\s*</script\s*>\n?', re.IGNORECASE)
+_OPEN_TAG = re.compile(r'<script\b((?:"[^"]*"|\'[^\']*\'|[^\'">])*)>', re.IGNORECASE)
+_DOCUMENT_WRITE = re.compile(r'\bdocument\s*\.\s*write(?:ln)?\s*\(')
+_INTERACTION_LISTENER = re.compile(
+    r'\baddEventListener\s*\(\s*[\'"](?:click|submit|focusin|focus|input|change|pointerdown|keydown)[\'"]')
+
+
+@dataclass(frozen=True)
+class ThirdPartyConfig:
+    """The `lazy` patterns and the `early` scripts (pattern → reason)."""
+
+    lazy: tuple
+    early: dict
+
+    def classify(self, target):
+        """`(lazy, reason it stays early)` for a script path or URL."""
+        if not any(fnmatch.fnmatchcase(target, pattern) for pattern in self.lazy):
+            return False, None
+        reason = next((reason for pattern, reason in self.early.items()
+                       if fnmatch.fnmatchcase(target, pattern)), None)
+        return True, reason
+
+
+@functools.lru_cache(maxsize=8)
+def _load_config(path, mtime_ns):
+    data = json.loads(Path(path).read_text(encoding='utf-8'))
+    return ThirdPartyConfig(tuple(data.get('lazy', ())), dict(data.get('early', {})))
+
+
+def load_config(root):
+    """The site's `ThirdPartyConfig` (empty when it has no config file)."""
+    path = Path(root) / THIRD_PARTY_CONFIG
+    try:
+        return _load_config(str(path), path.stat().st_mtime_ns)
+    except FileNotFoundError:
+        return ThirdPartyConfig((), {})
+
+
+@functools.lru_cache(maxsize=512)
+def _late_traits(path, mtime_ns):
+    """`(size, reason it cannot run late)` of a local script."""
+    js = Path(path).read_text(encoding='utf-8', errors='replace')
+    reason = None
+    if _DOCUMENT_WRITE.search(js):
+        reason = 'document.write'
+    elif 'DOMContentLoaded' in js and 'readyState' not in js:
+        reason = 'waits for DOMContentLoaded'
+    elif _INTERACTION_LISTENER.search(js):
+        reason = 'handles the first interaction'
+    return Path(path).stat().st_size, reason
+
+
+def late_traits(root, rel):
+    """`_late_traits` of a root-relative script, None if it is not a file."""
+    path = Path(root) / rel
+    try:
+        return _late_traits(str(path), path.stat().st_mtime_ns)
+    except OSError:
+        return None
+
+
+def script_target(script):
+    """What config patterns match for `script`: its local path or external URL."""
+    if script.rel:
+        return script.rel
+    url = re.split(r'[?#]', script.src.strip(), maxsplit=1)[0]
+    return 'https:' + url if url.startswith('//') else url
+
+
+def restore_scripts(content):
+    """Put the original `<script src>` back for every placeholder this stage wrote."""
+    def restore(match):
+        attributes = re.sub(r'(\s)data-src(\s*=)', r'\1src\2', match.group(1), count=1)
+        attributes = re.sub(r'(\s)data-type(\s*=)', r'\1type\2', attributes, count=1)
+        return f'<script{attributes}>'
+    return _PLACEHOLDER.sub(restore, content)
+
+
+def deferred_scripts(content, page_rel, resolver):
+    """Root-relative paths of the local scripts a page loads through placeholders."""
+    scripts = []
+    for match in _PLACEHOLDER.finditer(content):
+        src = parse_attributes(match.group(1)).get('data-src', '').strip()
+        rel = resolver.resolve(re.split(r'[?#]', src, maxsplit=1)[0], page_rel) if src else None
+        if rel:
+            scripts.append(rel)
+    return scripts
+
+
+def _placeholder(tag):
+    open_tag = _OPEN_TAG.match(tag)
+    attributes = re.sub(r'(\s)src(\s*=)', r'\1data-src\2', open_tag.group(1), count=1)
+    attributes = re.sub(r'(\s)type(\s*=)', r'\1data-type\2', attributes, count=1)
+    return f'{_PLACEHOLDER_PREFIX}{attributes}>{tag[open_tag.end():]}'
+
+
+def defer_third_party(content, page_rel, resolver, config, notes=None, report=None):
+    """Load the page's lazy scripts after interaction or idle (see the module docstring).
+
+    `notes` collects one line per script deferred; `report` gets the
+    `requests`, `blocking` requests and local `bytes` deferred, and the
+    lazy scripts `kept` early with their reason.
+    """
+    notes = [] if notes is None else notes
+    report = {} if report is None else report
+    content = restore_scripts(content)
+    scripts = scan_scripts(content, page_rel, resolver)
+    lazy, kept = [], {}
+    # The first script after the current one that runs while parsing
+    parsed_after = None
+    for script in reversed(scripts):
+        if script.kind == INLINE:
+            line = content.count('\n', 0, script.start) + 1
+            parsed_after = f'the inline script on line {line}'
+            continue
+        matched, reason = config.classify(script_target(script)) if script.src else (False, None)
+        traits = late_traits(resolver.root, script.rel) if matched and script.rel else None
+        if matched and reason is None:
+            if script.kind == BLOCKING and parsed_after:
+                reason = f'runs before {parsed_after}'
+            elif traits is not None:
+                reason = traits[1]
+        if not matched or reason:
+            if reason:
+                kept[script.src] = reason
+            if script.kind == BLOCKING:
+                parsed_after = parsed_after or script.src
+            continue
+        lazy.append((script, traits[0] if traits else 0))
+    lazy.reverse()
+    report.update(requests=len(lazy), blocking=sum(script.kind == BLOCKING for script, _ in lazy),
+                  bytes=sum(size for _, size in lazy), kept=kept)
+    if not lazy:
+        return _OWNED_LOADER.sub('', content)
+
+    edits = []
+    for script, _ in lazy:
+        edits.append((script.start, script.end, _placeholder(content[script.start:script.end])))
+        notes.append(f'load {script.src} after interaction or idle')
+    if DEFERRED_SCRIPTS not in {script.rel for script in scripts}:
+        first = lazy[0][0]
+        line_start = content.rfind('\n', 0, first.start) + 1
+        indent = content[line_start:first.start]
+        # Root-absolute when the page's scripts are (404.html is served at any path)
+        if any(re.match(r'/(?!/)', script.src or '') for script in scripts):
+            src = '/' + DEFERRED_SCRIPTS
+        else:
+            src = posixpath.relpath(DEFERRED_SCRIPTS, posixpath.dirname(page_rel) or '.')
+        loader = f'<script defer src="{src}" {OWNED}></script>'
+        if indent.strip():
+            edits.append((first.start, first.start, loader))
+        else:
+            edits.append((line_start, line_start, f'{indent}{loader}\n'))
+        notes.append(f'add {DEFERRED_SCRIPTS}')
+    notes.append(f"deferred {report['requests']} script requests ({report['blocking']} blocking), "
+                 f"{report['bytes']} bytes")
+    out = []
+    pos = 0
+    for start, end, text in sorted(edits, key=lambda edit: edit[:2]):
+        out.append(content[pos:start])
+        out.append(text)
+        pos = end
+    out.append(content[pos:])
+    return ''.join(out)
+
+
+def process_page(path, root):
+    """Worker: defer one page's third-party scripts."""
+    path = Path(path)
+    rel = Path(os.path.relpath(path, root)).as_posix()
+    if not path.exists():
+        return PageResult(str(path), NOT_FOUND, f"⚠️  {rel} not found")
+    try:
+        content = path.read_text(encoding='utf-8')
+        resolver = AssetManifest(root)
+        config = load_config(root)
+        profile = PageProfile()
+        notes, report = [], {}
+        updated = profile.run('third_party_defer', defer_third_party, content, rel, resolver, config,
+                              notes, report)
+        profile.annotate(notes)
+        stats = {'profile': profile.as_list(), 'third_party': report}
+        if updated == content:
+            return PageResult(str(path), UNCHANGED, f"✓ {rel}: third-party scripts unchanged", stats=stats)
+        path.write_text(updated, encoding='utf-8')
+        return PageResult(str(path), UPDATED, f"✅ {rel}: {report['requests']} script requests deferred "
+                          f"({report['blocking']} blocking), {report['bytes'] / 1024:.1f} KB", stats=stats)
+    except Exception as e:
+        return PageResult(str(path), FAILED, f"❌ Error in {rel}: {e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load tracking and third-party scripts after interaction or idle')
+    parser.add_argument('--root', type=Path, default=REPO_ROOT)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--force', action='store_true', help='rewrite pages the last run already handled')
+    parser.add_argument('--json', action='store_true', help='print the per-page report as JSON')
+    add_profiling_arguments(parser)
+    args = parser.parse_args()
+    root = args.root
+    if not (root / THIRD_PARTY_CONFIG).is_file():
+        parser.error(f'{root / THIRD_PARTY_CONFIG} does not exist')
+
+    scripts = {rel: version for rel, version in AssetManifest.build(root).versions.items() if rel.endswith('.js')}
+    rules = rules_digest(THIRD_PARTY_SOURCE, root / THIRD_PARTY_CONFIG, json.dumps(scripts, sort_keys=True))
+    manifest = BuildManifest(root / MANIFEST_DIR / 'third-party.json', root, rules)
+    if args.force:
+        manifest.pages = {}
+    pages = discover_pages(root)
+    results = run_incremental(profiled_worker(partial(process_page, root=root), args), pages, args.workers,
+                              manifest)
+
+    reports = {
+        Path(os.path.relpath(result.page, root)).as_posix(): result.stats['third_party']
+        for result in results if 'third_party' in result.stats
+    }
+    if args.json:
+        print(json.dumps(reports, indent=2))
+        return
+
+    for result in results:
+        if result.status in (UPDATED, FAILED):
+            print(result.message)
+    print("\n🏷️  Third-party script requests deferred per page (blocking, KB):")
+    for page, report in reports.items():
+        if report['requests'] or report['kept']:
+            reasons = ', '.join(dict.fromkeys(report['kept'].values()))
+            print(f"   {page}: {report['requests']} ({report['blocking']} blocking, "
+                  f"{report['bytes'] / 1024:.1f} KB)" + (f" (kept: {reasons})" if reasons else ''))
+
+    summary = merge_results(results)
+    print(f"\n📦 {summary[UPDATED]} pages updated, {summary[UNCHANGED]} unchanged, {summary[CACHED]} skipped; "
+          f"{sum(report['requests'] for report in reports.values())} script requests "
+          f"({sum(report['blocking'] for report in reports.values())} blocking, "
+          f"{sum(report['bytes'] for report in reports.values()) / 1024:.1f} KB) "
+          f"deferred on the pages processed")
+    finish_profiling(args, results)
+    if summary[FAILED]:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
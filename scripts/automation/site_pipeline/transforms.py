@@ -0,0 +1,148 @@
+"""
+Built-in pipeline transforms.
+
+Registered in the order they run. The navbar edits come first (old
+navbar → standard or new navbar, stylesheet link, body insertion), then
+componentization (hand-written navbar/footer → placeholders or pre-rendered
+components), loader injection, script deferral, third-party tag deferral,
+resource hints, and cache busting last so it also versions whatever the
+earlier transforms inserted.
+"""
+
+import re
+from pathlib import Path
+
+from .components import (
+    COMPONENTS_SOURCE,
+    FOOTER_PATTERN,
+    I18N_SCRIPT_PATTERN,
+    LOADER_SCRIPT,
+    NAVBAR_PATTERN,
+    PLACEHOLDERS,
+    PRERENDERED_PATTERN,
+    placeholder_for_block,
+    prerender_rules,
+    prerendered_block,
+)
+from .engine import Rule, SinglePassEngine
+from .fingerprint import fingerprint_content
+from .hints import HINTS_SOURCE, resource_hints
+from .markers import MARKERS, any_of
+from .navbar import (
+    NAVBAR_SOURCE,
+    ensure_css_linked,
+    has_new_navbar,
+    insert_new_navbar,
+    replace_old_navbar,
+    standardize_navbar,
+)
+from .pipeline import ASSETS, COMPONENTS, register
+from .script_loading import SCRIPT_LOADING_SOURCE, defer_scripts
+from .third_party import THIRD_PARTY_CONFIG, THIRD_PARTY_SOURCE, defer_third_party, load_config
+
+TRANSFORMS_SOURCE = Path(__file__)
+
+_NAVBAR = (TRANSFORMS_SOURCE, NAVBAR_SOURCE)
+_COMPONENTS = (TRANSFORMS_SOURCE, COMPONENTS_SOURCE)
+
+# Markers of a page that already shows a navbar, whatever its generation
+_ANY_NAVBAR = ('gb_navbar', 'old_navbar', 'navbar_placeholder', 'prerendered_navbar')
+
+# Hand-written (or previously pre-rendered) navbar/footer → runtime placeholders
+_PLACEHOLDER_ENGINE = SinglePassEngine([
+    Rule('prerendered_component', PRERENDERED_PATTERN, placeholder_for_block, flags=re.DOTALL),
+    Rule('navbar', NAVBAR_PATTERN, lambda _: PLACEHOLDERS['navbar'], once=True),
+    Rule('footer', FOOTER_PATTERN.pattern, lambda _: PLACEHOLDERS['footer'], flags=re.DOTALL, once=True),
+])
+
+_LOADER_ENGINE = SinglePassEngine([
+    Rule('component_loader', I18N_SCRIPT_PATTERN, lambda text: text + '\n' + LOADER_SCRIPT, once=True,
+         when=lambda content: 'component-loader.js' not in content),
+])
+
+
+@register('standardize_navbar', 'old <nav class="navbar"> → the standard navbar, current page active',
+          sources=_NAVBAR, when=any_of('old_navbar'))
+def standardize_navbar_transform(content, page):
+    return standardize_navbar(content, page.name)
+
+
+@register('css_link', 'link css/enhanced-navbar.css after css/global.css', sources=_NAVBAR,
+          when=lambda markers: 'enhanced_navbar_css' not in markers)
+def css_link_transform(content, page):
+    return ensure_css_linked(content)
+
+
+@register('navbar_upgrade', 'old <nav class="navbar"> → the new gb-navbar and its CSS (update-navbar.py)',
+          sources=_NAVBAR, when=lambda markers: 'old_navbar' in markers and 'gb_navbar' not in markers)
+def navbar_upgrade_transform(content, page):
+    if has_new_navbar(content):
+        return content
+    return replace_old_navbar(content) or content
+
+
+@register('navbar_insert', 'pages without any navbar get the gb-navbar after <body> '
+          '(update-navbar-additional.py)', sources=_NAVBAR,
+          when=lambda markers: 'body' in markers and markers.isdisjoint(_ANY_NAVBAR))
+def navbar_insert_transform(content, page):
+    # A placeholder, a pre-rendered component or the old navbar is a navbar too
+    if any(MARKERS[name] in content for name in _ANY_NAVBAR):
+        return content
+    return insert_new_navbar(content) or content
+
+
+@register('components', 'navbar/footer markup → data-component placeholders (apply-components.py)',
+          sources=_COMPONENTS, conflicts=('prerender_components',),
+          when=any_of('gb_navbar_element', 'gb_footer_element', 'prerendered_navbar', 'prerendered_footer'))
+def components_transform(content, page):
+    return _PLACEHOLDER_ENGINE.apply(content)
+
+
+@register('prerender_components', 'navbar/footer markup and placeholders → components/ inlined '
+          '(apply-components.py --inline)', needs=(COMPONENTS,), sources=_COMPONENTS,
+          conflicts=('components',),
+          when=any_of('gb_navbar_element', 'gb_footer_element', 'prerendered_navbar', 'prerendered_footer',
+                      'navbar_placeholder', 'footer_placeholder'))
+def prerender_components_transform(content, page):
+    navbar = PLACEHOLDERS['navbar']
+    footer = PLACEHOLDERS['footer']
+    if 'navbar' in page.components:
+        navbar = prerendered_block('navbar', page.components['navbar'], page.rel) + '\n\n'
+    if 'footer' in page.components:
+        footer = prerendered_block('footer', page.components['footer'], page.rel) + '\n\n'
+    return SinglePassEngine([
+        *prerender_rules(page.components, page.rel),
+        Rule('navbar', NAVBAR_PATTERN, lambda _: navbar, once=True),
+        Rule('footer', FOOTER_PATTERN.pattern, lambda _: footer, flags=re.DOTALL, once=True),
+    ]).apply(content)
+
+
+@register('loader', 'add js/utils/component-loader.js after the i18n script', sources=_COMPONENTS,
+          when=lambda markers: 'i18n_script' in markers and 'component_loader' not in markers)
+def loader_transform(content, page):
+    return _LOADER_ENGINE.apply(content)
+
+
+@register('script_defer', 'defer render-blocking scripts when no later script depends on them running early',
+          needs=(ASSETS,), sources=(TRANSFORMS_SOURCE, SCRIPT_LOADING_SOURCE))
+def script_defer_transform(content, page):
+    return defer_scripts(content, page.rel, page.assets, page.notes)
+
+
+@register('third_party_defer', 'load tracking and third-party scripts (config/third-party-scripts.json) after '
+          'the first interaction or idle', needs=(ASSETS,),
+          sources=(TRANSFORMS_SOURCE, THIRD_PARTY_SOURCE), root_sources=(THIRD_PARTY_CONFIG,))
+def third_party_defer_transform(content, page):
+    return defer_third_party(content, page.rel, page.assets, load_config(page.assets.root), page.notes)
+
+
+@register('resource_hints', 'preconnect/preload hints for what the page loads, fetchpriority on the top image, '
+          'lazy/async images below it', needs=(ASSETS,), sources=(TRANSFORMS_SOURCE, HINTS_SOURCE))
+def resource_hints_transform(content, page):
+    return resource_hints(content, page.rel, page.assets.root, page.notes)
+
+
+@register('cache_busting', 'set ?v=<content hash> on every local asset reference', needs=(ASSETS,),
+          sources=(TRANSFORMS_SOURCE,))
+def cache_busting_transform(content, page):
+    return fingerprint_content(content, page.assets, page.rel)
@@ -0,0 +1,265 @@
+"""
+Watch mode: re-apply pipeline transforms as the site is edited.
+
+The watcher tracks every page, `components/*.html` and every local asset
+the pages reference. A burst of edits is debounced into one change set,
+and only what it affects is rebuilt:
+
+- an edited or new page gets every selected transform,
+- an edited component re-runs the transforms that need `COMPONENTS` on the
+  pages that use it (placeholder, pre-rendered block or hand-written markup),
+- an edited asset re-runs the transforms that need `ASSETS` on the pages
+  that reference it.
+
+Who uses what comes from the reference index (`references.py`), which
+is refreshed for the pages each round rewrites.
+
+Transforms run from the first affected one to the end of the selection,
+so later transforms (cache busting) also see what the earlier ones
+re-inserted. Changes are detected by comparing size/mtime snapshots. On
+Linux the watcher blocks on inotify between scans; elsewhere, or with
+`poll=True`, it rescans every `interval` seconds. The pages the run writes
+itself are re-snapshotted so they do not trigger another round.
+
+Transform code is not watched: restart after editing the pipeline itself.
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import sys
+import time
+from pathlib import Path
+
+from .batch import FAILED, UPDATED, discover_pages, glob_pages
+from .components import COMPONENT_NAMES, load_components
+from .fingerprint import AssetManifest
+from .pipeline import ASSETS, COMPONENTS, pipeline_digest, run_pipeline
+from .references import ReferenceIndex, component_path
+
+# Debounce window (seconds): a change set closes after this much quiet
+DEBOUNCE = 0.3
+
+# Rescan period (seconds) of the polling watcher
+POLL_INTERVAL = 1.0
+
+def plan_rebuild(changed, transforms, index, pages):
+    """`{page rel: first transform index}` to re-run for a set of changed paths.
+
+    `changed` and `pages` are root-relative; a page listed under several
+    causes keeps the earliest transform.
+    """
+    def first(need=None):
+        for index, transform in enumerate(transforms):
+            if need is None or need in transform.needs:
+                return index
+        return None
+
+    plan = {}
+
+    def add(targets, index):
+        if index is None:
+            return
+        for page in targets:
+            plan[page] = min(index, plan.get(page, index))
+
+    component_files = {component_path(name): name for name in COMPONENT_NAMES}
+    for rel in changed:
+        if rel in pages:
+            add([rel], first())
+        elif rel in component_files:
+            add(index.referrers(component_files[rel], 'components'), first(COMPONENTS))
+        else:
+            add(index.referrers(rel, 'assets'), first(ASSETS))
+    return {page: index for page, index in plan.items() if page in pages}
+
+
+def _stamp(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+class PollingWaiter:
+    """Sleeps between scans."""
+
+    def __init__(self, interval=POLL_INTERVAL):
+        self.interval = interval
+
+    def watch(self, directories):
+        pass
+
+    def wait(self, timeout):
+        time.sleep(min(timeout, self.interval))
+
+    def close(self):
+        pass
+
+
+class InotifyWaiter:
+    """Blocks until something changes in a watched directory (Linux)."""
+
+    # IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+    MASK = 0x002 | 0x004 | 0x008 | 0x040 | 0x080 | 0x100 | 0x200
+
+    def __init__(self):
+        self.libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        self.directories = set()
+
+    def watch(self, directories):
+        for directory in set(map(str, directories)) - self.directories:
+            if self.libc.inotify_add_watch(self.fd, os.fsencode(directory), self.MASK) >= 0:
+                self.directories.add(directory)
+
+    def wait(self, timeout):
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if ready:
+            try:
+                while os.read(self.fd, 65536):
+                    pass
+            except BlockingIOError:
+                pass
+
+    def close(self):
+        os.close(self.fd)
+
+
+def make_waiter(poll=False, interval=POLL_INTERVAL):
+    """inotify where available, polling otherwise."""
+    if not poll and sys.platform.startswith('linux'):
+        try:
+            return InotifyWaiter()
+        except (OSError, AttributeError):
+            pass
+    return PollingWaiter(interval)
+
+
+class Watcher:
+    """Keeps a site's pages current with a transform selection."""
+
+    def __init__(self, root, transforms, manifest, assets=None, components=None, page_globs=(),
+                 workers=None, poll=False, interval=POLL_INTERVAL, debounce=DEBOUNCE, log=print):
+        self.root = Path(root)
+        self.transforms = transforms
+        self.manifest = manifest
+        self.page_globs = page_globs
+        self.workers = workers
+        self.interval = interval
+        self.debounce = debounce
+        self.log = log
+        self.waiter = make_waiter(poll, interval)
+        self.index = ReferenceIndex(root)
+        self.stamps = {}
+        self.assets = assets
+        self.components = components
+
+    def pages(self):
+        if self.page_globs:
+            return glob_pages(self.root, self.page_globs)
+        return discover_pages(self.root)
+
+    def watched(self):
+        """Root-relative paths whose changes matter right now."""
+        paths = {self.index.rel(page) for page in self.pages()}
+        paths.update(component_path(name) for name in COMPONENT_NAMES)
+        paths.update(self.index.targets('assets'))
+        return paths
+
+    def load_shared_data(self):
+        needs = set().union(*(transform.needs for transform in self.transforms))
+        self.assets = AssetManifest.build(self.root) if ASSETS in needs else None
+        self.components = load_components(self.root) if COMPONENTS in needs else None
+        self.manifest.rules = pipeline_digest(self.transforms, self.root, self.assets)
+
+    def snapshot(self, paths):
+        for rel in paths:
+            self.stamps[rel] = _stamp(self.root / rel)
+
+    def scan(self):
+        """Watched paths whose size/mtime changed since the last snapshot."""
+        watched = self.watched()
+        changed = {rel for rel in watched if _stamp(self.root / rel) != self.stamps.get(rel)}
+        changed.update(rel for rel in set(self.stamps) - watched if self.stamps[rel] is not None)
+        self.snapshot(changed)
+        self.waiter.watch({(self.root / rel).parent for rel in watched if (self.root / rel).parent.is_dir()})
+        return changed
+
+    def run(self, pages, transforms):
+        return run_pipeline(pages, transforms, self.root, self.workers, self.manifest,
+                            self.assets, self.components)
+
+    def start(self):
+        """Bring every page up to date and take the first snapshot.
+
+        Uses the `assets`/`components` the watcher was created with (from
+        `load_shared_data`); later rebuilds reload them when they change.
+        """
+        pages = self.pages()
+        results = self.run(pages, self.transforms)
+        self.index = ReferenceIndex.build(self.root, workers=self.workers)
+        self.index.save()
+        self.scan()
+        return results
+
+    def rebuild(self, changed):
+        """Re-run what `changed` affects; returns the PageResults."""
+        if any(not rel.endswith('.html') or rel.startswith('components/') for rel in changed):
+            self.load_shared_data()
+        pages = {self.index.rel(page) for page in self.pages()}
+        for rel in changed:
+            if rel.endswith('.html') and rel not in pages:
+                self.manifest.forget(self.root / rel)
+
+        plan = plan_rebuild(changed, self.transforms, self.index, pages)
+        results = []
+        for first in sorted(set(plan.values())):
+            targets = sorted(self.root / page for page, offset in plan.items() if offset == first)
+            for page in targets:
+                self.manifest.forget(page)
+            start = time.perf_counter()
+            batch = self.run(targets, self.transforms[first:])
+            elapsed = time.perf_counter() - start
+            names = ', '.join(transform.name for transform in self.transforms[first:])
+            written = sum(result.status == UPDATED for result in batch)
+            self.log(f"🔁 {names}: {len(targets)} pages, {written} written ({elapsed:.2f} s)")
+            results.extend(batch)
+
+        self.manifest.save()
+        rescan = {rel for rel in changed if rel.endswith('.html')} | set(plan)
+        self.index.update(sorted(self.root / rel for rel in rescan), workers=1)
+        self.index.save()
+        self.snapshot(self.index.rel(result.page) for result in results)
+        return results
+
+    def next_changes(self):
+        """Block until something changes, then collect the whole burst."""
+        changed = self.scan()
+        while not changed:
+            self.waiter.wait(self.interval)
+            changed = self.scan()
+        while True:
+            self.waiter.wait(self.debounce)
+            more = self.scan()
+            if not more:
+                return changed
+            changed |= more
+
+    def loop(self):
+        """Rebuild after every debounced change set until interrupted."""
+        try:
+            while True:
+                changed = self.next_changes()
+                self.log(f"✏️  {', '.join(sorted(changed))}")
+                for result in self.rebuild(changed):
+                    if result.status in (UPDATED, FAILED):
+                        self.log(result.message)
+        except KeyboardInterrupt:
+            self.log("👋 Stopped watching")
+        finally:
+            self.waiter.close()
@@ -2,38 +2,29 @@
 # This script will update all HTML pages with the same navbar structure
 
 import os
-import re
-
-# Standard navbar HTML (exact structure to use)
-STANDARD_NAVBAR = '''<nav class="navbar">
-  <div class="container inner">
-    <a class="brand" href="index.html" style="display:flex;align-items:center;gap:14px;min-height:56px;">
-      <img src="Logo Files/For Web/logo-nobackground-500.png" alt="Garcia Builder Logo" decoding="async" loading="eager" style="height: 48px;"/>
-      <span class="title-gradient" style="font-size:2rem;line-height:1.1;font-weight:800;">Garcia Builder</span>
-    </a>
-    <nav class="nav">
-      <a data-i18n="nav.home" href="index.html">Home</a>
-      <a data-i18n="nav.about" href="about.html">About</a>
-      <a data-i18n="nav.trans" href="transformations.html">Transformations</a>
-      <a data-i18n="nav.testi" href="testimonials.html">Testimonials</a>
-      <a data-i18n="nav.pricing" href="pricing.html">Pricing</a>
-      <a data-i18n="nav.blog" href="blog.html" style="display:none;">Blog</a>
-      <a data-i18n="nav.faq" href="faq.html">FAQ</a>
-      <a data-i18n="nav.contact" href="contact.html">Contact</a>
-    </nav>
-
-    <!-- Auth buttons will be dynamically inserted here by auth-guard.js -->
-    <div id="auth-buttons"></div>
-
-    <div class="lang">
-      <select id="lang-select">
-        <option data-i18n="nav.lang.en" value="en">EN</option>
-        <option data-i18n="nav.lang.pt" value="pt">PT</option>
-        <option data-i18n="nav.lang.es" value="es">ES</option>
-      </select>
-    </div>
-  </div>
-</nav>'''
+from pathlib import Path
+
+from site_pipeline import (
+    CACHED,
+    FAILED,
+    NOT_FOUND,
+    UNCHANGED,
+    UPDATED,
+    PageResult,
+    make_parser,
+    manifest_for,
+    merge_results,
+    resolve_pages,
+    rules_digest,
+    run_incremental,
+)
+from site_pipeline.navbar import NAVBAR_SOURCE, ensure_css_linked, standardize_navbar
+from site_pipeline.profiling import (
+    PageProfile,
+    add_profiling_arguments,
+    finish_profiling,
+    profiled_worker,
+)
 
 # Pages to update
 PAGES = [
@@ -47,80 +38,56 @@ PAGES = [
     'blog.html'
 ]
 
-# CSS to ensure is included
-CSS_LINK = '<link rel="stylesheet" href="css/enhanced-navbar.css?v=20251008">'
-
-def standardize_navbar(html_content, page_name):
-    """Replace existing navbar with standard one"""
-
-    # Find and replace navbar (pattern matches from <nav class="navbar"> to </nav>)
-    pattern = r'<nav class="navbar">.*?</nav>'
-
-    # Add active class to current page
-    navbar = STANDARD_NAVBAR
-    page_key = page_name.replace('.html', '')
-
-    # Add active class based on page
-    if page_key == 'index':
-        navbar = navbar.replace('href="index.html">Home', 'href="index.html" class="active">Home')
-    elif page_key in navbar:
-        navbar = navbar.replace(f'href="{page_name}"', f'href="{page_name}" class="active"')
-
-    # Replace navbar
-    html_content = re.sub(pattern, navbar, html_content, flags=re.DOTALL)
-
-    return html_content
-
-def ensure_css_linked(html_content):
-    """Ensure enhanced-navbar.css is linked"""
-    if 'enhanced-navbar.css' not in html_content:
-        # Find css/global.css and add after it
-        html_content = html_content.replace(
-            '<link rel="stylesheet" href="css/global.css',
-            f'<link rel="stylesheet" href="css/global.css'
-        )
-        html_content = html_content.replace(
-            '<link rel="stylesheet" href="css/global.css">',
-            f'<link rel="stylesheet" href="css/global.css">\n    {CSS_LINK}'
-        )
-        html_content = html_content.replace(
-            '<link href="css/global.css?v=20251003-2030" rel="stylesheet"/>',
-            f'<link href="css/global.css?v=20251003-2030" rel="stylesheet"/>\n{CSS_LINK}'
-        )
-    return html_content
+def standardize_page(filepath):
+    """Standardize the navbar of one page and return a PageResult"""
+    page = os.path.basename(filepath)
+    if not os.path.exists(filepath):
+        return PageResult(str(filepath), NOT_FOUND, f"⚠️  {page} not found")
 
-def main():
-    updated_files = []
+    try:
+        with open(filepath, 'r', encoding='utf-8') as f:
+            original = f.read()
+
+        # Standardize navbar
+        profile = PageProfile()
+        content = profile.run('standardize_navbar', standardize_navbar, original, page,
+                              matches=lambda before, _: before.count('<nav class="navbar">'))
 
-    for page in PAGES:
-        if not os.path.exists(page):
-            print(f"⚠️  {page} not found")
-            continue
+        # Ensure CSS is linked
+        content = profile.run('css_link', ensure_css_linked, content)
 
-        print(f"📝 Processing {page}...")
+        stats = {'profile': profile.as_list()}
+        if content == original:
+            return PageResult(str(filepath), UNCHANGED, f"✓ {page} already standard", stats=stats)
 
-        try:
-            with open(page, 'r', encoding='utf-8') as f:
-                content = f.read()
+        with open(filepath, 'w', encoding='utf-8') as f:
+            f.write(content)
 
-            # Standardize navbar
-            content = standardize_navbar(content, page)
+        return PageResult(str(filepath), UPDATED, f"📝 Processing {page}...\n✅ {page} updated!", stats=stats)
 
-            # Ensure CSS is linked
-            content = ensure_css_linked(content)
+    except Exception as e:
+        return PageResult(str(filepath), FAILED, f"📝 Processing {page}...\n❌ Error processing {page}: {e}")
 
-            with open(page, 'w', encoding='utf-8') as f:
-                f.write(content)
+def main():
+    args = add_profiling_arguments(make_parser('Standardize the navbar across HTML pages')).parse_args()
+    pages = resolve_pages(args, PAGES)
 
-            updated_files.append(page)
-            print(f"✅ {page} updated!")
+    manifest = manifest_for(args, 'standardize-navbar', rules_digest(Path(__file__), NAVBAR_SOURCE))
+    results = run_incremental(profiled_worker(standardize_page, args), pages, args.workers, manifest)
+    for result in results:
+        print(result.message)
 
-        except Exception as e:
-            print(f"❌ Error processing {page}: {e}")
+    updated_files = [os.path.relpath(r.page, args.root) for r in results if r.status == UPDATED]
+    summary = merge_results(results)
 
     print(f"\n🎉 Successfully updated {len(updated_files)} files:")
     for file in updated_files:
         print(f"   - {file}")
+    if summary[UNCHANGED] or summary[CACHED]:
+        print(f"✓ {summary[UNCHANGED]} already standard, {summary[CACHED]} cached")
+    if summary[FAILED]:
+        print(f"❌ {summary[FAILED]} files failed")
+    finish_profiling(args, results)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,19 @@
+// Resize and encode one image variant with sharp, for the image stage
+// (scripts/automation/site_pipeline/images.py), which owns the markup and the cache.
+//
+//   node scripts/encode-image.mjs --formats
+//   node scripts/encode-image.mjs <source> <target> <width> <avif|webp> <quality>
+import sharp from 'sharp';
+
+const args = process.argv.slice(2);
+
+if (args[0] === '--formats') {
+  console.log(['avif', 'webp'].filter((format) => sharp.format[format]?.output?.file).join(' '));
+} else {
+  const [source, target, width, format, quality] = args;
+  await sharp(source)
+    .rotate()
+    .resize({ width: Number(width), withoutEnlargement: true })
+    .toFormat(format, { quality: Number(quality) })
+    .toFile(target);
+}
@@ -0,0 +1,97 @@
+#!/usr/bin/env node
+/**
+ * Writes assets/i18n/{en,pt,es}.json from the dictionaries in assets/i18n.js,
+ * so build steps that cannot run the i18n runtime (the Python site pipeline)
+ * read the same strings visitors see. Keys only the JSON files have are kept;
+ * where both define a key, assets/i18n.js wins. The translations of untagged
+ * page text (STATIC_TEXT_TRANSLATIONS) go to assets/i18n/static-text.json.
+ */
+
+const fs = require('fs');
+const path = require('path');
+const vm = require('vm');
+
+const root = path.join(__dirname, '..');
+const i18nPath = path.join(root, 'assets', 'i18n.js');
+const outputDir = path.join(root, 'assets', 'i18n');
+const langs = ['en', 'pt', 'es'];
+
+function loadDicts() {
+  const sandbox = {
+    window: {},
+    document: {
+      addEventListener() {},
+      querySelectorAll() {
+        return [];
+      },
+      body: null,
+    },
+    localStorage: {
+      getItem() {
+        return null;
+      },
+      setItem() {},
+      removeItem() {},
+    },
+    navigator: { language: 'en' },
+    MutationObserver: function MutationObserver() {},
+    NodeFilter: { SHOW_TEXT: 4 },
+    setTimeout,
+  };
+
+  vm.runInNewContext(fs.readFileSync(i18nPath, 'utf8'), sandbox, {
+    filename: i18nPath,
+  });
+
+  if (!sandbox.window.DICTS || typeof sandbox.window.DICTS !== 'object') {
+    throw new Error('assets/i18n.js did not expose window.DICTS.');
+  }
+
+  return {
+    dicts: sandbox.window.DICTS,
+    staticText: sandbox.window.GB_I18N_STATIC_TEXT || {},
+  };
+}
+
+function isObject(value) {
+  return Boolean(value) && typeof value === 'object' && !Array.isArray(value);
+}
+
+function merge(base, override) {
+  const merged = {};
+  for (const key of Object.keys(override)) {
+    merged[key] = isObject(base[key]) && isObject(override[key])
+      ? merge(base[key], override[key])
+      : override[key];
+  }
+  for (const key of Object.keys(base)) {
+    if (!(key in merged)) merged[key] = base[key];
+  }
+  return merged;
+}
+
+function readJson(file) {
+  try {
+    return JSON.parse(fs.readFileSync(file, 'utf8'));
+  } catch (error) {
+    if (error.code === 'ENOENT') return {};
+    throw error;
+  }
+}
+
+const { dicts, staticText } = loadDicts();
+fs.mkdirSync(outputDir, { recursive: true });
+
+for (const lang of langs) {
+  if (!isObject(dicts[lang])) {
+    throw new Error(`assets/i18n.js has no "${lang}" dictionary.`);
+  }
+  const file = path.join(outputDir, `${lang}.json`);
+  const merged = merge(readJson(file), dicts[lang]);
+  fs.writeFileSync(file, `${JSON.stringify(merged, null, 2)}\n`);
+  console.log(`✅ ${path.relative(root, file)}`);
+}
+
+const staticFile = path.join(outputDir, 'static-text.json');
+fs.writeFileSync(staticFile, `${JSON.stringify(staticText, null, 2)}\n`);
+console.log(`✅ ${path.relative(root, staticFile)}`);
@@ -0,0 +1,195 @@
+'use strict';
+
+// assets/i18n-runtime.js over both dictionary scripts it reads, loaded in page
+// order on a small stub DOM: assets/i18n.js (every dictionary) and
+// assets/i18n-lite.js (the page's bundles, fetched per language). The page has
+// to translate, and keep its English when a bundle cannot be fetched.
+const assert = require('assert');
+const fs = require('fs');
+const path = require('path');
+const vm = require('vm');
+
+const root = path.resolve(__dirname, '..');
+
+function read(rel) {
+  return fs.readFileSync(path.join(root, rel), 'utf8');
+}
+
+// Just the DOM the runtime touches: attributes, text nodes and a text walker
+class Element {
+  constructor(tagName, attributes = {}, text = '') {
+    this.tagName = tagName.toUpperCase();
+    this.attributes = new Map(Object.entries(attributes));
+    this.dataset = {};
+    this.parentElement = null;
+    this.childNodes = [];
+    if (text) this.textContent = text;
+  }
+
+  append(child) {
+    child.parentElement = this;
+    this.childNodes.push(child);
+    return child;
+  }
+
+  get textContent() {
+    return this.childNodes.map((node) => (node instanceof Element ? node.textContent : node.nodeValue)).join('');
+  }
+
+  set textContent(value) {
+    this.childNodes = [];
+    this.append({ nodeValue: String(value), parentElement: null });
+  }
+
+  getAttribute(name) {
+    return this.attributes.has(name) ? this.attributes.get(name) : null;
+  }
+
+  setAttribute(name, value) {
+    this.attributes.set(name, String(value));
+  }
+
+  hasAttribute(name) {
+    return this.attributes.has(name);
+  }
+
+  addEventListener() {}
+
+  descendants() {
+    return this.childNodes.filter((node) => node instanceof Element).flatMap((node) => [node, ...node.descendants()]);
+  }
+
+  textNodes() {
+    return this.childNodes.flatMap((node) => (node instanceof Element ? node.textNodes() : [node]));
+  }
+}
+
+function matches(el, selector) {
+  return selector.split(',').some((part) => el.hasAttribute(part.trim().slice(1, -1)));
+}
+
+function createPage(paragraphs, { lang = null, fetch = null, script = {} } = {}) {
+  const body = new Element('body');
+  const elements = {};
+  for (const [name, attributes, text] of paragraphs) elements[name] = body.append(new Element('p', attributes, text));
+  const listeners = {};
+  const storage = lang ? { gb_lang: lang } : {};
+  const warnings = [];
+  const document = {
+    body,
+    currentScript: null,
+    addEventListener: (type, listener) => (listeners[type] = listeners[type] || []).push(listener),
+    dispatchEvent: (event) => (listeners[event.type] || []).forEach((listener) => listener(event)),
+    getElementById: () => null,
+    querySelectorAll: (selector) => body.descendants().filter((el) => matches(el, selector)),
+    createTreeWalker: (start) => {
+      const nodes = start.textNodes();
+      return {
+        currentNode: null,
+        nextNode() {
+          this.currentNode = nodes.shift() || null;
+          return this.currentNode;
+        }
+      };
+    }
+  };
+  const context = {
+    console: { log: console.log, warn: (...args) => warnings.push(args) },
+    document,
+    Event: class { constructor(type) { this.type = type; } },
+    fetch,
+    localStorage: {
+      getItem: (key) => (key in storage ? storage[key] : null),
+      setItem: (key, value) => { storage[key] = String(value); }
+    },
+    NodeFilter: { SHOW_TEXT: 4 },
+    Promise,
+    setTimeout
+  };
+  context.window = context;
+  vm.createContext(context);
+  return {
+    context,
+    elements,
+    warnings,
+    // The dictionary script, then the runtime, as the pages load them
+    load(dictionaries) {
+      document.currentScript = new Element('script', script);
+      vm.runInContext(read(dictionaries), context, { filename: dictionaries });
+      document.currentScript = null;
+      vm.runInContext(read('assets/i18n-runtime.js'), context, { filename: 'assets/i18n-runtime.js' });
+    },
+    ready: () => document.dispatchEvent({ type: 'DOMContentLoaded' })
+  };
+}
+
+const settle = () => new Promise((resolve) => setImmediate(resolve));
+
+// --- assets/i18n.js: every dictionary in the script ---
+
+const probe = createPage([]);
+probe.load('assets/i18n.js');
+const { DICTS, GB_I18N_STATIC_TEXT } = probe.context;
+const key = ['hero.title', 'nav.home', 'footer.rights'].find((name) => {
+  const en = name.split('.').reduce((value, part) => value && value[part], DICTS.en);
+  const pt = name.split('.').reduce((value, part) => value && value[part], DICTS.pt);
+  return typeof en === 'string' && typeof pt === 'string' && en !== pt;
+});
+assert.ok(key, 'assets/i18n.js should translate a common key to pt');
+const english = key.split('.').reduce((value, part) => value[part], DICTS.en);
+const portuguese = key.split('.').reduce((value, part) => value[part], DICTS.pt);
+const [untagged, untaggedPt] = Object.entries(GB_I18N_STATIC_TEXT.pt).find(([source, text]) => !/\s{2}/.test(source) && source !== text);
+
+(async () => {
+  const full = createPage([['tagged', { 'data-i18n': key }, english], ['untagged', {}, untagged]]);
+  full.load('assets/i18n.js');
+  assert.ok(full.context.GB_I18N, 'assets/i18n-runtime.js should expose window.GB_I18N after assets/i18n.js');
+  full.ready();
+  assert.strictEqual(full.elements.tagged.textContent, english, 'An English visitor keeps the English page');
+  await full.context.GB_I18N.setLang('pt');
+  assert.strictEqual(full.elements.tagged.textContent, portuguese, `${key}: setLang('pt') should translate it`);
+  assert.strictEqual(full.elements.untagged.textContent, untaggedPt, 'Untagged text should be translated');
+  await full.context.GB_I18N.setLang('en');
+  assert.strictEqual(full.elements.tagged.textContent, english, `${key}: setLang('en') should restore the English`);
+  assert.strictEqual(full.elements.untagged.textContent, untagged, 'Untagged text should be back in English');
+  assert.deepStrictEqual(full.warnings, [], 'assets/i18n.js + assets/i18n-runtime.js should not warn');
+
+  // --- assets/i18n-lite.js: the page's bundles, fetched per language ---
+
+  const bundles = { '/pt.json': { keys: { [key]: portuguese }, text: { [untagged]: untaggedPt } } };
+  const fetched = [];
+  // Answers on a later turn, like the network, so a refetch loop cannot starve the check
+  const fetch = async (url) => {
+    fetched.push(url);
+    await settle();
+    return bundles[url] ? { ok: true, json: async () => bundles[url] } : { ok: false, status: 404 };
+  };
+  const script = { 'data-i18n-en': '/en.json', 'data-i18n-pt': '/pt.json', 'data-i18n-es': '/es.json' };
+  const paragraphs = [['tagged', { 'data-i18n': key }, english], ['untagged', {}, untagged]];
+
+  const lite = createPage(paragraphs, { lang: 'pt', fetch, script });
+  lite.load('assets/i18n-lite.js');
+  lite.ready();
+  for (let i = 0; i < 5; i += 1) await settle();
+  assert.strictEqual(lite.elements.tagged.textContent, portuguese, `${key}: the pt bundle should translate it`);
+  assert.strictEqual(lite.elements.untagged.textContent, untaggedPt, 'The pt bundle should translate untagged text');
+  await lite.context.GB_I18N.setLang('en');
+  assert.strictEqual(lite.elements.tagged.textContent, english, 'A failed en fetch should restore the English');
+  assert.strictEqual(lite.elements.untagged.textContent, untagged, 'A failed en fetch should restore untagged English');
+
+  // A visitor whose language cannot be fetched gets the English page, and the fetch is not repeated
+  fetched.length = 0;
+  const failed = createPage(paragraphs, { lang: 'es', fetch, script });
+  failed.load('assets/i18n-lite.js');
+  failed.ready();
+  for (let i = 0; i < 20; i += 1) await settle();
+  assert.strictEqual(failed.elements.tagged.textContent, english, 'A failed fetch should leave the English text');
+  assert.strictEqual(failed.elements.untagged.textContent, untagged, 'A failed fetch should leave untagged English');
+  assert.ok(fetched.length <= 2, `A failed bundle should not be fetched again and again (${fetched.length} fetches)`);
+  assert.ok(failed.warnings.length > 0 && failed.warnings.length === fetched.length, 'Each failed fetch should be reported');
+
+  console.log('i18n runtime check passed.');
+})().catch((error) => {
+  console.error(error);
+  process.exit(1);
+});
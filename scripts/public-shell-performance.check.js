@@ -1,11 +1,16 @@
 'use strict';
 
 const assert = require('assert');
+const crypto = require('crypto');
 const fs = require('fs');
 const path = require('path');
 
 const root = path.resolve(__dirname, '..');
 const read = (file) => fs.readFileSync(path.join(root, file), 'utf8');
+// The site pipeline's cache busting replaces hand-set tokens with the file's content hash
+const contentVersion = (file) => crypto.createHash('sha256').update(fs.readFileSync(path.join(root, file))).digest('hex').slice(0, 10);
+const adsLoaderVersion = new RegExp(`ads-loader\\.js\\?v=(?:20260805-consent-v2|${contentVersion('js/tracking/ads-loader.js')})`);
+const deferredStylesVersion = new RegExp(`deferred-styles\\.js\\?v=(?:20260805|${contentVersion('js/utils/deferred-styles.js')})`);
 const home = read('index.html');
 const coaching = read('online-coaching.html');
 const adsLoader = read('js/tracking/ads-loader.js');
@@ -21,7 +26,7 @@ const compactAssets = [
 ];
 
 for (const [name, html] of [['home', home], ['online coaching', coaching]]) {
-  assert.match(html, /ads-loader\.js\?v=20260805-consent-v2/, `${name} must use the consent-aware tag loader`);
+  assert.match(html, adsLoaderVersion, `${name} must use the consent-aware tag loader`);
   assert.doesNotMatch(html, /googletagmanager\.com\/(?:gtm\.js|gtag\/js|ns\.html)/, `${name} must not request Google tags before consent`);
   assert.doesNotMatch(html, /connect\.facebook\.net|facebook\.com\/tr\?/, `${name} must not request Meta before consent`);
 }
@@ -33,7 +38,7 @@ assert.match(deferredStyles, /placeholder\.href = href/, 'Deferred styles must a
 assert.match(componentLoader, /componentInitializationInFlight/, 'Component loading must guard against duplicate initialization');
 assert.doesNotMatch(coaching, /bootstrap@|font-awesome|components\/newsletter\.css/, 'Coaching page must not load unused render-blocking frameworks');
 assert.match(home, /data-deferred-stylesheet data-href="https:\/\/cdnjs\.cloudflare\.com\/ajax\/libs\/font-awesome/, 'Homepage icons must not block first render');
-assert.match(home, /deferred-styles\.js\?v=20260805/, 'Homepage must activate deferred styles after first render');
+assert.match(home, deferredStylesVersion, 'Homepage must activate deferred styles after first render');
 assert.match(home, /<script defer src="\/js\/utils\/component-loader-v3-simplified\.js/, 'Homepage component loading must not block HTML parsing');
 assert.match(home, /hero-960\.webp/, 'Homepage must preload the compact mobile hero');
 assert.match(coaching, /online-coaching-960\.webp/, 'Coaching page must preload the compact mobile hero');
@@ -0,0 +1,199 @@
+'use strict';
+
+// Whole-site runs of the site pipeline (scripts/automation/run-pipeline.py) on a
+// generated site: deterministic corpus, parallel == serial, incremental
+// manifest, idempotent transforms, run report, cProfile dumps, reference index
+// and watch mode; and its documented navbar command on a copy of the real pages.
+const assert = require('assert');
+const childProcess = require('child_process');
+const crypto = require('crypto');
+const fs = require('fs');
+const os = require('os');
+const path = require('path');
+
+const root = path.resolve(__dirname, '..');
+const automation = path.join(root, 'scripts', 'automation');
+const python = process.env.PYTHON || (process.platform === 'win32' ? 'python' : 'python3');
+const transforms = 'standardize_navbar,css_link,components,loader,script_defer,third_party_defer,resource_hints,cache_busting';
+
+function run(args) {
+  return childProcess.execFileSync(python, args, { cwd: automation, encoding: 'utf8' });
+}
+
+// Runs `code` in scripts/automation with `data` decoded from stdin; it prints its result as JSON
+function pipeline(code, data = null) {
+  const program = `import json, sys\ndata = json.loads(sys.stdin.read())\n${code}`;
+  const output = childProcess.execFileSync(python, ['-c', program], {
+    cwd: automation,
+    input: JSON.stringify(data),
+    encoding: 'utf8'
+  });
+  return JSON.parse(output);
+}
+
+// rel → sha256 of every file under `dir`, the pipeline's own state left out
+function tree(dir) {
+  const files = {};
+  for (const entry of fs.readdirSync(dir, { recursive: true, withFileTypes: true })) {
+    const file = path.join(entry.parentPath || entry.path, entry.name);
+    const rel = path.relative(dir, file).split(path.sep).join('/');
+    if (!entry.isFile() || rel.startsWith('.site-pipeline/')) continue;
+    files[rel] = crypto.createHash('sha256').update(fs.readFileSync(file)).digest('hex');
+  }
+  return files;
+}
+
+function runPipeline(site, extra = []) {
+  const report = path.join(site, '.site-pipeline', 'report.json');
+  run(['run-pipeline.py', '--root', site, '--all', '-t', transforms, '--report', report, ...extra]);
+  return JSON.parse(fs.readFileSync(report, 'utf8')).pages;
+}
+
+// Root-relative pages of the site sections under `site`
+function pages(site) {
+  return ['.', 'blog', 'pages/public', 'pages/auth', 'pages/admin']
+    .filter(section => fs.existsSync(path.join(site, section)))
+    .flatMap(section => fs.readdirSync(path.join(site, section))
+      .filter(name => name.endsWith('.html'))
+      .map(name => path.posix.join(section, name).replace(/^\.\//, '')));
+}
+
+const statuses = (pages) => pages.reduce((counts, page) => ({ ...counts, [page.status]: (counts[page.status] || 0) + 1 }), {});
+
+const work = fs.mkdtempSync(path.join(os.tmpdir(), 'site-pipeline-'));
+try {
+  const serial = path.join(work, 'serial');
+  const parallel = path.join(work, 'parallel');
+  run(['-m', 'site_pipeline.synthetic', serial, '--pages', '40', '--seed', '7']);
+  run(['-m', 'site_pipeline.synthetic', parallel, '--pages', '40', '--seed', '7']);
+  assert.deepStrictEqual(tree(parallel), tree(serial), 'The synthetic site must only depend on its seed');
+
+  const first = runPipeline(serial, ['--workers', '1']);
+  runPipeline(parallel, ['--workers', '4']);
+  assert.deepStrictEqual(statuses(first), { updated: 40 }, 'The first run should rewrite every generated page');
+  assert.deepStrictEqual(tree(parallel), tree(serial), 'Parallel runs must write the same site as serial ones');
+
+  // The report follows each page through its transforms, down to the bytes written
+  for (const page of first) {
+    let size = page.transforms[0].bytes_in;
+    for (const step of page.transforms) {
+      assert.strictEqual(step.bytes_in, size, `${page.page}: ${step.name} should start from the previous output`);
+      size = step.bytes_out;
+    }
+    assert.strictEqual(size, fs.statSync(path.join(serial, page.page)).size, `${page.page}: report and file disagree`);
+  }
+
+  assert.deepStrictEqual(statuses(runPipeline(serial)), { cached: 40 }, 'An unchanged site must come from the manifest');
+  assert.deepStrictEqual(statuses(runPipeline(serial, ['--force'])), { unchanged: 40 },
+    'The transforms must leave their own output as it is');
+
+  const edited = 'blog/page-000001.html';
+  fs.appendFileSync(path.join(serial, edited), '\n<!-- edited -->\n');
+  const incremental = runPipeline(serial);
+  assert.deepStrictEqual(incremental.filter(page => page.status !== 'cached').map(page => page.page), [edited],
+    'Only the edited page should be processed again');
+
+  // --cprofile keeps the slowest dumps of the run and leaves other files in its directory
+  const dumps = path.join(work, 'cprofile');
+  const cachedDump = first.find(page => page.page !== edited).page.replace(/\//g, '__') + '.prof';
+  fs.mkdirSync(dumps);
+  fs.writeFileSync(path.join(dumps, 'not-this-run.prof'), '');
+  fs.writeFileSync(path.join(dumps, cachedDump), '');
+  fs.appendFileSync(path.join(serial, edited), '<!-- edited again -->\n');
+  runPipeline(serial, ['--cprofile', dumps, '--cprofile-top', '0']);
+  assert.deepStrictEqual(fs.readdirSync(dumps).sort(), [cachedDump, 'not-this-run.prof'].sort(),
+    'Only the dumps of the pages this run profiled should be pruned');
+  runPipeline(serial, ['--force', '--cprofile', dumps, '--cprofile-top', '2']);
+  assert.strictEqual(fs.readdirSync(dumps).filter(name => name !== 'not-this-run.prof').length, 2,
+    'The dumps of the two slowest pages should be kept');
+  assert.ok(fs.existsSync(path.join(dumps, 'not-this-run.prof')), 'Files the run did not write should stay');
+
+  // Watch mode: an edited stylesheet re-versions exactly the pages the reference index has for it
+  const watched = pipeline(`
+import re
+from pathlib import Path
+from site_pipeline.fingerprint import file_version
+from site_pipeline.manifest import BuildManifest
+from site_pipeline.pipeline import load_shared_data, pipeline_digest, select_transforms
+from site_pipeline.watch import Watcher
+
+site = Path(data['site'])
+transforms = select_transforms(data['transforms'].split(','))
+assets, components = load_shared_data(transforms, site)
+manifest = BuildManifest(site / '.site-pipeline' / 'watch.json', site, pipeline_digest(transforms, site, assets))
+watcher = Watcher(site, transforms, manifest, assets, components, workers=1, poll=True, interval=0.25,
+                  debounce=0.05, log=lambda line: None)
+watcher.start()
+asset = next(target for target in watcher.index.targets('assets') if target.startswith('css/synthetic-'))
+name = asset.rsplit('/', 1)[1]
+pages = sorted(watcher.index.rel(page) for page in watcher.pages())
+mentions = [rel for rel in pages if name in (site / rel).read_text(encoding='utf-8')]
+
+class EditOnFirstWait:
+    def __init__(self):
+        self.waits = []
+
+    def watch(self, directories):
+        pass
+
+    def wait(self, timeout):
+        self.waits.append(timeout)
+        if len(self.waits) == 1:
+            with open(site / asset, 'a', encoding='utf-8') as css:
+                css.write('\\n/* edited */\\n')
+
+    def close(self):
+        pass
+
+watcher.waiter = EditOnFirstWait()
+changed = watcher.next_changes()
+results = watcher.rebuild(changed)
+version = file_version((site / asset).read_bytes())
+print(json.dumps({
+    'waits': watcher.waiter.waits,
+    'changed': sorted(changed),
+    'asset': asset,
+    'referrers': watcher.index.referrers(asset, 'assets'),
+    'mentions': mentions,
+    'written': sorted(watcher.index.rel(result.page) for result in results if result.status == 'updated'),
+    'current': [rel for rel in mentions if f'{name}?v={version}' in (site / rel).read_text(encoding='utf-8')],
+}))
+`, { site: serial, transforms });
+  assert.deepStrictEqual(watched.waits, [0.25, 0.05], 'Watch mode must wait the configured interval, then the debounce');
+  assert.deepStrictEqual(watched.changed, [watched.asset]);
+  assert.ok(watched.referrers.length > 0, 'The edited stylesheet should be used by some pages');
+  assert.deepStrictEqual(watched.referrers, watched.mentions, 'The reference index must list every page using the asset');
+  assert.deepStrictEqual(watched.written, watched.referrers, 'Watch mode must rewrite exactly the pages using the asset');
+  assert.deepStrictEqual(watched.current, watched.referrers, 'Rewritten pages must carry the new content hash');
+
+  // run-pipeline.py's documented navbar command on a copy of the real pages: one navbar per page
+  const site = path.join(work, 'site');
+  const tracked = childProcess
+    .execSync('git ls-files "*.html" "*.css" "*.js" "*.json"', { cwd: root, encoding: 'utf8' })
+    .trim()
+    .split(/\r?\n/)
+    .filter(file => !file.startsWith('scripts/') && !file.includes('node_modules/'));
+  for (const file of tracked) {
+    fs.mkdirSync(path.dirname(path.join(site, file)), { recursive: true });
+    fs.copyFileSync(path.join(root, file), path.join(site, file));
+  }
+  const documented = fs.readFileSync(path.join(automation, 'run-pipeline.py'), 'utf8')
+    .match(/^ {4}python run-pipeline\.py (.*navbar_insert.*)$/m)[1].split(' ');
+  const navbars = (content) => ['<nav class="gb-navbar"', '<nav class="navbar">', 'data-component="navbar"',
+    '<!-- Navbar Component (prerendered'].reduce((count, needle) => count + content.split(needle).length - 1, 0);
+  const navbarCss = (content) => content.split('/* ===== NAVBAR ENHANCED').length - 1;
+  const before = Object.fromEntries(pages(site).map(rel => [rel, fs.readFileSync(path.join(site, rel), 'utf8')]));
+  run(['run-pipeline.py', '--root', site, '--workers', '1', ...documented]);
+  for (const [rel, original] of Object.entries(before)) {
+    const content = fs.readFileSync(path.join(site, rel), 'utf8');
+    if (!content.includes('<body')) continue;
+    assert.strictEqual(navbars(content), 1, `${rel}: the documented navbar command must leave one navbar`);
+    if (navbars(original) > 0 && !original.includes('<nav class="navbar">')) {
+      assert.strictEqual(navbarCss(content), navbarCss(original), `${rel}: a page with a navbar must not get the navbar <style>`);
+    }
+  }
+} finally {
+  fs.rmSync(work, { recursive: true, force: true });
+}
+
+console.log('Site pipeline build check passed.');
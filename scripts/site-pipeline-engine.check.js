@@ -0,0 +1,118 @@
+'use strict';
+
+// The site pipeline's single-pass engine (scripts/automation/site_pipeline):
+// same bytes as the old rule-by-rule chain, in memory and streamed, with the
+// balanced navbar locator and the marker-based transform skips.
+const assert = require('assert');
+const childProcess = require('child_process');
+const path = require('path');
+
+const root = path.resolve(__dirname, '..');
+const automation = path.join(root, 'scripts', 'automation');
+const python = process.env.PYTHON || (process.platform === 'win32' ? 'python' : 'python3');
+
+// Runs `code` in scripts/automation with `data` decoded from stdin; it prints its result as JSON
+function pipeline(code, data = null) {
+  const program = `import json, sys\ndata = json.loads(sys.stdin.read())\n${code}`;
+  const output = childProcess.execFileSync(python, ['-c', program], {
+    cwd: automation,
+    input: JSON.stringify(data),
+    encoding: 'utf8',
+    maxBuffer: 64 * 1024 * 1024
+  });
+  return JSON.parse(output);
+}
+
+const pages = childProcess
+  .execSync('git ls-files "*.html"', { cwd: root, encoding: 'utf8' })
+  .trim()
+  .split(/\r?\n/)
+  .filter(file => !file.startsWith('scripts/'));
+
+assert.ok(pages.length > 50, 'The site should have its pages tracked');
+
+// apply-components.py: one engine pass == add_component_loader → replace_navbar → replace_footer → update_cache_busting
+const chain = pipeline(`
+import importlib.util
+from site_pipeline.batch import REPO_ROOT
+from site_pipeline.fingerprint import AssetManifest
+spec = importlib.util.spec_from_file_location('apply_components', REPO_ROOT / 'apply-components.py')
+apply_components = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(apply_components)
+assets = AssetManifest.build(REPO_ROOT)
+mismatches = []
+changed = 0
+for rel in data:
+    text = (REPO_ROOT / rel).read_text(encoding='utf-8')
+    expected = apply_components.update_cache_busting(
+        apply_components.replace_footer(apply_components.replace_navbar(apply_components.add_component_loader(text))),
+        assets, rel)
+    if apply_components.build_engine(assets, rel).apply(text) != expected:
+        mismatches.append(rel)
+    changed += expected != text
+print(json.dumps({'mismatches': mismatches, 'changed': changed}))
+`, pages);
+assert.deepStrictEqual(chain.mismatches, [], 'The single-pass engine must give the same bytes as the sequential rules');
+assert.ok(chain.changed > 0, 'The byte-identity check should cover pages the rules rewrite');
+
+// --stream: the memory-mapped rewrite writes exactly what the in-memory pass returns
+const streamed = pipeline(`
+import importlib.util, shutil, tempfile
+from pathlib import Path
+from site_pipeline.batch import REPO_ROOT
+from site_pipeline.components import load_components
+from site_pipeline.fingerprint import AssetManifest
+spec = importlib.util.spec_from_file_location('apply_components', REPO_ROOT / 'apply-components.py')
+apply_components = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(apply_components)
+assets = AssetManifest.build(REPO_ROOT)
+components = load_components(REPO_ROOT)
+mismatches = []
+with tempfile.TemporaryDirectory() as tmp:
+    for rel in data:
+        for inline in (None, components):
+            engine = apply_components.build_engine(assets, rel, inline)
+            text = (REPO_ROOT / rel).read_text(encoding='utf-8')
+            copy = Path(tmp) / 'page.html'
+            shutil.copyfile(REPO_ROOT / rel, copy)
+            result = engine.stream(copy, chunk_size=4096)
+            expected = engine.apply(text)
+            if copy.read_bytes() != expected.encode('utf-8') or result.changed != (expected != text):
+                mismatches.append(f"{rel}{' --inline' if inline else ''}")
+print(json.dumps(mismatches))
+`, pages);
+assert.deepStrictEqual(streamed, [], 'Streaming must write the same bytes as the in-memory pass');
+
+// The navbar locator takes the whole component, nested <nav>s included, and nothing after it
+const located = pipeline(`
+from site_pipeline.batch import REPO_ROOT
+from site_pipeline.components import NAVBAR_PATTERN
+navbar = (REPO_ROOT / 'components' / 'navbar.html').read_text(encoding='utf-8').strip()
+page = f'<body>\\n{navbar}\\n<main><nav class="breadcrumbs"></nav></main>\\n</body>'
+match = NAVBAR_PATTERN.search(page)
+print(json.dumps({'nested': navbar.count('</nav>'), 'found': match.group().strip() if match else None, 'navbar': navbar}))
+`);
+assert.ok(located.nested > 1, 'components/navbar.html should still nest <nav>s');
+assert.strictEqual(located.found, located.navbar, 'The navbar locator must span the whole balanced <nav>');
+
+// Transforms skipped from the page markers would have left the page as it is
+const skipped = pipeline(`
+import dataclasses
+from pathlib import Path
+from site_pipeline.batch import REPO_ROOT
+from site_pipeline.pipeline import TRANSFORMS, Page, apply_transforms, load_shared_data, select_transforms
+mismatches = []
+for left_out in ('prerender_components', 'components'):
+    transforms = select_transforms([name for name in TRANSFORMS if name != left_out])
+    unskipped = [dataclasses.replace(transform, when=None) for transform in transforms]
+    assets, components = load_shared_data(transforms, REPO_ROOT)
+    for rel in data:
+        text = (REPO_ROOT / rel).read_text(encoding='utf-8')
+        skipping = apply_transforms(text, transforms, Page(rel, Path(rel).name, assets, components))[0]
+        if skipping != apply_transforms(text, unskipped, Page(rel, Path(rel).name, assets, components))[0]:
+            mismatches.append(f'{rel} (without {left_out})')
+print(json.dumps(mismatches))
+`, pages);
+assert.deepStrictEqual(skipped, [], 'Marker-based skips must not change any page');
+
+console.log(`Site pipeline engine check passed for ${pages.length} pages.`);
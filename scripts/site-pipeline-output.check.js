@@ -0,0 +1,385 @@
+'use strict';
+
+// The site pipeline's output stages (scripts/automation/site_pipeline): unused
+// CSS removal, critical CSS, minify and compress on a small build output,
+// image sizes and <picture> variants, and the English fallback of the i18n
+// stages and of the dictionary scripts the runtime reads.
+const assert = require('assert');
+const childProcess = require('child_process');
+const crypto = require('crypto');
+const fs = require('fs');
+const os = require('os');
+const path = require('path');
+const vm = require('vm');
+const zlib = require('zlib');
+
+const root = path.resolve(__dirname, '..');
+const automation = path.join(root, 'scripts', 'automation');
+const python = process.env.PYTHON || (process.platform === 'win32' ? 'python' : 'python3');
+
+function run(args) {
+  return childProcess.execFileSync(python, args, { cwd: automation, encoding: 'utf8' });
+}
+
+// Runs `code` in scripts/automation with `data` decoded from stdin; it prints its result as JSON
+function pipeline(code, data = null) {
+  const program = `import json, sys\ndata = json.loads(sys.stdin.read())\n${code}`;
+  const output = childProcess.execFileSync(python, ['-c', program], {
+    cwd: automation,
+    input: JSON.stringify(data),
+    encoding: 'utf8',
+    maxBuffer: 64 * 1024 * 1024
+  });
+  return JSON.parse(output);
+}
+
+// rel → sha256 of every file under `dir`
+function tree(dir) {
+  const files = {};
+  for (const entry of fs.readdirSync(dir, { recursive: true, withFileTypes: true })) {
+    const file = path.join(entry.parentPath || entry.path, entry.name);
+    if (!entry.isFile()) continue;
+    files[path.relative(dir, file).split(path.sep).join('/')] = crypto.createHash('sha256').update(fs.readFileSync(file)).digest('hex');
+  }
+  return files;
+}
+
+const read = (file) => fs.readFileSync(file, 'utf8');
+
+const pages = childProcess
+  .execSync('git ls-files "*.html"', { cwd: root, encoding: 'utf8' })
+  .trim()
+  .split(/\r?\n/)
+  .filter(file => !file.startsWith('scripts/') && !file.startsWith('components/'));
+
+// --- css_purge → critical_css → minify → compress on a small build output ---
+
+const stylesheet = `@font-face { font-family: Brand; src: url(../assets/fonts/brand.woff2) format('woff2'); }
+body { margin: 0; }
+.hero { background: url(../assets/hero.png) no-repeat; }
+.show { display: block; }
+.is-loading { opacity: .5; }
+.modal-backdrop { position: fixed; }
+.menu-open { overflow: hidden; }
+.unused-widget { color: red; }
+@media (max-width: 600px) {
+  .unused-widget { color: blue; }
+}
+@media (min-width: 900px) {
+  .hero { padding: 4rem; }
+}
+`;
+
+function page(prefix, title) {
+  return `<!DOCTYPE html>
+<html lang="en">
+<head>
+  <meta charset="utf-8">
+  <title>${title}</title>
+  <!-- build note -->
+  <link rel="stylesheet" href="${prefix}css/site.css?v=1">
+</head>
+<body>
+  <section class="hero">
+    <h1>   ${title}   </h1>
+  </section>
+  <pre>  keep
+    this   as it is </pre>
+  <textarea name="note">  two  spaces </textarea>
+  <script type="application/ld+json">{ "@type":  "WebPage",
+    "name":  "${title}" }</script>
+  <script src="${prefix}js/app.js" defer></script>
+</body>
+</html>
+`;
+}
+
+const work = fs.mkdtempSync(path.join(os.tmpdir(), 'site-pipeline-output-'));
+try {
+  const out = path.join(work, 'public');
+  fs.mkdirSync(path.join(out, 'css'), { recursive: true });
+  fs.mkdirSync(path.join(out, 'js', 'utils'), { recursive: true });
+  fs.mkdirSync(path.join(out, 'blog'));
+  fs.writeFileSync(path.join(out, 'css', 'site.css'), stylesheet);
+  fs.writeFileSync(path.join(out, 'js', 'app.js'), "document.body.classList.add('menu-open');\n");
+  fs.copyFileSync(path.join(root, 'js', 'utils', 'deferred-styles.js'), path.join(out, 'js', 'utils', 'deferred-styles.js'));
+  fs.writeFileSync(path.join(out, 'index.html'), page('', 'Home'));
+  fs.writeFileSync(path.join(out, 'blog', 'post.html'), page('../', 'Post'));
+  const stage = (name, extra = []) => run(['-m', `site_pipeline.${name}`, '--root', work, '--out', out, '--workers', '1', ...extra]);
+
+  // css_purge: allowlisted and script-added classes stay, unused rules and emptied blocks go
+  const purged = JSON.parse(stage('css_purge', ['--json']));
+  assert.deepStrictEqual(purged['css/site.css'].removed.filter(selector => !selector.includes('unused-widget')), [],
+    'Only the unused selectors should be removed');
+  const trimmed = fs.readdirSync(path.join(out, 'css')).filter(name => /^site\.[0-9a-f]{10}\.css$/.test(name));
+  assert.strictEqual(trimmed.length, 1, 'css_purge should write one trimmed copy');
+  const trimmedCss = read(path.join(out, 'css', trimmed[0]));
+  for (const kept of ['@font-face', '.hero', '.show', '.is-loading', '.modal-backdrop', '.menu-open', '(min-width: 900px)']) {
+    assert.ok(trimmedCss.includes(kept), `css_purge must keep ${kept}`);
+  }
+  assert.ok(!trimmedCss.includes('unused-widget') && !trimmedCss.includes('(max-width: 600px)'),
+    'css_purge should drop unused rules and the blocks they leave empty');
+  assert.ok(read(path.join(out, 'blog', 'post.html')).includes(`href="../css/${trimmed[0]}"`),
+    'Pages should link the trimmed copy');
+  const afterPurge = tree(out);
+  stage('css_purge');
+  assert.deepStrictEqual(tree(out), afterPurge, 'A second purge must change nothing');
+
+  // critical_css: inline rules rebased onto each page, links deferred with a noscript fallback, undoable
+  const linked = { 'index.html': read(path.join(out, 'index.html')), 'blog/post.html': read(path.join(out, 'blog', 'post.html')) };
+  stage('critical_css');
+  for (const [rel, prefix] of [['index.html', ''], ['blog/post.html', '../']]) {
+    const content = read(path.join(out, rel));
+    const inline = content.match(/<style data-critical-css>(.*?)<\/style>/s);
+    assert.ok(inline, `${rel}: critical CSS should be inlined`);
+    assert.ok(inline[1].includes(`url(${prefix}assets/hero.png)`), `${rel}: url()s must be rebased onto the page`);
+    assert.ok(!inline[1].includes('.menu-open{'), `${rel}: rules for classes not on the first screen stay deferred`);
+    assert.ok(content.includes(`<noscript data-critical-css><link rel="stylesheet" href="${prefix}css/${trimmed[0]}"></noscript>`),
+      `${rel}: the stylesheet must stay for visitors without JavaScript`);
+    assert.ok(/<link data-deferred-stylesheet data-critical-css data-href="[^"]+">/.test(content), `${rel}: the link should be deferred`);
+    assert.ok(content.includes(`src="${prefix}js/utils/deferred-styles.js?v=`), `${rel}: the loader should be added`);
+  }
+  // restore_links puts `rel` back last, so links are compared by their attributes
+  const attributeOrder = (content) => content.replace(/<link\b[^>]*>/g, (tag) => `<link${(tag.match(/\s+[^\s=>]+(?:="[^"]*")?/g) || []).sort().join('')}>`);
+  const restored = pipeline(`
+from pathlib import Path
+from site_pipeline.critical_css import restore_links
+print(json.dumps({rel: restore_links((Path(data['out']) / rel).read_text(encoding='utf-8')) for rel in data['pages']}))
+`, { out, pages: Object.keys(linked) });
+  for (const [rel, content] of Object.entries(linked)) {
+    assert.strictEqual(attributeOrder(restored[rel]), attributeOrder(content), `${rel}: restore_links must give back the page critical_css started from`);
+  }
+  const afterCritical = tree(out);
+  stage('critical_css');
+  assert.deepStrictEqual(tree(out), afterCritical, 'A second critical CSS run must change nothing');
+
+  // minify: raw blocks byte for byte, smaller pages, idempotent
+  const critical = { 'index.html': read(path.join(out, 'index.html')), 'blog/post.html': read(path.join(out, 'blog', 'post.html')) };
+  stage('minify');
+  for (const [rel, before] of Object.entries(critical)) {
+    const content = read(path.join(out, rel));
+    assert.ok(content.length < before.length, `${rel}: minify should shrink the page`);
+    for (const block of before.match(/<(pre|textarea)\b.*?<\/\1>|<script type="application\/ld\+json">.*?<\/script>/gs)) {
+      assert.ok(content.includes(block), `${rel}: minify must keep ${block.slice(0, 20)}… byte for byte`);
+    }
+    assert.ok(!content.includes('build note'), `${rel}: comments should be dropped`);
+  }
+  const afterMinify = tree(out);
+  stage('minify', ['--force']);
+  assert.deepStrictEqual(tree(out), afterMinify, 'Minifying minified pages must change nothing');
+
+  // compress: every variant decodes to its file
+  stage('compress');
+  const files = Object.keys(tree(out));
+  const variants = files.filter(rel => /\.(gz|br)$/.test(rel));
+  assert.ok(variants.includes('index.html.gz'), 'compress should write gzip variants');
+  for (const rel of variants) {
+    const data = fs.readFileSync(path.join(out, rel));
+    const decoded = rel.endsWith('.gz') ? zlib.gunzipSync(data) : zlib.brotliDecompressSync(data);
+    assert.ok(decoded.equals(fs.readFileSync(path.join(out, rel.slice(0, -3)))), `${rel} must decode to its file`);
+  }
+  const afterCompress = tree(out);
+  stage('compress');
+  assert.deepStrictEqual(tree(out), afterCompress, 'An unchanged output must not be compressed again');
+  // A file that cannot be compressed fails the stage, so the build stops
+  fs.rmSync(path.join(out, 'index.html.gz'));
+  fs.mkdirSync(path.join(out, 'index.html.gz'));
+  assert.throws(() => stage('compress', ['--force']), 'compress should exit non-zero when a file fails');
+} finally {
+  fs.rmSync(work, { recursive: true, force: true });
+}
+
+// minify on the real pages: idempotent, never larger, raw blocks kept
+const minified = pipeline(`
+import re
+from site_pipeline.batch import REPO_ROOT
+from site_pipeline.minify import minify_html
+raw = re.compile(r'<(pre|textarea)\\b.*?</\\1>|<script type="application/ld\\+json">.*?</script>', re.DOTALL)
+failures = []
+for rel in data:
+    text = (REPO_ROOT / rel).read_text(encoding='utf-8')
+    once = minify_html(text)
+    if minify_html(once) != once:
+        failures.append(f'{rel}: not idempotent')
+    if len(once) > len(text):
+        failures.append(f'{rel}: larger')
+    failures.extend(f'{rel}: {match.group()[:30]} changed' for match in raw.finditer(text) if match.group() not in once)
+print(json.dumps(failures))
+`, pages);
+assert.deepStrictEqual(minified, [], 'minify_html must be safe on every page');
+
+// --- images: header sizes and <picture> variants ---
+
+// Independent header parser: [width, height] of PNG, GIF, WebP and JPEG (stored, before EXIF orientation)
+function headerSize(data) {
+  if (data.readUInt32BE(0) === 0x89504e47) return [data.readUInt32BE(16), data.readUInt32BE(20)];
+  if (data.toString('latin1', 0, 3) === 'GIF') return [data.readUInt16LE(6), data.readUInt16LE(8)];
+  if (data.toString('latin1', 0, 4) === 'RIFF') {
+    const chunk = data.toString('latin1', 12, 16);
+    if (chunk === 'VP8 ') return [data.readUInt16LE(26) & 0x3fff, data.readUInt16LE(28) & 0x3fff];
+    if (chunk === 'VP8L') {
+      const bits = data.readUInt32LE(21);
+      return [(bits & 0x3fff) + 1, ((bits >>> 14) & 0x3fff) + 1];
+    }
+    return [data.readUIntLE(24, 3) + 1, data.readUIntLE(27, 3) + 1];
+  }
+  let offset = 2;
+  while (offset < data.length) {
+    const marker = data[offset + 1];
+    if (marker >= 0xc0 && marker <= 0xcf && ![0xc4, 0xc8, 0xcc].includes(marker)) {
+      return [data.readUInt16BE(offset + 7), data.readUInt16BE(offset + 5)];
+    }
+    offset += 2 + data.readUInt16BE(offset + 2);
+  }
+  return null;
+}
+
+const images = pipeline(`
+import re
+from site_pipeline.batch import REPO_ROOT
+from site_pipeline.fingerprint import AssetManifest
+from site_pipeline.images import (
+    _OWNED_PICTURE, image_size, page_css_rules, referenced_images, rewrite_images, scan_image, variant_rel,
+)
+from site_pipeline.references import ReferenceIndex, index_sources
+
+index = ReferenceIndex.build(REPO_ROOT)
+rels = referenced_images(REPO_ROOT, index)
+sizes = {rel: image_size((REPO_ROOT / rel).read_bytes()) for rel in rels if not rel.endswith(('.svg', '.avif'))}
+infos = {rel: info for rel in rels if (info := scan_image(REPO_ROOT / rel))}
+resolver = AssetManifest(REPO_ROOT)
+failures = []
+pictures = 0
+for path in index_sources(REPO_ROOT):
+    rel = path.relative_to(REPO_ROOT).as_posix()
+    text = path.read_text(encoding='utf-8')
+    rules = page_css_rules(text, rel, REPO_ROOT, resolver)
+    report = {}
+    sized = rewrite_images(text, rel, infos, rules, resolver, None, report)
+    variants = {}
+    for image, width, fmt in report['requests']:
+        variants.setdefault(image, {}).setdefault(fmt, {})[width] = variant_rel(image, infos[image], width, fmt)
+    wrapped = rewrite_images(text, rel, infos, rules, resolver, variants)
+    pictures += wrapped.count('<picture data-image-variants>')
+    if rewrite_images(wrapped, rel, infos, rules, resolver, variants) != wrapped:
+        failures.append(f'{rel}: not idempotent')
+    if _OWNED_PICTURE.sub(r'\\1', wrapped) != sized:
+        failures.append(f'{rel}: a <picture> changed more than its <img>')
+    # An <img> with its own srcset (npm run seo:images) only gets AVIF in front of it
+    for picture in re.findall(r'<picture data-image-variants>.*?</picture>', wrapped, re.S):
+        if ' srcset=' in picture[picture.index('<img'):] and 'type="image/webp"' in picture:
+            failures.append(f'{rel}: a WebP <source> shadows an existing srcset')
+    if re.sub(r' (?:width|height)="\\d+"', '', sized) != re.sub(r' (?:width|height)="\\d+"', '', text):
+        failures.append(f'{rel}: sizing changed more than width/height')
+print(json.dumps({'sizes': sizes, 'failures': failures, 'pictures': pictures}))
+`);
+assert.ok(Object.keys(images.sizes).length > 10, 'The pages should reference raster images');
+for (const [rel, size] of Object.entries(images.sizes)) {
+  const stored = headerSize(fs.readFileSync(path.join(root, rel)));
+  assert.ok(size, `${rel}: image_size should read the header`);
+  // JPEGs also give their EXIF orientation, which may swap the displayed axes
+  const compare = rel.match(/\.jpe?g$/i) ? (pair) => [...pair].sort((a, b) => a - b) : (pair) => pair;
+  assert.deepStrictEqual(compare(size.slice(0, 2)), compare(stored), `${rel}: image_size disagrees with the header`);
+}
+assert.deepStrictEqual(images.failures, [], 'The image stage must only add sizes and wrap <img>s');
+assert.ok(images.pictures > 0, 'Some images should get <picture> variants');
+
+// --- i18n: English fallback in the build and in the runtime's dictionary scripts ---
+
+const fallback = pipeline(`
+import copy
+from site_pipeline.batch import REPO_ROOT
+from site_pipeline.i18n import load_dictionaries, read_path, render_language, translate
+from site_pipeline.i18n_bundles import STATIC_TEXT, build_bundle, static_text_maps
+
+dictionaries = load_dictionaries(REPO_ROOT)
+
+def paths(dictionary, prefix=()):
+    for name, value in dictionary.items():
+        if isinstance(value, dict):
+            yield from paths(value, (*prefix, name))
+        elif isinstance(value, str):
+            yield (*prefix, name)
+
+# The exported dictionaries are complete, so a few translated keys are taken out of pt
+english_only = {}
+for path in paths(dictionaries['en']):
+    key = '.'.join(path)
+    if len(english_only) < 5 and read_path(dictionaries['pt'], key) not in (None, read_path(dictionaries['en'], key)):
+        english_only[key] = path
+dictionaries['pt'] = copy.deepcopy(dictionaries['pt'])
+for path in english_only.values():
+    parent = dictionaries['pt']
+    for name in path[:-1]:
+        parent = parent[name]
+    del parent[path[-1]]
+text_maps = static_text_maps(dictionaries, json.loads((REPO_ROOT / STATIC_TEXT).read_text(encoding='utf-8')))
+results = {}
+for key, path in english_only.items():
+    missing = {}
+    page = f'<html lang="en"><body><p data-i18n="{key}">page text</p></body></html>'
+    bundle = json.loads(build_bundle({key}, set(), 'pt', dictionaries, text_maps))
+    results[key] = {
+        'english': read_path(dictionaries['en'], key),
+        'translate': translate(dictionaries, 'pt', key),
+        'rendered': render_language(page, 'pt', dictionaries, missing),
+        'missing': missing,
+        'bundle': bundle,
+        'path': path,
+    }
+unknown = {}
+kept = render_language('<p data-i18n="no.such.key">page text</p>', 'pt', dictionaries, unknown)
+print(json.dumps({'results': results, 'unknown': unknown, 'kept': kept}))
+`);
+const englishOnly = Object.keys(fallback.results);
+assert.ok(englishOnly.length > 0, 'Some translated keys should be taken out of pt');
+for (const [key, result] of Object.entries(fallback.results)) {
+  assert.deepStrictEqual(result.translate, [result.english, 'en'], `${key}: translate should fall back to English`);
+  assert.ok(result.rendered.includes(`data-i18n="${key}">${result.english.replace(/&/g, '&amp;').replace(/</g, '&lt;').replace(/>/g, '&gt;')}</p>`),
+    `${key}: the pt page should show the English text`);
+  assert.ok(result.rendered.startsWith('<html lang="pt">'), `${key}: the page should be marked pt`);
+  assert.deepStrictEqual(result.missing, { [key]: 'en' }, `${key}: the report should name the fallback`);
+  assert.strictEqual(result.bundle.keys[key], result.english, `${key}: the pt bundle should carry the English text`);
+}
+assert.deepStrictEqual(fallback.unknown, { 'no.such.key': null }, 'Keys no dictionary has should be reported');
+assert.strictEqual(fallback.kept, '<p data-i18n="no.such.key">page text</p>', 'Keys no dictionary has keep the page text');
+
+// assets/i18n.js: the same fallback, from its own dictionaries with the same keys taken out of pt
+const full = { console };
+full.window = full;
+vm.runInNewContext(read(path.join(root, 'assets', 'i18n.js')), full);
+for (const [key, result] of Object.entries(fallback.results)) {
+  const parent = result.path.slice(0, -1).reduce((dictionary, name) => dictionary[name], full.DICTS.pt);
+  assert.ok(typeof parent[result.path.at(-1)] === 'string', `${key}: assets/i18n.js should have the pt text`);
+  delete parent[result.path.at(-1)];
+  assert.strictEqual(full.GB_I18N_SOURCE.t('pt', key), full.GB_I18N_SOURCE.t('en', key), `${key}: assets/i18n.js should fall back to English`);
+}
+assert.strictEqual(full.GB_I18N_SOURCE.t('pt', 'no.such.key'), undefined, 'Unknown keys leave the page text');
+
+// assets/i18n-lite.js: the English of the bundle built above, and the page text when a fetch fails
+(async () => {
+  const key = englishOnly[0];
+  const bundles = { '/pt.json': fallback.results[key].bundle };
+  const warnings = [];
+  const lite = {
+    console: { warn: (...args) => warnings.push(args) },
+    Promise,
+    document: { currentScript: { getAttribute: (name) => ({ 'data-i18n-pt': '/pt.json', 'data-i18n-es': '/es.json' })[name] || null } },
+    fetch: async (url) => (bundles[url] ? { ok: true, json: async () => bundles[url] } : { ok: false, status: 404 })
+  };
+  lite.window = lite;
+  vm.runInNewContext(read(path.join(root, 'assets', 'i18n-lite.js')), lite);
+  const source = lite.GB_I18N_SOURCE;
+  await source.load('pt');
+  assert.ok(source.has('pt'), 'The pt bundle should be loaded');
+  assert.strictEqual(source.t('pt', key), fallback.results[key].english, 'assets/i18n-lite.js should serve the English text');
+  const failed = await source.load('es');
+  assert.deepStrictEqual(JSON.parse(JSON.stringify(failed)), { keys: {}, text: {} }, 'A failed fetch resolves to no strings');
+  assert.strictEqual(source.t('es', key), undefined, 'A failed fetch leaves the page text');
+  assert.strictEqual(warnings.length, 1, 'A failed fetch should be reported once');
+
+  console.log(`Site pipeline output check passed for ${pages.length} pages.`);
+})().catch((error) => {
+  console.error(error);
+  process.exit(1);
+});
@@ -0,0 +1,249 @@
+'use strict';
+
+// The site pipeline's page transforms (scripts/automation/site_pipeline) on the
+// real pages: content-hash versions, execution order of deferred and shared
+// scripts, third-party placeholders, pre-rendered components and resource hints.
+const assert = require('assert');
+const childProcess = require('child_process');
+const crypto = require('crypto');
+const fs = require('fs');
+const os = require('os');
+const path = require('path');
+
+const root = path.resolve(__dirname, '..');
+const automation = path.join(root, 'scripts', 'automation');
+const python = process.env.PYTHON || (process.platform === 'win32' ? 'python' : 'python3');
+
+// Runs `code` in scripts/automation with `data` decoded from stdin; it prints its result as JSON
+function pipeline(code, data = null) {
+  const program = `import json, sys\ndata = json.loads(sys.stdin.read())\n${code}`;
+  const output = childProcess.execFileSync(python, ['-c', program], {
+    cwd: automation,
+    input: JSON.stringify(data),
+    encoding: 'utf8',
+    maxBuffer: 64 * 1024 * 1024
+  });
+  return JSON.parse(output);
+}
+
+const contentVersion = (file) => crypto.createHash('sha256').update(fs.readFileSync(file)).digest('hex').slice(0, 10);
+
+const pages = childProcess
+  .execSync('git ls-files "*.html"', { cwd: root, encoding: 'utf8' })
+  .trim()
+  .split(/\r?\n/)
+  .filter(file => !file.startsWith('scripts/') && !file.startsWith('components/'));
+
+const results = pipeline(`
+import re
+from pathlib import Path
+from urllib.parse import parse_qs
+from site_pipeline.batch import REPO_ROOT
+from site_pipeline.components import load_components
+from site_pipeline.fingerprint import ASSET_REF_PATTERN, AssetManifest, fingerprint_content
+from site_pipeline.hints import MAX_PRECONNECTS, OWNED as HINT, resource_hints
+from site_pipeline.pipeline import TRANSFORMS, Page
+from site_pipeline.script_loading import BLOCKING, INLINE, ORDERED, defer_scripts, scan_scripts
+from site_pipeline.third_party import DEFERRED_SCRIPTS, OWNED, defer_third_party, load_config, restore_scripts
+
+assets = AssetManifest.build(REPO_ROOT)
+components = load_components(REPO_ROOT)
+config = load_config(REPO_ROOT)
+prerender = TRANSFORMS['prerender_components'].func
+placeholders = TRANSFORMS['components'].func
+owned_loader = re.compile(rf'[ \\t]*<script\\b[^>]*\\b{OWNED}\\b[^>]*>\\s*</script\\s*>\\n?')
+
+def execution_order(content, rel):
+    """Sources (or inline code) of the scripts that run in order: while parsing, then deferred."""
+    scripts = [script for script in scan_scripts(content, rel, assets) if script.kind in (BLOCKING, INLINE, ORDERED)]
+    name = lambda script: script.rel or script.src or content[script.start:script.end]
+    return ([name(script) for script in scripts if script.kind != ORDERED] +
+            [name(script) for script in scripts if script.kind == ORDERED])
+
+failures = {key: [] for key in ('versions', 'order', 'defer', 'placeholders', 'early', 'loader', 'components', 'hints', 'priority')}
+versions = []
+totals = {'deferred': 0, 'lazy': 0, 'prerendered': 0}
+for rel in data:
+    text = (REPO_ROOT / rel).read_text(encoding='utf-8')
+
+    fingerprinted = fingerprint_content(text, assets, rel)
+    if fingerprint_content(fingerprinted, assets, rel) != fingerprinted:
+        failures['versions'].append(rel)
+    for ref in re.findall(ASSET_REF_PATTERN, fingerprinted):
+        url, query = re.match(r'\\w+="([^"?#]*)\\??([^"#]*)', ref).groups()
+        target = assets.resolve(url, rel)
+        if target in assets.versions:
+            versions.append([rel, target, parse_qs(query).get('v', [None])[0]])
+
+    report = {}
+    deferred = defer_scripts(text, rel, assets, report=report)
+    totals['deferred'] += report['before'] - report['after']
+    if execution_order(deferred, rel) != execution_order(text, rel):
+        failures['order'].append(rel)
+    if defer_scripts(deferred, rel, assets) != deferred:
+        failures['defer'].append(rel)
+
+    report = {}
+    lazy = defer_third_party(text, rel, assets, config, report=report)
+    totals['lazy'] += report['requests']
+    if owned_loader.sub('', restore_scripts(lazy)) != text or defer_third_party(lazy, rel, assets, config) != lazy:
+        failures['placeholders'].append(rel)
+    for src in re.findall(r'<script type="text/plain" data-deferred-script[^>]*\\bdata-src="([^"]*)"', lazy):
+        target = assets.resolve(re.split(r'[?#]', src)[0], rel) or src
+        if config.classify(target)[1]:
+            failures['early'].append(f'{rel}: {src}')
+    if report['requests'] and lazy.count(DEFERRED_SCRIPTS) != 1:
+        failures['loader'].append(rel)
+
+    page = Page(rel, Path(rel).name, assets, components)
+    inlined = prerender(text, page)
+    totals['prerendered'] += inlined != text
+    if prerender(inlined, page) != inlined or prerender(placeholders(inlined, page), page) != inlined:
+        failures['components'].append(rel)
+    restored = placeholders(inlined, page)
+    if placeholders(prerender(restored, page), page) != restored:
+        failures['components'].append(rel)
+
+    hinted = resource_hints(text, rel, REPO_ROOT)
+    head = hinted[:hinted.find('</head>')]
+    owned = re.findall(rf'<link\\b[^>]*\\b{HINT}\\b[^>]*>', hinted)
+    if (resource_hints(hinted, rel, REPO_ROOT) != hinted
+            or any(tag not in head for tag in owned)
+            or sum('rel="preconnect"' in tag for tag in owned) > MAX_PRECONNECTS
+            or hinted.count('fetchpriority="high"') > max(1, text.count('fetchpriority="high"'))):
+        failures['hints'].append(rel)
+    # The page's own high-priority image (fetchpriority or an image preload) wins; author lazy-loading stays
+    images = re.findall(r'<img\\b[^>]*>', hinted)
+    preloads_image = re.search(r'<link\\b(?=[^>]*\\bpreload\\b)(?=[^>]*\\bas="image")[^>]*>', text)
+    if ((preloads_image or 'fetchpriority="high"' in text) and hinted.count('fetchpriority="high"') != text.count('fetchpriority="high"')
+            or hinted.count('loading="lazy"') < text.count('loading="lazy"')
+            or any('fetchpriority="high"' in tag and 'loading="lazy"' in tag for tag in images if tag not in text)):
+        failures['priority'].append(rel)
+
+print(json.dumps({'failures': failures, 'versions': versions, 'totals': totals}))
+`, pages);
+
+// Cache busting: ?v= is the referenced file's own content hash, and a second run changes nothing
+assert.deepStrictEqual(results.failures.versions, [], 'Fingerprinting must be idempotent');
+assert.ok(results.versions.length > pages.length, 'Pages should reference local assets');
+const hashes = new Map();
+for (const [page, target, version] of results.versions) {
+  if (!hashes.has(target)) hashes.set(target, contentVersion(path.join(root, target)));
+  assert.strictEqual(version, hashes.get(target), `${page}: ${target} must be versioned with its content hash`);
+}
+
+// Script deferral keeps the order scripts run in
+assert.ok(results.totals.deferred > 0, 'Some render-blocking scripts should be deferrable');
+assert.deepStrictEqual(results.failures.order, [], 'Deferring scripts must keep their execution order');
+assert.deepStrictEqual(results.failures.defer, [], 'Script deferral must be idempotent');
+
+// Third-party tags: placeholders restore to the original page; early scripts are never deferred
+assert.ok(results.totals.lazy > 0, 'Some third-party scripts should be loaded after interaction');
+assert.deepStrictEqual(results.failures.placeholders, [], 'Third-party placeholders must round-trip to the original tags');
+assert.deepStrictEqual(results.failures.early, [], 'Scripts listed as early must keep loading with the page');
+assert.deepStrictEqual(results.failures.loader, [], 'Pages with placeholders must load js/utils/deferred-scripts.js once');
+
+// Pre-rendered components: switching between inline and placeholder mode leaves the page as it was
+assert.ok(results.totals.prerendered > 0, 'Pages should have components to pre-render');
+assert.deepStrictEqual(results.failures.components, [], 'Inline and placeholder components must switch back and forth');
+
+// Resource hints stay in <head>, within budget, and are recomputed to the same result
+assert.deepStrictEqual(results.failures.hints, [], 'Resource hints must be idempotent, in <head> and within budget');
+assert.deepStrictEqual(results.failures.priority, [],
+  'Only pages without a high-priority image get one, and lazy-loading the author wrote stays');
+
+// Shared inline blocks, on a small site: consent stays inline, styles are rebased, scripts keep their order
+const work = fs.mkdtempSync(path.join(os.tmpdir(), 'site-pipeline-'));
+try {
+  const padding = Array.from({ length: 24 }, (_, index) => `  // ${'padding '.repeat(4)}${index}`).join('\n');
+  const block = (code) => `<script>\n${code}\n${padding}\n</script>`;
+  const consent = `window.dataLayer = window.dataLayer || [];\nfunction gtag(){dataLayer.push(arguments);}\ngtag('consent', 'default', { ad_storage: 'denied' });`;
+  const headScript = 'window.gbHead = document.documentElement.className;';
+  const syncScript = 'window.gbForms = document.querySelectorAll("form").length;';
+  const menuScript = 'document.addEventListener("click", function () { window.gbMenu = true; });';
+  const css = Array.from({ length: 20 }, (_, index) => `.gb-shared-${index} { padding: ${index}px; }`).join('\n');
+  const site = {
+    'a.html': '',
+    'b.html': '',
+    'blog/c.html': '../'
+  };
+
+  for (const [page, prefix] of Object.entries(site)) {
+    fs.mkdirSync(path.join(work, path.dirname(page)), { recursive: true });
+    fs.writeFileSync(path.join(work, page), [
+      '<!DOCTYPE html>',
+      '<html>',
+      '<head>',
+      block(consent),
+      block(headScript),
+      `<style>\n.gb-hero { background: url(${prefix}assets/hero.png); }\n${css}\n</style>`,
+      `<script defer src="${prefix}js/app.js"></script>`,
+      '</head>',
+      '<body>',
+      '<main></main>',
+      block(syncScript),
+      '<script>window.gbReady = true;</script>',
+      block(menuScript),
+      '</body>',
+      '</html>',
+      ''
+    ].join('\n'));
+  }
+  fs.mkdirSync(path.join(work, 'js'));
+  fs.writeFileSync(path.join(work, 'js', 'app.js'), 'window.gbApp = true;\n');
+
+  const order = (page) => {
+    const html = fs.readFileSync(path.join(work, page), 'utf8');
+    const during = [];
+    const after = [];
+    for (const [, attrs, body] of html.matchAll(/<script\b([^>]*)>([\s\S]*?)<\/script>/g)) {
+      const src = /\bsrc="([^"?]+)/.exec(attrs);
+      const file = src && path.join(work, path.dirname(page), src[1]);
+      // Shared files hold the block's code: compare the code, wherever it runs from
+      const code = src ? (file.includes(`${path.sep}shared${path.sep}`) ? fs.readFileSync(file, 'utf8').trim() : path.relative(work, file)) : body.trim();
+      (src && /\bdefer\b/.test(attrs) ? after : during).push(code);
+    }
+    return [...during, ...after];
+  };
+  const before = Object.fromEntries(Object.keys(site).map(page => [page, order(page)]));
+
+  for (const kind of ['style', 'script']) {
+    childProcess.execFileSync(python, ['extract-shared-blocks.py', '--root', work, '--all', '--workers', '1', '--kind', kind], {
+      cwd: automation,
+      encoding: 'utf8'
+    });
+  }
+  const extracted = Object.fromEntries(Object.keys(site).map(page => [page, fs.readFileSync(path.join(work, page), 'utf8')]));
+
+  const sharedCss = fs.readdirSync(path.join(work, 'css', 'shared'));
+  assert.strictEqual(sharedCss.length, 1, 'Pages in different directories should share one rebased stylesheet');
+  assert.match(fs.readFileSync(path.join(work, 'css', 'shared', sharedCss[0]), 'utf8'), /url\(\.\.\/\.\.\/assets\/hero\.png\)/,
+    'Shared stylesheets must rebase url()s onto css/shared/');
+
+  for (const [page, prefix] of Object.entries(site)) {
+    const html = extracted[page];
+    assert.doesNotMatch(html, /<style>/, `${page}: the repeated <style> block should be shared`);
+    assert.ok(html.includes(`href="${prefix}css/shared/${sharedCss[0]}?v=`), `${page}: should link the shared stylesheet`);
+    assert.ok(html.includes(consent), `${page}: the consent defaults must stay inline`);
+    assert.ok(html.includes(headScript), `${page}: a <head> script that cannot be deferred must stay inline`);
+    assert.match(html, /<script src="[^"]*js\/shared\/inline-[0-9a-f]+\.js\?v=[0-9a-f]+"><\/script>\n<script>window\.gbReady/,
+      `${page}: a block followed by an inline script stays synchronous in place`);
+    assert.match(html, /<script defer src="[^"]*js\/shared\/inline-[0-9a-f]+\.js\?v=[0-9a-f]+"><\/script>\n<script defer src="[^"]*js\/app\.js">/,
+      `${page}: the last block is deferred in front of the first deferred script`);
+    assert.deepStrictEqual(order(page), before[page], `${page}: shared scripts must run in the original order`);
+  }
+
+  for (const kind of ['style', 'script']) {
+    childProcess.execFileSync(python, ['extract-shared-blocks.py', '--root', work, '--all', '--workers', '1', '--kind', kind], {
+      cwd: automation,
+      encoding: 'utf8'
+    });
+  }
+  for (const page of Object.keys(site)) {
+    assert.strictEqual(fs.readFileSync(path.join(work, page), 'utf8'), extracted[page], `${page}: extraction must be idempotent`);
+  }
+} finally {
+  fs.rmSync(work, { recursive: true, force: true });
+}
+
+console.log(`Site pipeline scripts check passed for ${pages.length} pages.`);
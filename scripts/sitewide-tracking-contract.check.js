@@ -1,9 +1,15 @@
 const assert = require('node:assert/strict');
+const crypto = require('node:crypto');
 const fs = require('node:fs');
 const path = require('node:path');
 
 const root = path.join(__dirname, '..');
 const read = (relativePath) => fs.readFileSync(path.join(root, relativePath), 'utf8');
+// The site pipeline's cache busting replaces hand-set tokens with the file's content hash
+const contentVersion = (relativePath) =>
+  crypto.createHash('sha256').update(fs.readFileSync(path.join(root, relativePath))).digest('hex').slice(0, 10);
+const sitewideVersion = contentVersion('js/tracking/sitewide-events.js');
+const usesSitewide = (html, token) => [token, sitewideVersion].some((v) => html.includes(`sitewide-events.js?v=${v}`));
 
 const sitewide = read('js/tracking/sitewide-events.js');
 assert(sitewide.includes('window.GB_SITE_TRACK'), 'Sitewide tracking API must be exposed');
@@ -25,7 +31,7 @@ for (const assessmentEntry of ['assessment.html', 'start.html', 'start-result.ht
 }
 
 for (const page of ['index.html', 'contact.html', 'nutrition-calculator.html', 'workouts.html', 'packages.html', 'apply.html']) {
-  assert(read(page).includes('sitewide-events.js?v=20260801-sitewide-v1'), `${page} must expose the sitewide contract in source previews`);
+  assert(usesSitewide(read(page), '20260801-sitewide-v1'), `${page} must expose the sitewide contract in source previews`);
 }
 
 const nutrition = read('js/modules/nutrition-calculator.js');
@@ -70,7 +76,7 @@ const pixelInit = read('js/tracking/pixel-init.js');
 assert(!pixelInit.includes("fbq('track','PageView')"), 'GTM must be the sole Meta PageView owner to prevent load-order duplicates');
 const blog = read('blog.html');
 assert(!blog.includes("fbq('init'"), 'Blog must not bootstrap a second Meta dataset outside GTM consent handling');
-assert(blog.includes('sitewide-events.js?v=20260802-sitewide-v2'), 'Blog must publish the shared sitewide event contract');
+assert(usesSitewide(blog, '20260802-sitewide-v2'), 'Blog must publish the shared sitewide event contract');
 
 const stripeServer = read('api/stripe-server-premium.js');
 assert(stripeServer.includes("process.env.META_GRAPH_API_VERSION || 'v25.0'"), 'Meta CAPI must use a supported configurable Graph API version');
@@ -1,5 +1,6 @@
 #!/usr/bin/env node
 const assert = require('assert');
+const crypto = require('crypto');
 const fs = require('fs');
 const path = require('path');
 
@@ -42,6 +43,12 @@ function read(file) {
   return fs.readFileSync(path.join(ROOT, file), 'utf8');
 }
 
+// The site pipeline's cache busting replaces NEW_TOKEN with the file's content hash
+function currentTokens(assetPath) {
+  const data = fs.readFileSync(path.join(ROOT, assetPath.replace(/^\//, '')));
+  return [NEW_TOKEN, crypto.createHash('sha256').update(data).digest('hex').slice(0, 10)];
+}
+
 function extractToken(content, assetPath) {
   const escaped = assetPath.replace(/[.*+?^${}()|[\]\\]/g, '\\$&');
   const regex = new RegExp(`${escaped}\\?v=([^"'&\\s>]+)`, 'g');
@@ -79,7 +86,7 @@ function assertGlobalTokenConsistencyForChangedAssets() {
 
     const uniqueTokens = Array.from(new Set(observed.map((item) => item.token)));
     assert(uniqueTokens.length === 1, `${assetPath} uses inconsistent version tokens across pages: ${uniqueTokens.join(', ')}`);
-    assert(uniqueTokens[0] === NEW_TOKEN, `${assetPath} must use ${NEW_TOKEN}, found ${uniqueTokens[0]}`);
+    assert(currentTokens(assetPath).includes(uniqueTokens[0]), `${assetPath} must use ${NEW_TOKEN} or its content hash, found ${uniqueTokens[0]}`);
   }
 }
 
@@ -114,8 +121,8 @@ function assertRequiredReferencesPresentWithNewToken() {
     const content = read(file);
     for (const assetPath of assets) {
       assert(
-        content.includes(`${assetPath}?v=${NEW_TOKEN}`),
-        `${file} must reference ${assetPath} with version ${NEW_TOKEN}`
+        currentTokens(assetPath).some((token) => content.includes(`${assetPath}?v=${token}`)),
+        `${file} must reference ${assetPath} with version ${NEW_TOKEN} or its content hash`
       );
     }
   }